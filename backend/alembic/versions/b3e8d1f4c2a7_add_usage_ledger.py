@@ -0,0 +1,49 @@
+"""add usage_ledger table
+
+Revision ID: b3e8d1f4c2a7
+Revises: a7c4f9e2b1d0
+Create Date: 2026-10-19
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = 'b3e8d1f4c2a7'
+down_revision: Union[str, None] = 'a7c4f9e2b1d0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'usage_ledger',
+        sa.Column('id', sa.BigInteger(), primary_key=True, autoincrement=True),
+        sa.Column('request_id', sa.String(length=32), nullable=False),
+        sa.Column('route', sa.String(length=200), nullable=False),
+        sa.Column('user_id', sa.BigInteger(), nullable=True),
+        sa.Column('tier', sa.String(length=50), nullable=True),
+        sa.Column('subject', sa.String(length=50), nullable=True),
+        sa.Column('cache_layer', sa.SmallInteger(), nullable=True),
+        sa.Column('operation', sa.String(length=100), nullable=False),
+        sa.Column('kind', sa.String(length=20), nullable=False),
+        sa.Column('provider', sa.String(length=50), nullable=False),
+        sa.Column('model', sa.String(length=100), nullable=False),
+        sa.Column('calls', sa.Integer(), nullable=False, server_default='1'),
+        sa.Column('prompt_tokens', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('completion_tokens', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('latency_ms', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('cost_usd', sa.Numeric(12, 6), nullable=False, server_default='0'),
+        sa.Column('created_at', sa.DateTime(), server_default=sa.func.now()),
+    )
+    op.create_index('ix_usage_ledger_request_id', 'usage_ledger', ['request_id'])
+    op.create_index('ix_usage_ledger_created_at', 'usage_ledger', ['created_at'])
+    op.create_index('ix_usage_ledger_user_created', 'usage_ledger', ['user_id', 'created_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_usage_ledger_user_created', table_name='usage_ledger')
+    op.drop_index('ix_usage_ledger_created_at', table_name='usage_ledger')
+    op.drop_index('ix_usage_ledger_request_id', table_name='usage_ledger')
+    op.drop_table('usage_ledger')
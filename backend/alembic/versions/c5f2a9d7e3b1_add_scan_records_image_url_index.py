@@ -0,0 +1,23 @@
+"""index scan_records.image_url for storage reference counts
+
+Revision ID: c5f2a9d7e3b1
+Revises: b3e8d1f4c2a7
+Create Date: 2026-10-19
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+revision: str = 'c5f2a9d7e3b1'
+down_revision: Union[str, None] = 'b3e8d1f4c2a7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_scan_records_image_url', 'scan_records', ['image_url'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_scan_records_image_url', table_name='scan_records')
@@ -0,0 +1,42 @@
+"""move question images out of practice_questions rows
+
+Creates practice_question_images. Existing blobs stay in
+practice_questions.image_data until scripts/migrate_question_images.py
+has moved them (in resumable batches); a later revision drops the column.
+
+Revision ID: d8a3e6b2f1c4
+Revises: c5f2a9d7e3b1
+Create Date: 2026-10-19
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+
+revision: str = 'd8a3e6b2f1c4'
+down_revision: Union[str, None] = 'c5f2a9d7e3b1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'practice_question_images',
+        sa.Column('question_id', sa.Integer(), nullable=False),
+        sa.Column('sha256', sa.String(length=64), nullable=False),
+        sa.Column('size', sa.Integer(), nullable=False),
+        sa.Column('data', sa.LargeBinary(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), server_default=sa.func.now()),
+        sa.ForeignKeyConstraint(['question_id'], ['practice_questions.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('question_id'),
+    )
+
+
+def downgrade() -> None:
+    # Copy images back so no data is lost on the way down.
+    op.execute(
+        "UPDATE practice_questions q SET image_data = i.data "
+        "FROM practice_question_images i WHERE i.question_id = q.id"
+    )
+    op.drop_table('practice_question_images')
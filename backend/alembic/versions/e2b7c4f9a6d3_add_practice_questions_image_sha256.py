@@ -0,0 +1,28 @@
+"""practice_questions.image_sha256 for versioned, cacheable image URLs
+
+Revision ID: e2b7c4f9a6d3
+Revises: d8a3e6b2f1c4
+Create Date: 2026-10-19
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+
+revision: str = 'e2b7c4f9a6d3'
+down_revision: Union[str, None] = 'd8a3e6b2f1c4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('practice_questions', sa.Column('image_sha256', sa.String(length=64), nullable=True))
+    op.execute(
+        "UPDATE practice_questions q SET image_sha256 = i.sha256 "
+        "FROM practice_question_images i WHERE i.question_id = q.id"
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('practice_questions', 'image_sha256')
@@ -1,14 +1,21 @@
-from typing import AsyncGenerator
+from typing import AsyncGenerator, Callable, Optional
 
 from fastapi import Depends, Request
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 
+from app.core.auth_cache import UserSnapshot
 from app.database import AsyncSessionLocal
 from app.models.user import User
+from app.observability import usage_ledger
 
 GUEST_EMAIL = "guest@eduscan.local"
 
+# Guest identity resolved once at startup (see ``load_guest_user``). The row
+# never changes, so per-request it is rebuilt from this snapshot without SQL.
+_guest_snapshot: Optional[UserSnapshot] = None
+
 
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
     """Dependency for getting database session."""
@@ -16,9 +23,10 @@ async def get_db() -> AsyncGenerator[AsyncSession, None]:
         yield session
 
 
-async def get_or_create_guest_user(db: AsyncSession = Depends(get_db)) -> User:
-    """Dependency for getting or creating a guest user for unauthenticated access."""
-    result = await db.execute(select(User).where(User.email == GUEST_EMAIL))
+async def _fetch_or_create_guest(db: AsyncSession) -> User:
+    result = await db.execute(
+        select(User).where(User.email == GUEST_EMAIL).options(selectinload(User.tier))
+    )
     guest = result.scalar_one_or_none()
     if not guest:
         guest = User(
@@ -32,6 +40,30 @@ async def get_or_create_guest_user(db: AsyncSession = Depends(get_db)) -> User:
     return guest
 
 
+async def load_guest_user(session_factory: Callable = AsyncSessionLocal) -> None:
+    """Resolve the guest user (creating it if missing) and cache its snapshot."""
+    global _guest_snapshot
+    async with session_factory() as db:
+        _guest_snapshot = UserSnapshot.from_user(await _fetch_or_create_guest(db))
+
+
+def reset_guest_user() -> None:
+    """Drop the cached guest snapshot — for tests only."""
+    global _guest_snapshot
+    _guest_snapshot = None
+
+
+async def get_or_create_guest_user(db: AsyncSession = Depends(get_db)) -> User:
+    """Dependency for getting or creating a guest user for unauthenticated access."""
+    if _guest_snapshot is not None:
+        guest = await _guest_snapshot.attach(db)
+    else:
+        # Not loaded at startup (e.g. DB was down) — fall back to the query.
+        guest = await _fetch_or_create_guest(db)
+    usage_ledger.annotate(user_id=guest.id, tier="guest")
+    return guest
+
+
 async def get_current_or_guest_user(
     request: Request,
     db: AsyncSession = Depends(get_db),
@@ -1,19 +1,25 @@
-from datetime import date, timedelta
+from datetime import date, datetime, timedelta
 
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy import func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import joinedload
 
+from app.core.auth_cache import user_cache
 from app.core.security import require_admin
-from app.database import get_db
+from app.database import get_db, pool_status
 from app.models.daily_usage import DailyUsage
 from app.models.subscription_tier import SubscriptionTier
 from app.models.system_setting import SystemSetting
+from app.models.usage_ledger import UsageLedgerEntry
 from app.models.user import User
+from app.observability.blocking_detector import blocking_detector
+from app.observability.loop_lag import loop_lag_monitor
 from app.schemas.settings import SettingsUpdate
 from app.schemas.tier import TierCreate, TierUpdate
 from app.schemas.user import AdminUserUpdate
+from app.services.parse_cache import parse_cache
+from app.services.settings_cache import settings_cache
 
 router = APIRouter(dependencies=[Depends(require_admin)])
 
@@ -228,6 +234,7 @@ async def update_user(
 
     await db.commit()
     await db.refresh(user)
+    user_cache.invalidate(user.clerk_id)
 
     return {
         "id": user.id,
@@ -307,6 +314,7 @@ async def create_tier(
     db.add(tier)
     await db.commit()
     await db.refresh(tier)
+    user_cache.clear()
 
     return {
         "id": tier.id,
@@ -347,6 +355,7 @@ async def update_tier(
 
     await db.commit()
     await db.refresh(tier)
+    user_cache.clear()
 
     return {
         "id": tier.id,
@@ -387,6 +396,7 @@ async def delete_tier(
 
     tier.is_active = False
     await db.commit()
+    user_cache.clear()
 
     return {"status": "ok", "message": f"Tier '{tier.name}' has been deactivated."}
 
@@ -445,5 +455,122 @@ async def update_settings(
             updated.append(key)
 
     await db.commit()
+    await settings_cache.reload_and_publish(updated)
 
     return {"status": "ok", "updated_keys": updated}
+
+
+# ---------------------------------------------------------------------------
+# Usage & cost
+# ---------------------------------------------------------------------------
+
+_USAGE_GROUPS = {
+    "cache_layer": UsageLedgerEntry.cache_layer,
+    "tier": UsageLedgerEntry.tier,
+    "subject": UsageLedgerEntry.subject,
+    "operation": UsageLedgerEntry.operation,
+    "model": UsageLedgerEntry.model,
+    "provider": UsageLedgerEntry.provider,
+    "route": UsageLedgerEntry.route,
+    "user": UsageLedgerEntry.user_id,
+}
+
+
+@router.get("/usage/cost")
+async def get_usage_cost(
+    group_by: str = Query(default="cache_layer", pattern="^(" + "|".join(_USAGE_GROUPS) + ")$"),
+    days: int = Query(default=7, ge=1, le=365),
+    user_id: int | None = Query(default=None),
+    limit: int = Query(default=100, ge=1, le=1000),
+    db: AsyncSession = Depends(get_db),
+):
+    """LLM/embedding tokens and cost from the usage ledger, grouped by one dimension.
+
+    ``requests`` counts distinct requests, so ``cost_per_request`` for
+    ``group_by=cache_layer`` is what one solve costs at each layer.
+    """
+    column = _USAGE_GROUPS[group_by]
+    since = datetime.utcnow() - timedelta(days=days)
+    cost = func.coalesce(func.sum(UsageLedgerEntry.cost_usd), 0)
+
+    query = (
+        select(
+            column.label("key"),
+            func.count(func.distinct(UsageLedgerEntry.request_id)).label("requests"),
+            func.coalesce(func.sum(UsageLedgerEntry.calls), 0).label("calls"),
+            func.coalesce(func.sum(UsageLedgerEntry.prompt_tokens), 0).label("prompt_tokens"),
+            func.coalesce(func.sum(UsageLedgerEntry.completion_tokens), 0).label("completion_tokens"),
+            func.coalesce(func.sum(UsageLedgerEntry.latency_ms), 0).label("latency_ms"),
+            cost.label("cost_usd"),
+        )
+        .where(UsageLedgerEntry.created_at >= since)
+        .group_by(column)
+        .order_by(cost.desc())
+        .limit(limit)
+    )
+    if user_id is not None:
+        query = query.where(UsageLedgerEntry.user_id == user_id)
+
+    rows = (await db.execute(query)).all()
+
+    return {
+        "group_by": group_by,
+        "days": days,
+        "rows": [
+            {
+                "key": row.key,
+                "requests": row.requests,
+                "calls": row.calls,
+                "prompt_tokens": row.prompt_tokens,
+                "completion_tokens": row.completion_tokens,
+                "avg_latency_ms": round(row.latency_ms / row.calls, 1) if row.calls else 0.0,
+                "cost_usd": float(row.cost_usd),
+                "cost_per_request": round(float(row.cost_usd) / row.requests, 6) if row.requests else 0.0,
+            }
+            for row in rows
+        ],
+    }
+
+
+# ---------------------------------------------------------------------------
+# Runtime diagnostics
+# ---------------------------------------------------------------------------
+
+
+@router.get("/db/pool")
+async def get_db_pool_status():
+    """Connection pool usage and per-route checkout wait / hold times."""
+    return pool_status()
+
+
+@router.get("/diagnostics/blocking")
+async def get_blocking_diagnostics(limit: int = Query(50, ge=1, le=500)):
+    """Event-loop lag and the call sites that blocked the loop, worst first.
+
+    Call sites are only collected when ``BLOCKING_DETECTOR_ENABLED`` is set;
+    loop lag is always measured.
+    """
+    lags = sorted(loop_lag_monitor.samples)
+    return {
+        "detector_enabled": blocking_detector.running,
+        "threshold_ms": round(blocking_detector.threshold * 1000, 1),
+        "loop_lag_ms": {
+            "samples": len(lags),
+            "p50": round(lags[len(lags) // 2] * 1000, 1) if lags else 0.0,
+            "p99": round(lags[max(0, int(len(lags) * 0.99) - 1)] * 1000, 1) if lags else 0.0,
+            "max": round(lags[-1] * 1000, 1) if lags else 0.0,
+        },
+        "sites": blocking_detector.sites()[:limit],
+    }
+
+
+@router.delete("/diagnostics/blocking", status_code=204)
+async def reset_blocking_diagnostics():
+    """Clear the per-call-site blocking counters (Prometheus counters keep counting)."""
+    blocking_detector.reset()
+
+
+@router.delete("/cache/pdf-parse")
+async def invalidate_pdf_parse_cache(sha256: str | None = Query(None, pattern="^[0-9a-f]{64}$")):
+    """Drop cached exam/schedule parses for one PDF (by SHA-256), or all of them."""
+    return {"deleted": await parse_cache.invalidate(sha256)}
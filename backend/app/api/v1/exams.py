@@ -3,7 +3,13 @@
 Endpoint design:
   Admin (require_admin):
     POST   /exams/upload                          Upload exam + schedule PDF
-    POST   /exams/crawl                           Crawl NZQA page
+    POST   /exams/crawl                           Crawl NZQA page (waits for the result)
+    POST   /exams/crawl/jobs                      Start a background crawl job
+    GET    /exams/crawl/jobs                      List crawl jobs
+    GET    /exams/crawl/jobs/{job_id}             Crawl job status + progress
+    GET    /exams/crawl/jobs/{job_id}/events      SSE progress stream
+    POST   /exams/crawl/jobs/{job_id}/resume      Re-run a finished crawl, skipping saved papers
+    DELETE /exams/crawl/jobs/{job_id}             Cancel a running crawl
     GET    /exams/{id}/questions/admin             All questions WITH answers (paginated)
     DELETE /exams/{id}                             Delete an exam paper
 
@@ -12,36 +18,47 @@ Endpoint design:
     GET    /exams/{id}/questions                   Questions WITHOUT answers (paginated, filterable by type)
     GET    /exams/{id}/questions/{qid}             Single question (no answer)
     POST   /exams/{id}/questions/{qid}/answer      Reveal answer after student submits attempt
-    GET    /exams/questions/{qid}/image            Serve cropped question image
+    GET    /exams/questions/{qid}/image            Serve cropped question image (?v= hash, ?w= width)
 """
 
+import asyncio
+import hashlib
+import json
 import math
 from typing import Optional
 
-from fastapi import APIRouter, Depends, File, Form, HTTPException, Query, UploadFile, status
-from fastapi.responses import Response
+from fastapi import APIRouter, Depends, File, Form, Header, HTTPException, Query, UploadFile, status
+from fastapi.responses import Response, StreamingResponse
 from pydantic import BaseModel
 from sqlalchemy import func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.config import get_settings
 from app.core.security import require_admin
 from app.database import get_db
-from app.models.exam_paper import ExamPaper, PracticeQuestion
+from app.models.exam_paper import ExamPaper, PracticeQuestion, PracticeQuestionImage
 from app.schemas.common import PaginatedResponse
 from app.schemas.exam import (
+    CrawlJobResponse,
     CrawlRequest,
     CrawlResponse,
-    CrawledPaperSummary,
     ExamPaperResponse,
     ExamUploadResponse,
     PracticeQuestionResponse,
     PracticeQuestionWithAnswerResponse,
     QuestionAnswerResponse,
 )
-from app.services.exam_crawler_service import ExamCrawlerService
+from app.services import question_images
+from app.services.crawl_job_service import CrawlJob, crawl_jobs
+from app.services.exam_ingest_service import ExamIngestService, PaperToIngest
+from app.services.image_preprocess import sniff_mime_type
 from app.services.pdf_parser_service import PDFParserService
 
 router = APIRouter()
+settings = get_settings()
+
+# Comment line sent on an idle SSE stream so proxies keep it open
+_SSE_KEEPALIVE_SECONDS = 15.0
 
 
 # ===========================================================================
@@ -71,72 +88,43 @@ async def upload_exam_pdf(
     if not exam_pdf.filename or not exam_pdf.filename.lower().endswith(".pdf"):
         raise HTTPException(status_code=422, detail="Exam file must be a PDF")
 
+    if schedule_pdf and (not schedule_pdf.filename or not schedule_pdf.filename.lower().endswith(".pdf")):
+        raise HTTPException(status_code=422, detail="Schedule file must be a PDF")
+
     parser = PDFParserService()
 
     exam_bytes = await exam_pdf.read()
-    parsed_exam = await parser.parse_exam_pdf(exam_bytes)
+    schedule_bytes = await schedule_pdf.read() if schedule_pdf else None
+
+    # Exam and marking schedule (if provided) are parsed concurrently
+    async def parse_schedule() -> list:
+        return await parser.parse_schedule_pdf(schedule_bytes) if schedule_bytes else []
+
+    parsed_exam, schedule_answers = await asyncio.gather(
+        parser.parse_exam_pdf(exam_bytes), parse_schedule(),
+    )
 
     if not parsed_exam.questions:
         raise HTTPException(status_code=422, detail="No questions could be parsed from the exam PDF")
 
-    # Parse marking schedule if provided
-    answer_map = {}
-    if schedule_pdf:
-        if not schedule_pdf.filename or not schedule_pdf.filename.lower().endswith(".pdf"):
-            raise HTTPException(status_code=422, detail="Schedule file must be a PDF")
-        schedule_bytes = await schedule_pdf.read()
-        schedule_answers = await parser.parse_schedule_pdf(schedule_bytes)
-        answer_map = parser.get_answer_map(schedule_answers)
-
-    # Create exam paper record
-    exam_paper = ExamPaper(
+    answer_map = parser.get_answer_map(schedule_answers)
+
+    [ingested] = await ExamIngestService(db).ingest([PaperToIngest(
+        parsed=parsed_exam,
         title=title,
         source_url=source_url,
         year=year,
         subject=subject,
         level=level,
         exam_code=exam_code,
-        paper_type="exam",
         language=language,
-        total_questions=len(parsed_exam.questions),
-        raw_text=parsed_exam.raw_text,
-    )
-    db.add(exam_paper)
-    await db.flush()
-
-    # Create practice question records
-    question_models = []
-    for pq in parsed_exam.questions:
-        key = f"{pq.question_number}_{pq.sub_question}"
-        answer = answer_map.get(key)
-
-        question = PracticeQuestion(
-            exam_paper_id=exam_paper.id,
-            question_number=pq.question_number,
-            sub_question=pq.sub_question,
-            question_text=pq.text,
-            question_type=answer.question_type if answer else None,
-            correct_answer=answer.correct_answer if answer else None,
-            accepted_answers=answer.accepted_answers if answer else None,
-            answer_explanation=answer.explanation if answer else None,
-            marks=answer.marks if answer else None,
-            outcome=answer.outcome if answer else None,
-            has_image=pq.has_image,
-            image_data=pq.image_bytes,
-            order_index=pq.order_index,
-        )
-        db.add(question)
-        question_models.append(question)
-
-    await db.commit()
-    await db.refresh(exam_paper)
-    for q in question_models:
-        await db.refresh(q)
+        answers=answer_map,
+    )])
 
     return ExamUploadResponse(
-        exam_paper=_paper_response(exam_paper),
-        total_questions_parsed=len(question_models),
-        questions=[_admin_question_response(q) for q in question_models],
+        exam_paper=_paper_response(ingested.paper),
+        total_questions_parsed=len(ingested.questions),
+        questions=[_admin_question_response(q) for q in ingested.questions],
     )
 
 
@@ -150,171 +138,119 @@ async def upload_exam_pdf(
     response_model=CrawlResponse,
     dependencies=[Depends(require_admin)],
 )
-async def crawl_exam_page(
-    request: CrawlRequest,
-    db: AsyncSession = Depends(get_db),
-):
-    """Crawl an NZQA page to discover, download, parse and store exam PDFs.
+async def crawl_exam_page(request: CrawlRequest):
+    """Crawl an NZQA page and wait for the result.
 
-    Uses concurrent download+parse for speed, then saves to DB sequentially.
+    Runs as a background crawl job (app/services/crawl_job_service.py) and
+    waits for it. The crawl keeps going if the client disconnects. Prefer
+    ``POST /crawl/jobs``, which returns at once, for long crawls.
     """
-    import asyncio
-    import logging
+    job = crawl_jobs.start(request)
+    await asyncio.shield(job.task)
+    if job.result is None:
+        raise HTTPException(status_code=500, detail=f"Crawl {job.status}: {job.error}")
+    return job.result
 
-    logger = logging.getLogger(__name__)
-    from app.services.exam_crawler_service import EXAM_CODE_MAP
 
-    crawler = ExamCrawlerService()
-    parser = PDFParserService()
+@router.post(
+    "/crawl/jobs",
+    response_model=CrawlJobResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+    dependencies=[Depends(require_admin)],
+)
+async def start_crawl_job(request: CrawlRequest):
+    """Start a crawl in the background; follow it via /crawl/jobs/{id}/events."""
+    return crawl_jobs.start(request).to_response()
 
-    all_pdfs = await crawler.discover_pdfs(request.url)
-    filtered = crawler.filter_exam_pdfs(all_pdfs, language=request.language)
-    pairs = crawler.pair_exams_with_schedules(filtered)
-
-    papers_imported: list[CrawledPaperSummary] = []
-    skipped: list[str] = []
-    failed: list[str] = []
-    errors: list[str] = []
-    total_questions = 0
-
-    # --- Phase 1: Filter out duplicates (fast, DB only) ---
-    new_pairs = []
-    for pair in pairs:
-        exam_title = pair.exam.title or pair.exam.url.split("/")[-1]
-        dup = (await db.execute(
-            select(ExamPaper).where(ExamPaper.source_url == pair.exam.url)
-        )).scalar_one_or_none()
-        if dup:
-            skipped.append(f"{exam_title} ({pair.exam.year})")
-            logger.info("Skipping existing: %s", exam_title)
-        else:
-            new_pairs.append(pair)
-
-    if not new_pairs:
-        return CrawlResponse(
-            url=request.url,
-            total_pdfs_discovered=len(all_pdfs),
-            total_papers_imported=0,
-            total_questions_parsed=0,
-            total_skipped=len(skipped),
-            papers=[], skipped=skipped, failed=failed, errors=errors,
-        )
 
-    # --- Phase 2: Download + parse concurrently (3 at a time) ---
-    CONCURRENCY = 3
-    semaphore = asyncio.Semaphore(CONCURRENCY)
-
-    async def process_pair(pair):
-        """Download and parse a single exam+schedule pair. Returns parsed data or error."""
-        exam_title = pair.exam.title or pair.exam.url.split("/")[-1]
-        async with semaphore:
-            try:
-                exam_bytes = await crawler.download_pdf(pair.exam.url)
-                parsed_exam = await parser.parse_exam_pdf(exam_bytes)
-                if not parsed_exam.questions:
-                    return {"status": "failed", "title": exam_title, "year": pair.exam.year,
-                            "msg": "0 questions parsed", "url": pair.exam.url}
-
-                answer_map = {}
-                if pair.schedule:
-                    try:
-                        schedule_bytes = await crawler.download_pdf(pair.schedule.url)
-                        schedule_answers = await parser.parse_schedule_pdf(schedule_bytes)
-                        answer_map = parser.get_answer_map(schedule_answers)
-                    except Exception as e:
-                        return {"status": "ok", "pair": pair, "parsed": parsed_exam,
-                                "answers": answer_map, "warning": f"Schedule failed: {e}"}
-
-                return {"status": "ok", "pair": pair, "parsed": parsed_exam, "answers": answer_map}
-            except Exception as e:
-                return {"status": "failed", "title": exam_title, "year": pair.exam.year,
-                        "msg": str(e), "url": pair.exam.url}
-
-    logger.info("Processing %d new papers (concurrency=%d)...", len(new_pairs), CONCURRENCY)
-    results = await asyncio.gather(*[process_pair(p) for p in new_pairs])
-
-    # --- Phase 3: Save to DB sequentially ---
-    for result in results:
-        if result["status"] == "failed":
-            failed.append(f"{result['title']} ({result['year']}) — {result['msg']}, URL: {result['url']}")
-            continue
-
-        pair = result["pair"]
-        parsed_exam = result["parsed"]
-        answer_map = result["answers"]
-        exam_title = pair.exam.title or pair.exam.url.split("/")[-1]
-
-        if result.get("warning"):
-            errors.append(f"{exam_title}: {result['warning']}")
-
-        try:
-            detected_code = pair.exam.exam_code or request.exam_code
-            code_info = EXAM_CODE_MAP.get(detected_code, {})
-
-            exam_paper = ExamPaper(
-                title=pair.exam.title or parsed_exam.title,
-                source_url=pair.exam.url,
-                year=pair.exam.year,
-                subject=str(code_info.get("subject", request.subject)),
-                level=int(code_info.get("level", request.level)),
-                exam_code=detected_code,
-                paper_type="exam",
-                language=request.language,
-                total_questions=len(parsed_exam.questions),
-                raw_text=parsed_exam.raw_text,
-            )
-            db.add(exam_paper)
-            await db.flush()
-
-            for pq in parsed_exam.questions:
-                key = f"{pq.question_number}_{pq.sub_question}"
-                answer = answer_map.get(key)
-                question = PracticeQuestion(
-                    exam_paper_id=exam_paper.id,
-                    question_number=pq.question_number,
-                    sub_question=pq.sub_question,
-                    question_text=pq.text,
-                    question_type=answer.question_type if answer else None,
-                    correct_answer=answer.correct_answer if answer else None,
-                    accepted_answers=answer.accepted_answers if answer else None,
-                    answer_explanation=answer.explanation if answer else None,
-                    marks=answer.marks if answer else None,
-                    outcome=answer.outcome if answer else None,
-                    has_image=pq.has_image,
-                    image_data=pq.image_bytes,
-                    order_index=pq.order_index,
-                )
-                db.add(question)
-
-            await db.commit()
-
-            total_questions += len(parsed_exam.questions)
-            papers_imported.append(CrawledPaperSummary(
-                title=exam_paper.title,
-                year=exam_paper.year,
-                total_questions=len(parsed_exam.questions),
-                exam_paper_id=str(exam_paper.id),
-            ))
-            logger.info("Imported: %s (%d questions)", exam_paper.title, len(parsed_exam.questions))
-
-        except Exception as e:
-            await db.rollback()
-            failed.append(f"{exam_title} ({pair.exam.year}) — {str(e)}, URL: {pair.exam.url}")
-            logger.exception("Failed to save %s", pair.exam.url)
-
-    return CrawlResponse(
-        url=request.url,
-        total_pdfs_discovered=len(all_pdfs),
-        total_papers_imported=len(papers_imported),
-        total_questions_parsed=total_questions,
-        total_skipped=len(skipped),
-        papers=papers_imported,
-        skipped=skipped,
-        failed=failed,
-        errors=errors,
+@router.get(
+    "/crawl/jobs",
+    response_model=list[CrawlJobResponse],
+    dependencies=[Depends(require_admin)],
+)
+async def list_crawl_jobs():
+    """Running and recently finished crawl jobs, newest first."""
+    return [job.to_response() for job in crawl_jobs.list()]
+
+
+@router.get(
+    "/crawl/jobs/{job_id}",
+    response_model=CrawlJobResponse,
+    dependencies=[Depends(require_admin)],
+)
+async def get_crawl_job(job_id: str):
+    return _require_crawl_job(job_id).to_response()
+
+
+@router.get(
+    "/crawl/jobs/{job_id}/events",
+    dependencies=[Depends(require_admin)],
+)
+async def stream_crawl_job(
+    job_id: str,
+    after: int = Query(0, ge=0, description="Replay events after this sequence number"),
+    last_event_id: Optional[str] = Header(None, alias="Last-Event-ID"),
+):
+    """SSE stream of a crawl job's progress.
+
+    Replays the job's events, then streams new ones until the job ends.
+    Event types: started; per paper discovered, skipped, downloaded,
+    parsed, saved or paper_failed; then the job's status, completed /
+    failed / cancelled (with the CrawlResponse or the error). Each event's
+    id is its sequence number, so a reconnecting client resumes after
+    ``Last-Event-ID``.
+    """
+    job = _require_crawl_job(job_id)
+    if last_event_id and last_event_id.isdigit():
+        after = max(after, int(last_event_id))
+
+    async def event_generator():
+        async for evt in job.follow(after, idle_timeout=_SSE_KEEPALIVE_SECONDS):
+            if evt is None:
+                yield ": keep-alive\n\n"
+                continue
+            data = json.dumps(evt.data, ensure_ascii=False)
+            yield f"id: {evt.seq}\nevent: {evt.type}\ndata: {data}\n\n"
+
+    return StreamingResponse(
+        event_generator(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+            "X-Accel-Buffering": "no",
+        },
     )
 
 
+@router.post(
+    "/crawl/jobs/{job_id}/resume",
+    response_model=CrawlJobResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+    dependencies=[Depends(require_admin)],
+)
+async def resume_crawl_job(job_id: str):
+    """Re-run a finished crawl as a new job; papers it already saved are skipped."""
+    job = _require_crawl_job(job_id)
+    if not job.done:
+        raise HTTPException(status_code=409, detail="Crawl job is still running")
+    return crawl_jobs.resume(job).to_response()
+
+
+@router.delete(
+    "/crawl/jobs/{job_id}",
+    response_model=CrawlJobResponse,
+    dependencies=[Depends(require_admin)],
+)
+async def cancel_crawl_job(job_id: str):
+    """Cancel a running crawl. Papers saved so far are kept; resume picks up the rest."""
+    job = _require_crawl_job(job_id)
+    if job.done:
+        raise HTTPException(status_code=409, detail=f"Crawl job already {job.status}")
+    crawl_jobs.cancel(job)
+    return job.to_response()
+
+
 # ===========================================================================
 # Admin: Upload marking schedule to existing exam
 # ===========================================================================
@@ -570,20 +506,66 @@ async def reveal_answer(
 @router.get("/questions/{question_id}/image")
 async def get_question_image(
     question_id: int,
+    v: Optional[str] = Query(None, description="Image hash prefix from image_url; makes the response immutable"),
+    w: Optional[int] = Query(None, description="Resized variant width (QUESTION_IMAGE_WIDTHS)"),
+    if_none_match: Optional[str] = Header(None),
+    range_header: Optional[str] = Header(None, alias="Range"),
     db: AsyncSession = Depends(get_db),
 ):
-    """Serve the cropped PNG image for a question."""
-    question = (await db.execute(
-        select(PracticeQuestion).where(PracticeQuestion.id == question_id)
-    )).scalar_one_or_none()
+    """Serve the cropped image (PNG or WebP) for a question.
 
-    if not question or not question.image_data:
-        raise HTTPException(status_code=404, detail="Question image not found")
+    ETag / 304 are answered from the hash alone; the blob is only read when
+    it has to be sent (see app/services/question_images.py).
+    """
+    if w is not None and w not in settings.question_image_widths:
+        raise HTTPException(status_code=422, detail=f"w must be one of {settings.question_image_widths}")
 
+    data: Optional[bytes] = None
+    sha256 = (await db.execute(
+        select(PracticeQuestionImage.sha256).where(PracticeQuestionImage.question_id == question_id)
+    )).scalar_one_or_none()
+    if sha256 is None:
+        # Not yet moved by scripts/migrate_question_images.py
+        data = (await db.execute(
+            select(PracticeQuestion.image_data).where(PracticeQuestion.id == question_id)
+        )).scalar_one_or_none()
+        if not data:
+            raise HTTPException(status_code=404, detail="Question image not found")
+        sha256 = hashlib.sha256(data).hexdigest()
+
+    tag = question_images.etag(sha256, w)
+    headers = {
+        "ETag": tag,
+        "Accept-Ranges": "bytes",
+        "Cache-Control": question_images.IMMUTABLE if v and sha256.startswith(v) else question_images.REVALIDATE,
+    }
+    if question_images.etag_matches(if_none_match, tag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    async def load_original() -> bytes:
+        if data is not None:
+            return data
+        return (await db.execute(
+            select(PracticeQuestionImage.data).where(PracticeQuestionImage.question_id == question_id)
+        )).scalar_one()
+
+    body = await question_images.variant_cache.get(sha256, w, load_original) if w else await load_original()
+    media_type = sniff_mime_type(body)
+
+    try:
+        byte_range = question_images.parse_range(range_header, len(body))
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_416_RANGE_NOT_SATISFIABLE,
+            headers={"Content-Range": f"bytes */{len(body)}"},
+        )
+    if byte_range is None:
+        return Response(content=body, media_type=media_type, headers=headers)
+    start, end = byte_range
+    headers["Content-Range"] = f"bytes {start}-{end}/{len(body)}"
     return Response(
-        content=question.image_data,
-        media_type="image/png",
-        headers={"Cache-Control": "no-cache"},
+        content=body[start:end + 1], status_code=status.HTTP_206_PARTIAL_CONTENT,
+        media_type=media_type, headers=headers,
     )
 
 
@@ -674,6 +656,13 @@ async def explain_question(
 # ===========================================================================
 
 
+def _require_crawl_job(job_id: str) -> CrawlJob:
+    job = crawl_jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Crawl job not found")
+    return job
+
+
 async def _require_exam(exam_id: int, db: AsyncSession) -> ExamPaper:
     paper = await db.get(ExamPaper, exam_id)
     if not paper:
@@ -731,7 +720,7 @@ def _student_question_response(q: PracticeQuestion) -> PracticeQuestionResponse:
         question_type=q.question_type,
         options=q.options,
         has_image=q.has_image,
-        image_url=f"/api/v1/exams/questions/{q.id}/image" if q.has_image else None,
+        image_url=question_images.image_url(q),
         order_index=q.order_index,
     )
 
@@ -746,7 +735,7 @@ def _admin_question_response(q: PracticeQuestion) -> PracticeQuestionWithAnswerR
         question_text=q.question_text,
         question_type=q.question_type,
         has_image=q.has_image,
-        image_url=f"/api/v1/exams/questions/{q.id}/image" if q.has_image else None,
+        image_url=question_images.image_url(q),
         order_index=q.order_index,
         correct_answer=q.correct_answer,
         accepted_answers=q.accepted_answers,
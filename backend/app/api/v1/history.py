@@ -12,10 +12,9 @@ from app.models.scan_record import ScanRecord
 from app.models.user import User
 from app.schemas.common import PaginatedResponse
 from app.schemas.scan import ScanRecordResponse
-from app.services.storage_service import StorageService
+from app.services.storage_service import storage_service
 
 logger = logging.getLogger(__name__)
-storage_service = StorageService()
 
 router = APIRouter()
 
@@ -88,20 +87,24 @@ async def delete_history_item(
     if not record:
         raise HTTPException(status_code=404, detail="Record not found")
 
-    # 1. Delete image from storage (R2 or local)
-    if record.image_url:
-        try:
-            await storage_service.delete_image(record.image_url)
-        except Exception as e:
-            logger.warning("Failed to delete image %s: %s", record.image_url, e)
+    image_url = record.image_url
 
-    # 2. Delete related mistake_book entries (no CASCADE on FK)
+    # 1. Delete related mistake_book entries (no CASCADE on FK)
     await db.execute(
         sa_delete(MistakeBook).where(MistakeBook.scan_id == scan_id)
     )
 
-    # 3. Delete scan record (solutions, conversation_messages, evaluation_logs
+    # 2. Delete scan record (solutions, conversation_messages, evaluation_logs
     #    are CASCADE-deleted by DB foreign keys)
     await db.delete(record)
     await db.commit()
+
+    # 3. Delete the image from storage (R2 or local) once this row is gone,
+    #    unless another scan of the same content still references it
+    if image_url:
+        try:
+            await storage_service.delete_image(image_url)
+        except Exception as e:
+            logger.warning("Failed to delete image %s: %s", image_url, e)
+
     return {"message": "Deleted successfully"}
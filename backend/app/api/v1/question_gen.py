@@ -31,6 +31,7 @@ from app.schemas.question_gen import (
     SyncResponse,
 )
 from app.schemas.common import PaginatedResponse
+from app.services import question_images
 from app.services.question_generator_service import QuestionGeneratorService
 
 router = APIRouter()
@@ -58,7 +59,7 @@ def _question_response(q: PracticeQuestion) -> GeneratedQuestionResponse:
         status=q.status,
         source_question_id=str(q.source_question_id) if q.source_question_id else None,
         has_image=q.has_image,
-        image_url=f"/api/v1/exams/questions/{q.id}/image" if q.has_image else None,
+        image_url=question_images.image_url(q),
         created_at=q.created_at,
     )
 
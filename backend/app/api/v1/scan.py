@@ -61,6 +61,7 @@ async def solve_problem(
         subject=subject,
         ai_provider=ai_provider,
         grade_level=grade_level,
+        quota=quota,
     )
 
 
@@ -99,6 +100,7 @@ async def solve_problem_guest(
         subject=subject,
         ai_provider=ai_provider,
         grade_level=grade_level,
+        quota=quota,
     )
 
 
@@ -129,7 +131,7 @@ async def solve_problem_guest_stream(
         )
     is_guest = current_user.email == "guest@eduscan.local"
     ip_address = request.client.host if request.client else "unknown"
-    await check_and_increment_quota(
+    quota = await check_and_increment_quota(
         user=None if is_guest else current_user,
         ip_address=ip_address if is_guest else None,
         db=db,
@@ -144,6 +146,7 @@ async def solve_problem_guest_stream(
             subject=subject,
             ai_provider=ai_provider,
             grade_level=grade_level,
+            quota=quota,
         ):
             event_type = evt["event"]
             data = json.dumps(evt["data"], ensure_ascii=False)
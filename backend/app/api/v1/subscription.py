@@ -4,6 +4,7 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.deps import get_current_or_guest_user
+from app.core.auth_cache import user_cache
 from app.core.security import require_admin
 from app.database import get_db
 from app.models.user import User
@@ -52,4 +53,5 @@ async def admin_set_user_tier(
         await service.set_user_tier(user_id, body.tier_name)
     except ValueError as e:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    user_cache.clear()  # keyed by clerk_id, not user_id
     return {"detail": f"User {user_id} tier set to '{body.tier_name}'"}
@@ -3,6 +3,7 @@ from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.config import get_settings
+from app.core.auth_cache import user_cache
 from app.database import get_db
 from app.models.subscription_tier import SubscriptionTier
 from app.models.user import User
@@ -49,6 +50,8 @@ async def handle_clerk_webhook(
     elif event_type == "user.deleted":
         await _handle_user_deleted(data, db)
 
+    # After the handler commits, so the next request re-reads fresh state.
+    user_cache.invalidate(data.get("id"))
     return {"status": "ok"}
 
 
@@ -0,0 +1,254 @@
+"""Caches behind the Clerk auth fast path.
+
+Every authenticated request used to (1) verify the JWT signature with a
+synchronous JWKS client and (2) look the user up by ``clerk_id``. These
+caches remove both from the common case:
+
+- ``JWKSCache``: Clerk signing keys fetched with httpx and refreshed in the
+  background; an unknown ``kid`` triggers a rate-limited refetch (key
+  rotation).
+- ``VerifiedTokenCache``: bounded LRU of ``sha256(token)`` → claims, valid
+  until the token's own ``exp``. Raw tokens are never stored.
+- ``UserSnapshotCache``: short-TTL ``clerk_id`` → user/tier column snapshot.
+  Invalidated by the Clerk webhooks and admin user/tier edits on the worker
+  that handles them; the TTL bounds staleness on the other workers.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Optional
+
+import httpx
+import jwt
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app.config import get_settings
+from app.models.subscription_tier import SubscriptionTier
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+# Minimum gap between on-demand JWKS refetches triggered by unknown kids.
+_JWKS_MIN_REFETCH_SECONDS = 30.0
+
+
+class JWKSCache:
+    """Clerk JWKS held in memory and refreshed off the request path."""
+
+    def __init__(self, jwks_url: str, refresh_seconds: int = 3600, timeout: float = 10.0):
+        self._jwks_url = jwks_url
+        self._refresh_seconds = refresh_seconds
+        self._timeout = timeout
+        self._keys: dict[str, jwt.PyJWK] = {}
+        self._fetched_at = 0.0
+        self._lock = asyncio.Lock()
+        self._refresher: Optional[asyncio.Task] = None
+
+    @property
+    def fetched_at(self) -> float:
+        return self._fetched_at
+
+    async def refresh(self) -> None:
+        """Fetch the JWKS document and replace the key map."""
+        async with httpx.AsyncClient(timeout=self._timeout) as client:
+            resp = await client.get(self._jwks_url)
+            resp.raise_for_status()
+        self.load(resp.json())
+
+    def load(self, jwks: dict) -> None:
+        """Install keys from a JWKS dict (also used by tests/benchmarks)."""
+        keys: dict[str, jwt.PyJWK] = {}
+        for key in jwt.PyJWKSet.from_dict(jwks).keys:
+            if key.key_id:
+                keys[key.key_id] = key
+        self._keys = keys
+        self._fetched_at = time.monotonic()
+
+    async def get_signing_key(self, kid: str) -> jwt.PyJWK:
+        key = self._keys.get(kid)
+        if key is not None:
+            return key
+        # Unknown kid: first use or Clerk rotated keys — refetch, rate-limited.
+        async with self._lock:
+            key = self._keys.get(kid)
+            if key is None and (
+                not self._keys
+                or time.monotonic() - self._fetched_at >= _JWKS_MIN_REFETCH_SECONDS
+            ):
+                await self.refresh()
+                key = self._keys.get(kid)
+        if key is None:
+            raise jwt.InvalidTokenError(f"Unknown signing key: {kid}")
+        return key
+
+    def start_refresher(self) -> asyncio.Task:
+        if self._refresher is None or self._refresher.done():
+            self._refresher = asyncio.get_running_loop().create_task(self._refresh_loop())
+        return self._refresher
+
+    async def stop_refresher(self) -> None:
+        if self._refresher is None:
+            return
+        self._refresher.cancel()
+        try:
+            await self._refresher
+        except (asyncio.CancelledError, Exception):
+            pass
+        self._refresher = None
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            try:
+                await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Keep serving the previous keys; retry on the next tick.
+                logger.warning("JWKS refresh failed: %s", e)
+            await asyncio.sleep(self._refresh_seconds)
+
+
+class VerifiedTokenCache:
+    """Bounded LRU of verified token hash → decoded claims."""
+
+    def __init__(self, max_size: int = 10_000):
+        self._max_size = max_size
+        self._entries: OrderedDict[str, tuple[dict, float]] = OrderedDict()
+
+    @staticmethod
+    def token_hash(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def get(self, token_hash: str) -> Optional[dict]:
+        entry = self._entries.get(token_hash)
+        if entry is None:
+            return None
+        claims, exp = entry
+        if time.time() >= exp:
+            self._entries.pop(token_hash, None)
+            return None
+        self._entries.move_to_end(token_hash)
+        return claims
+
+    def put(self, token_hash: str, claims: dict) -> None:
+        exp = claims.get("exp")
+        if not isinstance(exp, (int, float)):
+            return  # no expiry — never cache
+        self._entries[token_hash] = (claims, float(exp))
+        self._entries.move_to_end(token_hash)
+        while len(self._entries) > self._max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+_USER_COLUMNS = tuple(c.key for c in User.__table__.columns)
+_TIER_COLUMNS = tuple(c.key for c in SubscriptionTier.__table__.columns)
+
+
+@dataclass(frozen=True)
+class UserSnapshot:
+    """Column values of a ``User`` and its tier, detached from any session."""
+
+    user: tuple[tuple[str, Any], ...]
+    tier: Optional[tuple[tuple[str, Any], ...]]
+
+    @classmethod
+    def from_user(cls, user: User) -> "UserSnapshot":
+        tier = user.__dict__.get("tier")
+        return cls(
+            user=tuple((k, getattr(user, k)) for k in _USER_COLUMNS),
+            tier=tuple((k, getattr(tier, k)) for k in _TIER_COLUMNS) if tier else None,
+        )
+
+    async def attach(self, db: AsyncSession) -> User:
+        """Rebuild the ``User`` (with tier loaded) inside ``db`` without a SELECT."""
+        user = User(**dict(self.user))
+        make_transient_to_detached(user)
+        tier = None
+        if self.tier is not None:
+            tier = SubscriptionTier(**dict(self.tier))
+            make_transient_to_detached(tier)
+        set_committed_value(user, "tier", tier)
+        return await db.merge(user, load=False)
+
+
+class UserSnapshotCache:
+    """``clerk_id`` → ``UserSnapshot`` with a short TTL."""
+
+    def __init__(self, ttl_seconds: float = 60.0, max_size: int = 10_000):
+        self._ttl = ttl_seconds
+        self._max_size = max_size
+        self._entries: OrderedDict[str, tuple[UserSnapshot, float]] = OrderedDict()
+
+    def get(self, clerk_id: str) -> Optional[UserSnapshot]:
+        entry = self._entries.get(clerk_id)
+        if entry is None:
+            return None
+        snapshot, expires_at = entry
+        if time.monotonic() >= expires_at:
+            self._entries.pop(clerk_id, None)
+            return None
+        return snapshot
+
+    def put(self, clerk_id: str, user: User) -> None:
+        if self._ttl <= 0:
+            return
+        if "tier" not in user.__dict__ and user.tier_id is not None:
+            return  # tier not loaded — a snapshot would wrongly read as tier-less
+        self._entries[clerk_id] = (UserSnapshot.from_user(user), time.monotonic() + self._ttl)
+        self._entries.move_to_end(clerk_id)
+        while len(self._entries) > self._max_size:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, clerk_id: Optional[str]) -> None:
+        if clerk_id:
+            self._entries.pop(clerk_id, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+_settings = get_settings()
+
+jwks_cache: Optional[JWKSCache] = (
+    JWKSCache(_settings.clerk_jwks_url, refresh_seconds=_settings.clerk_jwks_refresh_seconds)
+    if _settings.clerk_jwks_url else None
+)
+token_cache = VerifiedTokenCache(max_size=_settings.auth_token_cache_size)
+user_cache = UserSnapshotCache(ttl_seconds=_settings.auth_user_cache_ttl_seconds)
+
+
+async def decode_clerk_token(token: str, jwks: JWKSCache) -> dict:
+    """Return verified claims for ``token``, from cache when possible.
+
+    Raises ``jwt.InvalidTokenError`` (or a JWKS fetch error) on failure.
+    Verification options match what ``fastapi_clerk_auth`` used: RS256,
+    ``exp``/``iat`` checked, audience/issuer not checked.
+    """
+    token_hash = VerifiedTokenCache.token_hash(token)
+    claims = token_cache.get(token_hash)
+    if claims is not None:
+        return claims
+
+    kid = jwt.get_unverified_header(token).get("kid", "")
+    key = await jwks.get_signing_key(kid)
+    claims = jwt.decode(
+        token,
+        key=key.key,
+        algorithms=["RS256"],
+        options={"verify_aud": False, "verify_iss": False},
+    )
+    token_cache.put(token_hash, claims)
+    return claims
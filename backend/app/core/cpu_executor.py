@@ -0,0 +1,211 @@
+"""CPU-bound work off the event loop.
+
+Two pools, created lazily:
+
+- ``pdf``: a process pool for PyMuPDF. Page text extraction and
+  rasterization hold the GIL for long stretches, so threads would still
+  stall the loop. Workers use the ``forkserver`` start method, so they
+  never inherit the app's threads, sockets or event loop. They only
+  import the module of the function they run (``app.services.pdf_extract``),
+  not the app.
+- ``image``: a thread pool for Pillow. Pillow releases the GIL while
+  decoding, resizing and encoding, so threads are enough, and the bytes
+  don't need to be pickled.
+
+Each pool bounds its backlog. At most ``max_pending`` tasks can be
+submitted (running or queued in the executor); further callers wait
+asynchronously for a slot. ``timeout`` covers both the wait and the run,
+and raises ``CPUTaskTimeout``. A task that times out while running cannot
+be interrupted. It finishes in the background, and it keeps holding its
+slot until it does, so the bound stays honest.
+
+Metrics (``cpu_pool_*`` / ``cpu_task_*``) are exported on ``/metrics``.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Optional, TypeVar
+
+from app.config import get_settings
+from app.observability.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+_TASK_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+CPU_POOL_INFLIGHT = REGISTRY.gauge("cpu_pool_inflight", "Tasks submitted to the pool and not yet finished", ["pool"])
+CPU_POOL_WAITING = REGISTRY.gauge("cpu_pool_waiting", "Callers waiting for a pool slot", ["pool"])
+CPU_TASK_QUEUE = REGISTRY.histogram(
+    "cpu_task_queue_seconds", "Wait for a pool slot plus executor queueing", ["pool", "task"], _TASK_BUCKETS,
+)
+CPU_TASK_DURATION = REGISTRY.histogram(
+    "cpu_task_duration_seconds", "Task run time inside the pool", ["pool", "task"], _TASK_BUCKETS,
+)
+CPU_TASK_TIMEOUTS = REGISTRY.counter("cpu_task_timeouts_total", "Tasks that exceeded their timeout", ["pool", "task"])
+CPU_TASK_ERRORS = REGISTRY.counter("cpu_task_errors_total", "Tasks that raised", ["pool", "task"])
+
+
+class CPUTaskTimeout(asyncio.TimeoutError):
+    """A CPU task did not get a slot and finish within its timeout."""
+
+
+def _timed_call(fn: Callable[..., T], args: tuple, kwargs: dict) -> tuple[float, float, T]:
+    """Runs inside the worker; returns (start, end, result) on the worker's clock.
+
+    ``time.time`` rather than ``perf_counter`` so the parent can separate
+    queueing from run time across processes.
+    """
+    start = time.time()
+    result = fn(*args, **kwargs)
+    return start, time.time(), result
+
+
+class CPUPool:
+    """One bounded executor (process or thread) with metrics."""
+
+    def __init__(
+        self,
+        name: str,
+        factory: Callable[[], Executor],
+        max_pending: int,
+        timeout: float,
+    ):
+        self.name = name
+        self._factory = factory
+        self._max_pending = max_pending
+        self._timeout = timeout
+        self._executor: Optional[Executor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._slots_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._inflight = 0
+
+    @property
+    def inflight(self) -> int:
+        return self._inflight
+
+    def _ensure(self) -> tuple[Executor, asyncio.Semaphore]:
+        if self._executor is None:
+            self._executor = self._factory()
+        loop = asyncio.get_running_loop()
+        if self._slots is None or self._slots_loop is not loop:
+            # Semaphores bind to one loop; tests and scripts may run several.
+            self._slots = asyncio.Semaphore(self._max_pending)
+            self._slots_loop = loop
+        return self._executor, self._slots
+
+    async def run(self, fn: Callable[..., T], *args: Any, timeout: Optional[float] = None, **kwargs: Any) -> T:
+        """Run ``fn(*args, **kwargs)`` in the pool; raises ``CPUTaskTimeout``."""
+        executor, slots = self._ensure()
+        task = getattr(fn, "__name__", "task")
+        timeout = self._timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        submitted = time.time()
+
+        CPU_POOL_WAITING.inc(pool=self.name)
+        try:
+            await asyncio.wait_for(slots.acquire(), timeout)
+        except asyncio.TimeoutError:
+            CPU_TASK_TIMEOUTS.inc(pool=self.name, task=task)
+            raise CPUTaskTimeout(f"{self.name} pool: no slot for {task} within {timeout:.0f}s") from None
+        finally:
+            CPU_POOL_WAITING.dec(pool=self.name)
+
+        self._inflight += 1
+        CPU_POOL_INFLIGHT.set(self._inflight, pool=self.name)
+        try:
+            future = asyncio.get_running_loop().run_in_executor(executor, _timed_call, fn, args, kwargs)
+        except BaseException:
+            self._release(slots)
+            raise
+        # The slot is released when the work really finishes, not when the
+        # caller stops waiting for it.
+        future.add_done_callback(lambda _: self._release(slots))
+
+        try:
+            start, end, result = await asyncio.wait_for(
+                asyncio.shield(future), max(0.0, deadline - time.monotonic()),
+            )
+        except asyncio.TimeoutError:
+            CPU_TASK_TIMEOUTS.inc(pool=self.name, task=task)
+            future.add_done_callback(_consume_exception)
+            raise CPUTaskTimeout(f"{self.name} pool: {task} exceeded {timeout:.0f}s") from None
+        except asyncio.CancelledError:
+            future.add_done_callback(_consume_exception)
+            raise
+        except Exception:
+            CPU_TASK_ERRORS.inc(pool=self.name, task=task)
+            raise
+        CPU_TASK_QUEUE.observe(max(0.0, start - submitted), pool=self.name, task=task)
+        CPU_TASK_DURATION.observe(end - start, pool=self.name, task=task)
+        return result
+
+    def _release(self, slots: asyncio.Semaphore) -> None:
+        self._inflight -= 1
+        CPU_POOL_INFLIGHT.set(self._inflight, pool=self.name)
+        slots.release()
+
+    def shutdown(self, wait: bool = True) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=True)
+            self._executor = None
+        self._slots = None
+        self._slots_loop = None
+
+
+def _consume_exception(future: asyncio.Future) -> None:
+    if not future.cancelled() and future.exception() is not None:
+        logger.warning("Abandoned CPU task failed: %s", future.exception())
+
+
+def _process_context():
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
+class CPUExecutor:
+    """The ``pdf`` (process) and ``image`` (thread) pools."""
+
+    def __init__(self):
+        settings = get_settings()
+        process_workers = settings.cpu_process_workers or min(4, os.cpu_count() or 1)
+        thread_workers = settings.cpu_thread_workers or min(8, (os.cpu_count() or 1) + 2)
+        self.process_workers = process_workers
+        self.pdf = CPUPool(
+            "pdf",
+            lambda: ProcessPoolExecutor(
+                max_workers=process_workers,
+                mp_context=_process_context(),
+                # Recycle workers so MuPDF's allocator can't grow without bound.
+                max_tasks_per_child=settings.cpu_process_max_tasks_per_child or None,
+            ),
+            max_pending=settings.cpu_process_max_pending,
+            timeout=settings.cpu_task_timeout_seconds,
+        )
+        self.image = CPUPool(
+            "image",
+            lambda: ThreadPoolExecutor(max_workers=thread_workers, thread_name_prefix="cpu-image"),
+            max_pending=settings.cpu_thread_max_pending,
+            timeout=settings.cpu_task_timeout_seconds,
+        )
+
+    async def run_pdf(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """Run a picklable, module-level PyMuPDF function in the process pool."""
+        return await self.pdf.run(fn, *args, **kwargs)
+
+    async def run_image(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """Run a Pillow function in the thread pool."""
+        return await self.image.run(fn, *args, **kwargs)
+
+    def shutdown(self, wait: bool = True) -> None:
+        self.pdf.shutdown(wait=wait)
+        self.image.shutdown(wait=wait)
+
+
+cpu_executor = CPUExecutor()
@@ -1,20 +1,22 @@
-from fastapi import Depends, Request
-from fastapi_clerk_auth import ClerkConfig, ClerkHTTPBearer
+import logging
+
+from fastapi import Depends, HTTPException, Request
+from fastapi.security.utils import get_authorization_scheme_param
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
 from app.config import get_settings
+from app.core.auth_cache import decode_clerk_token, jwks_cache, user_cache
 from app.core.exceptions import AuthenticationError, AuthorizationError
 from app.database import get_db
 from app.models.user import User
 from app.models.subscription_tier import SubscriptionTier
+from app.observability import usage_ledger
 
+logger = logging.getLogger(__name__)
 settings = get_settings()
 
-clerk_config = ClerkConfig(jwks_url=settings.clerk_jwks_url) if settings.clerk_jwks_url else None
-clerk_auth = ClerkHTTPBearer(config=clerk_config) if clerk_config else None
-
 
 async def _get_default_tier_id(db: AsyncSession) -> int | None:
     return await db.scalar(
@@ -22,26 +24,55 @@ async def _get_default_tier_id(db: AsyncSession) -> int | None:
     )
 
 
+def _annotate_usage(user: User) -> None:
+    """Attribute this request's LLM usage to ``user`` in the usage ledger."""
+    tier = user.__dict__.get("tier")
+    usage_ledger.annotate(user_id=user.id, tier=tier.name if tier is not None else None)
+
+
+async def _verify_bearer(request: Request) -> dict:
+    """Return verified Clerk claims for the request's Bearer token.
+
+    Mirrors ``fastapi_clerk_auth.ClerkHTTPBearer``: missing, malformed or
+    invalid tokens are rejected with 403.
+    """
+    scheme, token = get_authorization_scheme_param(request.headers.get("Authorization"))
+    if not token or scheme.lower() != "bearer":
+        raise HTTPException(status_code=403, detail="Forbidden")
+    try:
+        return await decode_clerk_token(token, jwks_cache)
+    except Exception as e:
+        logger.debug("Clerk token rejected: %s", e)
+        raise HTTPException(status_code=403, detail="Forbidden")
+
+
 async def get_current_user(
     request: Request,
     db: AsyncSession = Depends(get_db),
 ) -> User:
     """Verify Clerk JWT and return local user. Auto-create on first login."""
-    if not clerk_auth:
+    if not jwks_cache:
         raise AuthenticationError(detail="Auth not configured")
 
-    credentials = await clerk_auth(request)
-    clerk_id = credentials.decoded.get("sub")
+    decoded = await _verify_bearer(request)
+    clerk_id = decoded.get("sub")
     if not clerk_id:
         raise AuthenticationError(detail="Invalid token: missing sub claim")
 
+    snapshot = user_cache.get(clerk_id)
+    if snapshot is not None:
+        user = await snapshot.attach(db)
+        if not user.is_active:
+            raise AuthenticationError(detail="Account is deactivated")
+        _annotate_usage(user)
+        return user
+
     user = await db.scalar(
         select(User).where(User.clerk_id == clerk_id).options(selectinload(User.tier))
     )
 
     if not user:
         # Extract email from Clerk JWT (location varies by Clerk version)
-        decoded = credentials.decoded
         email = (
             decoded.get("email")
             or decoded.get("primary_email")
@@ -84,6 +115,8 @@ async def get_current_user(
     if not user.is_active:
         raise AuthenticationError(detail="Account is deactivated")
 
+    user_cache.put(clerk_id, user)
+    _annotate_usage(user)
     return user
 
 
@@ -1,10 +1,16 @@
+import logging
+import time
 from urllib.parse import urlparse, parse_qs, urlencode, urlunparse
 
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
 from app.config import get_settings
+from app.observability.metrics import REGISTRY
+from app.observability.request_context import current_route
 
+logger = logging.getLogger(__name__)
 settings = get_settings()
 
 # Render/Neon provide postgresql:// URLs with params asyncpg doesn't understand.
@@ -33,15 +39,109 @@ def _fix_db_url(url: str) -> str:
     return urlunparse(parsed._replace(query=clean_query))
 
 
-_db_url = _fix_db_url(settings.database_url)
+# Pool sizing per process role. Budget: every API worker + worker + script
+# process holds up to pool_size + max_overflow connections.
+POOL_PROFILES: dict[str, dict[str, int]] = {
+    "api": {"pool_size": 10, "max_overflow": 20},
+    "worker": {"pool_size": 4, "max_overflow": 4},
+    "script": {"pool_size": 2, "max_overflow": 0},
+}
+
+_WAIT_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
 
-engine = create_async_engine(
-    _db_url,
-    echo=settings.debug,
-    pool_pre_ping=True,
-    pool_size=10,
-    max_overflow=20,
+DB_POOL_WAIT = REGISTRY.histogram(
+    "db_pool_checkout_wait_seconds", "Time to obtain a pooled connection", ["route"], _WAIT_BUCKETS,
+)
+DB_POOL_HOLD = REGISTRY.histogram(
+    "db_pool_connection_hold_seconds", "Time a connection stays checked out", ["route"],
+)
+DB_POOL_SLOW_CHECKOUTS = REGISTRY.counter(
+    "db_pool_slow_checkouts_total", "Checkouts slower than db_slow_checkout_ms", ["route"],
 )
+DB_POOL_IN_USE = REGISTRY.gauge("db_pool_connections_in_use", "Connections checked out")
+
+
+class InstrumentedAsyncPool(AsyncAdaptedQueuePool):
+    """Queue pool that records checkout wait and hold time per route."""
+
+    def _do_get(self):
+        route = current_route()
+        start = time.perf_counter()
+        record = super()._do_get()
+        now = time.perf_counter()
+        waited = now - start
+        DB_POOL_WAIT.observe(waited, route=route)
+        DB_POOL_IN_USE.inc()
+        if waited * 1000 >= settings.db_slow_checkout_ms:
+            DB_POOL_SLOW_CHECKOUTS.inc(route=route)
+            logger.warning(
+                "Slow DB checkout on %s: %.0fms (in use %d/%d)",
+                route, waited * 1000, self.checkedout(), self.size() + self._max_overflow,
+            )
+        record.info["_checkout"] = (now, route)
+        return record
+
+    def _do_return_conn(self, record):
+        checkout = record.info.pop("_checkout", None)
+        if checkout is not None:
+            DB_POOL_IN_USE.dec()
+            DB_POOL_HOLD.observe(time.perf_counter() - checkout[0], route=checkout[1])
+        super()._do_return_conn(record)
+
+
+def create_engine_for_role(role: str | None = None, url: str | None = None) -> AsyncEngine:
+    """Build the async engine with the pool profile for ``role``.
+
+    Pre-ping is off by default: it costs a round trip on every checkout.
+    ``pool_recycle`` retires connections before the server or proxy drops
+    them, and a dead connection still surfaces as an error that invalidates
+    the pool.
+    """
+    role = role or settings.db_process_role
+    profile = dict(POOL_PROFILES.get(role, POOL_PROFILES["api"]))
+    if settings.db_pool_size is not None:
+        profile["pool_size"] = settings.db_pool_size
+    if settings.db_max_overflow is not None:
+        profile["max_overflow"] = settings.db_max_overflow
+
+    url = url or _db_url
+    kwargs = {}
+    if url.startswith("postgresql+asyncpg"):
+        kwargs["connect_args"] = {
+            "prepared_statement_cache_size": settings.db_statement_cache_size,
+            # asyncpg's own cache must be off too when SQLAlchemy's is (pgbouncer)
+            "statement_cache_size": settings.db_statement_cache_size,
+        }
+    return create_async_engine(
+        url,
+        echo=settings.debug,
+        poolclass=InstrumentedAsyncPool,
+        pool_pre_ping=settings.db_pool_pre_ping,
+        pool_recycle=settings.db_pool_recycle_seconds,
+        pool_timeout=settings.db_pool_timeout,
+        **profile,
+        **kwargs,
+    )
+
+
+def pool_status(db_engine: AsyncEngine | None = None) -> dict:
+    """Live pool counters plus per-route wait/hold metrics."""
+    pool = (db_engine or engine).pool
+    return {
+        "role": settings.db_process_role,
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": pool.overflow(),
+        "max_overflow": getattr(pool, "_max_overflow", None),
+        "timeout": pool.timeout(),
+        "metrics": REGISTRY.snapshot(prefix="db_pool_"),
+    }
+
+
+_db_url = _fix_db_url(settings.database_url)
+
+engine = create_engine_for_role()
 
 AsyncSessionLocal = async_sessionmaker(
     engine,
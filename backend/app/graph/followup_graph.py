@@ -38,7 +38,7 @@ def build_followup_graph():
     graph.add_edge("build_context", "generate_reply")
     graph.add_edge("generate_reply", END)
 
-    return graph.compile()
+    return graph.compile(name="followup_graph")
 
 
 followup_graph = build_followup_graph()
@@ -52,7 +52,7 @@ def build_solve_graph():
 
     graph.add_edge("enrich", END)
 
-    return graph.compile()
+    return graph.compile(name="solve_graph")
 
 
 solve_graph = build_solve_graph()
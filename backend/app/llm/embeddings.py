@@ -1,7 +1,11 @@
 import logging
+import time
+
 import httpx
 from langchain_openai import OpenAIEmbeddings
 from app.config import get_settings
+from app.llm.fake import fake_embedding
+from app.observability import usage_ledger
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
@@ -35,19 +39,45 @@ async def _google_embed_batch(texts: list[str]) -> list[list[float]]:
     return await asyncio.gather(*[_google_embed(t) for t in texts])
 
 
+def _record(provider: str, model: str, texts: list[str], start: float) -> None:
+    # Neither API returns token counts here; ~4 chars/token is close enough
+    # for costing at embedding prices.
+    tokens = sum(len(t) for t in texts) // 4
+    usage_ledger.record(
+        "embedding", provider, model,
+        prompt_tokens=tokens, latency_s=time.perf_counter() - start, operation="embedding",
+    )
+
+
 async def embed_text(text: str) -> list[float]:
     """Generate embedding vector. Google default, OpenAI fallback."""
+    if settings.embedding_provider_override == "fake":
+        return fake_embedding(text)
+    start = time.perf_counter()
     try:
-        return await _google_embed(text)
+        vector = await _google_embed(text)
+        _record("google_genai", "gemini-embedding-001", [text], start)
+        return vector
     except Exception as e:
         logger.warning("Google embedding failed, falling back to OpenAI: %s", e)
-        return await _openai_embeddings.aembed_query(text)
+        start = time.perf_counter()
+        vector = await _openai_embeddings.aembed_query(text)
+        _record("openai", _openai_embeddings.model, [text], start)
+        return vector
 
 
 async def embed_texts(texts: list[str]) -> list[list[float]]:
     """Generate embedding vectors for multiple texts. Google default, OpenAI fallback."""
+    if settings.embedding_provider_override == "fake":
+        return [fake_embedding(t) for t in texts]
+    start = time.perf_counter()
     try:
-        return await _google_embed_batch(texts)
+        vectors = await _google_embed_batch(texts)
+        _record("google_genai", "gemini-embedding-001", texts, start)
+        return vectors
     except Exception as e:
         logger.warning("Google embedding failed, falling back to OpenAI: %s", e)
-        return await _openai_embeddings.aembed_documents(texts)
+        start = time.perf_counter()
+        vectors = await _openai_embeddings.aembed_documents(texts)
+        _record("openai", _openai_embeddings.model, texts, start)
+        return vectors
@@ -0,0 +1,275 @@
+"""Offline stand-ins for the LLM, embedding and OCR providers.
+
+Used by the load-test harness (``benchmarks/loadtest``) and tests to drive
+the real solve/grading code paths without network calls or provider spend.
+Enabled with ``LLM_PROVIDER_OVERRIDE=fake``, ``EMBEDDING_PROVIDER_OVERRIDE=fake``
+and ``OCR_PROVIDER=fake``.
+
+Responses are recognised from the JSON schema each prompt asks for (see
+``app/llm/prompts``) and are deterministic for a given prompt, so cache
+layers behave as they would with a real provider. Latency is drawn from a
+log-normal distribution around a per-tier median; a configurable fraction
+of calls fail.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import math
+import random
+import re
+import time
+from typing import Any, Callable, Optional
+
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.language_models import BaseChatModel, LangSmithParams
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from app.config import get_settings
+
+# Median latency per fake model, in seconds — roughly the real providers'.
+FAKE_MODEL_LATENCY: dict[str, float] = {
+    "fake-strong": 4.0,
+    "fake-fast": 0.8,
+    "fake-verify": 0.6,
+    "fake-evaluate": 2.5,
+    "fake-grading": 2.0,
+}
+FAKE_OCR_LATENCY = 1.5
+FAKE_EMBEDDING_DIM = 768
+
+_rng = random.Random()
+
+
+class FakeProviderError(RuntimeError):
+    """Injected provider failure (see ``fake_llm_failure_rate``)."""
+
+
+def sample_latency(median: float, sigma: Optional[float] = None) -> float:
+    """Log-normal latency (seconds) around ``median``, scaled by settings."""
+    settings = get_settings()
+    sigma = settings.fake_llm_latency_sigma if sigma is None else sigma
+    median *= settings.fake_llm_latency_scale
+    if median <= 0:
+        return 0.0
+    return median * math.exp(_rng.gauss(0.0, sigma)) if sigma > 0 else median
+
+
+def maybe_fail(failure_rate: Optional[float] = None) -> None:
+    rate = get_settings().fake_llm_failure_rate if failure_rate is None else failure_rate
+    if rate > 0 and _rng.random() < rate:
+        raise FakeProviderError("Injected fake provider failure")
+
+
+def seed(value: int) -> None:
+    """Seed latency/failure sampling for reproducible runs."""
+    _rng.seed(value)
+
+
+def _digest(text: str) -> int:
+    return int.from_bytes(hashlib.sha256(text.encode()).digest()[:8], "big")
+
+
+# -- Canned responses ---------------------------------------------------------
+
+
+def _solution(prompt: str) -> dict:
+    n = _digest(prompt) % 20
+    return {
+        "question_type": "linear equation",
+        "knowledge_points": ["algebra", "linear_equations"],
+        "steps": [
+            {"step": 1, "description": "Isolate the variable term", "formula": "2x = 10", "calculation": "15 - 5 = 10"},
+            {"step": 2, "description": "Divide both sides", "formula": f"x = {n}", "calculation": f"x = {n}"},
+        ],
+        "final_answer": f"x = {n}",
+        "explanation": "Undo the operations in reverse order.",
+        "tips": "Check by substituting back.",
+    }
+
+
+def _grading(prompt: str) -> list:
+    ids = re.findall(r"\(ID: (\d+)\)", prompt)
+    maxes = re.findall(r"Max Score: ([\d.]+)", prompt)
+    return [
+        {
+            "question_id": int(qid),
+            "score": float(maxes[i]) if i < len(maxes) else 1.0,
+            "is_correct": True,
+            "feedback": "Key points covered.",
+        }
+        for i, qid in enumerate(ids)
+    ]
+
+
+def _practice(prompt: str) -> dict:
+    return {
+        "questions": [
+            {
+                "difficulty_offset": i,
+                "question_text": f"Solve for x: {i + 2}x + 1 = {2 * i + 5}",
+                "question_type": "numeric",
+                "correct_answer": "2",
+                "accepted_answers": ["2", "x=2"],
+                "answer_explanation": "Step 1: subtract 1. Step 2: divide.",
+                "knowledge_points": ["algebra"],
+                "difficulty": ["easy", "medium", "hard"][i],
+                "marks": 3,
+            }
+            for i in range(3)
+        ]
+    }
+
+
+def _similar(prompt: str) -> list:
+    match = re.search(r"exactly (\d+) objects", prompt)
+    count = int(match.group(1)) if match else 1
+    return [
+        {
+            "question_text": f"Similar question {i + 1}",
+            "correct_answer": "4",
+            "accepted_answers": ["4"],
+            "answer_explanation": "Worked solution.",
+            "question_type": "numeric",
+            "tikz_code": None,
+        }
+        for i in range(count)
+    ]
+
+
+# (predicate on the full prompt, response builder) — first match wins, so
+# the more specific schemas come first.
+_RESPONDERS: list[tuple[Callable[[str], bool], Callable[[str], Any]]] = [
+    (lambda p: '"question_id"' in p and "(ID: " in p, _grading),
+    (lambda p: '"independent_answer"' in p, lambda p: {
+        "independent_answer": _solution(p)["final_answer"],
+        "is_correct": True,
+        "error_description": None,
+        "confidence": 0.92,
+    }),
+    (lambda p: '"difficulty_offset"' in p, _practice),
+    (lambda p: '"tikz_code"' in p, _similar),
+    (lambda p: '"pedagogy"' in p, lambda p: {
+        "correctness": 0.9, "completeness": 0.85, "clarity": 0.9,
+        "pedagogy": 0.8, "format": 0.9, "overall": 0.87,
+        "improvement_suggestions": "None.", "better_approach": None,
+    }),
+    (lambda p: '"relevance"' in p and '"pass"' in p, lambda p: {
+        "scores": {"correctness": 0.9, "completeness": 0.85, "clarity": 0.9, "format": 0.9, "relevance": 0.9},
+        "overall": 0.89, "issues": [], "pass": True,
+    }),
+    (lambda p: "reusable solution framework" in p, lambda p: {
+        "topic": "linear equations",
+        "reasoning_chain": ["Collect variable terms", "Isolate the variable", "Check"],
+        "key_principles": ["inverse operations"],
+        "what_to_identify": ["single unknown"],
+        "common_mistakes": ["sign errors"],
+    }),
+    (lambda p: '"final_answer"' in p, _solution),
+    (lambda p: '"problem_type"' in p and '"knowledge_points"' in p, lambda p: {
+        "subject": "math",
+        "problem_type": "equation",
+        "difficulty": ["easy", "medium", "hard"][_digest(p) % 3],
+        "knowledge_points": ["algebra", "linear_equations"],
+    }),
+]
+
+
+def fake_response(prompt: str) -> str:
+    """Deterministic response text for a rendered prompt."""
+    for matches, build in _RESPONDERS:
+        if matches(prompt):
+            return json.dumps(build(prompt), ensure_ascii=False)
+    # Follow-up chat and anything unrecognised: plain text.
+    return "Good question. Work through it one step at a time and check each result."
+
+
+# -- Chat model ---------------------------------------------------------------
+
+
+class FakeChatModel(BaseChatModel):
+    """Chat model registered as provider ``fake`` in ``LLM_REGISTRY``."""
+
+    model: str = "fake-strong"
+    temperature: float = 0.0
+    latency: Optional[float] = None  # median seconds; default from FAKE_MODEL_LATENCY
+    failure_rate: Optional[float] = None  # default from settings
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake"
+
+    @property
+    def _identifying_params(self) -> dict[str, Any]:
+        return {"model": self.model}
+
+    def _get_ls_params(self, stop: Optional[list[str]] = None, **kwargs: Any) -> LangSmithParams:
+        params = super()._get_ls_params(stop=stop, **kwargs)
+        params["ls_provider"] = "fake"
+        params["ls_model_name"] = self.model
+        return params
+
+    def _result(self, messages: list[BaseMessage]) -> ChatResult:
+        prompt = "\n".join(str(m.content) for m in messages)
+        content = fake_response(prompt)
+        message = AIMessage(
+            content=content,
+            usage_metadata={
+                "input_tokens": len(prompt) // 4,
+                "output_tokens": len(content) // 4,
+                "total_tokens": (len(prompt) + len(content)) // 4,
+            },
+            response_metadata={"model_name": self.model},
+        )
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _median_latency(self) -> float:
+        if self.latency is not None:
+            return self.latency
+        return FAKE_MODEL_LATENCY.get(self.model, 1.0)
+
+    def _generate(
+        self,
+        messages: list[BaseMessage],
+        stop: Optional[list[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        time.sleep(sample_latency(self._median_latency()))
+        maybe_fail(self.failure_rate)
+        return self._result(messages)
+
+    async def _agenerate(
+        self,
+        messages: list[BaseMessage],
+        stop: Optional[list[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        await asyncio.sleep(sample_latency(self._median_latency()))
+        maybe_fail(self.failure_rate)
+        return self._result(messages)
+
+
+# -- Embeddings ---------------------------------------------------------------
+
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+
+
+def fake_embedding(text: str, dim: int = FAKE_EMBEDDING_DIM) -> list[float]:
+    """Deterministic unit vector from hashed tokens.
+
+    Feature hashing keeps the geometry meaningful: identical text gives
+    identical vectors (semantic-cache exact hits) and texts sharing most
+    tokens land close together (near-duplicate hits).
+    """
+    vec = [0.0] * dim
+    for token in _TOKEN_RE.findall(text.lower()):
+        h = _digest(token)
+        vec[h % dim] += 1.0 if (h >> 32) & 1 else -1.0
+    norm = math.sqrt(sum(v * v for v in vec))
+    if norm == 0:
+        vec[0], norm = 1.0, 1.0
+    return [v / norm for v in vec]
@@ -5,14 +5,20 @@ from langchain_groq import ChatGroq
 from langchain_core.language_models import BaseChatModel
 
 from app.config import get_settings
+from app.llm.fake import FakeChatModel
+from app.observability.usage_ledger import usage_ledger_handler
 
 LLM_REGISTRY: dict[str, type[BaseChatModel]] = {
     "claude": ChatAnthropic,
     "openai": ChatOpenAI,
     "gemini": ChatGoogleGenerativeAI,
     "groq": ChatGroq,
+    "fake": FakeChatModel,
 }
 
+# Registered for LLM_PROVIDER_OVERRIDE only — never picked by routing/rotation.
+OFFLINE_PROVIDERS = {"fake"}
+
 MODEL_CONFIG: dict[str, dict[str, str]] = {
     "claude": {
         "strong": "claude-sonnet-4-20250514",
@@ -33,6 +39,13 @@ MODEL_CONFIG: dict[str, dict[str, str]] = {
         "strong": "qwen-qwq-32b",
         "fast": "qwen3-32b",
     },
+    "fake": {
+        "strong": "fake-strong",
+        "fast": "fake-fast",
+        "verify": "fake-verify",
+        "evaluate": "fake-evaluate",
+        "grading": "fake-grading",
+    },
 }
 
 SUBJECT_PROVIDER_MAP: dict[str, str] = {
@@ -66,7 +79,7 @@ def _get_api_key_kwargs(provider: str) -> dict:
 def get_llm(tier: str = "strong", provider: str | None = None) -> BaseChatModel:
     """Get a ChatModel instance by tier and provider."""
     settings = get_settings()
-    provider = provider or settings.default_ai_provider
+    provider = settings.llm_provider_override or provider or settings.default_ai_provider
     if provider not in LLM_REGISTRY:
         raise ValueError(f"Unknown provider: {provider}. Available: {list(LLM_REGISTRY.keys())}")
     if tier not in MODEL_CONFIG.get(provider, {}):
@@ -76,7 +89,8 @@ def get_llm(tier: str = "strong", provider: str | None = None) -> BaseChatModel:
     cls = LLM_REGISTRY[provider]
     model = MODEL_CONFIG[provider][tier]
     kwargs = _get_api_key_kwargs(provider)
-    return cls(model=model, temperature=0.1, **kwargs)
+    # Every call is costed into the usage ledger through this one hook.
+    return cls(model=model, temperature=0.1, callbacks=[usage_ledger_handler], **kwargs)
 
 
 def select_llm(
@@ -102,7 +116,7 @@ def select_llm(
         return get_llm(tier, provider)
 
     # Paid tier: existing subject-based routing
-    providers = list(LLM_REGISTRY.keys())
+    providers = [p for p in LLM_REGISTRY if p not in OFFLINE_PROVIDERS]
 
     if attempt == 0:
         provider = preferred or SUBJECT_PROVIDER_MAP.get(subject, "claude")
@@ -1,16 +1,30 @@
+import hmac
 import logging
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 from redis.asyncio import from_url as redis_from_url
 from sqlalchemy import text
 
+from app.api.deps import load_guest_user
 from app.api.v1.router import api_router
 from app.config import get_settings
+from app.core.auth_cache import jwks_cache
+from app.core.cpu_executor import CPUTaskTimeout, cpu_executor
 from app.core.rate_limiter import RateLimitMiddleware
 from app.database import engine
+from app.observability import graph_metrics  # noqa: F401 — registers the LangChain metrics hook
+from app.observability.blocking_detector import blocking_detector
 from app.observability.langsmith_client import get_langsmith_client
+from app.observability.loop_lag import loop_lag_monitor
+from app.observability.metrics import REGISTRY
+from app.observability.request_context import RequestContextMiddleware
+from app.observability.usage_ledger import UsageScopeMiddleware, usage_ledger
+from app.services.crawl_job_service import crawl_jobs
+from app.services.pdf_downloader import pdf_downloader
+from app.services.settings_cache import settings_cache
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
@@ -45,8 +59,40 @@ async def lifespan(app: FastAPI):
         except Exception as e:
             logger.warning("Rate limiter Redis unavailable, rate limiting disabled: %s", e)
             _redis = None
+    # Guest identity — resolved once so guest requests skip the lookup
+    try:
+        await load_guest_user()
+    except Exception as e:
+        logger.warning("Guest user preload failed, resolving per request: %s", e)
+    # Clerk JWKS — fetched now and refreshed in the background
+    if jwks_cache is not None:
+        jwks_cache.start_refresher()
+    # System settings snapshot + change listener (falls back to DB reads on failure)
+    try:
+        await settings_cache.load()
+    except Exception as e:
+        logger.warning("Settings cache load failed, reading settings from DB: %s", e)
+    try:
+        settings_cache.start_listener(redis_from_url(settings.redis_url, decode_responses=True))
+    except Exception as e:
+        logger.warning("Settings cache listener unavailable: %s", e)
+    # Usage ledger — batched writer for per-call cost rows
+    usage_ledger.start()
+    # Event-loop lag probe — shows when CPU work blocks the loop
+    loop_lag_monitor.start()
+    if settings.blocking_detector_enabled:
+        blocking_detector.start()
     yield
     # Shutdown
+    await blocking_detector.stop()
+    await loop_lag_monitor.stop()
+    await usage_ledger.stop()
+    await crawl_jobs.shutdown()
+    cpu_executor.shutdown(wait=False)
+    await pdf_downloader.aclose()
+    await settings_cache.stop_listener()
+    if jwks_cache is not None:
+        await jwks_cache.stop_refresher()
     if _redis:
         await _redis.aclose()
     if ls_client is not None:
@@ -65,6 +111,12 @@ app = FastAPI(
     lifespan=lifespan,
 )
 
+# Usage ledger scope (innermost) — aggregates LLM cost per request
+app.add_middleware(UsageScopeMiddleware)
+
+# Request context — lets DB pool / LLM metrics tag the route
+app.add_middleware(RequestContextMiddleware)
+
 # CORS Middleware (outermost — runs first on response)
 app.add_middleware(
     CORSMiddleware,
@@ -85,6 +137,27 @@ if settings.rate_limit_enabled:
 app.include_router(api_router, prefix="/api/v1")
 
 
+@app.exception_handler(CPUTaskTimeout)
+async def cpu_task_timeout_handler(request: Request, exc: CPUTaskTimeout):
+    # PDF/image pools saturated or a task ran too long — back off and retry.
+    logger.warning("%s %s: %s", request.method, request.url.path, exc)
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Server is busy processing files, please retry shortly"},
+        headers={"Retry-After": "30"},
+    )
+
+
 @app.get("/health")
 async def health_check():
     return {"status": "healthy", "app": settings.app_name}
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics(request: Request):
+    """In-process metrics in Prometheus text format (graph nodes, LLM calls, DB pool)."""
+    if settings.metrics_token:
+        expected = f"Bearer {settings.metrics_token}"
+        if not hmac.compare_digest(request.headers.get("authorization", ""), expected):
+            return PlainTextResponse("Unauthorized\n", status_code=401)
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
@@ -12,10 +12,11 @@ from app.models.daily_usage import DailyUsage
 from app.models.guest_usage import GuestUsage
 from app.models.system_setting import SystemSetting
 from app.models.semantic_cache import SemanticCache
-from app.models.exam_paper import ExamPaper, PracticeQuestion
+from app.models.exam_paper import ExamPaper, PracticeQuestion, PracticeQuestionImage
 from app.models.exam_session import ExamSession, ExamAnswer
 from app.models.practice_answer import PracticeAnswer
 from app.models.grading_cache import GradingCache
+from app.models.usage_ledger import UsageLedgerEntry
 
 __all__ = [
     "User",
@@ -34,8 +35,10 @@ __all__ = [
     "SemanticCache",
     "ExamPaper",
     "PracticeQuestion",
+    "PracticeQuestionImage",
     "ExamSession",
     "ExamAnswer",
     "PracticeAnswer",
     "GradingCache",
+    "UsageLedgerEntry",
 ]
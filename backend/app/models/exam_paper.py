@@ -1,3 +1,4 @@
+import hashlib
 from datetime import datetime
 from typing import TYPE_CHECKING, List, Optional
 
@@ -15,7 +16,7 @@ from sqlalchemy import (
     Index,
 )
 from sqlalchemy.dialects.postgresql import JSONB
-from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy.orm import Mapped, mapped_column, relationship, validates
 
 from app.database import Base
 
@@ -75,7 +76,15 @@ class PracticeQuestion(Base):
         JSONB, nullable=True
     )  # ["option A text", "option B text", ...] for multichoice
     has_image: Mapped[bool] = mapped_column(Boolean, default=False)
-    image_data: Mapped[Optional[bytes]] = mapped_column(LargeBinary, nullable=True)
+    # Legacy in-row image; new images go to practice_question_images.
+    # Emptied by scripts/migrate_question_images.py, then dropped. Deferred
+    # with raiseload so no listing query can pull blobs by accident.
+    image_data: Mapped[Optional[bytes]] = mapped_column(
+        LargeBinary, nullable=True, deferred=True, deferred_raiseload=True
+    )
+    # Hash of the current image (practice_question_images.sha256), used as
+    # the ?v= version of image URLs so they can be cached as immutable.
+    image_sha256: Mapped[Optional[str]] = mapped_column(String(64), nullable=True)
     order_index: Mapped[int] = mapped_column(Integer, default=0)
 
     # AI generation fields
@@ -131,6 +140,16 @@ class PracticeQuestion(Base):
     source_question: Mapped[Optional["PracticeQuestion"]] = relationship(
         "PracticeQuestion", remote_side="PracticeQuestion.id", foreign_keys=[source_question_id]
     )
+    # Never loaded implicitly: select it explicitly or use selectinload().
+    image: Mapped[Optional["PracticeQuestionImage"]] = relationship(
+        "PracticeQuestionImage", uselist=False, lazy="raise",
+        cascade="all, delete-orphan", passive_deletes=True,
+    )
+
+    @validates("image")
+    def _track_image_sha256(self, key, image):
+        self.image_sha256 = image.sha256 if image is not None else None
+        return image
 
     __table_args__ = (
         Index("ix_practice_questions_status", "status"),
@@ -139,3 +158,26 @@ class PracticeQuestion(Base):
         Index("ix_practice_questions_source_scan", "source_scan_id"),
         Index("ix_practice_questions_generated_for", "generated_for_user_id"),
     )
+
+
+class PracticeQuestionImage(Base):
+    """Cropped question image, kept out of practice_questions rows.
+
+    Listing queries never touch this table; only the image endpoint does.
+    """
+
+    __tablename__ = "practice_question_images"
+
+    question_id: Mapped[int] = mapped_column(
+        ForeignKey("practice_questions.id", ondelete="CASCADE"), primary_key=True
+    )
+    sha256: Mapped[str] = mapped_column(String(64))
+    size: Mapped[int] = mapped_column(Integer)
+    data: Mapped[bytes] = mapped_column(LargeBinary)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime, server_default=func.now()
+    )
+
+    @classmethod
+    def from_bytes(cls, data: bytes, **kwargs) -> "PracticeQuestionImage":
+        return cls(sha256=hashlib.sha256(data).hexdigest(), size=len(data), data=data, **kwargs)
@@ -0,0 +1,43 @@
+from datetime import datetime
+from decimal import Decimal
+from typing import Optional
+
+from sqlalchemy import BigInteger, DateTime, Index, Integer, Numeric, SmallInteger, String, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database import Base
+
+
+class UsageLedgerEntry(Base):
+    """Tokens, latency and cost of LLM / embedding calls, one row per
+    (request, operation, provider, model). Append-only; written in batches
+    by ``app.observability.usage_ledger``.
+
+    No FK to ``users``: rows are kept for cost history after a user is
+    deleted, and inserts stay cheap.
+    """
+
+    __tablename__ = "usage_ledger"
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
+    request_id: Mapped[str] = mapped_column(String(32), nullable=False, index=True)
+    route: Mapped[str] = mapped_column(String(200), nullable=False)
+    user_id: Mapped[Optional[int]] = mapped_column(BigInteger, nullable=True)
+    tier: Mapped[Optional[str]] = mapped_column(String(50), nullable=True)
+    subject: Mapped[Optional[str]] = mapped_column(String(50), nullable=True)
+    cache_layer: Mapped[Optional[int]] = mapped_column(SmallInteger, nullable=True)
+    operation: Mapped[str] = mapped_column(String(100), nullable=False)  # graph node or task name
+    kind: Mapped[str] = mapped_column(String(20), nullable=False)  # "llm" | "embedding"
+    provider: Mapped[str] = mapped_column(String(50), nullable=False)
+    model: Mapped[str] = mapped_column(String(100), nullable=False)
+    calls: Mapped[int] = mapped_column(Integer, nullable=False, default=1)
+    prompt_tokens: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    completion_tokens: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    latency_ms: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    cost_usd: Mapped[Decimal] = mapped_column(Numeric(12, 6), nullable=False, default=0)
+    created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
+
+    __table_args__ = (
+        Index("ix_usage_ledger_created_at", "created_at"),
+        Index("ix_usage_ledger_user_created", "user_id", "created_at"),
+    )
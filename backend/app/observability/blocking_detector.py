@@ -0,0 +1,232 @@
+"""Blocking-call detector (opt-in diagnostics).
+
+``loop_lag`` measures *how long* the loop stalls. This finds out *who*
+stalled it. A heartbeat task stamps the time every ``check_interval``. A
+watchdog thread notices when the stamp stops moving for longer than
+``threshold``, and at that point the loop thread is still inside the
+blocking call. The watchdog captures that thread's stack
+(``sys._current_frames``) and attributes the block to a call site: the
+innermost frame in our own code, ignoring the stdlib and site-packages.
+For example, a boto3 ``put_object`` shows up as the ``StorageService``
+line that called it, with the library frame kept as ``blocked_in``.
+
+Per call site it aggregates block count, total and max blocked time, and
+the last stack. These are exported as
+``event_loop_blocks_total{site}`` / ``event_loop_blocked_seconds_total{site}``
+and served on ``GET /api/v1/admin/diagnostics/blocking``.
+
+Enabled with ``BLOCKING_DETECTOR_ENABLED=true``. The cost is one sleeping
+task and one thread that wakes every ``check_interval``. Stacks are only
+walked when a block is actually in progress.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import sys
+import sysconfig
+import threading
+import time
+import traceback
+from dataclasses import dataclass, field
+from typing import Optional
+
+from app.config import get_settings
+from app.observability.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+EVENT_LOOP_BLOCKS = REGISTRY.counter(
+    "event_loop_blocks_total", "Loop stalls longer than the blocking threshold, by call site", ["site"],
+)
+EVENT_LOOP_BLOCKED_SECONDS = REGISTRY.counter(
+    "event_loop_blocked_seconds_total", "Time the loop was stalled, by call site", ["site"],
+)
+
+OTHER_SITE = "other"
+
+_LIBRARY_PREFIXES = tuple(
+    os.path.realpath(p) for p in {
+        sysconfig.get_paths()["stdlib"],
+        sysconfig.get_paths()["platstdlib"],
+        sysconfig.get_paths()["purelib"],
+        sysconfig.get_paths()["platlib"],
+    }
+)
+
+
+def _is_library(filename: str) -> bool:
+    if filename.startswith("<"):
+        return True  # <frozen ...>, <string>
+    return os.path.realpath(filename).startswith(_LIBRARY_PREFIXES)
+
+
+def _frame_label(frame: traceback.FrameSummary, module: Optional[str]) -> str:
+    return f"{module or os.path.basename(frame.filename)}:{frame.name}:{frame.lineno}"
+
+
+@dataclass
+class BlockingSite:
+    site: str
+    blocked_in: str
+    count: int = 0
+    total_seconds: float = 0.0
+    max_seconds: float = 0.0
+    last_seen: float = 0.0
+    last_stack: list[str] = field(default_factory=list)
+
+    def as_dict(self) -> dict:
+        return {
+            "site": self.site,
+            "blocked_in": self.blocked_in,
+            "count": self.count,
+            "total_ms": round(self.total_seconds * 1000, 1),
+            "max_ms": round(self.max_seconds * 1000, 1),
+            "avg_ms": round(self.total_seconds * 1000 / self.count, 1) if self.count else 0.0,
+            "last_seen": self.last_seen,
+            "last_stack": self.last_stack,
+        }
+
+
+@dataclass
+class _Block:
+    beat: float  # heartbeat value that stopped moving
+    site: str
+    blocked_in: str
+    stack: list[str]
+
+
+class BlockingDetector:
+    def __init__(
+        self,
+        threshold: float = 0.1,
+        check_interval: Optional[float] = None,
+        max_sites: int = 200,
+        stack_depth: int = 20,
+    ):
+        self.threshold = threshold
+        self._interval = check_interval or max(0.005, threshold / 4)
+        self._max_sites = max_sites
+        self._stack_depth = stack_depth
+        self._sites: dict[str, BlockingSite] = {}
+        self._lock = threading.Lock()
+        self._beat = time.monotonic()
+        self._loop_thread_id: Optional[int] = None
+        self._heartbeat: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+
+    @property
+    def running(self) -> bool:
+        return self._watchdog is not None and self._watchdog.is_alive()
+
+    def start(self) -> None:
+        """Start watching the running loop (call from inside it)."""
+        if self.running:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._beat = time.monotonic()
+        self._stopping.clear()
+        self._heartbeat = asyncio.get_running_loop().create_task(self._beat_loop())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-blocking-watchdog", daemon=True)
+        self._watchdog.start()
+        logger.info("Blocking-call detector on (threshold %.0f ms)", self.threshold * 1000)
+
+    async def stop(self) -> None:
+        self._stopping.set()
+        if self._heartbeat is not None:
+            self._heartbeat.cancel()
+            try:
+                await self._heartbeat
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._heartbeat = None
+        if self._watchdog is not None:
+            self._watchdog.join(timeout=1.0)
+            self._watchdog = None
+
+    async def _beat_loop(self) -> None:
+        while True:
+            self._beat = time.monotonic()
+            await asyncio.sleep(self._interval)
+
+    # -- Watchdog thread -----------------------------------------------------
+
+    def _watch(self) -> None:
+        pending: Optional[_Block] = None
+        while not self._stopping.wait(self._interval):
+            beat = self._beat
+            if pending is not None:
+                if beat != pending.beat:
+                    # Loop resumed: the heartbeat fired ``interval`` late by the stall.
+                    self._record(pending, max(0.0, beat - pending.beat - self._interval))
+                    pending = None
+                continue
+            if time.monotonic() - beat > self._interval + self.threshold:
+                pending = self._capture(beat)
+
+    def _capture(self, beat: float) -> Optional[_Block]:
+        frame = sys._current_frames().get(self._loop_thread_id)
+        if frame is None:
+            return None
+        summaries = traceback.extract_stack(frame, limit=self._stack_depth)
+        # Module names come from the live frames, innermost last like ``summaries``.
+        modules = []
+        f = frame
+        while f is not None and len(modules) < len(summaries):
+            modules.append(f.f_globals.get("__name__"))
+            f = f.f_back
+        modules.reverse()
+
+        innermost = summaries[-1] if summaries else None
+        site_frame, site_module = None, None
+        for summary, module in zip(reversed(summaries), reversed(modules)):
+            if not _is_library(summary.filename):
+                site_frame, site_module = summary, module
+                break
+        site = _frame_label(site_frame, site_module) if site_frame else OTHER_SITE
+        blocked_in = _frame_label(innermost, modules[-1] if modules else None) if innermost else "?"
+        stack = [_frame_label(s, m) for s, m in zip(summaries, modules)]
+        return _Block(beat=beat, site=site, blocked_in=blocked_in, stack=stack)
+
+    def _record(self, block: _Block, seconds: float) -> None:
+        with self._lock:
+            entry = self._sites.get(block.site)
+            if entry is None:
+                if len(self._sites) >= self._max_sites:
+                    block.site = OTHER_SITE
+                    entry = self._sites.get(OTHER_SITE)
+                if entry is None:
+                    entry = self._sites[block.site] = BlockingSite(site=block.site, blocked_in=block.blocked_in)
+            entry.count += 1
+            entry.total_seconds += seconds
+            entry.max_seconds = max(entry.max_seconds, seconds)
+            entry.last_seen = time.time()
+            entry.blocked_in = block.blocked_in
+            entry.last_stack = block.stack
+        EVENT_LOOP_BLOCKS.inc(site=block.site)
+        EVENT_LOOP_BLOCKED_SECONDS.inc(seconds, site=block.site)
+        logger.warning(
+            "Event loop blocked %.0f ms at %s (in %s)\n  %s",
+            seconds * 1000, block.site, block.blocked_in, "\n  ".join(block.stack[-8:]),
+        )
+
+    # -- Reporting -----------------------------------------------------------
+
+    def sites(self) -> list[dict]:
+        """Call sites, worst (total blocked time) first."""
+        with self._lock:
+            entries = [s.as_dict() for s in self._sites.values()]
+        return sorted(entries, key=lambda s: s["total_ms"], reverse=True)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._sites.clear()
+
+
+_settings = get_settings()
+blocking_detector = BlockingDetector(
+    threshold=_settings.blocking_detector_threshold_seconds,
+    max_sites=_settings.blocking_detector_max_sites,
+)
@@ -0,0 +1,228 @@
+"""Per-node latency and LLM usage metrics for the LangGraph pipelines.
+
+A LangChain callback handler attached to every run through
+``register_configure_hook`` (the same mechanism LangSmith tracing uses),
+so nodes and LLM call sites need no changes. It records into the
+in-process ``REGISTRY`` and is exported on ``/metrics``:
+
+- ``graph_node_duration_seconds{graph,node,subject,tier}``
+- ``graph_node_errors_total`` / ``graph_node_retries_total{graph,node}``
+- ``graph_cache_layer_total{graph,layer,subject,tier}``
+- ``llm_call_duration_seconds`` / ``llm_first_token_seconds{provider,model,node}``
+- ``llm_tokens_total{provider,model,node,kind}`` and ``llm_errors_total``
+
+Node timings are buffered per graph run (a few tuples) and recorded when
+the graph finishes, so they carry the subject detected by ``analyze``
+rather than whatever the request passed in. Subject and tier labels are
+clamped to known values to keep cardinality bounded.
+"""
+from __future__ import annotations
+
+import contextvars
+import logging
+import time
+from typing import Any, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.tracers.context import register_configure_hook
+
+from app.config import get_settings
+from app.llm.registry import SUBJECT_PROVIDER_MAP
+from app.observability.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+# Compiled-graph names (``graph.compile(name=...)``) that get node metrics.
+INSTRUMENTED_GRAPHS = frozenset({"solve_graph", "followup_graph"})
+
+_TIERS = frozenset({"free", "paid"})
+_NODE_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 15.0, 30.0, 60.0)
+
+GRAPH_NODE_DURATION = REGISTRY.histogram(
+    "graph_node_duration_seconds", "Wall time of one graph node run",
+    ["graph", "node", "subject", "tier"], _NODE_BUCKETS,
+)
+GRAPH_NODE_ERRORS = REGISTRY.counter(
+    "graph_node_errors_total", "Graph node runs that raised", ["graph", "node"],
+)
+GRAPH_NODE_RETRIES = REGISTRY.counter(
+    "graph_node_retries_total", "Extra runs of a node within one graph run", ["graph", "node"],
+)
+GRAPH_CACHE_LAYER = REGISTRY.counter(
+    "graph_cache_layer_total", "Completed graph runs by solve cache layer",
+    ["graph", "layer", "subject", "tier"],
+)
+LLM_CALL_DURATION = REGISTRY.histogram(
+    "llm_call_duration_seconds", "Chat model call wall time", ["provider", "model", "node"], _NODE_BUCKETS,
+)
+LLM_FIRST_TOKEN = REGISTRY.histogram(
+    "llm_first_token_seconds", "Time to first streamed token (provider queue + prefill)",
+    ["provider", "model", "node"], _NODE_BUCKETS,
+)
+LLM_TOKENS = REGISTRY.counter(
+    "llm_tokens_total", "Tokens reported by the provider", ["provider", "model", "node", "kind"],
+)
+LLM_ERRORS = REGISTRY.counter(
+    "llm_errors_total", "Chat model calls that raised", ["provider", "model", "node"],
+)
+
+
+def _subject_label(value: Any) -> str:
+    if not value:
+        return "unknown"
+    value = str(value).lower()
+    return value if value in SUBJECT_PROVIDER_MAP else "other"
+
+
+def _tier_label(value: Any) -> str:
+    if not value:
+        return "unknown"
+    return value if value in _TIERS else "other"
+
+
+class _GraphRun:
+    __slots__ = ("graph", "subject", "tier", "nodes")
+
+    def __init__(self, graph: str, inputs: Any):
+        self.graph = graph
+        state = inputs if isinstance(inputs, dict) else {}
+        self.subject = state.get("subject")
+        self.tier = state.get("user_tier")
+        self.nodes: list[tuple[str, float]] = []
+
+
+class GraphMetricsHandler(BaseCallbackHandler):
+    """Callback handler feeding the graph/LLM metrics above."""
+
+    # Recording is a few dict operations — run on the caller's thread instead
+    # of being dispatched to the default executor for every event.
+    run_inline = True
+
+    def __init__(self):
+        self._graphs: dict[UUID, _GraphRun] = {}
+        # node run_id -> (graph run_id, node, start)
+        self._nodes: dict[UUID, tuple[UUID, str, float]] = {}
+        # llm run_id -> (provider, model, node, start, first_token_seen)
+        self._llms: dict[UUID, list] = {}
+
+    # -- Graph and node runs -------------------------------------------------
+
+    def on_chain_start(
+        self,
+        serialized: Optional[dict[str, Any]],
+        inputs: Any,
+        *,
+        run_id: UUID,
+        parent_run_id: Optional[UUID] = None,
+        metadata: Optional[dict[str, Any]] = None,
+        name: Optional[str] = None,
+        **kwargs: Any,
+    ) -> None:
+        if name in INSTRUMENTED_GRAPHS:
+            self._graphs[run_id] = _GraphRun(name, inputs)
+            return
+        node = (metadata or {}).get("langgraph_node")
+        if node and name == node and parent_run_id in self._graphs:
+            self._nodes[run_id] = (parent_run_id, node, time.perf_counter())
+
+    def on_chain_end(self, outputs: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        entry = self._nodes.pop(run_id, None)
+        if entry is not None:
+            graph_run = self._graphs.get(entry[0])
+            if graph_run is not None:
+                graph_run.nodes.append((entry[1], time.perf_counter() - entry[2]))
+            return
+        graph_run = self._graphs.pop(run_id, None)
+        if graph_run is not None:
+            self._finish_graph(graph_run, outputs if isinstance(outputs, dict) else {})
+
+    def on_chain_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        entry = self._nodes.pop(run_id, None)
+        if entry is not None:
+            graph_run = self._graphs.get(entry[0])
+            if graph_run is not None:
+                GRAPH_NODE_ERRORS.inc(graph=graph_run.graph, node=entry[1])
+                graph_run.nodes.append((entry[1], time.perf_counter() - entry[2]))
+            return
+        graph_run = self._graphs.pop(run_id, None)
+        if graph_run is not None:
+            self._finish_graph(graph_run, {})
+
+    def _finish_graph(self, run: _GraphRun, outputs: dict) -> None:
+        subject = _subject_label(outputs.get("detected_subject") or outputs.get("subject") or run.subject)
+        tier = _tier_label(run.tier)
+        seen: dict[str, int] = {}
+        for node, seconds in run.nodes:
+            GRAPH_NODE_DURATION.observe(seconds, graph=run.graph, node=node, subject=subject, tier=tier)
+            seen[node] = seen.get(node, 0) + 1
+        for node, count in seen.items():
+            if count > 1:
+                GRAPH_NODE_RETRIES.inc(count - 1, graph=run.graph, node=node)
+        layer = outputs.get("cache_layer")
+        if layer is not None:
+            GRAPH_CACHE_LAYER.inc(graph=run.graph, layer=layer, subject=subject, tier=tier)
+
+    # -- Chat model calls ----------------------------------------------------
+
+    def on_chat_model_start(
+        self,
+        serialized: dict[str, Any],
+        messages: Any,
+        *,
+        run_id: UUID,
+        metadata: Optional[dict[str, Any]] = None,
+        **kwargs: Any,
+    ) -> None:
+        metadata = metadata or {}
+        self._llms[run_id] = [
+            metadata.get("ls_provider") or "unknown",
+            metadata.get("ls_model_name") or "unknown",
+            metadata.get("langgraph_node") or "-",
+            time.perf_counter(),
+            False,
+        ]
+
+    def on_llm_new_token(self, token: str, *, run_id: UUID, **kwargs: Any) -> None:
+        entry = self._llms.get(run_id)
+        if entry is not None and not entry[4]:
+            entry[4] = True
+            LLM_FIRST_TOKEN.observe(
+                time.perf_counter() - entry[3], provider=entry[0], model=entry[1], node=entry[2],
+            )
+
+    def on_llm_end(self, response: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        entry = self._llms.pop(run_id, None)
+        if entry is None:
+            return
+        provider, model, node, start, _ = entry
+        LLM_CALL_DURATION.observe(time.perf_counter() - start, provider=provider, model=model, node=node)
+        usage = _usage(response)
+        if usage:
+            LLM_TOKENS.inc(usage.get("input_tokens", 0), provider=provider, model=model, node=node, kind="prompt")
+            LLM_TOKENS.inc(usage.get("output_tokens", 0), provider=provider, model=model, node=node, kind="completion")
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        entry = self._llms.pop(run_id, None)
+        if entry is not None:
+            LLM_ERRORS.inc(provider=entry[0], model=entry[1], node=entry[2])
+
+
+def _usage(response: Any) -> Optional[dict]:
+    try:
+        message = response.generations[0][0].message
+    except (AttributeError, IndexError):
+        return None
+    return getattr(message, "usage_metadata", None)
+
+
+graph_metrics_handler = GraphMetricsHandler()
+
+# The handler is the variable's *default*, so every context — including
+# request tasks that never saw an explicit ``set`` — picks it up. Setting the
+# variable to ``None`` turns recording off for that context (tests).
+graph_metrics_var: contextvars.ContextVar[Optional[GraphMetricsHandler]] = contextvars.ContextVar(
+    "graph_metrics_handler",
+    default=graph_metrics_handler if get_settings().graph_metrics_enabled else None,
+)
+register_configure_hook(graph_metrics_var, inheritable=True)
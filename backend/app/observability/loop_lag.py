@@ -0,0 +1,78 @@
+"""Event-loop lag monitor.
+
+A task sleeps for ``interval`` and measures how late it wakes up. The
+overshoot is how long something held the loop without yielding, such as
+a synchronous PDF parse or image decode. Every request on the worker
+waited at least that long.
+
+- ``event_loop_lag_seconds``: histogram of the overshoots
+- ``event_loop_lag_max_seconds``: worst overshoot since the last scrape
+  window (reset every ``window`` samples)
+
+A warning is logged when lag exceeds ``warn_seconds``.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from typing import Optional
+
+from app.config import get_settings
+from app.observability.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+EVENT_LOOP_LAG = REGISTRY.histogram(
+    "event_loop_lag_seconds", "How late the loop-lag probe woke up",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+EVENT_LOOP_LAG_MAX = REGISTRY.gauge("event_loop_lag_max_seconds", "Worst loop lag in the recent window")
+
+
+class LoopLagMonitor:
+    def __init__(self, interval: float = 0.25, warn_seconds: float = 0.2, window: int = 240):
+        self._interval = interval
+        self._warn_seconds = warn_seconds
+        self._window = window
+        self._task: Optional[asyncio.Task] = None
+        self.samples: list[float] = []  # recent lags, newest last (bounded by window)
+
+    @property
+    def max_lag(self) -> float:
+        return max(self.samples, default=0.0)
+
+    def start(self) -> asyncio.Task:
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        return self._task
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except (asyncio.CancelledError, Exception):
+            pass
+        self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self._interval)
+            lag = max(0.0, time.perf_counter() - start - self._interval)
+            self.samples.append(lag)
+            if len(self.samples) > self._window:
+                del self.samples[0]
+            EVENT_LOOP_LAG.observe(lag)
+            EVENT_LOOP_LAG_MAX.set(self.max_lag)
+            if lag > self._warn_seconds:
+                logger.warning("Event loop blocked for %.0f ms", lag * 1000)
+
+
+_settings = get_settings()
+loop_lag_monitor = LoopLagMonitor(
+    interval=_settings.loop_lag_interval_seconds,
+    warn_seconds=_settings.loop_lag_warn_seconds,
+)
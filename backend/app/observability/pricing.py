@@ -0,0 +1,45 @@
+"""List prices used to cost LLM and embedding calls in the usage ledger.
+
+USD per 1M tokens as (input, output). Review when ``MODEL_CONFIG`` changes
+or providers reprice; unknown models cost 0 and are logged once.
+"""
+import logging
+
+logger = logging.getLogger(__name__)
+
+MODEL_PRICING: dict[str, tuple[float, float]] = {
+    # Anthropic
+    "claude-sonnet-4-20250514": (3.00, 15.00),
+    "claude-haiku-4-5-20251001": (1.00, 5.00),
+    # OpenAI
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4o-mini": (0.15, 0.60),
+    "text-embedding-3-small": (0.02, 0.0),
+    # Google
+    "gemini-2.5-flash": (0.30, 2.50),
+    "gemini-2.5-flash-lite": (0.10, 0.40),
+    "gemini-embedding-001": (0.15, 0.0),
+    # Groq
+    "qwen-qwq-32b": (0.29, 0.39),
+    "qwen3-32b": (0.29, 0.59),
+}
+
+_warned: set[str] = set()
+
+
+def estimate_cost(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    """Cost in USD of one call, from ``MODEL_PRICING``."""
+    price = MODEL_PRICING.get(model)
+    if price is None:
+        # Provider-returned names may carry a prefix/suffix ("models/...", a
+        # date); longest match first so gpt-4o-mini doesn't price as gpt-4o.
+        for name, candidate in sorted(MODEL_PRICING.items(), key=lambda kv: -len(kv[0])):
+            if model.endswith(name) or model.startswith(name):
+                price = candidate
+                break
+    if price is None:
+        if model not in _warned and not model.startswith("fake"):
+            _warned.add(model)
+            logger.warning("No pricing for model %s — costing at 0", model)
+        return 0.0
+    return (prompt_tokens * price[0] + completion_tokens * price[1]) / 1_000_000
@@ -0,0 +1,44 @@
+"""Per-request context readable from anywhere below the ASGI app.
+
+``RequestContextMiddleware`` stores the ASGI scope in a contextvar. Starlette
+writes the matched route into that same scope during routing, so code that
+runs inside the endpoint (DB pool checkouts, LLM calls, background tasks
+spawned with ``spawn_in_current_context``) can label metrics with the route
+template rather than the raw path.
+"""
+from __future__ import annotations
+
+import contextvars
+from typing import Optional
+
+_current_scope: contextvars.ContextVar[Optional[dict]] = contextvars.ContextVar(
+    "current_request_scope", default=None
+)
+
+NO_ROUTE = "-"  # outside any request (startup, scripts)
+UNMATCHED_ROUTE = "unmatched"
+
+
+def current_route() -> str:
+    """Route template of the active request, e.g. ``/api/v1/scan/{scan_id}``."""
+    scope = _current_scope.get()
+    if scope is None:
+        return NO_ROUTE
+    route = scope.get("route")
+    return getattr(route, "path", None) or UNMATCHED_ROUTE
+
+
+class RequestContextMiddleware:
+    """Pure ASGI middleware — no response buffering, safe for streaming."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        token = _current_scope.set(scope)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _current_scope.reset(token)
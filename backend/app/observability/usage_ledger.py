@@ -0,0 +1,329 @@
+"""Usage ledger: tokens, latency and cost of every LLM and embedding call.
+
+``Solution`` only stores the solve call's tokens. The ledger captures
+every call (analyze, verify, framework, deep evaluate, OCR, grading,
+practice generation, embeddings) so cache layers and tier limits can be
+judged on real cost.
+
+Capture:
+- ``usage_ledger_handler`` is attached to every chat model built by
+  ``app.llm.registry.get_llm`` (and the Gemini OCR model). Embedding calls
+  report through ``record`` directly.
+- Calls made during an HTTP request aggregate into that request's
+  ``UsageScope`` (opened by ``UsageScopeMiddleware``), keyed by
+  (kind, operation, provider, model). Services annotate the scope with
+  user, tier, subject and cache layer as they learn them.
+- When the request ends, its aggregates become ledger rows in an
+  in-memory buffer; a background task bulk-inserts the buffer every
+  ``usage_ledger_flush_seconds`` or once ``usage_ledger_batch_size`` rows
+  are pending. Calls from background tasks that outlive the request are
+  written as rows of their own with the same request id.
+
+Fail-open: recording never raises, and a failed flush drops the batch
+with a warning rather than retrying into an unbounded buffer.
+"""
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import contextvars
+import logging
+import time
+import uuid
+from decimal import Decimal
+from typing import Any, Iterator, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from sqlalchemy import insert
+
+from app.config import get_settings
+from app.database import AsyncSessionLocal
+from app.models.usage_ledger import UsageLedgerEntry
+from app.observability.metrics import REGISTRY
+from app.observability.pricing import estimate_cost
+from app.observability.request_context import NO_ROUTE, current_route
+
+logger = logging.getLogger(__name__)
+
+LEDGER_ROWS_WRITTEN = REGISTRY.counter("usage_ledger_rows_written_total", "Ledger rows inserted")
+LEDGER_ROWS_DROPPED = REGISTRY.counter(
+    "usage_ledger_rows_dropped_total", "Ledger rows dropped (buffer full or flush failed)",
+)
+
+
+class UsageScope:
+    """Aggregated usage of one request, plus its attribution labels."""
+
+    __slots__ = ("request_id", "route", "user_id", "tier", "subject", "cache_layer", "entries", "closed")
+
+    def __init__(self, route: str = NO_ROUTE):
+        self.request_id = uuid.uuid4().hex
+        self.route = route
+        self.user_id: Optional[int] = None
+        self.tier: Optional[str] = None
+        self.subject: Optional[str] = None
+        self.cache_layer: Optional[int] = None
+        # (kind, operation, provider, model) -> [calls, prompt, completion, latency_ms, cost]
+        self.entries: dict[tuple[str, str, str, str], list] = {}
+        self.closed = False
+
+    def add(self, key: tuple[str, str, str, str], prompt: int, completion: int, latency_ms: float, cost: float) -> None:
+        agg = self.entries.get(key)
+        if agg is None:
+            self.entries[key] = [1, prompt, completion, latency_ms, cost]
+        else:
+            agg[0] += 1
+            agg[1] += prompt
+            agg[2] += completion
+            agg[3] += latency_ms
+            agg[4] += cost
+
+    def rows(self, entries: Optional[dict] = None) -> list[dict]:
+        rows = []
+        for (kind, operation, provider, model), agg in (entries if entries is not None else self.entries).items():
+            rows.append({
+                "request_id": self.request_id,
+                "route": self.route[:200],
+                "user_id": self.user_id,
+                "tier": self.tier,
+                "subject": self.subject,
+                "cache_layer": self.cache_layer,
+                "operation": operation[:100],
+                "kind": kind,
+                "provider": provider,
+                "model": model[:100],
+                "calls": agg[0],
+                "prompt_tokens": agg[1],
+                "completion_tokens": agg[2],
+                "latency_ms": int(agg[3]),
+                "cost_usd": Decimal(str(round(agg[4], 6))),
+            })
+        return rows
+
+
+_current_scope: contextvars.ContextVar[Optional[UsageScope]] = contextvars.ContextVar(
+    "usage_scope", default=None
+)
+_current_operation: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar(
+    "usage_operation", default=None
+)
+
+
+def current_scope() -> Optional[UsageScope]:
+    return _current_scope.get()
+
+
+def annotate(
+    *,
+    user_id: Optional[int] = None,
+    tier: Optional[str] = None,
+    subject: Optional[str] = None,
+    cache_layer: Optional[int] = None,
+) -> None:
+    """Attach attribution labels to the current request's usage (no-op outside one)."""
+    scope = _current_scope.get()
+    if scope is None:
+        return
+    if user_id is not None:
+        scope.user_id = user_id
+    if tier is not None:
+        scope.tier = tier
+    if subject is not None:
+        scope.subject = subject[:50]
+    if cache_layer is not None:
+        scope.cache_layer = cache_layer
+
+
+@contextlib.contextmanager
+def usage_operation(name: str) -> Iterator[None]:
+    """Label calls made inside the block (outside a graph node) as ``name``."""
+    token = _current_operation.set(name)
+    try:
+        yield
+    finally:
+        _current_operation.reset(token)
+
+
+def record(
+    kind: str,
+    provider: str,
+    model: str,
+    prompt_tokens: int = 0,
+    completion_tokens: int = 0,
+    latency_s: float = 0.0,
+    operation: Optional[str] = None,
+) -> None:
+    """Record one call. Never raises."""
+    try:
+        cost = estimate_cost(model, prompt_tokens, completion_tokens)
+        operation = operation or _current_operation.get() or current_route()
+        key = (kind, operation, provider, model)
+        latency_ms = latency_s * 1000
+        scope = _current_scope.get()
+        if scope is None or scope.closed:
+            # No request (script, startup) or a background task that outlived
+            # its request: write a row of its own.
+            scope = scope or UsageScope(route=current_route())
+            single = {key: [1, prompt_tokens, completion_tokens, latency_ms, cost]}
+            usage_ledger.push(scope.rows(single))
+            return
+        scope.add(key, prompt_tokens, completion_tokens, latency_ms, cost)
+    except Exception as e:
+        logger.warning("Usage ledger record failed: %s", e)
+
+
+class UsageLedgerHandler(BaseCallbackHandler):
+    """Chat-model callback that feeds ``record``; attached in ``get_llm``."""
+
+    run_inline = True
+
+    def __init__(self):
+        # llm run_id -> (provider, model, operation, start)
+        self._runs: dict[UUID, tuple[str, str, Optional[str], float]] = {}
+
+    def on_chat_model_start(
+        self,
+        serialized: dict[str, Any],
+        messages: Any,
+        *,
+        run_id: UUID,
+        metadata: Optional[dict[str, Any]] = None,
+        **kwargs: Any,
+    ) -> None:
+        metadata = metadata or {}
+        self._runs[run_id] = (
+            metadata.get("ls_provider") or "unknown",
+            metadata.get("ls_model_name") or "unknown",
+            metadata.get("langgraph_node"),
+            time.perf_counter(),
+        )
+
+    def on_llm_end(self, response: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        run = self._runs.pop(run_id, None)
+        if run is None:
+            return
+        provider, model, operation, start = run
+        usage = {}
+        try:
+            usage = response.generations[0][0].message.usage_metadata or {}
+        except (AttributeError, IndexError):
+            pass
+        record(
+            "llm", provider, model,
+            prompt_tokens=usage.get("input_tokens", 0),
+            completion_tokens=usage.get("output_tokens", 0),
+            latency_s=time.perf_counter() - start,
+            operation=operation,
+        )
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        run = self._runs.pop(run_id, None)
+        if run is not None:
+            # Failed calls still cost latency (tokens are unknown).
+            provider, model, operation, start = run
+            record("llm", provider, model, latency_s=time.perf_counter() - start, operation=operation)
+
+
+usage_ledger_handler = UsageLedgerHandler()
+
+
+class UsageLedger:
+    """Buffers ledger rows and bulk-inserts them in the background."""
+
+    def __init__(self, session_factory=AsyncSessionLocal):
+        settings = get_settings()
+        self._session_factory = session_factory
+        self._enabled = settings.usage_ledger_enabled
+        self._flush_seconds = settings.usage_ledger_flush_seconds
+        self._batch_size = settings.usage_ledger_batch_size
+        self._max_buffer = settings.usage_ledger_max_buffer
+        self._buffer: list[dict] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._flusher: Optional[asyncio.Task] = None
+
+    @property
+    def pending(self) -> int:
+        return len(self._buffer)
+
+    def push(self, rows: list[dict]) -> None:
+        if not self._enabled or not rows:
+            return
+        self._buffer.extend(rows)
+        overflow = len(self._buffer) - self._max_buffer
+        if overflow > 0:
+            del self._buffer[:overflow]
+            LEDGER_ROWS_DROPPED.inc(overflow)
+            logger.warning("Usage ledger buffer full — dropped %d oldest rows", overflow)
+        if self._wakeup is not None and len(self._buffer) >= self._batch_size:
+            self._wakeup.set()
+
+    async def flush(self) -> int:
+        """Insert everything buffered so far; returns the row count written."""
+        if not self._buffer:
+            return 0
+        batch, self._buffer = self._buffer, []
+        try:
+            async with self._session_factory() as db:
+                await db.execute(insert(UsageLedgerEntry), batch)
+                await db.commit()
+        except Exception as e:
+            LEDGER_ROWS_DROPPED.inc(len(batch))
+            logger.warning("Usage ledger flush of %d rows failed: %s", len(batch), e)
+            return 0
+        LEDGER_ROWS_WRITTEN.inc(len(batch))
+        return len(batch)
+
+    def start(self) -> Optional[asyncio.Task]:
+        if not self._enabled:
+            return None
+        if self._flusher is None or self._flusher.done():
+            self._wakeup = asyncio.Event()
+            self._flusher = asyncio.get_running_loop().create_task(self._flush_loop())
+        return self._flusher
+
+    async def stop(self) -> None:
+        """Stop the flusher and write whatever is still buffered."""
+        if self._flusher is not None:
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._flusher = None
+            self._wakeup = None
+        await self.flush()
+
+    async def _flush_loop(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self._flush_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+
+usage_ledger = UsageLedger()
+
+
+class UsageScopeMiddleware:
+    """Opens a ``UsageScope`` per HTTP request and hands its rows to the ledger."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        usage = UsageScope()
+        token = _current_scope.set(usage)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _current_scope.reset(token)
+            usage.closed = True
+            if usage.entries:
+                route = scope.get("route")
+                usage.route = getattr(route, "path", None) or scope.get("path", NO_ROUTE)
+                usage_ledger.push(usage.rows())
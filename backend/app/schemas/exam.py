@@ -1,7 +1,7 @@
 from datetime import datetime
 from typing import List, Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 class ExamPaperResponse(BaseModel):
@@ -88,6 +88,7 @@ class CrawlRequest(BaseModel):
     subject: str = "numeracy"
     level: int = 1
     exam_code: str = "32406"
+    concurrency: Optional[int] = Field(None, ge=1, le=32)  # default: settings.crawler_concurrency
 
 
 class CrawledPaperSummary(BaseModel):
@@ -107,3 +108,25 @@ class CrawlResponse(BaseModel):
     skipped: List[str] = []
     failed: List[str] = []
     errors: List[str] = []
+
+
+class CrawlProgress(BaseModel):
+    discovered: int = 0  # new papers to import (excludes skipped)
+    skipped: int = 0
+    downloaded: int = 0
+    parsed: int = 0
+    saved: int = 0
+    paper_failed: int = 0
+
+
+class CrawlJobResponse(BaseModel):
+    id: str
+    url: str
+    status: str  # pending | running | completed | failed | cancelled
+    concurrency: int
+    progress: CrawlProgress
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+    resumed_from: Optional[str] = None
+    error: Optional[str] = None
+    result: Optional[CrawlResponse] = None
@@ -0,0 +1,365 @@
+"""Exam crawls as background jobs.
+
+``POST /exams/crawl/jobs`` returns at once and the crawl runs as a task:
+
+1. discover the page's PDFs and pair exams with marking schedules
+2. drop papers already imported (one ``IN`` query)
+3. download + parse ``concurrency`` papers at a time
+4. save parsed papers as they finish, ``crawler_save_batch_size`` per
+   transaction (app/services/exam_ingest_service.py)
+
+Each DB step opens its own short session, so no connection is held while
+PDFs download or parse.
+
+Every step is appended to the job's event log: ``started``, then per paper
+``discovered`` / ``skipped``, ``downloaded``, ``parsed``, ``saved`` or
+``paper_failed``, and finally the job's status: ``completed`` / ``failed``
+/ ``cancelled``. Per-paper events bump the ``CrawlProgress`` counter of the
+same name; ``started`` and the final event count nothing.
+``CrawlJob.follow`` replays the log and then waits for new events. The SSE
+endpoint streams it, and a client that reconnects with ``Last-Event-ID``
+misses nothing.
+
+Resume: papers are saved as they finish, so an interrupted crawl keeps
+what it had. ``CrawlJobManager.resume`` runs the same request again. Step
+2 skips the saved papers, unchanged PDFs come back from the download
+cache as 304s (pdf_downloader.py), and their parses come from the parse
+cache (parse_cache.py).
+
+Jobs live in this process's memory, which keeps the last
+``crawler_job_history`` finished jobs. After a restart, posting the same
+crawl again resumes it the same way.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import AsyncIterator, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.config import get_settings
+from app.database import AsyncSessionLocal
+from app.observability.tracing import spawn_in_current_context
+from app.schemas.exam import (
+    CrawlJobResponse,
+    CrawlProgress,
+    CrawlRequest,
+    CrawlResponse,
+    CrawledPaperSummary,
+)
+from app.services.exam_crawler_service import EXAM_CODE_MAP, CrawledPDF, ExamCrawlerService, ExamSchedulePair
+from app.services.exam_ingest_service import ExamIngestService, IngestedPaper, PaperToIngest
+from app.services.pdf_parser_service import PDFParserService
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+TERMINAL_STATUSES = {"completed", "failed", "cancelled"}
+
+# Event types that bump a CrawlProgress counter of the same name
+_COUNTED = set(CrawlProgress.model_fields)
+
+
+@dataclass(frozen=True)
+class CrawlEvent:
+    seq: int  # 1-based position in the job's log; the SSE event id
+    type: str
+    data: dict
+
+
+class CrawlJob:
+    def __init__(self, request: CrawlRequest, concurrency: int, resumed_from: Optional[str] = None):
+        self.id = uuid.uuid4().hex
+        self.request = request
+        self.concurrency = concurrency
+        self.resumed_from = resumed_from
+        self.status = "pending"
+        self.created_at = datetime.now(timezone.utc)
+        self.finished_at: Optional[datetime] = None
+        self.error: Optional[str] = None
+        self.result: Optional[CrawlResponse] = None
+        self.progress = CrawlProgress()
+        self.events: list[CrawlEvent] = []
+        self.task: Optional[asyncio.Task] = None
+        self._wake = asyncio.Event()
+
+    @property
+    def done(self) -> bool:
+        return self.status in TERMINAL_STATUSES
+
+    def emit(self, type: str, **data) -> None:
+        if type in _COUNTED:
+            setattr(self.progress, type, getattr(self.progress, type) + 1)
+        self._append(type, data)
+
+    def finish(self, status: str) -> None:
+        self.status = status
+        self.finished_at = datetime.now(timezone.utc)
+        # The job's own outcome is not a per-paper step: never counted
+        if self.result is not None:
+            self._append(status, self.result.model_dump())
+        else:
+            self._append(status, {"error": self.error})
+
+    def _append(self, type: str, data: dict) -> None:
+        self.events.append(CrawlEvent(seq=len(self.events) + 1, type=type, data=data))
+        # Wake every follower, then arm a fresh event for the next emit
+        self._wake.set()
+        self._wake = asyncio.Event()
+
+    async def follow(self, after: int = 0, idle_timeout: Optional[float] = None) -> AsyncIterator[Optional[CrawlEvent]]:
+        """Events with ``seq > after``, live until the job ends.
+
+        Yields ``None`` after ``idle_timeout`` seconds without an event, so
+        the caller can send a keep-alive.
+        """
+        while True:
+            while after < len(self.events):
+                after += 1
+                yield self.events[after - 1]
+            if self.done:
+                return
+            try:
+                await asyncio.wait_for(self._wake.wait(), idle_timeout)
+            except asyncio.TimeoutError:
+                yield None
+
+    def to_response(self) -> CrawlJobResponse:
+        return CrawlJobResponse(
+            id=self.id,
+            url=self.request.url,
+            status=self.status,
+            concurrency=self.concurrency,
+            progress=self.progress.model_copy(),
+            created_at=self.created_at,
+            finished_at=self.finished_at,
+            resumed_from=self.resumed_from,
+            error=self.error,
+            result=self.result,
+        )
+
+
+class CrawlJobManager:
+    def __init__(self, session_factory: Optional[async_sessionmaker[AsyncSession]] = None):
+        self.session_factory = session_factory or AsyncSessionLocal
+        self._jobs: dict[str, CrawlJob] = {}
+
+    def start(self, request: CrawlRequest, resumed_from: Optional[str] = None) -> CrawlJob:
+        job = CrawlJob(request, request.concurrency or settings.crawler_concurrency, resumed_from)
+        self._jobs[job.id] = job
+        self._prune()
+        job.task = spawn_in_current_context(self._run(job))
+        return job
+
+    def get(self, job_id: str) -> Optional[CrawlJob]:
+        return self._jobs.get(job_id)
+
+    def list(self) -> list[CrawlJob]:
+        """Newest first."""
+        return list(reversed(self._jobs.values()))
+
+    def resume(self, job: CrawlJob) -> CrawlJob:
+        """Run a finished job's crawl again; already-saved papers are skipped."""
+        return self.start(job.request, resumed_from=job.id)
+
+    def cancel(self, job: CrawlJob) -> None:
+        if job.task is not None and not job.done:
+            job.task.cancel()
+
+    async def shutdown(self) -> None:
+        tasks = [job.task for job in self._jobs.values() if job.task is not None and not job.done]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _prune(self) -> None:
+        finished = [job_id for job_id, job in self._jobs.items() if job.done]
+        for job_id in finished[:max(0, len(finished) - settings.crawler_job_history)]:
+            del self._jobs[job_id]
+
+    async def _run(self, job: CrawlJob) -> None:
+        job.status = "running"
+        job.emit("started", url=job.request.url, concurrency=job.concurrency, resumed_from=job.resumed_from)
+        try:
+            job.result = await run_crawl(job, self.session_factory)
+        except asyncio.CancelledError:
+            logger.info("Crawl job %s cancelled", job.id)
+            job.finish("cancelled")
+        except Exception as e:
+            logger.exception("Crawl job %s failed", job.id)
+            job.error = str(e)
+            job.finish("failed")
+        else:
+            job.finish("completed")
+        finally:
+            self._prune()
+
+
+# ---------------------------------------------------------------------------
+# The crawl itself
+# ---------------------------------------------------------------------------
+
+
+def _title(pdf: CrawledPDF) -> str:
+    return pdf.title or pdf.url.split("/")[-1]
+
+
+async def run_crawl(job: CrawlJob, session_factory: async_sessionmaker[AsyncSession]) -> CrawlResponse:
+    request = job.request
+    crawler = ExamCrawlerService()
+    parser = PDFParserService()
+
+    all_pdfs = await crawler.discover_pdfs(request.url)
+    filtered = crawler.filter_exam_pdfs(all_pdfs, language=request.language)
+    pairs = crawler.pair_exams_with_schedules(filtered)
+
+    papers_imported: list[CrawledPaperSummary] = []
+    skipped: list[str] = []
+    failed: list[str] = []
+    errors: list[str] = []
+
+    # --- Phase 1: Filter out duplicates (one query) ---
+    async with session_factory() as db:
+        existing = await ExamIngestService(db).existing_source_urls([pair.exam.url for pair in pairs])
+    new_pairs: list[ExamSchedulePair] = []
+    for pair in pairs:
+        event = {"url": pair.exam.url, "title": _title(pair.exam), "year": pair.exam.year}
+        if pair.exam.url in existing:
+            skipped.append(f"{_title(pair.exam)} ({pair.exam.year})")
+            job.emit("skipped", **event)
+        else:
+            new_pairs.append(pair)
+            job.emit("discovered", **event, schedule_url=pair.schedule.url if pair.schedule else None)
+
+    def fail(title: str, year: int, url: str, msg: str) -> None:
+        failed.append(f"{title} ({year}) — {msg}, URL: {url}")
+        job.emit("paper_failed", url=url, title=title, year=year, error=msg)
+
+    # --- Phase 2: Download + parse concurrently ---
+    semaphore = asyncio.Semaphore(job.concurrency)
+    # Exams of one event (or year) share a marking schedule: one download +
+    # parse per schedule URL, awaited by every pair that uses it.
+    schedules: dict[str, asyncio.Task] = {}
+
+    async def load_schedule(url: str) -> dict:
+        schedule_bytes = await crawler.download_pdf(url)
+        return parser.get_answer_map(await parser.parse_schedule_pdf(schedule_bytes))
+
+    async def process_pair(pair: ExamSchedulePair) -> Optional[PaperToIngest]:
+        """Download and parse one exam+schedule pair; None if it failed."""
+        exam_title = _title(pair.exam)
+        async with semaphore:
+            async def parse_exam():
+                data = await crawler.download_pdf(pair.exam.url)
+                job.emit("downloaded", url=pair.exam.url, title=exam_title, bytes=len(data))
+                return await parser.parse_exam_pdf(data)
+
+            async def parse_schedule():
+                # A schedule failure only costs the answers: (answer_map, warning)
+                if not pair.schedule:
+                    return {}, None
+                url = pair.schedule.url
+                if url not in schedules:
+                    schedules[url] = asyncio.create_task(load_schedule(url))
+                try:
+                    # Shielded: one pair failing or being cancelled must not
+                    # cancel the parse the other pairs are waiting on.
+                    return await asyncio.shield(schedules[url]), None
+                except Exception as e:
+                    return {}, f"Schedule failed: {e}"
+
+            try:
+                # Exam and schedule download + parse run concurrently
+                parsed_exam, (answer_map, warning) = await asyncio.gather(parse_exam(), parse_schedule())
+            except Exception as e:
+                fail(exam_title, pair.exam.year, pair.exam.url, str(e))
+                return None
+        if not parsed_exam.questions:
+            fail(exam_title, pair.exam.year, pair.exam.url, "0 questions parsed")
+            return None
+        if warning:
+            errors.append(f"{exam_title}: {warning}")
+        job.emit("parsed", url=pair.exam.url, title=exam_title, questions=len(parsed_exam.questions),
+                 answers=len(answer_map), warning=warning)
+
+        detected_code = pair.exam.exam_code or request.exam_code
+        code_info = EXAM_CODE_MAP.get(detected_code, {})
+        return PaperToIngest(
+            parsed=parsed_exam,
+            title=pair.exam.title or parsed_exam.title,
+            source_url=pair.exam.url,
+            year=pair.exam.year,
+            subject=str(code_info.get("subject", request.subject)),
+            level=int(code_info.get("level", request.level)),
+            exam_code=detected_code,
+            language=request.language,
+            answers=answer_map,
+        )
+
+    # --- Phase 3: Save finished papers in batches ---
+    def record(ingested: list[IngestedPaper]) -> None:
+        # Summarize right away: a later rollback expires these objects
+        for item in ingested:
+            papers_imported.append(CrawledPaperSummary(
+                title=item.paper.title,
+                year=item.paper.year,
+                total_questions=len(item.questions),
+                exam_paper_id=str(item.paper.id),
+            ))
+            job.emit("saved", url=item.paper.source_url, title=item.paper.title,
+                     exam_paper_id=str(item.paper.id), questions=len(item.questions))
+            logger.info("Imported: %s (%d questions)", item.paper.title, len(item.questions))
+
+    async def save(batch: list[PaperToIngest]) -> None:
+        if not batch:
+            return
+        async with session_factory() as db:
+            ingest = ExamIngestService(db)
+            try:
+                record(await ingest.ingest(batch))
+            except Exception:
+                # Isolate the bad paper(s): retry one paper per transaction
+                logger.exception("Batch save failed; retrying papers one by one")
+                for paper in batch:
+                    try:
+                        record(await ingest.ingest([paper]))
+                    except Exception as e:
+                        fail(paper.title, paper.year, paper.source_url, str(e))
+                        logger.exception("Failed to save %s", paper.source_url)
+
+    logger.info("Crawl job %s: processing %d new papers (concurrency=%d)", job.id, len(new_pairs), job.concurrency)
+    tasks = [asyncio.create_task(process_pair(pair)) for pair in new_pairs]
+    try:
+        batch: list[PaperToIngest] = []
+        for finished in asyncio.as_completed(tasks):
+            paper = await finished
+            if paper is None:
+                continue
+            batch.append(paper)
+            if len(batch) >= settings.crawler_save_batch_size:
+                await save(batch)
+                batch = []
+        await save(batch)
+    finally:
+        for task in [*tasks, *schedules.values()]:
+            task.cancel()
+
+    return CrawlResponse(
+        url=request.url,
+        total_pdfs_discovered=len(all_pdfs),
+        total_papers_imported=len(papers_imported),
+        total_questions_parsed=sum(p.total_questions for p in papers_imported),
+        total_skipped=len(skipped),
+        papers=papers_imported,
+        skipped=skipped,
+        failed=failed,
+        errors=errors,
+    )
+
+
+crawl_jobs = CrawlJobManager()
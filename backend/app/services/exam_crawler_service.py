@@ -2,10 +2,13 @@
 
 import logging
 import re
+from bisect import bisect_left, bisect_right
 from dataclasses import dataclass, field
+from html import unescape
+from typing import Optional
 from urllib.parse import urljoin
 
-import httpx
+from app.services.pdf_downloader import PDFDownloader, pdf_downloader
 
 logger = logging.getLogger(__name__)
 
@@ -51,6 +54,33 @@ EVENT_RE = re.compile(r"event[- ]?(\d)", re.IGNORECASE)
 WEEK_RE = re.compile(r"week[- ]?(\d)", re.IGNORECASE)
 EXAM_CODE_RE = re.compile(r"\b(\d{5})\b")  # 5-digit NZQA standard number
 
+# Every classification pattern above as one alternation, so a link's text
+# is scanned once. Named groups say which pattern hit; _classify_pdf
+# applies the same priorities as the per-pattern dicts. The alternation
+# sits inside a lookahead: matches are zero-width and consume nothing, so
+# "event-2023" still yields the year, and each pattern's first hit is
+# where its own search() would find it. The leading character class holds
+# the first letters of all alternatives (update it with them): it rejects
+# most positions before any alternative is tried.
+CLASSIFY_RE = re.compile(
+    "(?=[2acemnprstw])(?=" + "|".join([
+        f"(?P<year>{YEAR_RE.pattern})",
+        f"(?P<event>{EVENT_RE.pattern})",
+        f"(?P<week>{WEEK_RE.pattern})",
+        r"(?P<exam>\b(?:assessment paper|exam)\b)",
+        *(f"(?P<type_{name}>{p.pattern})" for name, p in PDF_TYPE_PATTERNS.items()),
+        *(f"(?P<lang_{name}>{p.pattern})" for name, p in LANGUAGE_PATTERNS.items()),
+    ]) + ")",
+    re.IGNORECASE,
+)
+# File-size labels in generic link text: "PDF (2.3 MB)", "(796KB)"
+SIZE_LABEL_RE = re.compile(r"PDF\s*\([^)]*\)|\([^)]*(?:KB|MB)\)")
+
+# Page source around a link with generic text, used as its context
+# (clipped to the link's table row or list item)
+_CONTEXT_BEFORE = 300
+_CONTEXT_AFTER = 50
+
 # Map known exam codes to subject and level
 EXAM_CODE_MAP: dict[str, dict[str, str | int]] = {
     "32406": {"subject": "numeracy", "level": 1},
@@ -76,56 +106,155 @@ EXAM_CODE_MAP: dict[str, dict[str, str | int]] = {
 }
 
 
+@dataclass
+class PDFLink:
+    """An ``<a href="*.pdf">`` on a page."""
+    href: str
+    text: str
+    context: str  # page text around the link when its text is generic, else the text
+
+
+@dataclass
+class _RawLink:
+    href: str
+    chunks: list[str]
+    start: int  # source offsets of the <a> ... </a>
+    end: int = 0
+    row_start: int = 0  # of the enclosing <tr> / <li>, if any
+    row_end: float = float("inf")
+
+
+# Rows bound a link's context. table/ul/ol are tracked too, so that closing
+# one also closes rows left open inside it.
+_ROW_TAGS = {"tr", "li"}
+
+# Page tokenizer: each match is an <a> whose attributes mention ".pdf", an
+# </a>, a row or list tag, a skipped script/style/comment, or a run of
+# text. Other tags (and other links) are never visited on their own: a
+# text run starts at any tag's closing ">", which the alternatives before
+# it leave unconsumed.
+_TOKEN_RE = re.compile(
+    r"<a\s(?P<pdf_attrs>[^>]*\.pdf[^>]*)(?=>)"
+    r"|</(?P<close_a>a)\s*(?=>)"
+    r"|<(?P<end>/?)(?P<tag>tr|li|table|ul|ol)\b[^>]*(?=>)"
+    r"|<(?P<raw>script|style)\b.*?</(?P=raw)\s*(?=>)"
+    r"|<!--.*?--(?=>)"
+    r"|>(?P<text>\s*[^<\s][^<]*)",
+    re.IGNORECASE | re.DOTALL,
+)
+_HREF_RE = re.compile(r"""\bhref\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s"'>]+))""", re.IGNORECASE)
+
+
+class _PDFLinkScanner:
+    """One pass over a page: PDF links, their enclosing rows, and every text run with its source offset."""
+
+    def __init__(self):
+        self.text_offsets: list[int] = []
+        self.texts: list[str] = []
+        self.links: list[_RawLink] = []
+        self._blocks: list[tuple[str, int, list[_RawLink]]] = []  # tag, start, links inside
+
+    def scan(self, html: str) -> list[_RawLink]:
+        open_link: Optional[_RawLink] = None
+        for token in _TOKEN_RE.finditer(html):
+            pdf_attrs, close_a, end_tag, tag, _, text = token.groups()
+            if text is not None:
+                if "&" in text:
+                    text = unescape(text)
+                self.text_offsets.append(token.start("text"))
+                self.texts.append(text)
+                if open_link:
+                    open_link.chunks.append(text)
+            elif pdf_attrs is not None:
+                href = _HREF_RE.search(pdf_attrs)
+                href = href and unescape(next(g for g in href.groups() if g is not None))
+                open_link = None
+                if href and href.lower().endswith(".pdf"):
+                    open_link = self._add_link(href, token.start())
+            elif close_a:
+                if open_link:
+                    open_link.end = token.end() + 1
+                    open_link = None
+            elif tag:  # script, style and comments have no groups
+                tag = tag.lower()
+                if not end_tag:
+                    if tag in _ROW_TAGS and self._blocks and self._blocks[-1][0] == tag:
+                        self._close_block(token.start())  # implied </tr> / </li>
+                    self._blocks.append((tag, token.start(), []))
+                elif self._blocks and self._blocks[-1][0] == tag:
+                    self._close_block(token.end() + 1)
+                elif any(block[0] == tag for block in self._blocks):
+                    while self._blocks[-1][0] != tag:  # rows left open inside it
+                        self._close_block(token.end() + 1)
+                    self._close_block(token.end() + 1)
+        while self._blocks:
+            self._close_block(len(html))
+        # A link never closed with </a> is not a link
+        return [link for link in self.links if link.end]
+
+    def _add_link(self, href: str, start: int) -> _RawLink:
+        link = _RawLink(href=href, chunks=[], start=start)
+        row = next((block for block in reversed(self._blocks) if block[0] in _ROW_TAGS), None)
+        if row:
+            link.row_start = row[1]
+            row[2].append(link)
+        self.links.append(link)
+        return link
+
+    def _close_block(self, end: int) -> None:
+        for link in self._blocks.pop()[2]:
+            link.row_end = end
+
+    def text_between(self, start: int, end: float) -> str:
+        """Text in page source ``[start, end)``, whitespace-normalized."""
+        first = max(bisect_right(self.text_offsets, start) - 1, 0)
+        last = bisect_left(self.text_offsets, end)
+        pieces = [
+            text[max(0, start - offset):max(0, end - offset)]
+            for offset, text in zip(self.text_offsets[first:last], self.texts[first:last])
+        ]
+        return " ".join(" ".join(pieces).split())
+
+
+def extract_pdf_links(html: str) -> list[PDFLink]:
+    """All ``<a href="*.pdf">`` links on a page, with context for generic link text."""
+    scanner = _PDFLinkScanner()
+    links = []
+    for link in scanner.scan(html):
+        text = "".join(link.chunks).strip()
+        # NZQA new site often uses generic link text like "PDF (2.3 MB)".
+        # The text around the link, within its table row or list item,
+        # says what it is.
+        context = text
+        if text.startswith("PDF") or len(text) < 20:
+            context = scanner.text_between(
+                max(link.start - _CONTEXT_BEFORE, link.row_start),
+                min(link.end + _CONTEXT_AFTER, link.row_end),
+            )
+        links.append(PDFLink(href=link.href, text=text, context=context))
+    return links
+
+
 class ExamCrawlerService:
     """Crawl NZQA pages to discover and download exam PDFs."""
 
-    def __init__(self, timeout: float = 30.0):
-        self._timeout = timeout
+    def __init__(self, downloader: Optional[PDFDownloader] = None):
+        # Shared pooled client + on-disk PDF cache (app/services/pdf_downloader.py)
+        self._downloader = downloader or pdf_downloader
 
     async def discover_pdfs(self, page_url: str) -> list[CrawledPDF]:
         """Fetch an NZQA page and discover all PDF links."""
-        async with httpx.AsyncClient(timeout=self._timeout, follow_redirects=True) as client:
-            resp = await client.get(page_url)
-            resp.raise_for_status()
-
-        html = resp.text
-        pdfs = []
-
-        # Find all <a> tags with .pdf links
-        # Pattern: <a href="...pdf"...>link text</a>
-        link_re = re.compile(
-            r'<a\s[^>]*href="([^"]*\.pdf)"[^>]*>(.*?)</a>',
-            re.IGNORECASE | re.DOTALL,
-        )
-
-        for match in link_re.finditer(html):
-            href = match.group(1)
-            link_text = re.sub(r"<[^>]+>", "", match.group(2)).strip()
-
-            # NZQA new site often uses generic link text like "PDF (2.3 MB)".
-            # Extract surrounding context (the text in the same row/container)
-            # by looking at a window of text around the match in the HTML.
-            context_text = link_text
-            if link_text.startswith("PDF") or len(link_text) < 20:
-                start = max(0, match.start() - 300)
-                end = min(len(html), match.end() + 50)
-                surrounding = re.sub(r"<[^>]+>", " ", html[start:end]).strip()
-                surrounding = re.sub(r"\s+", " ", surrounding)
-                context_text = surrounding
-
-            url = urljoin(page_url, href)
-            pdf = self._classify_pdf(url, link_text, context_text)
-            pdfs.append(pdf)
-
+        html = await self._downloader.get_text(page_url)
+        pdfs = [
+            self._classify_pdf(urljoin(page_url, link.href), link.text, link.context)
+            for link in extract_pdf_links(html)
+        ]
         logger.info("Discovered %d PDFs on %s", len(pdfs), page_url)
         return pdfs
 
     async def download_pdf(self, url: str) -> bytes:
-        """Download a PDF and return its bytes."""
-        async with httpx.AsyncClient(timeout=self._timeout, follow_redirects=True) as client:
-            resp = await client.get(url)
-            resp.raise_for_status()
-        return resp.content
+        """Download a PDF (or revalidate the cached copy) and return its bytes."""
+        return await self._downloader.get_bytes(url)
 
     def filter_exam_pdfs(
         self,
@@ -189,26 +318,21 @@ class ExamCrawlerService:
         """Classify a PDF by its URL, link text, and surrounding page context."""
         combined = f"{context_text or link_text} {url}"
 
+        # One scan: first hit of each pattern
+        hits: dict[str, re.Match] = {}
+        for match in CLASSIFY_RE.finditer(combined):
+            hits.setdefault(match.lastgroup, match)
+
         # Detect year
-        year_match = YEAR_RE.search(combined)
-        year = int(year_match.group(1)) if year_match else 0
+        year = int(hits["year"].group("year")) if "year" in hits else 0
 
-        # Detect type
+        # Detect type. "assessment paper" or "exam" anywhere makes it an exam.
         pdf_type = "exam"  # default
-        for ptype, pattern in PDF_TYPE_PATTERNS.items():
-            if pattern.search(combined):
-                pdf_type = ptype
-                break
-        # If link text or context contains "assessment paper" or "exam", it's an exam
-        if re.search(r"\b(assessment paper|exam)\b", combined, re.IGNORECASE):
-            pdf_type = "exam"
-
-        # Detect language
-        language = "unknown"
-        for lang, pattern in LANGUAGE_PATTERNS.items():
-            if pattern.search(combined):
-                language = lang
-                break
+        if "exam" not in hits:
+            pdf_type = next((t for t in PDF_TYPE_PATTERNS if f"type_{t}" in hits), "exam")
+
+        # Detect language (first in LANGUAGE_PATTERNS order wins)
+        language = next((lang for lang in LANGUAGE_PATTERNS if f"lang_{lang}" in hits), "unknown")
         # Check URL for Maori filename pattern (e.g. 91262-mex-2024.pdf)
         if language == "unknown" and MAORI_URL_RE.search(url):
             language = "te_reo_maori"
@@ -217,14 +341,13 @@ class ExamCrawlerService:
         if language == "unknown" and pdf_type in ("exam", "schedule"):
             language = "english"
 
-        # Detect event/week
+        # Detect event/week (both patterns end in the digit)
         event = ""
-        event_match = EVENT_RE.search(combined)
-        week_match = WEEK_RE.search(combined)
-        if event_match:
-            event = f"event-{event_match.group(1)}"
-        if week_match:
-            event = f"{event}-week-{week_match.group(1)}" if event else f"week-{week_match.group(1)}"
+        if "event" in hits:
+            event = f"event-{hits['event'].group('event')[-1]}"
+        if "week" in hits:
+            week = hits["week"].group("week")[-1]
+            event = f"{event}-week-{week}" if event else f"week-{week}"
 
         # Detect exam code from URL (e.g. "91946-exm-2025.pdf" → "91946")
         exam_code = ""
@@ -241,9 +364,7 @@ class ExamCrawlerService:
         # Use context for title when link text is generic like "PDF (2.3 MB)" or "(796KB)"
         title = link_text
         if (link_text.startswith("PDF") or link_text.startswith("(")) and context_text and len(context_text) > len(link_text):
-            clean = re.sub(r"PDF\s*\([^)]*\)", "", context_text).strip()
-            clean = re.sub(r"\([^)]*KB\)|\([^)]*MB\)", "", clean).strip()
-            clean = re.sub(r"\s+", " ", clean).strip()
+            clean = " ".join(SIZE_LABEL_RE.sub("", context_text).split())
             if clean:
                 title = clean[:100]
         # Still generic? Use exam code + year
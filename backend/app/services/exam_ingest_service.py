@@ -0,0 +1,155 @@
+"""Bulk ingestion of parsed exam papers.
+
+Used by the upload and crawl endpoints. A batch of papers is written with
+a fixed number of statements, however many questions it has:
+
+1. one multi-row ``INSERT ... RETURNING`` for the exam_papers rows
+2. one for all their practice_questions rows; RETURNING gives back full
+   ORM objects, so nothing is refreshed afterwards
+3. one for the practice_question_images rows
+4. one commit
+
+``sort_by_parameter_order`` keeps RETURNING rows in input order. That is
+how generated ids are matched back to papers and questions. SQLAlchemy
+splits very large batches into pages of ``insertmanyvalues_page_size``
+rows.
+
+``existing_source_urls`` is the crawl's dedup check: one ``IN`` query for
+the whole page of discovered PDFs.
+"""
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass, field
+from typing import Optional
+
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.exam_paper import ExamPaper, PracticeQuestion, PracticeQuestionImage
+from app.services.pdf_parser_service import ParsedExam, ParsedSubQuestion, ScheduleAnswer
+
+logger = logging.getLogger(__name__)
+
+# Bound on the parameters of one IN (...) list.
+_IN_CHUNK = 1000
+
+
+@dataclass
+class PaperToIngest:
+    """A parsed exam plus the metadata of its exam_papers row."""
+
+    parsed: ParsedExam
+    title: str
+    year: int
+    subject: str
+    level: int
+    exam_code: str
+    language: str
+    source_url: Optional[str] = None
+    answers: dict[str, ScheduleAnswer] = field(default_factory=dict)  # PDFParserService.get_answer_map
+
+
+@dataclass
+class IngestedPaper:
+    paper: ExamPaper
+    questions: list[PracticeQuestion]
+
+
+class ExamIngestService:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def existing_source_urls(self, urls: list[str]) -> set[str]:
+        """The subset of ``urls`` already imported as exam papers."""
+        found: set[str] = set()
+        unique = list(dict.fromkeys(urls))
+        for i in range(0, len(unique), _IN_CHUNK):
+            found.update((await self.db.execute(
+                select(ExamPaper.source_url).where(ExamPaper.source_url.in_(unique[i:i + _IN_CHUNK]))
+            )).scalars())
+        return found
+
+    async def ingest(self, papers: list[PaperToIngest]) -> list[IngestedPaper]:
+        """Insert ``papers`` with their questions and images, and commit once."""
+        if not papers:
+            return []
+        try:
+            paper_rows = (await self.db.scalars(
+                insert(ExamPaper).returning(ExamPaper, sort_by_parameter_order=True),
+                [_paper_values(p) for p in papers],
+            )).all()
+
+            question_values: list[dict] = []
+            images: list[Optional[PracticeQuestionImage]] = []
+            owners: list[int] = []
+            for index, (paper, row) in enumerate(zip(papers, paper_rows)):
+                for pq in paper.parsed.questions:
+                    image = PracticeQuestionImage.from_bytes(pq.image_bytes) if pq.image_bytes else None
+                    question_values.append(_question_values(row.id, pq, paper.answers, image))
+                    images.append(image)
+                    owners.append(index)
+
+            question_rows: list[PracticeQuestion] = []
+            if question_values:
+                question_rows = (await self.db.scalars(
+                    insert(PracticeQuestion).returning(PracticeQuestion, sort_by_parameter_order=True),
+                    question_values,
+                )).all()
+
+            image_values = [
+                {"question_id": row.id, "sha256": image.sha256, "size": image.size, "data": image.data}
+                for row, image in zip(question_rows, images) if image is not None
+            ]
+            if image_values:
+                await self.db.execute(insert(PracticeQuestionImage), image_values)
+
+            await self.db.commit()
+        except Exception:
+            await self.db.rollback()
+            raise
+
+        result = [IngestedPaper(paper=row, questions=[]) for row in paper_rows]
+        for owner, question in zip(owners, question_rows):
+            result[owner].questions.append(question)
+        logger.info("Ingested %d papers, %d questions", len(paper_rows), len(question_rows))
+        return result
+
+
+def _paper_values(paper: PaperToIngest) -> dict:
+    return {
+        "title": paper.title,
+        "source_url": paper.source_url,
+        "year": paper.year,
+        "subject": paper.subject,
+        "level": paper.level,
+        "exam_code": paper.exam_code,
+        "paper_type": "exam",
+        "language": paper.language,
+        "total_questions": len(paper.parsed.questions),
+        "raw_text": paper.parsed.raw_text,
+    }
+
+
+def _question_values(
+    paper_id: int,
+    pq: ParsedSubQuestion,
+    answers: dict[str, ScheduleAnswer],
+    image: Optional[PracticeQuestionImage],
+) -> dict:
+    answer = answers.get(f"{pq.question_number}_{pq.sub_question}")
+    return {
+        "exam_paper_id": paper_id,
+        "question_number": pq.question_number,
+        "sub_question": pq.sub_question,
+        "question_text": pq.text,
+        "question_type": answer.question_type if answer else None,
+        "correct_answer": answer.correct_answer if answer else None,
+        "accepted_answers": answer.accepted_answers if answer else None,
+        "answer_explanation": answer.explanation if answer else None,
+        "marks": answer.marks if answer else None,
+        "outcome": answer.outcome if answer else None,
+        "has_image": pq.has_image,
+        "image_sha256": image.sha256 if image is not None else None,
+        "order_index": pq.order_index,
+    }
@@ -10,6 +10,7 @@ from sqlalchemy.orm import selectinload
 from app.core.exceptions import NotFoundError, ValidationError
 from app.models.exam_paper import ExamPaper, PracticeQuestion
 from app.models.exam_session import ExamAnswer, ExamSession
+from app.services import question_images
 from app.services.grading_service import GradingService
 
 logger = logging.getLogger(__name__)
@@ -245,7 +246,7 @@ class ExamSessionService:
             else:
                 incorrect += 1
 
-            image_url = f"/api/v1/exams/questions/{q.id}/image" if q.has_image else None
+            image_url = question_images.image_url(q)
 
             answers_out.append(
                 {
@@ -0,0 +1,133 @@
+"""Image normalization ahead of OCR.
+
+Phone photos are 3–12 MB, and the OCR model downsamples them anyway. This
+stage turns an upload into the smallest image that still reads well:
+
+1. Decode with JPEG ``draft`` mode, so the decoder skips resolution that
+   the resize would throw away.
+2. Apply the EXIF orientation.
+3. Downscale so the longest side is at most ``ocr_image_max_side``.
+4. Optionally convert to grayscale and auto-contrast. Ink on paper
+   survives this; shadows and color casts from room lighting do not.
+5. Re-encode as JPEG or WebP, stepping the quality down until the image
+   fits in ``ocr_image_max_bytes``.
+
+Everything is CPU-bound Pillow work. ``normalize_for_ocr_async`` runs it
+in the CPU executor's image thread pool so it does not stall the event loop. On any decode
+error the original bytes are passed through unchanged.
+"""
+from __future__ import annotations
+
+import io
+import logging
+import math
+from dataclasses import dataclass
+from typing import Optional
+
+from PIL import Image, ImageOps
+
+from app.config import get_settings
+from app.core.cpu_executor import cpu_executor
+
+logger = logging.getLogger(__name__)
+
+_MIME_TYPES = {"JPEG": "image/jpeg", "WEBP": "image/webp", "PNG": "image/png", "GIF": "image/gif"}
+
+# Quality ladder tried in order until the encoded image fits the byte budget.
+_QUALITY_STEPS = (85, 75, 65, 55, 45)
+# If even the lowest quality is too big, shrink by this factor and retry.
+_SHRINK_FACTOR = 0.75
+_MIN_SIDE = 640
+
+
+@dataclass(frozen=True)
+class NormalizedImage:
+    data: bytes
+    mime_type: str
+    width: int
+    height: int
+    original_bytes: int
+
+
+def sniff_mime_type(image_bytes: bytes) -> str:
+    """MIME type from magic bytes; defaults to JPEG."""
+    if image_bytes[:8] == b"\x89PNG\r\n\x1a\n":
+        return "image/png"
+    if image_bytes[:4] == b"RIFF" and image_bytes[8:12] == b"WEBP":
+        return "image/webp"
+    if image_bytes[:6] in (b"GIF87a", b"GIF89a"):
+        return "image/gif"
+    return "image/jpeg"
+
+
+def _encode(img: Image.Image, fmt: str, quality: int, final: bool = False) -> bytes:
+    """Encode; ``final`` adds the slower entropy optimizations (JPEG only)."""
+    buf = io.BytesIO()
+    if fmt == "WEBP":
+        img.save(buf, format="WEBP", quality=quality, method=4)
+    else:
+        img.save(buf, format="JPEG", quality=quality, optimize=final, progressive=final)
+    return buf.getvalue()
+
+
+def _encode_within(img: Image.Image, fmt: str, max_bytes: int) -> bytes:
+    """Highest quality on the ladder that fits ``max_bytes`` (or the lowest)."""
+    for quality in _QUALITY_STEPS:
+        data = _encode(img, fmt, quality)
+        if len(data) <= max_bytes:
+            break
+    # Optimized Huffman tables only ever shrink the output, so the fast
+    # encodes pick the quality and the expensive encode runs once.
+    return _encode(img, fmt, quality, final=True) if fmt == "JPEG" else data
+
+
+def normalize_for_ocr(
+    image_bytes: bytes,
+    *,
+    max_side: Optional[int] = None,
+    max_bytes: Optional[int] = None,
+    output_format: Optional[str] = None,
+    grayscale: Optional[bool] = None,
+) -> NormalizedImage:
+    """Downscale, normalize and re-encode ``image_bytes`` for OCR (blocking)."""
+    settings = get_settings()
+    max_side = max_side or settings.ocr_image_max_side
+    max_bytes = max_bytes or settings.ocr_image_max_bytes
+    fmt = (output_format or settings.ocr_image_format).upper()
+    grayscale = settings.ocr_image_grayscale if grayscale is None else grayscale
+
+    try:
+        img = Image.open(io.BytesIO(image_bytes))
+        # JPEG only: decode at the smallest 1/2^n scale whose longest side is
+        # still >= max_side.
+        scale = max_side / max(img.size)
+        if scale < 1:
+            img.draft("L" if grayscale else "RGB", (math.ceil(img.width * scale), math.ceil(img.height * scale)))
+        rotated = img.getexif().get(0x0112, 1) > 1
+        img = ImageOps.exif_transpose(img)
+        img = img.convert("L" if grayscale else "RGB")
+        img.thumbnail((max_side, max_side), Image.Resampling.LANCZOS)
+        if grayscale:
+            img = ImageOps.autocontrast(img, cutoff=1)
+
+        while True:
+            data = _encode_within(img, fmt, max_bytes)
+            if len(data) <= max_bytes or max(img.size) <= _MIN_SIDE:
+                break
+            img = img.resize(
+                (max(1, int(img.width * _SHRINK_FACTOR)), max(1, int(img.height * _SHRINK_FACTOR))),
+                Image.Resampling.LANCZOS,
+            )
+    except Exception as e:
+        logger.warning("OCR image normalization failed, sending original: %s", e)
+        return NormalizedImage(image_bytes, sniff_mime_type(image_bytes), 0, 0, len(image_bytes))
+
+    if len(data) >= len(image_bytes) and not rotated:
+        # Already small (e.g. a screenshot): re-encoding would only lose detail.
+        return NormalizedImage(image_bytes, sniff_mime_type(image_bytes), img.width, img.height, len(image_bytes))
+    return NormalizedImage(data, _MIME_TYPES[fmt], img.width, img.height, len(image_bytes))
+
+
+async def normalize_for_ocr_async(image_bytes: bytes, **kwargs) -> NormalizedImage:
+    """``normalize_for_ocr`` in the CPU executor's image pool."""
+    return await cpu_executor.run_image(normalize_for_ocr, image_bytes, **kwargs)
@@ -0,0 +1,288 @@
+"""Perceptual-hash cache in front of OCR.
+
+Students re-upload near-identical photos of the same worksheet. Each
+upload is fingerprinted with a difference hash (dHash) of the EXIF-
+corrected, downscaled grayscale image. Prior OCR results within a small
+Hamming distance are reused, so the upload skips the vision call. Reusing
+the exact same text also lets it hit the Layer 1 (Redis exact-match)
+solve cache downstream.
+
+Index: a BK-tree over the hashes, kept in memory per worker. Entries are
+persisted in Redis:
+- ``ocr_cache:entries`` (hash → JSON)
+- ``ocr_cache:index`` (ZSET by insert time)
+Workers pull entries added by other workers every ``ocr_cache_sync_seconds``.
+The ZSET is trimmed to ``ocr_cache_max_entries``.
+
+Worksheets look alike at thumbnail scale, so the hash is larger than the
+usual 64 bits (``ocr_cache_hash_size``² bits), the distance threshold is
+tight, and the aspect ratio must match as well.
+
+Fail-open: any Redis or imaging error is logged and treated as a miss.
+"""
+from __future__ import annotations
+
+import asyncio
+import io
+import json
+import logging
+import time
+from dataclasses import dataclass
+from typing import Generic, Iterator, Optional, TypeVar
+
+from PIL import Image, ImageOps
+from redis.asyncio import from_url as redis_from_url
+
+from app.config import get_settings
+from app.core.cpu_executor import cpu_executor
+from app.observability.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+_settings = get_settings()
+_redis = redis_from_url(_settings.redis_url, decode_responses=True)
+
+ENTRIES_KEY = "ocr_cache:entries"
+INDEX_KEY = "ocr_cache:index"
+
+# Max relative difference in aspect ratio for two images to be "the same".
+_ASPECT_TOLERANCE = 0.05
+
+OCR_CACHE_LOOKUPS = REGISTRY.counter("ocr_cache_lookups_total", "OCR fingerprint cache lookups", ["result"])
+OCR_CACHE_DISTANCE = REGISTRY.histogram(
+    "ocr_cache_hit_distance_bits", "Hamming distance of OCR cache hits", buckets=(0, 1, 2, 4, 6, 8, 12, 16, 24, 32),
+)
+
+V = TypeVar("V")
+
+
+# ---------------------------------------------------------------------------
+# Fingerprints
+# ---------------------------------------------------------------------------
+
+
+@dataclass(frozen=True)
+class ImageFingerprint:
+    hash: int
+    bits: int
+    aspect: float  # width / height after EXIF rotation
+
+    @property
+    def hex(self) -> str:
+        return format(self.hash, f"0{self.bits // 4}x")
+
+
+def dhash(image: Image.Image, hash_size: int = 16) -> int:
+    """Difference hash: one bit per horizontally adjacent pixel pair."""
+    small = image.convert("L").resize((hash_size + 1, hash_size), Image.Resampling.BILINEAR)
+    pixels = small.tobytes()
+    width = hash_size + 1
+    value = 0
+    for row in range(hash_size):
+        offset = row * width
+        for col in range(hash_size):
+            value = (value << 1) | (pixels[offset + col] < pixels[offset + col + 1])
+    return value
+
+
+def fingerprint(image_bytes: bytes, hash_size: int = 16) -> ImageFingerprint:
+    """Fingerprint of the image as displayed (EXIF orientation applied).
+
+    JPEGs are decoded with ``draft`` at a reduced scale — the hash only needs
+    a tiny thumbnail, and a full 12 MP decode would dominate the cost.
+    """
+    img = Image.open(io.BytesIO(image_bytes))
+    img.draft("L", (hash_size * 8, hash_size * 8))
+    img = ImageOps.exif_transpose(img)
+    width, height = img.size
+    return ImageFingerprint(hash=dhash(img, hash_size), bits=hash_size * hash_size, aspect=width / height)
+
+
+def hamming(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+# ---------------------------------------------------------------------------
+# BK-tree
+# ---------------------------------------------------------------------------
+
+
+class BKTree(Generic[V]):
+    """Burkhard-Keller tree over integer hashes with Hamming distance.
+
+    Radius queries prune by the triangle inequality, so a lookup touches a
+    small fraction of the entries for small radii.
+    """
+
+    __slots__ = ("_root", "_size")
+
+    def __init__(self):
+        # node: [hash, value, {distance: child}]
+        self._root: Optional[list] = None
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add(self, key: int, value: V) -> None:
+        """Insert ``key``; an existing identical key has its value replaced."""
+        if self._root is None:
+            self._root = [key, value, {}]
+            self._size = 1
+            return
+        node = self._root
+        while True:
+            d = hamming(key, node[0])
+            if d == 0:
+                node[1] = value
+                return
+            child = node[2].get(d)
+            if child is None:
+                node[2][d] = [key, value, {}]
+                self._size += 1
+                return
+            node = child
+
+    def search(self, key: int, radius: int) -> list[tuple[int, int, V]]:
+        """All ``(distance, key, value)`` within ``radius``, nearest first."""
+        if self._root is None:
+            return []
+        found = []
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            d = hamming(key, node[0])
+            if d <= radius:
+                found.append((d, node[0], node[1]))
+            lo, hi = d - radius, d + radius
+            for dist, child in node[2].items():
+                if lo <= dist <= hi:
+                    stack.append(child)
+        found.sort(key=lambda item: item[0])
+        return found
+
+    def items(self) -> Iterator[tuple[int, V]]:
+        stack = [self._root] if self._root is not None else []
+        while stack:
+            node = stack.pop()
+            yield node[0], node[1]
+            stack.extend(node[2].values())
+
+
+# ---------------------------------------------------------------------------
+# Cache
+# ---------------------------------------------------------------------------
+
+
+@dataclass(frozen=True)
+class _Entry:
+    text: str
+    aspect: float
+
+
+class OCRFingerprintCache:
+    """In-memory BK-tree of OCR results, synced with Redis."""
+
+    def __init__(self, redis=None):
+        self._redis = redis if redis is not None else _redis
+        self._hash_size = _settings.ocr_cache_hash_size
+        self._max_distance = _settings.ocr_cache_max_distance
+        self._max_entries = _settings.ocr_cache_max_entries
+        self._sync_seconds = _settings.ocr_cache_sync_seconds
+        self._tree: BKTree[_Entry] = BKTree()
+        self._synced_score = 0.0  # ZSET score of the newest entry pulled
+        self._synced_at = float("-inf")
+        self._sync_lock = asyncio.Lock()
+
+    def __len__(self) -> int:
+        return len(self._tree)
+
+    async def fingerprint(self, image_bytes: bytes) -> Optional[ImageFingerprint]:
+        try:
+            return await cpu_executor.run_image(fingerprint, image_bytes, self._hash_size)
+        except Exception as e:
+            logger.warning("Image fingerprint failed, skipping OCR cache: %s", e)
+            return None
+
+    def match(self, fp: ImageFingerprint) -> Optional[tuple[int, str]]:
+        """Nearest cached ``(distance, text)`` for ``fp``, from memory only."""
+        for distance, _, entry in self._tree.search(fp.hash, self._max_distance):
+            if abs(entry.aspect - fp.aspect) <= _ASPECT_TOLERANCE * fp.aspect:
+                return distance, entry.text
+        return None
+
+    async def lookup(self, fp: ImageFingerprint) -> Optional[str]:
+        await self._maybe_sync()
+        hit = self.match(fp)
+        if hit is None:
+            OCR_CACHE_LOOKUPS.inc(result="miss")
+            return None
+        OCR_CACHE_LOOKUPS.inc(result="hit")
+        OCR_CACHE_DISTANCE.observe(hit[0])
+        return hit[1]
+
+    async def store(self, fp: ImageFingerprint, text: str) -> None:
+        if not text.strip():
+            return
+        self._add(fp.hash, _Entry(text=text, aspect=fp.aspect))
+        now = time.time()
+        try:
+            async with self._redis.pipeline(transaction=False) as pipe:
+                pipe.hset(ENTRIES_KEY, fp.hex, json.dumps({"t": text, "a": round(fp.aspect, 4)}))
+                pipe.zadd(INDEX_KEY, {fp.hex: now})
+                await pipe.execute()
+            await self._trim()
+        except Exception as e:
+            logger.warning("OCR cache persist failed: %s", e)
+
+    def _add(self, key: int, entry: _Entry) -> None:
+        if len(self._tree) >= self._max_entries * 5 // 4:
+            # A BK-tree can't delete cheaply; start over and let the next
+            # lookup resync from Redis (which is trimmed to ``max_entries``).
+            self._tree = BKTree()
+            self._synced_score = 0.0
+            self._synced_at = float("-inf")
+        self._tree.add(key, entry)
+
+    async def _trim(self) -> None:
+        overflow = await self._redis.zcard(INDEX_KEY) - self._max_entries
+        if overflow <= 0:
+            return
+        oldest = await self._redis.zrange(INDEX_KEY, 0, overflow - 1)
+        if oldest:
+            async with self._redis.pipeline(transaction=False) as pipe:
+                pipe.zrem(INDEX_KEY, *oldest)
+                pipe.hdel(ENTRIES_KEY, *oldest)
+                await pipe.execute()
+
+    async def _maybe_sync(self) -> None:
+        if time.monotonic() - self._synced_at < self._sync_seconds or self._sync_lock.locked():
+            return
+        async with self._sync_lock:
+            self._synced_at = time.monotonic()
+            try:
+                await self.sync()
+            except Exception as e:
+                logger.warning("OCR cache sync failed: %s", e)
+
+    async def sync(self) -> int:
+        """Pull entries newer than the last sync from Redis; returns how many."""
+        pairs = await self._redis.zrangebyscore(
+            INDEX_KEY, f"({self._synced_score}", "+inf", withscores=True,
+        )
+        if not pairs:
+            return 0
+        keys = [key for key, _ in pairs]
+        values = await self._redis.hmget(ENTRIES_KEY, keys)
+        added = 0
+        for key, raw in zip(keys, values):
+            if raw is None:
+                continue
+            data = json.loads(raw)
+            self._add(int(key, 16), _Entry(text=data["t"], aspect=float(data["a"])))
+            added += 1
+        self._synced_score = max(score for _, score in pairs)
+        return added
+
+
+ocr_cache = OCRFingerprintCache()
@@ -1,4 +1,6 @@
+import asyncio
 import base64
+import hashlib
 import io
 import logging
 from abc import ABC, abstractmethod
@@ -7,6 +9,9 @@ from typing import Optional
 from PIL import Image, ImageOps
 
 from app.config import get_settings
+from app.core.cpu_executor import cpu_executor
+from app.services.image_preprocess import normalize_for_ocr_async, sniff_mime_type
+from app.services.ocr_cache import ocr_cache
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
@@ -34,6 +39,8 @@ class GeminiVisionOCRProvider(BaseOCRProvider):
         from langchain_core.messages import HumanMessage
         from langchain_google_genai import ChatGoogleGenerativeAI
 
+        from app.observability.usage_ledger import usage_ledger_handler
+
         api_key = settings.google_api_key
         if not api_key:
             raise ValueError("GOOGLE_API_KEY not set")
@@ -42,9 +49,11 @@ class GeminiVisionOCRProvider(BaseOCRProvider):
             model="gemini-2.5-flash-lite",
             google_api_key=api_key,
             temperature=0.0,
+            callbacks=[usage_ledger_handler],
         )
 
         b64_image = base64.b64encode(image_bytes).decode("utf-8")
+        mime_type = sniff_mime_type(image_bytes)
 
         message = HumanMessage(
             content=[
@@ -62,7 +71,7 @@ class GeminiVisionOCRProvider(BaseOCRProvider):
                 },
                 {
                     "type": "image_url",
-                    "image_url": {"url": f"data:image/jpeg;base64,{b64_image}"},
+                    "image_url": {"url": f"data:{mime_type};base64,{b64_image}"},
                 },
             ]
         )
@@ -99,6 +108,22 @@ class MockOCRProvider(BaseOCRProvider):
         return "Find the value of x in the equation $2x + 5 = 15$."
 
 
+class FakeOCRProvider(BaseOCRProvider):
+    """Offline OCR for load tests: simulated latency, text derived from the image.
+
+    Identical images yield identical text, so repeated uploads exercise the
+    solve cache the way real OCR would.
+    """
+
+    async def extract_text(self, image_bytes: bytes) -> str:
+        from app.llm import fake
+
+        await asyncio.sleep(fake.sample_latency(fake.FAKE_OCR_LATENCY))
+        fake.maybe_fail()
+        n = int(hashlib.sha256(image_bytes).hexdigest()[:6], 16) % 1000
+        return f"Find the value of x in the equation $2x + 5 = {n}$."
+
+
 def fix_orientation(image_bytes: bytes) -> bytes:
     """Fix image orientation based on EXIF data.
 
@@ -128,6 +153,7 @@ class OCRService:
     - baidu: Baidu OCR (good for Chinese + handwriting)
     - tesseract: Local Tesseract (free, offline)
     - mock: Mock provider for testing
+    - fake: Mock with simulated latency/failures (load tests)
     """
 
     PROVIDERS = {
@@ -136,6 +162,7 @@ class OCRService:
         "baidu": BaiduOCRProvider,
         "tesseract": TesseractOCRProvider,
         "mock": MockOCRProvider,
+        "fake": FakeOCRProvider,
     }
 
     def __init__(self, provider: Optional[str] = None):
@@ -144,8 +171,35 @@ class OCRService:
         self.provider = provider_class()
 
     async def extract_text(self, image_bytes: bytes) -> str:
-        """Extract text from image (auto-fixes EXIF orientation first)."""
-        image_bytes = fix_orientation(image_bytes)
+        """Extract text from image.
+
+        The image is normalized first (EXIF orientation, downscale, re-encode;
+        see ``image_preprocess``). Near-duplicate images (same perceptual hash within
+        ``ocr_cache_max_distance``) reuse the earlier OCR result.
+        """
+        fp = await ocr_cache.fingerprint(image_bytes) if settings.ocr_cache_enabled else None
+        if fp is not None:
+            cached = await ocr_cache.lookup(fp)
+            if cached is not None:
+                return cached
+
+        text = await self._extract_uncached(await self._prepare(image_bytes))
+        if fp is not None:
+            await ocr_cache.store(fp, text)
+        return text
+
+    @staticmethod
+    async def _prepare(image_bytes: bytes) -> bytes:
+        if not settings.ocr_preprocess_enabled:
+            return await cpu_executor.run_image(fix_orientation, image_bytes)
+        normalized = await normalize_for_ocr_async(image_bytes)
+        logger.debug(
+            "OCR image normalized: %d -> %d bytes (%dx%d)",
+            normalized.original_bytes, len(normalized.data), normalized.width, normalized.height,
+        )
+        return normalized.data
+
+    async def _extract_uncached(self, image_bytes: bytes) -> str:
         try:
             return await self.provider.extract_text(image_bytes)
         except NotImplementedError:
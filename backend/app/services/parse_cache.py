@@ -0,0 +1,149 @@
+"""Content-addressed cache of exam/schedule PDF parse results.
+
+Re-crawls and ``scripts/reprocess_exam_images.py`` keep fetching PDFs that
+haven't changed. Each parse costs PyMuPDF work plus the Gemini split
+calls. Results are cached in Redis under the PDF's SHA-256 and a parser
+version:
+
+- ``pdf_parse:{version}:{sha256}:exam``: ``ParsedExam`` as JSON; each
+  question refers to its crop by key
+- ``pdf_parse:{version}:{sha256}:schedule``: ``ScheduleAnswer`` list as JSON
+- ``pdf_parse:{version}:{sha256}:crops``: hash of crop key → image bytes
+
+Invalidation is by version, never by deleting old entries (they expire
+after ``pdf_parse_cache_ttl_days``). A version is derived from:
+- ``PARSER_VERSION`` (below) and ``pdf_extract.CROP_VERSION``, bumped by
+  hand when parsing or cropping logic changes;
+- a hash of the prompts and crop settings, so editing a prompt or
+  switching ``PDF_CROP_FORMAT`` invalidates without a bump.
+
+``invalidate()`` (``DELETE /admin/cache/pdf-parse``) drops entries
+explicitly, for one PDF or all of them.
+Fail-open: Redis errors are logged and treated as misses.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+from typing import Optional
+
+from redis.asyncio import from_url as redis_from_url
+
+from app.config import get_settings
+from app.observability.metrics import REGISTRY
+from app.services import pdf_extract
+
+logger = logging.getLogger(__name__)
+
+_settings = get_settings()
+
+# Bump when parse/merge logic changes in a way the prompt hash can't see.
+PARSER_VERSION = 1
+
+KEY_PREFIX = "pdf_parse"
+
+PDF_PARSE_CACHE_LOOKUPS = REGISTRY.counter(
+    "pdf_parse_cache_lookups_total", "PDF parse cache lookups", ["kind", "result"],
+)
+
+
+def content_hash(file_bytes: bytes) -> str:
+    return hashlib.sha256(file_bytes).hexdigest()
+
+
+def _fingerprint(*parts: object) -> str:
+    return hashlib.sha256("\x00".join(str(p) for p in parts).encode()).hexdigest()[:12]
+
+
+class PDFParseCache:
+    def __init__(self, redis=None):
+        self._redis = redis if redis is not None else redis_from_url(_settings.redis_url)
+
+    @property
+    def enabled(self) -> bool:
+        return _settings.pdf_parse_cache_enabled
+
+    # -- Versions ------------------------------------------------------------
+
+    @staticmethod
+    def crop_version() -> str:
+        return "c" + _fingerprint(
+            pdf_extract.CROP_VERSION, pdf_extract.IMAGE_DPI,
+            _settings.pdf_crop_format, _settings.pdf_crop_webp_quality,
+        )
+
+    @staticmethod
+    def parse_version(system_prompt: str) -> str:
+        return "p" + _fingerprint(PARSER_VERSION, system_prompt)
+
+    def _key(self, version: str, sha256: str, kind: str) -> str:
+        return f"{KEY_PREFIX}:{version}:{sha256}:{kind}"
+
+    # -- Crops ---------------------------------------------------------------
+
+    async def get_crops(self, sha256: str) -> Optional[dict[str, bytes]]:
+        if not self.enabled:
+            return None
+        try:
+            raw = await self._redis.hgetall(self._key(self.crop_version(), sha256, "crops"))
+        except Exception as e:
+            logger.warning("PDF parse cache read failed: %s", e)
+            return None
+        PDF_PARSE_CACHE_LOOKUPS.inc(kind="crops", result="hit" if raw else "miss")
+        if not raw:
+            return None
+        return {k.decode(): v for k, v in raw.items() if k != b""}
+
+    async def put_crops(self, sha256: str, images: dict[str, bytes]) -> None:
+        if not self.enabled:
+            return
+        key = self._key(self.crop_version(), sha256, "crops")
+        # An empty field marks "no crops" so an image-less PDF still hits.
+        mapping = dict(images) or {"": b""}
+        try:
+            async with self._redis.pipeline(transaction=True) as pipe:
+                pipe.delete(key)
+                pipe.hset(key, mapping=mapping)
+                pipe.expire(key, self._ttl())
+                await pipe.execute()
+        except Exception as e:
+            logger.warning("PDF parse cache write failed: %s", e)
+
+    # -- JSON entries (exam structure, schedule answers) ---------------------
+
+    async def get_json(self, kind: str, version: str, sha256: str) -> Optional[object]:
+        if not self.enabled:
+            return None
+        try:
+            raw = await self._redis.get(self._key(version, sha256, kind))
+        except Exception as e:
+            logger.warning("PDF parse cache read failed: %s", e)
+            return None
+        PDF_PARSE_CACHE_LOOKUPS.inc(kind=kind, result="hit" if raw else "miss")
+        return json.loads(raw) if raw else None
+
+    async def put_json(self, kind: str, version: str, sha256: str, value: object) -> None:
+        if not self.enabled:
+            return
+        try:
+            await self._redis.set(self._key(version, sha256, kind), json.dumps(value), ex=self._ttl())
+        except Exception as e:
+            logger.warning("PDF parse cache write failed: %s", e)
+
+    # -- Invalidation ----------------------------------------------------------
+
+    async def invalidate(self, sha256: Optional[str] = None) -> int:
+        """Delete cached results for one PDF (all versions), or everything."""
+        pattern = f"{KEY_PREFIX}:*:{sha256}:*" if sha256 else f"{KEY_PREFIX}:*"
+        deleted = 0
+        async for key in self._redis.scan_iter(match=pattern, count=500):
+            deleted += await self._redis.delete(key)
+        return deleted
+
+    @staticmethod
+    def _ttl() -> int:
+        return int(_settings.pdf_parse_cache_ttl_days * 86400)
+
+
+parse_cache = PDFParseCache()
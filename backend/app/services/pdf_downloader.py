@@ -0,0 +1,323 @@
+"""Pooled, resumable, conditional downloads for the exam crawler.
+
+One shared ``httpx.AsyncClient`` (keep-alive pool of
+``crawler_max_connections``) serves every crawl and script, with at most
+``crawler_per_host_concurrency`` requests in flight per host.
+
+PDFs are streamed to ``crawler_cache_dir``, never held whole in memory
+during the download. Writes (batched to ``_WRITE_BATCH``), renames and
+metadata updates run in worker threads, off the event loop. Each URL gets
+three files, named by the URL's hash:
+
+- ``{key}.pdf``: the last complete download
+- ``{key}.part``: an interrupted download, resumed with ``Range`` +
+  ``If-Range`` on the next attempt
+- ``{key}.json``: metadata (url, ETag, Last-Modified, size)
+
+A ``.part`` that already holds the whole body (its size is at or past
+the length the server announced, or the server answers the ``Range``
+with 416) is thrown away with its metadata and fetched again in full.
+
+A cached URL is revalidated with ``If-None-Match`` / ``If-Modified-Since``.
+A 304 costs one round trip and no body. Timeouts, connection errors, 429
+and 5xx are retried ``crawler_retries`` times with exponential backoff
+and jitter (or ``Retry-After``). A retry after a broken stream picks up
+from the ``.part`` file.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import random
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import BinaryIO, Optional
+from weakref import WeakValueDictionary
+
+import httpx
+
+from app.config import get_settings
+from app.observability.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+_RETRY_STATUSES = {429, 500, 502, 503, 504}
+_MAX_RETRY_AFTER = 30.0
+_WRITE_BATCH = 256 * 1024  # bytes buffered per worker-thread write
+
+CRAWLER_DOWNLOADS = REGISTRY.counter(
+    "crawler_downloads_total", "Exam PDF downloads", ["result"],  # fetched | resumed | not_modified | failed
+)
+CRAWLER_DOWNLOAD_BYTES = REGISTRY.counter("crawler_download_bytes_total", "Exam PDF bytes received")
+
+
+@dataclass
+class DownloadMeta:
+    url: str
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    size: int = 0  # expected total while incomplete (0 if unknown)
+    complete: bool = False
+
+
+@dataclass(frozen=True)
+class DownloadedPDF:
+    url: str
+    path: Path
+    size: int
+    not_modified: bool  # served from the cache after a 304
+
+
+class _RetryableStatus(Exception):
+    def __init__(self, response: httpx.Response):
+        super().__init__(f"HTTP {response.status_code}")
+        self.retry_after = _retry_after(response)
+
+
+def _retry_after(response: httpx.Response) -> Optional[float]:
+    try:
+        return min(float(response.headers["retry-after"]), _MAX_RETRY_AFTER)
+    except (KeyError, ValueError):
+        return None
+
+
+class PDFDownloader:
+    def __init__(
+        self,
+        cache_dir: Optional[str] = None,
+        *,
+        max_connections: Optional[int] = None,
+        per_host: Optional[int] = None,
+        retries: Optional[int] = None,
+        backoff: Optional[float] = None,
+        timeout: Optional[float] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.cache_dir = Path(cache_dir or settings.crawler_cache_dir)
+        self._max_connections = max_connections or settings.crawler_max_connections
+        self._per_host = per_host or settings.crawler_per_host_concurrency
+        self._retries = settings.crawler_retries if retries is None else retries
+        self._backoff = settings.crawler_backoff_seconds if backoff is None else backoff
+        self._timeout = timeout or settings.crawler_timeout_seconds
+        self._transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+        self._hosts: dict[str, asyncio.Semaphore] = {}
+        # One download per cache key at a time; they share the .part file
+        self._url_locks: WeakValueDictionary[str, asyncio.Lock] = WeakValueDictionary()
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                timeout=self._timeout,
+                follow_redirects=True,
+                limits=httpx.Limits(
+                    max_connections=self._max_connections,
+                    max_keepalive_connections=self._max_connections,
+                ),
+                transport=self._transport,
+            )
+        return self._client
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    # -- Public API ----------------------------------------------------------
+
+    async def get_text(self, url: str) -> str:
+        """GET a page (not cached), with the host limit and retries."""
+        async def attempt() -> str:
+            resp = await self.client.get(url)
+            if resp.status_code in _RETRY_STATUSES:
+                raise _RetryableStatus(resp)
+            resp.raise_for_status()
+            return resp.text
+
+        async with self._host_slot(url):
+            return await self._retrying(url, attempt)
+
+    async def fetch(self, url: str) -> DownloadedPDF:
+        """Download ``url`` into the cache (or revalidate it); returns its path.
+
+        Concurrent fetches of one URL run one after another: the later ones
+        revalidate what the first downloaded.
+        """
+        async with self._url_lock(url), self._host_slot(url):
+            try:
+                return await self._retrying(url, lambda: self._fetch_once(url))
+            except Exception:
+                CRAWLER_DOWNLOADS.inc(result="failed")
+                raise
+
+    async def get_bytes(self, url: str) -> bytes:
+        """``fetch`` then read the cached file."""
+        downloaded = await self.fetch(url)
+        return await asyncio.to_thread(downloaded.path.read_bytes)
+
+    # -- Internals -------------------------------------------------------------
+
+    def _host_slot(self, url: str) -> asyncio.Semaphore:
+        host = httpx.URL(url).host
+        if host not in self._hosts:
+            self._hosts[host] = asyncio.Semaphore(self._per_host)
+        return self._hosts[host]
+
+    def _url_lock(self, url: str) -> asyncio.Lock:
+        key = _cache_key(url)
+        lock = self._url_locks.get(key)
+        if lock is None:
+            lock = self._url_locks[key] = asyncio.Lock()
+        return lock
+
+    def _paths(self, url: str) -> tuple[Path, Path, Path]:
+        key = _cache_key(url)
+        return (self.cache_dir / f"{key}.pdf", self.cache_dir / f"{key}.part", self.cache_dir / f"{key}.json")
+
+    async def _retrying(self, url: str, attempt):
+        for number in range(self._retries + 1):
+            try:
+                return await attempt()
+            except (httpx.TransportError, _RetryableStatus) as e:
+                if number == self._retries:
+                    raise
+                delay = getattr(e, "retry_after", None)
+                if delay is None:
+                    delay = self._backoff * 2 ** number + random.uniform(0, self._backoff)
+                logger.warning("GET %s failed (%s); retry %d in %.1fs", url, e, number + 1, delay)
+                await asyncio.sleep(delay)
+
+    async def _fetch_once(self, url: str) -> DownloadedPDF:
+        # Disk I/O runs in worker threads, off the event loop.
+        pdf_path, part_path, meta_path = self._paths(url)
+        meta, headers, offset = await asyncio.to_thread(_plan_request, url, pdf_path, part_path, meta_path)
+
+        async with self.client.stream("GET", url, headers=headers) as resp:
+            if resp.status_code == 304:  # only ever sent for a complete cached copy
+                CRAWLER_DOWNLOADS.inc(result="not_modified")
+                return DownloadedPDF(url=url, path=pdf_path, size=meta.size, not_modified=True)
+            if resp.status_code == 416 and offset:
+                # The .part already covers the whole body (or more); start over.
+                await resp.aclose()
+                logger.warning("Range bytes=%d- of %s not satisfiable; refetching in full", offset, url)
+                await asyncio.to_thread(_discard_partial, part_path, meta_path)
+                return await self._fetch_once(url)
+            if resp.status_code in _RETRY_STATUSES:
+                raise _RetryableStatus(resp)
+            resp.raise_for_status()
+
+            resumed = resp.status_code == 206
+            if resumed and not resp.headers.get("content-range", "").startswith(f"bytes {offset}-"):
+                await asyncio.to_thread(part_path.unlink, missing_ok=True)
+                raise httpx.RemoteProtocolError(f"unexpected Content-Range for {url}; restarting")
+            if not resumed:
+                offset = 0
+            # Validators (and the expected size) are saved first so a broken
+            # stream can resume.
+            meta = DownloadMeta(
+                url=url,
+                etag=resp.headers.get("etag"),
+                last_modified=resp.headers.get("last-modified"),
+                size=_expected_size(resp),
+            )
+            await asyncio.to_thread(self.cache_dir.mkdir, parents=True, exist_ok=True)
+            await asyncio.to_thread(_write_meta, meta_path, meta)
+            out = await asyncio.to_thread(open, part_path, "ab" if resumed else "wb")
+            buffer = bytearray()
+            try:
+                # Unchunked: whatever arrived before a broken stream is kept.
+                async for chunk in resp.aiter_bytes():
+                    buffer += chunk
+                    CRAWLER_DOWNLOAD_BYTES.inc(len(chunk))
+                    if len(buffer) >= _WRITE_BATCH:
+                        await asyncio.to_thread(out.write, bytes(buffer))
+                        buffer.clear()
+            finally:
+                await asyncio.to_thread(_write_and_close, out, bytes(buffer))
+
+        await asyncio.to_thread(_complete, part_path, pdf_path, meta_path, meta)
+        CRAWLER_DOWNLOADS.inc(result="resumed" if resumed else "fetched")
+        logger.info("Downloaded %s (%d bytes%s)", url, meta.size, f", resumed at {offset}" if resumed else "")
+        return DownloadedPDF(url=url, path=pdf_path, size=meta.size, not_modified=False)
+
+
+def _cache_key(url: str) -> str:
+    return hashlib.sha256(url.encode()).hexdigest()[:32]
+
+
+def _plan_request(
+    url: str, pdf_path: Path, part_path: Path, meta_path: Path,
+) -> tuple[DownloadMeta, dict[str, str], int]:
+    """Cached metadata, request headers and resume offset for ``url``."""
+    meta = _read_meta(meta_path) or DownloadMeta(url=url)
+    validator = meta.etag or meta.last_modified
+    headers: dict[str, str] = {}
+    offset = 0
+    if meta.complete and pdf_path.exists():
+        if meta.etag:
+            headers["If-None-Match"] = meta.etag
+        if meta.last_modified:
+            headers["If-Modified-Since"] = meta.last_modified
+    elif validator and part_path.exists() and part_path.stat().st_size:
+        offset = part_path.stat().st_size
+        if meta.size and offset >= meta.size:
+            # Nothing left to ask for; a Range here would only get a 416.
+            _discard_partial(part_path, meta_path)
+            offset = 0
+        else:
+            headers["Range"] = f"bytes={offset}-"
+            headers["If-Range"] = validator
+    return meta, headers, offset
+
+
+def _write_and_close(out: BinaryIO, data: bytes) -> None:
+    try:
+        out.write(data)
+    finally:
+        out.close()
+
+
+def _complete(part_path: Path, pdf_path: Path, meta_path: Path, meta: DownloadMeta) -> None:
+    os.replace(part_path, pdf_path)
+    meta.size = pdf_path.stat().st_size
+    meta.complete = True
+    _write_meta(meta_path, meta)
+
+
+def _expected_size(response: httpx.Response) -> int:
+    """Full body length from ``Content-Range`` (206) or ``Content-Length``, else 0."""
+    try:
+        if response.status_code == 206:
+            return int(response.headers["content-range"].rsplit("/", 1)[1])
+        if "content-encoding" not in response.headers:
+            return int(response.headers["content-length"])
+    except (KeyError, IndexError, ValueError):
+        pass
+    return 0
+
+
+def _discard_partial(part_path: Path, meta_path: Path) -> None:
+    part_path.unlink(missing_ok=True)
+    meta_path.unlink(missing_ok=True)
+
+
+def _read_meta(path: Path) -> Optional[DownloadMeta]:
+    try:
+        return DownloadMeta(**json.loads(path.read_text()))
+    except (FileNotFoundError, ValueError, TypeError):
+        return None
+
+
+def _write_meta(path: Path, meta: DownloadMeta) -> None:
+    tmp = path.with_suffix(".json.tmp")
+    tmp.write_text(json.dumps(asdict(meta)))
+    os.replace(tmp, path)
+
+
+pdf_downloader = PDFDownloader()
@@ -0,0 +1,485 @@
+"""PyMuPDF extraction for exam PDFs: text, title, embedded images and
+per-question crops.
+
+These are plain module-level functions on ``bytes``, so they can run in
+the CPU executor's process pool (``app.core.cpu_executor``). A worker
+process imports this module and fitz only, never the LLM stack.
+``PDFParserService`` calls them through the executor and does the AI
+question splitting itself.
+
+The document is read in a single pass. ``analyze_pages`` builds one
+``TextPage`` per page and takes from it both the line geometry (the
+``"dict"`` output, reduced to ``TextLine``s) and the plain text. It also
+records the page's image xrefs. The title, full-text, marker and image
+extractors all work from that list of ``PageInfo``. Only rendering
+(crops, embedded-image decoding) goes back to the document.
+
+Question crops are planned, not rendered, during analysis.
+``plan_question_crops`` turns the markers into ``CropJob``s (key, page,
+clip). ``render_crops`` renders a batch of them from one open document,
+so ``app.services.pdf_raster`` can spread the batches over the process
+pool. ``extract_question_images`` still does both in one process.
+"""
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass, field
+from typing import Optional
+
+import fitz  # PyMuPDF
+
+
+@dataclass
+class ExamExtraction:
+    """Everything ``PDFParserService.parse_exam_pdf`` needs from the PDF."""
+
+    title: str
+    raw_text: str
+    page_images: dict[int, list[bytes]] = field(default_factory=dict)
+    question_images: dict[str, bytes] = field(default_factory=dict)
+    crop_jobs: list[CropJob] = field(default_factory=list)  # set when crops are left to the caller
+
+
+@dataclass(frozen=True, slots=True)
+class CropJob:
+    key: str                                  # "Q1_a", "Q1_passage_0"
+    page: int
+    clip: tuple[float, float, float, float]   # x0, y0, x1, y1 in PDF points
+
+
+@dataclass(slots=True)
+class TextLine:
+    y: float      # top of the line's bbox
+    text: str     # spans joined and stripped
+    size: float   # font size of the first span
+
+
+@dataclass(slots=True)
+class PageInfo:
+    """What the extractors need from one page, read once."""
+
+    index: int
+    width: float
+    height: float
+    text: str
+    lines: list[TextLine] = field(default_factory=list)
+    image_xrefs: list[int] = field(default_factory=list)
+
+
+def analyze_pages(doc: fitz.Document, with_lines: bool = True) -> list[PageInfo]:
+    """One pass over ``doc``: text, line geometry and image xrefs per page.
+
+    The TextPage is built without ``TEXT_PRESERVE_IMAGES``, so the
+    ``"dict"`` output carries no decoded image blocks. Nothing here used
+    them, and they were most of its memory.
+    """
+    pages: list[PageInfo] = []
+    for page in doc:
+        textpage = page.get_textpage(flags=fitz.TEXTFLAGS_TEXT)
+        lines: list[TextLine] = []
+        if with_lines:
+            for block in page.get_text("dict", textpage=textpage)["blocks"]:
+                if block.get("type") != 0:
+                    continue
+                for line in block["lines"]:
+                    spans = line["spans"]
+                    lines.append(TextLine(
+                        y=line["bbox"][1],
+                        text="".join(s["text"] for s in spans).strip(),
+                        size=spans[0]["size"] if spans else 0.0,
+                    ))
+        pages.append(PageInfo(
+            index=page.number,
+            width=page.rect.width,
+            height=page.rect.height,
+            text=page.get_text("text", textpage=textpage),
+            lines=lines,
+            image_xrefs=[img[0] for img in page.get_images(full=True)] if with_lines else [],
+        ))
+    return pages
+
+
+def extract_exam(file_bytes: bytes, with_crops: bool = True) -> ExamExtraction:
+    """Title, full text, embedded images and question crops of an exam PDF.
+
+    With ``with_crops=False`` the crops are returned as ``crop_jobs`` for
+    the caller to render (see ``app.services.pdf_raster``).
+    """
+    doc = fitz.open(stream=file_bytes, filetype="pdf")
+    try:
+        pages = analyze_pages(doc)
+        extraction = ExamExtraction(
+            title=extract_title(pages),
+            raw_text=extract_full_text(pages),
+            page_images=extract_all_images(doc, pages),
+        )
+        if with_crops:
+            extraction.question_images = extract_question_images(doc, pages)
+        else:
+            extraction.crop_jobs = plan_question_crops(pages)
+        return extraction
+    finally:
+        doc.close()
+
+
+def plan_crops(file_bytes: bytes) -> list[CropJob]:
+    """Crop jobs of an exam PDF (for re-rendering crops without the rest)."""
+    doc = fitz.open(stream=file_bytes, filetype="pdf")
+    try:
+        return plan_question_crops(analyze_pages(doc))
+    finally:
+        doc.close()
+
+
+def extract_text(file_bytes: bytes) -> str:
+    """Full text of a PDF (marking schedules)."""
+    doc = fitz.open(stream=file_bytes, filetype="pdf")
+    try:
+        return extract_full_text(analyze_pages(doc, with_lines=False))
+    finally:
+        doc.close()
+
+
+def render_first_page_png(pdf_path: str, dpi: int = 150) -> bytes:
+    """First page of the PDF at ``pdf_path`` as PNG (TikZ diagrams)."""
+    doc = fitz.open(pdf_path)
+    try:
+        return doc[0].get_pixmap(dpi=dpi).tobytes("png")
+    finally:
+        doc.close()
+
+
+# ---------------------------------------------------------------------------
+# Per-question image extraction via PDF coordinate positioning
+# ---------------------------------------------------------------------------
+
+# Patterns for locating question boundaries in the PDF
+QUESTION_RE = re.compile(r"QUESTION\s+(ONE|TWO|THREE|FOUR|FIVE)\s*:?\s*(.*)")
+SUB_RE = re.compile(r"^\(([a-f])\)")
+NUMBER_MAP = {
+    "ONE": "1", "TWO": "2", "THREE": "3", "FOUR": "4", "FIVE": "5",
+}
+HEADER_MARGIN = 40   # skip page number at top
+FOOTER_MARGIN = 40   # skip footer at bottom
+SIDE_MARGIN = 30     # left/right trim
+IMAGE_DPI = 150      # resolution for cropped images
+WEBP_QUALITY = 80
+CROP_VERSION = 1     # bump when crop planning changes; invalidates cached crops
+
+
+def extract_question_images(
+    doc: fitz.Document,
+    pages: Optional[list[PageInfo]] = None,
+    image_format: str = "png",
+) -> dict[str, bytes]:
+    """Render every planned crop of an open document, in this process.
+
+    Returns a dict keyed by "Q{n}_{letter}" / "Q{n}_passage_{i}" → image bytes.
+    """
+    if pages is None:
+        pages = analyze_pages(doc)
+    return dict(_render(doc, plan_question_crops(pages), image_format, IMAGE_DPI, WEBP_QUALITY))
+
+
+def render_crops(
+    source: str | bytes,
+    jobs: list[CropJob],
+    image_format: str = "png",
+    dpi: int = IMAGE_DPI,
+    webp_quality: int = WEBP_QUALITY,
+) -> list[tuple[str, bytes]]:
+    """Render a batch of crops; ``source`` is a PDF path or the PDF bytes.
+
+    The document is opened once per batch. A path lets pool workers
+    share one temp file instead of each unpickling the whole PDF.
+    """
+    if isinstance(source, bytes):
+        doc = fitz.open(stream=source, filetype="pdf")
+    else:
+        doc = fitz.open(source)
+    try:
+        return _render(doc, jobs, image_format, dpi, webp_quality)
+    finally:
+        doc.close()
+
+
+def _render(
+    doc: fitz.Document, jobs: list[CropJob], image_format: str, dpi: int, webp_quality: int,
+) -> list[tuple[str, bytes]]:
+    rendered = []
+    for job in jobs:
+        pix = doc[job.page].get_pixmap(clip=fitz.Rect(job.clip), dpi=dpi)
+        if image_format == "webp":
+            # method=2: most of method 4's size saving at about half its encode time.
+            data = pix.pil_tobytes(format="WEBP", quality=webp_quality, method=2)
+        else:
+            data = pix.tobytes("png")
+        rendered.append((job.key, data))
+    return rendered
+
+
+def plan_question_crops(pages: list[PageInfo]) -> list[CropJob]:
+    """Plan a cropped image for each sub-question (and passage page).
+
+    Strategy:
+    - Find all QUESTION headers and (a)/(b)/(c) markers with y-coordinates.
+    - For each sub-question, crop from the *context start* to the next
+      sub-question boundary.
+    - Context start = the QUESTION header (if on the same page) or the
+      previous sub-question's end, plus any preamble text/images above
+      the current (x) marker on the same page.
+    - For sub-questions that share a page with prior ones, include from
+      the *end of the previous sub-question* so shared context (tables,
+      graphs) is preserved.
+
+    Passage jobs come first, then one job per sub-question in document
+    order.
+    """
+    markers = find_markers(pages)
+    if not markers:
+        return []
+
+    # --- Passage/context pages for each question ---
+    # For reading exams, pages between QUESTION header and first sub
+    # contain the reading passage that students need.
+    jobs = _plan_passage_crops(pages, markers)
+
+    # --- Per-sub-question crops ---
+    for i, marker in enumerate(markers):
+        if marker["type"] != "sub":
+            continue
+
+        q_num = marker["question"]
+        sub = marker["label"]
+        page_idx = marker["page"]
+        page_w = pages[page_idx].width
+        page_h = pages[page_idx].height
+
+        # --- Determine y_top: where to start cropping ---
+        y_top = _find_context_top(markers, i, page_idx)
+
+        # --- Determine y_bottom: where to stop cropping ---
+        y_bottom = _find_crop_bottom(markers, i, page_idx, page_h)
+
+        clip = (
+            SIDE_MARGIN,
+            max(0, y_top),
+            page_w - SIDE_MARGIN,
+            min(page_h, y_bottom),
+        )
+        jobs.append(CropJob(key=f"Q{q_num}_{sub}", page=page_idx, clip=clip))
+
+    return jobs
+
+
+def _plan_passage_crops(pages: list[PageInfo], markers: list[dict]) -> list[CropJob]:
+    """Plan full-page passage images for each question.
+
+    For reading/literacy exams, there are passage pages between the
+    QUESTION header and the first sub-question. These need to be shown
+    as context before the sub-questions.
+
+    Produces keys like "Q1_passage_0", "Q1_passage_1", etc.
+    """
+    jobs: list[CropJob] = []
+
+    # Group markers by question number
+    question_headers: dict[str, dict] = {}
+    first_subs: dict[str, dict] = {}
+
+    for m in markers:
+        q = m["question"]
+        if not q:
+            continue
+        if m["type"] == "question" and q not in question_headers:
+            question_headers[q] = m
+        if m["type"] == "sub" and q not in first_subs:
+            first_subs[q] = m
+
+    for q_num, header in question_headers.items():
+        first_sub = first_subs.get(q_num)
+        if not first_sub:
+            continue
+
+        header_page = header["page"]
+        sub_page = first_sub["page"]
+
+        # Only extract if there are passage pages between header and first sub
+        if sub_page <= header_page:
+            continue
+
+        # One job per passage page (from header page to the page before first sub)
+        for page_offset, page_idx in enumerate(range(header_page, sub_page)):
+            page = pages[page_idx]
+            clip = (
+                SIDE_MARGIN,
+                HEADER_MARGIN,
+                page.width - SIDE_MARGIN,
+                page.height - FOOTER_MARGIN,
+            )
+            jobs.append(CropJob(key=f"Q{q_num}_passage_{page_offset}", page=page_idx, clip=clip))
+
+    return jobs
+
+
+def find_markers(pages: list[PageInfo]) -> list[dict]:
+    """Scan every page for QUESTION headers and (a)-(f) sub-question markers.
+
+    Returns a sorted list of marker dicts:
+      {"page": int, "y": float, "type": "question"|"sub",
+       "question": str, "label": str, "title": str}
+    """
+    markers: list[dict] = []
+    current_question = ""
+    current_title = ""
+
+    for page in pages:
+        for line in page.lines:
+            qm = QUESTION_RE.match(line.text)
+            if qm:
+                current_question = NUMBER_MAP.get(
+                    qm.group(1), qm.group(1)
+                )
+                current_title = qm.group(2).strip()
+                markers.append({
+                    "page": page.index, "y": line.y, "type": "question",
+                    "question": current_question,
+                    "label": current_question,
+                    "title": current_title,
+                })
+
+            sm = SUB_RE.match(line.text)
+            if sm:
+                markers.append({
+                    "page": page.index, "y": line.y, "type": "sub",
+                    "question": current_question,
+                    "label": sm.group(1),
+                    "title": "",
+                })
+
+    markers.sort(key=lambda m: (m["page"], m["y"]))
+    return markers
+
+
+def _find_context_top(markers: list[dict], current_idx: int, page_idx: int) -> float:
+    """Find the y-coordinate where cropping should start for a sub-question.
+
+    Rules:
+    1. For the first sub-question (a) of a question: include from the
+       QUESTION header (if on same page) or page top, so shared context
+       like passages/tables/graphs is captured.
+    2. For subsequent subs (b), (c), etc.: start from just above the
+       current sub's own marker — each sub only shows its own content.
+    """
+    marker = markers[current_idx]
+
+    # Check if this is the first sub of its question on this page
+    is_first_sub = True
+    question_header_y = None
+
+    for j in range(current_idx - 1, -1, -1):
+        prev = markers[j]
+        if prev["page"] != page_idx:
+            break
+        if prev["type"] == "question":
+            question_header_y = prev["y"]
+            break
+        if prev["type"] == "sub" and prev["question"] == marker["question"]:
+            is_first_sub = False
+            break
+
+    if is_first_sub:
+        # First sub: include QUESTION header or page top for shared context
+        if question_header_y is not None:
+            return question_header_y - 5
+        return HEADER_MARGIN
+
+    # Subsequent subs: start from just above their own (x) marker
+    return marker["y"] - 10
+
+
+def _find_crop_bottom(
+    markers: list[dict], current_idx: int, page_idx: int, page_height: float,
+) -> float:
+    """Find the y-coordinate where cropping should end."""
+    for j in range(current_idx + 1, len(markers)):
+        nxt = markers[j]
+        if nxt["page"] == page_idx:
+            return nxt["y"] - 5
+        if nxt["page"] > page_idx:
+            break
+    return page_height - FOOTER_MARGIN
+
+
+# ---------------------------------------------------------------------------
+# PyMuPDF text/image extraction
+# ---------------------------------------------------------------------------
+
+def extract_title(pages: list[PageInfo]) -> str:
+    """Extract exam title from the first page."""
+    if not pages:
+        return "Unknown Exam"
+
+    lines = pages[0].lines
+    for line in lines:
+        if "Numeracy" in line.text and any(str(y) in line.text for y in range(2020, 2030)):
+            return line.text
+
+    # Fallback: look for any large bold text
+    for line in lines:
+        if line.size >= 14 and len(line.text) > 5:
+            return line.text
+
+    return "Exam Paper"
+
+
+# Patterns to strip from extracted text (watermarks, repeated noise)
+NOISE_PATTERNS = [
+    re.compile(r"(?:DO NOT WRITE IN(?:\s+THIS)?(?:\s+AREA)?[^\n]*\n?)+", re.IGNORECASE),
+    re.compile(r"(?:SUPERVISOR'?S?\s+USE\s+ONLY[^\n]*\n?)+", re.IGNORECASE),
+]
+
+
+def extract_full_text(pages: list[PageInfo]) -> str:
+    """Extract all text from the PDF, filtering out watermarks and noise."""
+    parts = []
+    for page in pages:
+        text = page.text.strip()
+        if text:
+            # Remove watermark/noise patterns
+            for pattern in NOISE_PATTERNS:
+                text = pattern.sub("", text)
+            # Collapse multiple blank lines
+            text = re.sub(r"\n{3,}", "\n\n", text).strip()
+            if text:
+                parts.append(f"--- Page {page.index + 1} ---\n{text}")
+    return "\n\n".join(parts)
+
+
+def extract_all_images(doc: fitz.Document, pages: list[PageInfo]) -> dict[int, list[bytes]]:
+    """Extract images from all pages as PNG bytes.
+
+    An image reused across pages (logos, shared diagrams) is decoded once.
+    """
+    decoded: dict[int, Optional[bytes]] = {}
+    page_images: dict[int, list[bytes]] = {}
+    for page in pages:
+        images = []
+        for xref in page.image_xrefs:
+            if xref not in decoded:
+                decoded[xref] = _image_png(doc, xref)
+            if decoded[xref] is not None:
+                images.append(decoded[xref])
+        if images:
+            page_images[page.index] = images
+    return page_images
+
+
+def _image_png(doc: fitz.Document, xref: int) -> Optional[bytes]:
+    try:
+        pix = fitz.Pixmap(doc, xref)
+        if pix.n > 4:
+            pix = fitz.Pixmap(fitz.csRGB, pix)
+        return pix.tobytes("png")
+    except Exception:
+        return None
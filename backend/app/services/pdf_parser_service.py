@@ -1,17 +1,31 @@
-"""PDF parsing service: PyMuPDF for text/image extraction, AI for question splitting."""
-
+"""PDF parsing service: PyMuPDF for text/image extraction, AI for question splitting.
+
+Long papers are split for the LLM. ``split_question_chunks`` cuts the
+extracted text at its ``QUESTION ONE``..``FIVE`` headings (preamble goes
+with the first chunk). The chunks are parsed concurrently, at most
+``PDF_PARSE_CONCURRENCY`` at a time, each call returning its own small
+JSON array. ``merge_chunk_items`` orders the results by question number,
+then by document order, and drops duplicate (question, sub) pairs.
+Text without headings is sent in one call, as before.
+"""
+
+import asyncio
 import json
 import logging
 import re
-from dataclasses import dataclass, field
+from dataclasses import asdict, dataclass, field
 
-import fitz  # PyMuPDF
 from langchain_core.messages import HumanMessage, SystemMessage
 from langsmith import traceable
 
+from app.config import get_settings
+from app.core.cpu_executor import cpu_executor
 from app.llm.registry import get_llm
+from app.services import pdf_extract, pdf_raster
+from app.services.parse_cache import content_hash, parse_cache
 
 logger = logging.getLogger(__name__)
+settings = get_settings()
 
 
 # ---------------------------------------------------------------------------
@@ -27,6 +41,7 @@ class ParsedSubQuestion:
     has_image: bool = False
     image_bytes: bytes | None = None
     order_index: int = 0
+    image_key: str | None = None  # crop key ("Q1_a", "Q1_passage_0") of image_bytes
 
 
 @dataclass
@@ -36,6 +51,12 @@ class ParsedExam:
     questions: list[ParsedSubQuestion] = field(default_factory=list)
 
 
+@dataclass
+class TextChunk:
+    question_number: str  # "1".."5"; "" when the text has no headings
+    text: str
+
+
 @dataclass
 class ScheduleAnswer:
     question_number: str
@@ -109,6 +130,81 @@ Return ONLY a JSON array, no markdown:
 ]"""
 
 
+# ---------------------------------------------------------------------------
+# Chunking
+# ---------------------------------------------------------------------------
+
+QUESTION_HEADING_RE = re.compile(
+    r"^[ \t]*QUESTION\s+(ONE|TWO|THREE|FOUR|FIVE)\b", re.MULTILINE | re.IGNORECASE,
+)
+
+
+def split_question_chunks(raw_text: str) -> list[TextChunk]:
+    """Split extracted text at its QUESTION headings.
+
+    A repeated heading for the current question (a "continued" page
+    header) stays inside its chunk. Text before the first heading (title,
+    instructions) is kept with the first chunk.
+    """
+    starts: list[tuple[int, str]] = []
+    for match in QUESTION_HEADING_RE.finditer(raw_text):
+        number = pdf_extract.NUMBER_MAP[match.group(1).upper()]
+        if not starts or starts[-1][1] != number:
+            starts.append((match.start(), number))
+    if len(starts) < 2:
+        return [TextChunk(question_number=starts[0][1] if starts else "", text=raw_text)]
+
+    chunks = []
+    for i, (start, number) in enumerate(starts):
+        begin = 0 if i == 0 else start
+        end = starts[i + 1][0] if i + 1 < len(starts) else len(raw_text)
+        chunks.append(TextChunk(question_number=number, text=raw_text[begin:end].strip()))
+    return chunks
+
+
+def merge_chunk_items(chunks: list[TextChunk], results: list[list[dict]]) -> list[dict]:
+    """Merge per-chunk JSON items by question number, then document order.
+
+    Items without a ``question_number`` take their chunk's. The first of
+    any repeated (question, sub-question) pair wins.
+    """
+    ordered = []
+    for chunk_idx, (chunk, items) in enumerate(zip(chunks, results)):
+        for pos, item in enumerate(items):
+            number = str(item.get("question_number") or chunk.question_number)
+            item["question_number"] = number
+            rank = int(number) if number.isdigit() else int(chunk.question_number or 0)
+            ordered.append((rank, chunk_idx, pos, item))
+    ordered.sort(key=lambda entry: entry[:3])
+
+    merged: list[dict] = []
+    seen: set[tuple[str, str]] = set()
+    for _, _, _, item in ordered:
+        key = (item["question_number"], str(item.get("sub_question", "")).lower())
+        if key in seen:
+            continue
+        seen.add(key)
+        merged.append(item)
+    return merged
+
+
+# ---------------------------------------------------------------------------
+# Parse cache (de)serialization — crop bytes live in the crops hash
+# ---------------------------------------------------------------------------
+
+def _exam_to_cache(parsed: ParsedExam) -> dict:
+    questions = [{k: v for k, v in asdict(q).items() if k != "image_bytes"} for q in parsed.questions]
+    return {"title": parsed.title, "raw_text": parsed.raw_text, "questions": questions}
+
+
+def _exam_from_cache(cached: dict, crops: dict[str, bytes]) -> ParsedExam:
+    questions = []
+    for item in cached["questions"]:
+        image_key = item.get("image_key")
+        questions.append(ParsedSubQuestion(**item, image_bytes=crops.get(image_key) if image_key else None))
+    return ParsedExam(title=cached["title"], raw_text=cached["raw_text"], questions=questions)
+
+
 # ---------------------------------------------------------------------------
 # Service
 # ---------------------------------------------------------------------------
@@ -118,26 +214,57 @@ class PDFParserService:
 
     @traceable(run_type="chain", name="pdf.parse_exam", tags=["pdf", "exam"])
     async def parse_exam_pdf(self, file_bytes: bytes) -> ParsedExam:
-        """Extract text from exam PDF, then use AI to split into questions."""
-        doc = fitz.open(stream=file_bytes, filetype="pdf")
-
-        title = self._extract_title(doc)
-        raw_text = self._extract_full_text(doc)
-        page_images = self._extract_all_images(doc)
+        """Extract text from exam PDF, then use AI to split into questions.
 
-        # Extract per-question cropped images using PDF positioning
-        question_images = self.extract_question_images(doc)
+        Unchanged PDFs are served from the parse cache (app/services/parse_cache.py).
+        """
+        sha256 = content_hash(file_bytes)
+        version = parse_cache.parse_version(EXAM_PARSE_SYSTEM) + parse_cache.crop_version()
+        cached = await parse_cache.get_json("exam", version, sha256)
+        if cached is not None:
+            crops = await parse_cache.get_crops(sha256)
+            if crops is not None:
+                return _exam_from_cache(cached, crops)
+
+        parsed, question_images = await self._parse_exam(file_bytes)
+        await parse_cache.put_crops(sha256, question_images)
+        await parse_cache.put_json("exam", version, sha256, _exam_to_cache(parsed))
+        return parsed
+
+    async def question_images(self, file_bytes: bytes) -> dict[str, bytes]:
+        """Cropped image per sub-question and passage page (cached)."""
+        sha256 = content_hash(file_bytes)
+        cached = await parse_cache.get_crops(sha256)
+        if cached is not None:
+            return cached
+        jobs = await cpu_executor.run_pdf(pdf_extract.plan_crops, file_bytes)
+        images = await pdf_raster.render_question_crops(file_bytes, jobs)
+        await parse_cache.put_crops(sha256, images)
+        return images
 
-        doc.close()
+    async def _parse_exam(self, file_bytes: bytes) -> tuple[ParsedExam, dict[str, bytes]]:
+        # Text, images and the crop plan — PyMuPDF, in the process pool
+        extraction = await cpu_executor.run_pdf(pdf_extract.extract_exam, file_bytes, with_crops=False)
+        title = extraction.title
+        raw_text = extraction.raw_text
+        page_images = extraction.page_images
 
-        # AI splits text into structured questions
-        questions = await self._ai_parse_questions(raw_text, page_images)
+        # Crops render across the pool while the AI splits the text
+        crops = asyncio.ensure_future(
+            pdf_raster.render_question_crops(file_bytes, extraction.crop_jobs)
+        )
+        try:
+            questions = await self._ai_parse_questions(raw_text, page_images)
+            question_images = await crops
+        finally:
+            crops.cancel()
 
         # Attach cropped images to parsed questions
         for q in questions:
             key = f"Q{q.question_number}_{q.sub_question}"
             if key in question_images:
                 q.image_bytes = question_images[key]
+                q.image_key = key
                 q.has_image = True
 
         # Create passage entries (reading context pages) and insert before
@@ -165,6 +292,7 @@ class PDFParserService:
                         question_type="passage",
                         has_image=True,
                         image_bytes=question_images[pk],
+                        image_key=pk,
                         order_index=-1,  # will be re-indexed below
                     ))
 
@@ -184,16 +312,21 @@ class PDFParserService:
                 q.order_index = i
             questions = merged
 
-        return ParsedExam(title=title, raw_text=raw_text, questions=questions)
+        return ParsedExam(title=title, raw_text=raw_text, questions=questions), question_images
 
     @traceable(run_type="chain", name="pdf.parse_schedule", tags=["pdf", "schedule"])
     async def parse_schedule_pdf(self, file_bytes: bytes) -> list[ScheduleAnswer]:
         """Extract text from marking schedule PDF, then use AI to extract answers."""
-        doc = fitz.open(stream=file_bytes, filetype="pdf")
-        raw_text = self._extract_full_text(doc)
-        doc.close()
-
-        return await self._ai_parse_schedule(raw_text)
+        sha256 = content_hash(file_bytes)
+        version = parse_cache.parse_version(SCHEDULE_PARSE_SYSTEM)
+        cached = await parse_cache.get_json("schedule", version, sha256)
+        if cached is not None:
+            return [ScheduleAnswer(**item) for item in cached]
+
+        raw_text = await cpu_executor.run_pdf(pdf_extract.extract_text, file_bytes)
+        answers = await self._ai_parse_schedule(raw_text)
+        await parse_cache.put_json("schedule", version, sha256, [asdict(a) for a in answers])
+        return answers
 
     def get_answer_map(self, answers: list[ScheduleAnswer]) -> dict[str, ScheduleAnswer]:
         """Build a lookup map: '1_a' → ScheduleAnswer."""
@@ -210,15 +343,7 @@ class PDFParserService:
         self, raw_text: str, page_images: dict[int, list[bytes]]
     ) -> list[ParsedSubQuestion]:
         """Use LLM to parse exam text into structured questions."""
-        llm = get_llm(tier="fast", provider="gemini")
-
-        messages = [
-            SystemMessage(content=EXAM_PARSE_SYSTEM),
-            HumanMessage(content=f"Parse this exam paper:\n\n{raw_text}"),
-        ]
-
-        result = await llm.ainvoke(messages)
-        parsed = self._extract_json_array(result.content)
+        parsed = await self._ai_parse_chunks(EXAM_PARSE_SYSTEM, "Parse this exam paper", raw_text)
 
         questions = []
         has_any_image = len(page_images) > 0
@@ -237,15 +362,7 @@ class PDFParserService:
 
     async def _ai_parse_schedule(self, raw_text: str) -> list[ScheduleAnswer]:
         """Use LLM to parse marking schedule into structured answers."""
-        llm = get_llm(tier="fast", provider="gemini")
-
-        messages = [
-            SystemMessage(content=SCHEDULE_PARSE_SYSTEM),
-            HumanMessage(content=f"Parse this marking schedule:\n\n{raw_text}"),
-        ]
-
-        result = await llm.ainvoke(messages)
-        parsed = self._extract_json_array(result.content)
+        parsed = await self._ai_parse_chunks(SCHEDULE_PARSE_SYSTEM, "Parse this marking schedule", raw_text)
 
         answers = []
         for item in parsed:
@@ -261,301 +378,24 @@ class PDFParserService:
 
         return answers
 
-    # ---------------------------------------------------------------------------
-    # Per-question image extraction via PDF coordinate positioning
-    # ---------------------------------------------------------------------------
-
-    # Patterns for locating question boundaries in the PDF
-    _QUESTION_RE = re.compile(r"QUESTION\s+(ONE|TWO|THREE|FOUR|FIVE)\s*:?\s*(.*)")
-    _SUB_RE = re.compile(r"^\(([a-f])\)")
-    _NUMBER_MAP = {
-        "ONE": "1", "TWO": "2", "THREE": "3", "FOUR": "4", "FIVE": "5",
-    }
-    _HEADER_MARGIN = 40   # skip page number at top
-    _FOOTER_MARGIN = 40   # skip footer at bottom
-    _SIDE_MARGIN = 30     # left/right trim
-    _IMAGE_DPI = 150      # resolution for cropped images
-
-    def extract_question_images(
-        self, doc: fitz.Document,
-    ) -> dict[str, bytes]:
-        """Extract a cropped PNG image for each sub-question.
-
-        Strategy:
-        - Find all QUESTION headers and (a)/(b)/(c) markers with y-coordinates.
-        - For each sub-question, crop from the *context start* to the next
-          sub-question boundary.
-        - Context start = the QUESTION header (if on the same page) or the
-          previous sub-question's end, plus any preamble text/images above
-          the current (x) marker on the same page.
-        - For sub-questions that share a page with prior ones, include from
-          the *end of the previous sub-question* so shared context (tables,
-          graphs) is preserved.
-
-        Returns a dict keyed by "Q{n}_{letter}" → PNG bytes.
-        """
-        markers = self._find_markers(doc)
-        if not markers:
-            return {}
-
-        images: dict[str, bytes] = {}
-
-        # --- Extract passage/context pages for each question ---
-        # For reading exams, pages between QUESTION header and first sub
-        # contain the reading passage that students need.
-        self._extract_passage_images(doc, markers, images)
-
-        # --- Extract per-sub-question cropped images ---
-        for i, marker in enumerate(markers):
-            if marker["type"] != "sub":
-                continue
-
-            q_num = marker["question"]
-            sub = marker["label"]
-            page_idx = marker["page"]
-            page = doc[page_idx]
-            page_w = page.rect.width
-            page_h = page.rect.height
-
-            # --- Determine y_top: where to start cropping ---
-            y_top = self._find_context_top(markers, i, page_idx)
-
-            # --- Determine y_bottom: where to stop cropping ---
-            y_bottom = self._find_crop_bottom(markers, i, page_idx, page_h)
-
-            # Crop and render
-            clip = fitz.Rect(
-                self._SIDE_MARGIN,
-                max(0, y_top),
-                page_w - self._SIDE_MARGIN,
-                min(page_h, y_bottom),
-            )
-            pix = page.get_pixmap(clip=clip, dpi=self._IMAGE_DPI)
-            key = f"Q{q_num}_{sub}"
-            images[key] = pix.tobytes("png")
-
-        return images
-
-    def _extract_passage_images(
-        self,
-        doc: fitz.Document,
-        markers: list[dict],
-        images: dict[str, bytes],
-    ) -> None:
-        """Extract full-page passage images for each question.
-
-        For reading/literacy exams, there are passage pages between the
-        QUESTION header and the first sub-question. These need to be shown
-        as context before the sub-questions.
-
-        Produces keys like "Q1_passage_0", "Q1_passage_1", etc.
-        """
-        # Group markers by question number
-        question_headers: dict[str, dict] = {}
-        first_subs: dict[str, dict] = {}
-
-        for m in markers:
-            q = m["question"]
-            if not q:
-                continue
-            if m["type"] == "question" and q not in question_headers:
-                question_headers[q] = m
-            if m["type"] == "sub" and q not in first_subs:
-                first_subs[q] = m
-
-        for q_num, header in question_headers.items():
-            first_sub = first_subs.get(q_num)
-            if not first_sub:
-                continue
-
-            header_page = header["page"]
-            sub_page = first_sub["page"]
-
-            # Only extract if there are passage pages between header and first sub
-            if sub_page <= header_page:
-                continue
-
-            # Render each passage page (from header page to the page before first sub)
-            for page_offset, page_idx in enumerate(range(header_page, sub_page)):
-                page = doc[page_idx]
-                clip = fitz.Rect(
-                    self._SIDE_MARGIN,
-                    self._HEADER_MARGIN,
-                    page.rect.width - self._SIDE_MARGIN,
-                    page.rect.height - self._FOOTER_MARGIN,
-                )
-                pix = page.get_pixmap(clip=clip, dpi=self._IMAGE_DPI)
-                key = f"Q{q_num}_passage_{page_offset}"
-                images[key] = pix.tobytes("png")
-
-    def _find_markers(
-        self, doc: fitz.Document,
-    ) -> list[dict]:
-        """Scan every page for QUESTION headers and (a)-(f) sub-question markers.
-
-        Returns a sorted list of marker dicts:
-          {"page": int, "y": float, "type": "question"|"sub",
-           "question": str, "label": str, "title": str}
-        """
-        markers: list[dict] = []
-        current_question = ""
-        current_title = ""
-
-        for page_idx in range(len(doc)):
-            page = doc[page_idx]
-            for block in page.get_text("dict")["blocks"]:
-                if block.get("type") != 0:
-                    continue
-                for line in block["lines"]:
-                    text = "".join(s["text"] for s in line["spans"]).strip()
-                    y = line["bbox"][1]
-
-                    qm = self._QUESTION_RE.match(text)
-                    if qm:
-                        current_question = self._NUMBER_MAP.get(
-                            qm.group(1), qm.group(1)
-                        )
-                        current_title = qm.group(2).strip()
-                        markers.append({
-                            "page": page_idx, "y": y, "type": "question",
-                            "question": current_question,
-                            "label": current_question,
-                            "title": current_title,
-                        })
-
-                    sm = self._SUB_RE.match(text)
-                    if sm:
-                        markers.append({
-                            "page": page_idx, "y": y, "type": "sub",
-                            "question": current_question,
-                            "label": sm.group(1),
-                            "title": "",
-                        })
-
-        markers.sort(key=lambda m: (m["page"], m["y"]))
-        return markers
-
-    def _find_context_top(
-        self, markers: list[dict], current_idx: int, page_idx: int,
-    ) -> float:
-        """Find the y-coordinate where cropping should start for a sub-question.
-
-        Rules:
-        1. For the first sub-question (a) of a question: include from the
-           QUESTION header (if on same page) or page top, so shared context
-           like passages/tables/graphs is captured.
-        2. For subsequent subs (b), (c), etc.: start from just above the
-           current sub's own marker — each sub only shows its own content.
-        """
-        marker = markers[current_idx]
-
-        # Check if this is the first sub of its question on this page
-        is_first_sub = True
-        question_header_y = None
-
-        for j in range(current_idx - 1, -1, -1):
-            prev = markers[j]
-            if prev["page"] != page_idx:
-                break
-            if prev["type"] == "question":
-                question_header_y = prev["y"]
-                break
-            if prev["type"] == "sub" and prev["question"] == marker["question"]:
-                is_first_sub = False
-                break
-
-        if is_first_sub:
-            # First sub: include QUESTION header or page top for shared context
-            if question_header_y is not None:
-                return question_header_y - 5
-            return self._HEADER_MARGIN
-
-        # Subsequent subs: start from just above their own (x) marker
-        return marker["y"] - 10
-
-    def _find_crop_bottom(
-        self, markers: list[dict], current_idx: int,
-        page_idx: int, page_height: float,
-    ) -> float:
-        """Find the y-coordinate where cropping should end."""
-        for j in range(current_idx + 1, len(markers)):
-            nxt = markers[j]
-            if nxt["page"] == page_idx:
-                return nxt["y"] - 5
-            if nxt["page"] > page_idx:
-                break
-        return page_height - self._FOOTER_MARGIN
-
-    # ---------------------------------------------------------------------------
-    # PyMuPDF text/image extraction
-    # ---------------------------------------------------------------------------
-
-    def _extract_title(self, doc: fitz.Document) -> str:
-        """Extract exam title from the first page."""
-        if len(doc) == 0:
-            return "Unknown Exam"
-
-        page = doc[0]
-        for block in page.get_text("dict")["blocks"]:
-            if block.get("type") != 0:
-                continue
-            for line in block["lines"]:
-                text = "".join(span["text"] for span in line["spans"]).strip()
-                if "Numeracy" in text and any(str(y) in text for y in range(2020, 2030)):
-                    return text
-
-        # Fallback: look for any large bold text
-        for block in page.get_text("dict")["blocks"]:
-            if block.get("type") != 0:
-                continue
-            for line in block["lines"]:
-                spans = line["spans"]
-                if spans and spans[0]["size"] >= 14:
-                    text = "".join(s["text"] for s in spans).strip()
-                    if len(text) > 5:
-                        return text
-
-        return "Exam Paper"
-
-    # Patterns to strip from extracted text (watermarks, repeated noise)
-    _NOISE_PATTERNS = [
-        re.compile(r"(?:DO NOT WRITE IN(?:\s+THIS)?(?:\s+AREA)?[^\n]*\n?)+", re.IGNORECASE),
-        re.compile(r"(?:SUPERVISOR'?S?\s+USE\s+ONLY[^\n]*\n?)+", re.IGNORECASE),
-    ]
-
-    def _extract_full_text(self, doc: fitz.Document) -> str:
-        """Extract all text from the PDF, filtering out watermarks and noise."""
-        parts = []
-        for i, page in enumerate(doc):
-            text = page.get_text("text").strip()
-            if text:
-                # Remove watermark/noise patterns
-                for pattern in self._NOISE_PATTERNS:
-                    text = pattern.sub("", text)
-                # Collapse multiple blank lines
-                text = re.sub(r"\n{3,}", "\n\n", text).strip()
-                if text:
-                    parts.append(f"--- Page {i + 1} ---\n{text}")
-        return "\n\n".join(parts)
-
-    def _extract_all_images(self, doc: fitz.Document) -> dict[int, list[bytes]]:
-        """Extract images from all pages as PNG bytes."""
-        page_images: dict[int, list[bytes]] = {}
-        for page_num in range(len(doc)):
-            page = doc[page_num]
-            images = []
-            for img_info in page.get_images(full=True):
-                xref = img_info[0]
-                try:
-                    pix = fitz.Pixmap(doc, xref)
-                    if pix.n > 4:
-                        pix = fitz.Pixmap(fitz.csRGB, pix)
-                    images.append(pix.tobytes("png"))
-                except Exception:
-                    continue
-            if images:
-                page_images[page_num] = images
-        return page_images
+    async def _ai_parse_chunks(self, system_prompt: str, instruction: str, raw_text: str) -> list[dict]:
+        """One LLM call per question chunk, bounded, merged by question number."""
+        llm = get_llm(tier="fast", provider="gemini")
+        chunks = split_question_chunks(raw_text)
+        semaphore = asyncio.Semaphore(max(1, settings.pdf_parse_concurrency))
+
+        async def parse(chunk: TextChunk) -> list[dict]:
+            scope = f" (QUESTION {chunk.question_number} only)" if len(chunks) > 1 else ""
+            messages = [
+                SystemMessage(content=system_prompt),
+                HumanMessage(content=f"{instruction}{scope}:\n\n{chunk.text}"),
+            ]
+            async with semaphore:
+                result = await llm.ainvoke(messages)
+            return self._extract_json_array(result.content)
+
+        results = await asyncio.gather(*(parse(chunk) for chunk in chunks))
+        return merge_chunk_items(chunks, results)
 
     # ---------------------------------------------------------------------------
     # JSON extraction helper
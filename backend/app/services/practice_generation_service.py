@@ -93,6 +93,9 @@ class PracticeGenerationService:
         provider = solution.ai_provider or "gemini"
         llm = get_llm(tier="strong", provider=provider)
 
+        # Release the pooled connection while the LLM call runs.
+        await self.db.commit()
+
         try:
             response = await llm.ainvoke(messages)
             content = response.content if hasattr(response, "content") else str(response)
@@ -6,13 +6,14 @@ from datetime import datetime, timezone
 from typing import Any
 
 from sqlalchemy import select, text
+from sqlalchemy.orm import selectinload
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 
 from app.config import get_settings
 from app.database import _fix_db_url
 from app.llm.prompts.generate_similar import build_generate_similar_messages
 from app.llm.registry import select_llm
-from app.models.exam_paper import ExamPaper, PracticeQuestion
+from app.models.exam_paper import ExamPaper, PracticeQuestion, PracticeQuestionImage
 from app.utils.tikz_renderer import render_tikz_to_png
 
 logger = logging.getLogger(__name__)
@@ -122,7 +123,7 @@ class QuestionGeneratorService:
                 marks=source.marks,
                 outcome=source.outcome,
                 has_image=has_image,
-                image_data=image_data,
+                image=PracticeQuestionImage.from_bytes(image_data) if image_data else None,
                 order_index=source.order_index + i + 1,
                 source="ai_generated",
                 status="draft",
@@ -190,6 +191,7 @@ class QuestionGeneratorService:
                 PracticeQuestion.status == "approved",
                 PracticeQuestion.synced_at.is_(None),
             )
+            .options(selectinload(PracticeQuestion.image))
         )
         questions = (await self.db.execute(query)).scalars().all()
 
@@ -208,21 +210,22 @@ class QuestionGeneratorService:
             async with remote_engine.begin() as conn:
                 for q in questions:
                     try:
-                        await conn.execute(
+                        remote_id = (await conn.execute(
                             text("""
                                 INSERT INTO practice_questions (
                                     exam_paper_id, question_number, sub_question,
                                     question_text, question_type, correct_answer,
                                     accepted_answers, answer_explanation, marks,
-                                    outcome, has_image, image_data, order_index,
+                                    outcome, has_image, order_index,
                                     source, status, source_question_id, created_at
                                 ) VALUES (
                                     :exam_paper_id, :question_number, :sub_question,
                                     :question_text, :question_type, :correct_answer,
                                     :accepted_answers, :answer_explanation, :marks,
-                                    :outcome, :has_image, :image_data, :order_index,
+                                    :outcome, :has_image, :order_index,
                                     :source, :status, :source_question_id, :created_at
                                 )
+                                RETURNING id
                             """),
                             {
                                 "exam_paper_id": q.exam_paper_id,
@@ -238,14 +241,26 @@ class QuestionGeneratorService:
                                 "marks": q.marks,
                                 "outcome": q.outcome,
                                 "has_image": q.has_image,
-                                "image_data": q.image_data,
                                 "order_index": q.order_index,
                                 "source": q.source,
                                 "status": q.status,
                                 "source_question_id": q.source_question_id,
                                 "created_at": q.created_at,
                             },
-                        )
+                        )).scalar_one()
+                        if q.image is not None:
+                            await conn.execute(
+                                text("""
+                                    INSERT INTO practice_question_images (question_id, sha256, size, data)
+                                    VALUES (:question_id, :sha256, :size, :data)
+                                """),
+                                {
+                                    "question_id": remote_id,
+                                    "sha256": q.image.sha256,
+                                    "size": q.image.size,
+                                    "data": q.image.data,
+                                },
+                            )
 
                         # Mark as synced locally
                         q.synced_at = datetime.now(timezone.utc)
@@ -0,0 +1,135 @@
+"""HTTP caching and resized variants for question images.
+
+Question images never change under a given hash, so:
+
+- URLs carry the image hash as ``?v=`` (``image_url``). A request whose
+  ``v`` matches the stored hash is served ``immutable`` for a year. A new
+  crop gets a new URL, so there is nothing to invalidate.
+- Every response has a strong ETag derived from the hash (and width), and
+  ``If-None-Match`` is answered with a 304 before the blob is read.
+- ``?w=`` picks a resized WebP variant from ``question_image_widths``.
+  Variants are rendered on first request in the CPU executor's image pool
+  and kept in Redis under ``question_image:{sha256}:{width}``.
+- Single byte ranges are honoured (``parse_range``).
+
+Fail-open: Redis errors are logged, and the variant is rendered again.
+"""
+from __future__ import annotations
+
+import io
+import logging
+from collections.abc import Awaitable, Callable
+from typing import Optional
+
+from PIL import Image
+from redis.asyncio import from_url as redis_from_url
+
+from app.config import get_settings
+from app.core.cpu_executor import cpu_executor
+from app.observability.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+_settings = get_settings()
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "public, no-cache"
+VERSION_LENGTH = 16  # hex chars of the hash used in ?v=
+
+QUESTION_IMAGE_VARIANTS = REGISTRY.counter(
+    "question_image_variants_total", "Resized question image lookups", ["result"],
+)
+
+
+def image_url(question) -> Optional[str]:
+    """Versioned image URL of a ``PracticeQuestion`` (None without an image)."""
+    if not question.has_image:
+        return None
+    url = f"/api/v1/exams/questions/{question.id}/image"
+    if question.image_sha256:
+        url += f"?v={question.image_sha256[:VERSION_LENGTH]}"
+    return url
+
+
+def etag(sha256: str, width: Optional[int] = None) -> str:
+    return f'"{sha256[:32]}-w{width}"' if width else f'"{sha256[:32]}"'
+
+
+def etag_matches(if_none_match: Optional[str], current: str) -> bool:
+    """Whether an ``If-None-Match`` header covers ``current`` (weak compare)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == current for tag in if_none_match.split(","))
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[tuple[int, int]]:
+    """Inclusive (start, end) of a single ``bytes=`` range.
+
+    None means "send the whole body" (no header, multiple ranges, or a
+    malformed one). Raises ``ValueError`` if the range is unsatisfiable.
+    """
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    first, _, last = header[len("bytes="):].strip().partition("-")
+    try:
+        if first:
+            start, end = int(first), int(last) if last else size - 1
+        else:
+            start, end = max(0, size - int(last)), size - 1
+    except ValueError:
+        return None
+    if start >= size or start > end or (not first and not int(last)):
+        raise ValueError(f"unsatisfiable range {header!r} for {size} bytes")
+    return start, min(end, size - 1)
+
+
+def resize_image(image_bytes: bytes, width: int, quality: int) -> bytes:
+    """Downscale to ``width`` (never up) and encode as WebP (blocking)."""
+    img = Image.open(io.BytesIO(image_bytes))
+    img.load()
+    if img.width > width:
+        img = img.resize((width, max(1, round(img.height * width / img.width))), Image.Resampling.LANCZOS)
+    if img.mode not in ("RGB", "RGBA", "L"):
+        img = img.convert("RGBA" if "A" in img.getbands() else "RGB")
+    buf = io.BytesIO()
+    img.save(buf, format="WEBP", quality=quality, method=4)
+    return buf.getvalue()
+
+
+class VariantCache:
+    """Resized variants keyed by (image hash, width), stored in Redis."""
+
+    def __init__(self, redis=None):
+        self._redis = redis if redis is not None else redis_from_url(_settings.redis_url)
+
+    @staticmethod
+    def _key(sha256: str, width: int) -> str:
+        return f"question_image:{sha256}:{width}"
+
+    async def get(
+        self, sha256: str, width: int, load_original: Callable[[], Awaitable[bytes]],
+    ) -> bytes:
+        """The ``width`` variant; ``load_original`` is only awaited on a miss."""
+        key = self._key(sha256, width)
+        try:
+            cached = await self._redis.get(key)
+        except Exception as e:
+            logger.warning("Question image variant cache read failed: %s", e)
+            cached = None
+        QUESTION_IMAGE_VARIANTS.inc(result="hit" if cached else "miss")
+        if cached:
+            return cached
+
+        data = await cpu_executor.run_image(
+            resize_image, await load_original(), width, _settings.question_image_variant_quality,
+        )
+        try:
+            await self._redis.set(key, data, ex=int(_settings.question_image_variant_ttl_days * 86400))
+        except Exception as e:
+            logger.warning("Question image variant cache write failed: %s", e)
+        return data
+
+
+variant_cache = VariantCache()
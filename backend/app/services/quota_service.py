@@ -1,15 +1,16 @@
 import hashlib
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import date, timedelta
 
 from fastapi import HTTPException
-from sqlalchemy import select
+from sqlalchemy import select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.daily_usage import DailyUsage
 from app.models.guest_usage import GuestUsage
 from app.models.system_setting import SystemSetting
 from app.models.user import User
+from app.services.settings_cache import settings_cache
 
 
 @dataclass
@@ -17,9 +18,15 @@ class QuotaInfo:
     limit: int
     used: int
     remaining: int
+    # The row check_and_increment_quota charged, for refund_quota
+    usage: DailyUsage | GuestUsage | None = field(default=None, repr=False)
 
 
 async def get_setting_value(key: str, db: AsyncSession, default=None):
+    """Read a system setting, preferring the in-process snapshot."""
+    snapshot = settings_cache.snapshot
+    if snapshot is not None:
+        return snapshot.get(key, default)
     result = await db.scalar(
         select(SystemSetting.value).where(SystemSetting.key == key)
     )
@@ -40,6 +47,23 @@ async def check_and_increment_quota(
         raise HTTPException(status_code=401, detail="Authentication required")
 
 
+async def refund_quota(quota: QuotaInfo, db: AsyncSession) -> None:
+    """Give back the question a failed solve was charged.
+
+    For when the charge was already committed; an uncommitted one is simply
+    rolled back. Decrements in SQL so concurrent charges aren't lost.
+    """
+    usage = quota.usage
+    if usage is None:
+        return
+    model = type(usage)
+    await db.execute(
+        update(model)
+        .where(model.id == usage.id, model.question_count > 0)
+        .values(question_count=model.question_count - 1)
+    )
+
+
 async def get_quota_status(
     user: User | None,
     ip_address: str | None,
@@ -68,7 +92,7 @@ async def _check_user_quota(user: User, db: AsyncSession) -> QuotaInfo:
         usage = await _get_or_create_user_usage(user.id, db)
         usage.question_count += 1
         await db.flush()
-        return QuotaInfo(limit=0, used=usage.question_count, remaining=-1)
+        return QuotaInfo(limit=0, used=usage.question_count, remaining=-1, usage=usage)
 
     usage = await _get_or_create_user_usage(user.id, db)
 
@@ -91,6 +115,7 @@ async def _check_user_quota(user: User, db: AsyncSession) -> QuotaInfo:
         limit=limit,
         used=usage.question_count,
         remaining=limit - usage.question_count,
+        usage=usage,
     )
 
 
@@ -118,6 +143,7 @@ async def _check_guest_quota(ip_address: str, db: AsyncSession) -> QuotaInfo:
         limit=limit,
         used=usage.question_count,
         remaining=limit - usage.question_count,
+        usage=usage,
     )
 
 
@@ -22,6 +22,7 @@ from app.llm.embeddings import embed_text
 from app.llm.prompts.framework import build_framework_messages
 from app.llm.registry import get_llm
 from app.observability.langsmith_client import get_langsmith_client
+from app.observability import usage_ledger
 from app.observability.tracing import spawn_in_current_context
 from app.models.scan_record import ScanRecord
 from app.models.semantic_cache import SemanticCache
@@ -29,12 +30,12 @@ from app.models.solution import Solution
 from app.schemas.scan import ScanResponse, SolutionResponse, SolutionStep
 from app.services.conversation_service import ConversationService
 from app.services.embedding_service import EmbeddingService
-from app.services.storage_service import StorageService
+from app.services.quota_service import QuotaInfo, refund_quota
+from app.services.storage_service import storage_service
 from app.services.subscription_service import SubscriptionService
 
 logger = logging.getLogger(__name__)
 
-storage_service = StorageService()
 _settings = get_settings()
 
 
@@ -95,6 +96,23 @@ def _tag_cache_layer(cache_layer: Optional[int]) -> None:
         pass
 
 
+def _discard_image_upload(upload: Optional[asyncio.Task]) -> None:
+    """Delete the object of an upload whose scan will not be saved.
+
+    Runs once the upload finishes (it can't be interrupted mid-transfer);
+    failed uploads have nothing to delete.
+    """
+    if upload is None:
+        return
+
+    def _cleanup(task: asyncio.Task) -> None:
+        if task.cancelled() or task.exception() is not None:
+            return
+        spawn_in_current_context(storage_service.delete_image(task.result().url))
+
+    upload.add_done_callback(_cleanup)
+
+
 class ScanService:
     """Service for handling problem scanning and solving via LangGraph."""
 
@@ -105,6 +123,46 @@ class ScanService:
         self._conversation_service = ConversationService(db)
         self._embedding_service = EmbeddingService(db)
 
+    # -- DB phases -------------------------------------------------------
+    # The solve path spends seconds awaiting storage and LLM calls. An
+    # AsyncSession keeps its pooled connection checked out until the
+    # transaction ends, so DB work is grouped into short phases (pre-check,
+    # persist) and each phase is committed before the next slow await.
+    # Committing the pre-check also commits the route's quota charge, so a
+    # solve that fails before persisting refunds it.
+
+    async def _end_db_phase(self) -> None:
+        """Commit, returning the session's connection to the pool.
+
+        Loaded objects stay usable (``expire_on_commit=False``); the next
+        query checks out a fresh connection.
+        """
+        await self.db.commit()
+
+    async def _refund_quota(self, quota: Optional[QuotaInfo]) -> None:
+        """Undo the committed quota charge of a solve that failed."""
+        if quota is None:
+            return
+        try:
+            await self.db.rollback()  # drop whatever the failed phase left
+            await refund_quota(quota, self.db)
+            await self.db.commit()
+        except Exception:
+            logger.warning("Quota refund failed", exc_info=True)
+
+    async def _precheck_usage(self, sub_service: SubscriptionService, user_id: int) -> str:
+        """Tier check: usage limit gate. Returns the user's tier name."""
+        user_tier = await sub_service.get_user_tier(user_id)
+        if user_tier == "free":
+            allowed, remaining = await sub_service.check_usage_limit(user_id)
+            if not allowed:
+                from fastapi import HTTPException
+                raise HTTPException(
+                    status_code=429,
+                    detail={"error": "daily_limit_exceeded", "remaining": 0},
+                )
+        return user_tier
+
     @traceable(run_type="chain", name="scan.solve", tags=["scan"])
     async def scan_and_solve(
         self,
@@ -114,52 +172,58 @@ class ScanService:
         subject: Optional[str] = None,
         ai_provider: Optional[str] = None,
         grade_level: Optional[str] = None,
+        quota: Optional[QuotaInfo] = None,
     ) -> ScanResponse:
-        """Process uploaded image or typed text through LangGraph pipeline."""
-        # -- Tier check: usage limit gate --
+        """Process uploaded image or typed text through LangGraph pipeline.
+
+        ``quota`` is the charge from ``check_and_increment_quota``, refunded
+        if the solve fails.
+        """
+        # -- DB phase 1: tier / usage pre-check --
         sub_service = SubscriptionService(self.db)
-        user_tier = await sub_service.get_user_tier(user_id)
-        if user_tier == "free":
-            allowed, remaining = await sub_service.check_usage_limit(user_id)
-            if not allowed:
-                from fastapi import HTTPException
-                raise HTTPException(
-                    status_code=429,
-                    detail={"error": "daily_limit_exceeded", "remaining": 0},
-                )
+        user_tier = await self._precheck_usage(sub_service, user_id)
+        await self._end_db_phase()
 
         _tag_current_run(
             subject=subject, user_tier=user_tier,
             provider=ai_provider, user_id=user_id,
         )
 
-        image_url: Optional[str] = None
         image_bytes: Optional[bytes] = None
+        upload: Optional[asyncio.Task] = None
 
-        if image:
-            # Image flow: upload and read bytes for OCR
-            image_url = await storage_service.upload_image(image)
-            image.file.seek(0)
-            image_bytes = await image.read()
-
-        # Run the LangGraph pipeline
-        result = await self._graph.ainvoke({
-            "image_bytes": image_bytes,
-            "image_url": image_url,
-            "input_text": text,
-            "user_id": user_id,
-            "subject": subject,
-            "grade_level": grade_level,
-            "preferred_provider": ai_provider,
-            "user_tier": user_tier,
-            "attempt_count": 0,
-        })
+        try:
+            if image:
+                # Image flow: store in the background; OCR works on the bytes
+                image_bytes, upload = await self._start_image_upload(image)
 
-        _tag_cache_layer(result.get("cache_layer"))
+            # Run the LangGraph pipeline
+            try:
+                result = await self._graph.ainvoke({
+                    "image_bytes": image_bytes,
+                    "input_text": text,
+                    "user_id": user_id,
+                    "subject": subject,
+                    "grade_level": grade_level,
+                    "preferred_provider": ai_provider,
+                    "user_tier": user_tier,
+                    "attempt_count": 0,
+                })
+            except BaseException:
+                _discard_image_upload(upload)
+                raise
 
-        response = await self._persist_and_build_response(
-            result, user_id, image_url, grade_level
-        )
+            _tag_cache_layer(result.get("cache_layer"))
+            usage_ledger.annotate(subject=result.get("detected_subject"), cache_layer=result.get("cache_layer"))
+
+            # -- DB phase 2: persist (join the upload first — no connection held) --
+            image_url = await self._join_image_upload(upload)
+            response = await self._persist_and_build_response(
+                result, user_id, image_url, grade_level
+            )
+        except BaseException:
+            await self._refund_quota(quota)
+            raise
 
         # -- Increment usage after successful solve --
         await sub_service.increment_usage(user_id)
@@ -185,48 +249,42 @@ class ScanService:
         subject: Optional[str] = None,
         ai_provider: Optional[str] = None,
         grade_level: Optional[str] = None,
+        quota: Optional[QuotaInfo] = None,
     ) -> AsyncIterator[dict[str, Any]]:
-        """Stream the solve pipeline, yielding SSE-ready dicts per node."""
-        # -- Tier check: usage limit gate --
+        """Stream the solve pipeline, yielding SSE-ready dicts per node.
+
+        ``quota`` is refunded as in ``scan_and_solve``.
+        """
+        # -- DB phase 1: tier / usage pre-check --
         sub_service = SubscriptionService(self.db)
-        user_tier = await sub_service.get_user_tier(user_id)
-        if user_tier == "free":
-            allowed, remaining = await sub_service.check_usage_limit(user_id)
-            if not allowed:
-                from fastapi import HTTPException
-                raise HTTPException(
-                    status_code=429,
-                    detail={"error": "daily_limit_exceeded", "remaining": 0},
-                )
+        user_tier = await self._precheck_usage(sub_service, user_id)
+        await self._end_db_phase()
 
         _tag_current_run(
             subject=subject, user_tier=user_tier,
             provider=ai_provider, user_id=user_id,
         )
 
-        image_url: Optional[str] = None
         image_bytes: Optional[bytes] = None
-
-        if image:
-            image_url = await storage_service.upload_image(image)
-            image.file.seek(0)
-            image_bytes = await image.read()
-
-        initial_input = {
-            "image_bytes": image_bytes,
-            "image_url": image_url,
-            "input_text": text,
-            "user_id": user_id,
-            "subject": subject,
-            "grade_level": grade_level,
-            "preferred_provider": ai_provider,
-            "user_tier": user_tier,
-            "attempt_count": 0,
-        }
-
+        upload: Optional[asyncio.Task] = None
+        refund = quota  # cleared once the scan is persisted
         accumulated: dict[str, Any] = {}
 
         try:
+            if image:
+                image_bytes, upload = await self._start_image_upload(image)
+
+            initial_input = {
+                "image_bytes": image_bytes,
+                "input_text": text,
+                "user_id": user_id,
+                "subject": subject,
+                "grade_level": grade_level,
+                "preferred_provider": ai_provider,
+                "user_tier": user_tier,
+                "attempt_count": 0,
+            }
+
             async for chunk in self._graph.astream(
                 initial_input, stream_mode="updates"
             ):
@@ -248,12 +306,16 @@ class ScanService:
                             "data": {"ocr_text": update["ocr_text"]},
                         }
 
-            # -- Pipeline complete — persist (mirrors scan_and_solve) -------
+            # -- Pipeline complete — DB phase 2: persist (mirrors scan_and_solve)
             result = accumulated
             _tag_cache_layer(result.get("cache_layer"))
+            usage_ledger.annotate(subject=result.get("detected_subject"), cache_layer=result.get("cache_layer"))
+            image_url = await self._join_image_upload(upload)
+            upload = None
             response = await self._persist_and_build_response(
                 result, user_id, image_url, grade_level
             )
+            refund = None
 
             # -- Increment usage after successful solve --
             await sub_service.increment_usage(user_id)
@@ -266,6 +328,45 @@ class ScanService:
         except Exception as e:
             logger.exception("Streaming solve failed")
             yield {"event": "error", "data": {"message": str(e)}}
+        finally:
+            # Failed or abandoned (client disconnected) before persisting.
+            _discard_image_upload(upload)
+            await self._refund_quota(refund)
+
+    # -- Image upload (overlaps the graph) -------------------------------
+
+    @staticmethod
+    async def _start_image_upload(image: UploadFile) -> tuple[bytes, asyncio.Task]:
+        """Read the image and start storing it in the background.
+
+        OCR and the cache lookups run on the returned bytes while the
+        object-store round-trip is in flight, so upload latency no longer
+        adds to OCR latency.
+        """
+        upload = await storage_service.read_upload(image)
+        return upload.data, spawn_in_current_context(storage_service.put_upload(upload))
+
+    @staticmethod
+    async def _join_image_upload(upload: Optional[asyncio.Task]) -> Optional[str]:
+        """URL of the background upload; None if it failed or is too slow.
+
+        A scan without an image URL still has its OCR text and solution, so
+        storage trouble degrades the history view rather than the solve.
+        """
+        if upload is None:
+            return None
+        try:
+            stored = await asyncio.wait_for(
+                asyncio.shield(upload), _settings.storage_upload_join_timeout_seconds,
+            )
+        except asyncio.TimeoutError:
+            logger.warning("Image upload still running, saving scan without image_url")
+            _discard_image_upload(upload)
+            return None
+        except Exception as e:
+            logger.warning("Image upload failed, saving scan without image_url: %s", e)
+            return None
+        return stored.url
 
     # -- Shared persistence helper --------------------------------------
 
@@ -476,7 +577,8 @@ class ScanService:
             # don't mix billing tiers.
             llm = get_llm("fast", provider=provider)
             messages = build_framework_messages(ocr_text, solution_raw, subject)
-            result = await llm.ainvoke(messages)
+            with usage_ledger.usage_operation("framework"):
+                result = await llm.ainvoke(messages)
 
             try:
                 framework = json.loads(result.content)
@@ -512,24 +614,27 @@ class ScanService:
     ) -> None:
         """Run deep evaluation in the background and persist results."""
         try:
-            evaluation = await run_deep_evaluate(
-                problem_text=problem_text,
-                solution_raw=solution_raw,
-                final_answer=final_answer,
-                steps=steps,
-                subject=subject,
-                grade_level=grade_level,
-            )
-            if evaluation:
-                result = await self.db.execute(
-                    select(Solution).where(Solution.id == solution_id)
+            with usage_ledger.usage_operation("deep_evaluate"):
+                evaluation = await run_deep_evaluate(
+                    problem_text=problem_text,
+                    solution_raw=solution_raw,
+                    final_answer=final_answer,
+                    steps=steps,
+                    subject=subject,
+                    grade_level=grade_level,
                 )
-                sol = result.scalar_one_or_none()
-                if sol:
-                    sol.deep_evaluation = evaluation
-                    sol.quality_score = evaluation.get("overall", sol.quality_score)
-                    await self.db.commit()
-                    logger.info("Deep evaluation saved for solution %s", solution_id)
+            if evaluation:
+                # Own session: the request's session may be closed or in use.
+                async with AsyncSessionLocal() as db:
+                    result = await db.execute(
+                        select(Solution).where(Solution.id == solution_id)
+                    )
+                    sol = result.scalar_one_or_none()
+                    if sol:
+                        sol.deep_evaluation = evaluation
+                        sol.quality_score = evaluation.get("overall", sol.quality_score)
+                        await db.commit()
+                        logger.info("Deep evaluation saved for solution %s", solution_id)
         except Exception as e:
             logger.warning("Background deep_evaluate failed for solution %s: %s", solution_id, e)
 
@@ -546,6 +651,7 @@ class ScanService:
         )
         scan_record = result_row.scalars().first()
         subject = scan_record.subject if scan_record else "math"
+        await self._end_db_phase()
 
         # Run follow-up graph
         result = await self._followup_graph.ainvoke({
@@ -658,7 +764,8 @@ class ScanService:
 
             async with AsyncSessionLocal() as db:
                 service = PracticeGenerationService(db)
-                await service.get_or_generate(scan_id=scan_id, user_id=user_id)
+                with usage_ledger.usage_operation("practice_generation"):
+                    await service.get_or_generate(scan_id=scan_id, user_id=user_id)
                 logger.info("Background practice generation done for scan %d", scan_id)
         except Exception:
             logger.exception("Background practice generation failed for scan %d", scan_id)
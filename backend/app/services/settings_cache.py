@@ -0,0 +1,200 @@
+"""Process-local cache of ``system_settings`` rows.
+
+Settings change a few times a month but are read on every guest solve, so
+the whole table is loaded once into an immutable ``SettingsSnapshot`` and
+swapped atomically when it changes.
+
+Refresh triggers:
+- ``PATCH /admin/settings`` reloads the local snapshot and publishes the
+  changed keys on ``SETTINGS_CHANNEL``.
+- Every worker runs a Redis pub/sub listener that reloads on that message.
+- As a safety net the listener also reloads every
+  ``settings_cache_refresh_seconds`` in case a message was missed.
+
+Fail-open: if the snapshot has never loaded, callers fall back to a direct
+DB read (see ``quota_service.get_setting_value``).
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import time
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import Any, Callable, Iterable, Mapping, Optional
+
+from sqlalchemy import select
+
+from app.config import get_settings
+from app.database import AsyncSessionLocal
+from app.models.system_setting import SystemSetting
+
+logger = logging.getLogger(__name__)
+
+SETTINGS_CHANNEL = "system_settings:changed"
+
+
+@dataclass(frozen=True)
+class SettingsSnapshot:
+    """Immutable view of all system settings at ``loaded_at``."""
+
+    values: Mapping[str, Any] = field(default_factory=lambda: MappingProxyType({}))
+    loaded_at: float = 0.0
+
+    def get(self, key: str, default: Any = None) -> Any:
+        value = self.values.get(key)
+        return default if value is None else value
+
+    def get_int(self, key: str, default: int = 0) -> int:
+        value = self.values.get(key)
+        if isinstance(value, bool):
+            return int(value)
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return default
+
+    def get_float(self, key: str, default: float = 0.0) -> float:
+        try:
+            return float(self.values.get(key))
+        except (TypeError, ValueError):
+            return default
+
+    def get_bool(self, key: str, default: bool = False) -> bool:
+        value = self.values.get(key)
+        if isinstance(value, bool):
+            return value
+        if isinstance(value, (int, float)):
+            return bool(value)
+        if isinstance(value, str):
+            lowered = value.strip().lower()
+            if lowered in ("true", "1", "yes", "on"):
+                return True
+            if lowered in ("false", "0", "no", "off"):
+                return False
+        return default
+
+    def get_str(self, key: str, default: str = "") -> str:
+        value = self.values.get(key)
+        return default if value is None else str(value)
+
+
+class SettingsCache:
+    """Holds the current ``SettingsSnapshot`` and keeps it fresh."""
+
+    def __init__(self, session_factory: Callable = AsyncSessionLocal):
+        self._session_factory = session_factory
+        self._snapshot: Optional[SettingsSnapshot] = None
+        self._reload_lock = asyncio.Lock()
+        self._listener: Optional[asyncio.Task] = None
+        self._redis = None
+
+    @property
+    def snapshot(self) -> Optional[SettingsSnapshot]:
+        """Current snapshot, or ``None`` until the first successful load."""
+        return self._snapshot
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._snapshot is not None
+
+    async def load(self) -> SettingsSnapshot:
+        """Read every ``system_settings`` row and swap in a new snapshot."""
+        async with self._reload_lock:
+            async with self._session_factory() as db:
+                rows = (
+                    await db.execute(select(SystemSetting.key, SystemSetting.value))
+                ).all()
+            snapshot = SettingsSnapshot(
+                values=MappingProxyType({row.key: row.value for row in rows}),
+                loaded_at=time.time(),
+            )
+            self._snapshot = snapshot
+            logger.info("Settings cache loaded (%d keys)", len(snapshot.values))
+            return snapshot
+
+    def reset(self) -> None:
+        """Drop the snapshot — for tests only."""
+        self._snapshot = None
+
+    async def reload_and_publish(self, keys: Iterable[str]) -> None:
+        """Reload locally, then tell other workers which keys changed.
+
+        Publishing is best-effort: a failure only delays other workers until
+        their periodic refresh.
+        """
+        try:
+            await self.load()
+        except Exception as e:
+            logger.warning("Settings cache reload failed: %s", e)
+        if self._redis is None:
+            return
+        try:
+            await self._redis.publish(SETTINGS_CHANNEL, json.dumps(sorted(keys)))
+        except Exception as e:
+            logger.warning("Settings change publish failed: %s", e)
+
+    # -- Pub/sub listener ----------------------------------------------------
+
+    def start_listener(self, redis) -> asyncio.Task:
+        """Spawn the background task that reloads on change notifications."""
+        self._redis = redis
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.get_running_loop().create_task(
+                self._listen(redis)
+            )
+        return self._listener
+
+    async def stop_listener(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._listener = None
+        if self._redis is not None:
+            try:
+                await self._redis.aclose()
+            except Exception:
+                pass
+            self._redis = None
+
+    async def _listen(self, redis) -> None:
+        refresh_seconds = get_settings().settings_cache_refresh_seconds
+        pubsub = None
+        while True:
+            try:
+                if pubsub is None and redis is not None:
+                    pubsub = redis.pubsub()
+                    await pubsub.subscribe(SETTINGS_CHANNEL)
+                message = None
+                if pubsub is not None:
+                    message = await pubsub.get_message(
+                        ignore_subscribe_messages=True, timeout=refresh_seconds,
+                    )
+                else:
+                    await asyncio.sleep(refresh_seconds)
+                if message is not None:
+                    logger.info("Settings changed on another worker: %s", message.get("data"))
+                await self.load()
+            except asyncio.CancelledError:
+                if pubsub is not None:
+                    try:
+                        await pubsub.aclose()
+                    except Exception:
+                        pass
+                raise
+            except Exception as e:
+                logger.warning("Settings cache listener error, retrying: %s", e)
+                if pubsub is not None:
+                    try:
+                        await pubsub.aclose()
+                    except Exception:
+                        pass
+                pubsub = None
+                await asyncio.sleep(min(refresh_seconds, 5))
+
+
+settings_cache = SettingsCache()
@@ -1,17 +1,230 @@
+"""Image storage: Cloudflare R2 (S3-compatible) or the local filesystem.
+
+Uploads are read once. ``StorageService.store_upload`` reads the
+``UploadFile`` in chunks. Each chunk feeds a sha256 and an in-memory buffer
+(the tee). The same bytes are then streamed to the backend and returned to
+the caller for OCR, so nothing re-reads the upload.
+
+Objects are content-addressed: ``{folder}/{sha256}.{ext}``, with the
+extension taken from the sniffed image type rather than the filename. A
+photo uploaded by a whole class is stored once. Before a put, a HEAD on
+the backend checks for the key, and a hit skips the upload. The check is
+not cached in-process: another worker may have deleted the object since,
+and skipping the put on a stale entry would save a scan pointing at
+nothing. The HEAD runs in the background upload, overlapped with OCR.
+Because objects are shared, ``delete_image`` only deletes one when no
+``scan_records`` row still references its URL
+(``ix_scan_records_image_url``).
+
+One race remains: a duplicate scan still being solved on another request
+has no row yet, so a delete that lands in that window removes an object
+the new row will reference. The history view then shows a missing image;
+the scan itself is unaffected.
+
+Both backends do their blocking I/O in worker threads:
+- ``R2Backend`` uses boto3 ``upload_fileobj`` with a ``TransferConfig``.
+  Objects above ``storage_multipart_threshold_mb`` go up as parallel
+  multipart parts.
+- ``LocalBackend`` writes chunks to ``storage_local_dir``. Tests and
+  local development use it as the stand-in for R2.
+
+``R2_ENDPOINT_URL`` points the S3 backend at any S3-compatible endpoint,
+such as a local MinIO (``http://localhost:9000``).
+"""
+import asyncio
+import hashlib
+import io
+import logging
 import os
-import shutil
-import uuid
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Optional
+from typing import BinaryIO, Optional
 
 import boto3
+from boto3.s3.transfer import TransferConfig
 from botocore.config import Config
-from fastapi import UploadFile
+from botocore.exceptions import ClientError
+from fastapi import HTTPException, UploadFile
+from sqlalchemy import func, select
 
 from app.config import get_settings
+from app.database import AsyncSessionLocal
+from app.models.scan_record import ScanRecord
+from app.services.image_preprocess import sniff_mime_type
 
+logger = logging.getLogger(__name__)
 settings = get_settings()
 
+_MB = 1024 * 1024
+_READ_CHUNK = _MB
+
+_EXTENSIONS = {"image/jpeg": "jpg", "image/png": "png", "image/webp": "webp", "image/gif": "gif"}
+
+
+@dataclass(frozen=True)
+class StoredObject:
+    url: str
+    key: str
+    sha256: str
+    size: int
+    content_type: str
+
+
+@dataclass(frozen=True)
+class UploadedImage:
+    """An upload read into memory, not yet stored."""
+
+    data: bytes
+    sha256: str
+    file_ext: str
+    content_type: str
+
+
+class StorageBackend(ABC):
+    """Where uploaded objects live."""
+
+    @abstractmethod
+    async def put(self, key: str, body: BinaryIO, size: int, content_type: str) -> str:
+        """Store ``body`` under ``key``; returns the URL saved on records."""
+
+    @abstractmethod
+    async def exists(self, key: str) -> bool:
+        """Whether an object is stored under ``key``."""
+
+    @abstractmethod
+    async def delete(self, url: str) -> bool:
+        """Delete the object behind a URL returned by ``put``."""
+
+    @abstractmethod
+    def url_for(self, key: str) -> str:
+        """The URL ``put`` returns for ``key``."""
+
+    @abstractmethod
+    def key_from_url(self, url: str) -> str:
+        """Inverse of ``url_for``."""
+
+
+class R2Backend(StorageBackend):
+    """S3-compatible object storage via boto3, run in worker threads."""
+
+    def __init__(self, client=None):
+        endpoint = settings.r2_endpoint_url or f"https://{settings.r2_account_id}.r2.cloudflarestorage.com"
+        self._endpoint = endpoint.rstrip("/")
+        self._bucket = settings.r2_bucket_name
+        self._s3 = client or boto3.client(
+            "s3",
+            endpoint_url=self._endpoint,
+            aws_access_key_id=settings.r2_access_key_id,
+            aws_secret_access_key=settings.r2_secret_access_key,
+            config=Config(
+                signature_version="s3v4",
+                max_pool_connections=max(10, settings.storage_max_concurrency * 2),
+            ),
+            region_name="auto",
+        )
+        self._transfer = TransferConfig(
+            multipart_threshold=settings.storage_multipart_threshold_mb * _MB,
+            multipart_chunksize=settings.storage_multipart_chunk_mb * _MB,
+            max_concurrency=settings.storage_max_concurrency,
+        )
+
+    async def put(self, key: str, body: BinaryIO, size: int, content_type: str) -> str:
+        await asyncio.to_thread(
+            self._s3.upload_fileobj,
+            body,
+            self._bucket,
+            key,
+            ExtraArgs={"ContentType": content_type},
+            Config=self._transfer,
+        )
+        return self.url_for(key)
+
+    async def exists(self, key: str) -> bool:
+        try:
+            await asyncio.to_thread(self._s3.head_object, Bucket=self._bucket, Key=key)
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return False
+            raise
+        return True
+
+    async def delete(self, url: str) -> bool:
+        await asyncio.to_thread(self._s3.delete_object, Bucket=self._bucket, Key=self.key_from_url(url))
+        return True
+
+    def url_for(self, key: str) -> str:
+        if settings.r2_public_url:
+            return f"{settings.r2_public_url.rstrip('/')}/{key}"
+        return f"{self._endpoint}/{self._bucket}/{key}"
+
+    def key_from_url(self, url: str) -> str:
+        """Extract the object key from a stored URL.
+
+        Upload produces two URL formats:
+          - Public:  {r2_public_url}/scans/<sha256>.jpg
+          - Direct:  {endpoint}/{bucket}/scans/<sha256>.jpg
+        """
+        public = settings.r2_public_url
+        if public and url.startswith(public.rstrip("/")):
+            return url[len(public.rstrip("/")) + 1:]
+
+        # Direct URL: everything after "{bucket}/"
+        marker = f"{self._bucket}/"
+        idx = url.find(marker)
+        if idx != -1:
+            return url[idx + len(marker):]
+
+        # Fallback: treat whole URL as key
+        return url
+
+
+class LocalBackend(StorageBackend):
+    """Local filesystem; the stored "URL" is the relative file path."""
+
+    def __init__(self, root: Optional[str] = None):
+        self._root = Path(root or settings.storage_local_dir)
+        self._root.mkdir(parents=True, exist_ok=True)
+
+    async def put(self, key: str, body: BinaryIO, size: int, content_type: str) -> str:
+        path = self._root / key
+        await asyncio.to_thread(self._write, path, body)
+        return str(path)
+
+    async def exists(self, key: str) -> bool:
+        return await asyncio.to_thread((self._root / key).exists)
+
+    def url_for(self, key: str) -> str:
+        return str(self._root / key)
+
+    def key_from_url(self, url: str) -> str:
+        try:
+            return Path(url).relative_to(self._root).as_posix()
+        except ValueError:
+            return url
+
+    @staticmethod
+    def _write(path: Path, body: BinaryIO) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(path.suffix + ".part")
+        with open(tmp, "wb") as out:
+            while chunk := body.read(_READ_CHUNK):
+                out.write(chunk)
+        os.replace(tmp, path)  # readers never see a half-written file
+
+    async def delete(self, url: str) -> bool:
+        path = Path(url)
+        if not await asyncio.to_thread(path.exists):
+            return False
+        await asyncio.to_thread(os.remove, path)
+        return True
+
+
+def default_backend() -> StorageBackend:
+    if settings.r2_access_key_id and settings.r2_secret_access_key:
+        return R2Backend()
+    return LocalBackend()
+
 
 class StorageService:
     """
@@ -20,91 +233,87 @@ class StorageService:
     Uses Cloudflare R2 when configured, falls back to local filesystem.
     """
 
-    def __init__(self):
-        self._s3 = None
-        self._use_r2 = bool(
-            settings.r2_access_key_id and settings.r2_secret_access_key
+    def __init__(self, backend: Optional[StorageBackend] = None):
+        self.backend = backend or default_backend()
+
+    async def read_upload(self, file: UploadFile) -> UploadedImage:
+        """Read ``file`` once, hashing as it goes (413 above ``storage_max_upload_mb``)."""
+        data, digest = await self._read_and_hash(file)
+        # From the bytes, not the filename: photo.JPG and photo.jpeg share a key.
+        content_type = sniff_mime_type(data)
+        return UploadedImage(
+            data=data, sha256=digest, file_ext=_EXTENSIONS[content_type], content_type=content_type,
         )
-        if self._use_r2:
-            self._s3 = boto3.client(
-                "s3",
-                endpoint_url=f"https://{settings.r2_account_id}.r2.cloudflarestorage.com",
-                aws_access_key_id=settings.r2_access_key_id,
-                aws_secret_access_key=settings.r2_secret_access_key,
-                config=Config(signature_version="s3v4"),
-                region_name="auto",
-            )
+
+    async def put_upload(self, upload: UploadedImage, folder: str = "scans") -> StoredObject:
+        """Store bytes returned by ``read_upload``, skipping the put for stored content."""
+        key = f"{folder}/{upload.sha256}.{upload.file_ext}"
+        if await self._exists(key):
+            url = self.backend.url_for(key)
         else:
-            self._upload_dir = Path("uploads")
-            self._upload_dir.mkdir(exist_ok=True)
+            url = await self.backend.put(key, io.BytesIO(upload.data), len(upload.data), upload.content_type)
+        return StoredObject(
+            url=url, key=key, sha256=upload.sha256, size=len(upload.data), content_type=upload.content_type,
+        )
+
+    async def store_upload(self, file: UploadFile, folder: str = "scans") -> tuple[StoredObject, bytes]:
+        """Read ``file`` once, store it, and return its record and bytes."""
+        upload = await self.read_upload(file)
+        return await self.put_upload(upload, folder), upload.data
 
     async def upload_image(
         self,
         file: UploadFile,
         folder: str = "scans",
     ) -> str:
-        file_ext = file.filename.split(".")[-1] if file.filename else "jpg"
-        key = f"{folder}/{uuid.uuid4()}.{file_ext}"
-
-        if self._use_r2:
-            content = await file.read()
-            self._s3.put_object(
-                Bucket=settings.r2_bucket_name,
-                Key=key,
-                Body=content,
-                ContentType=file.content_type or "image/jpeg",
-            )
-            if settings.r2_public_url:
-                return f"{settings.r2_public_url.rstrip('/')}/{key}"
-            return f"https://{settings.r2_account_id}.r2.cloudflarestorage.com/{settings.r2_bucket_name}/{key}"
-
-        # Local fallback
-        folder_path = self._upload_dir / folder
-        folder_path.mkdir(parents=True, exist_ok=True)
-        file_path = folder_path / key.split("/")[-1]
-        with open(file_path, "wb") as buf:
-            shutil.copyfileobj(file.file, buf)
-        return str(file_path)
+        stored, _ = await self.store_upload(file, folder)
+        return stored.url
 
     async def delete_image(self, url: str) -> bool:
-        """Delete an image from R2 or local filesystem.
+        """Delete an image no scan record references any more.
 
-        Extracts the object key from the stored URL and issues a delete.
+        Call after the referencing row is gone. Returns False when the
+        object is still referenced, missing, or the delete failed.
         """
         try:
-            if self._use_r2:
-                key = self._extract_r2_key(url)
-                self._s3.delete_object(
-                    Bucket=settings.r2_bucket_name,
-                    Key=key,
-                )
-                return True
-
-            path = Path(url)
-            if path.exists():
-                os.remove(path)
-                return True
-            return False
-        except Exception:
+            if await self.reference_count(url):
+                return False
+            return await self.backend.delete(url)
+        except Exception as e:
+            logger.warning("Storage delete failed for %s: %s", url, e)
             return False
 
     @staticmethod
-    def _extract_r2_key(url: str) -> str:
-        """Extract the R2 object key from a stored URL.
+    async def reference_count(url: str) -> int:
+        """Number of ``scan_records`` rows pointing at ``url``."""
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(func.count()).select_from(ScanRecord).where(ScanRecord.image_url == url)
+            )
+            return result.scalar_one()
 
-        Upload produces two URL formats:
-          - Public:  {r2_public_url}/scans/uuid.jpg
-          - Direct:  https://{account}.r2.cloudflarestorage.com/{bucket}/scans/uuid.jpg
-        """
-        public = settings.r2_public_url
-        if public and url.startswith(public.rstrip("/")):
-            return url[len(public.rstrip("/")) + 1:]
+    async def _exists(self, key: str) -> bool:
+        try:
+            return await self.backend.exists(key)
+        except Exception as e:
+            logger.warning("Storage existence check failed for %s, uploading: %s", key, e)
+            return False
 
-        # Direct URL: everything after "{bucket}/"
-        marker = f"{settings.r2_bucket_name}/"
-        idx = url.find(marker)
-        if idx != -1:
-            return url[idx + len(marker):]
+    @staticmethod
+    async def _read_and_hash(file: UploadFile) -> tuple[bytes, str]:
+        limit = settings.storage_max_upload_mb * _MB
+        digest = hashlib.sha256()
+        buf = bytearray()
+        await file.seek(0)
+        while chunk := await file.read(_READ_CHUNK):
+            digest.update(chunk)
+            buf += chunk
+            if len(buf) > limit:
+                raise HTTPException(
+                    status_code=413, detail=f"Image exceeds {settings.storage_max_upload_mb} MB",
+                )
+        return bytes(buf), digest.hexdigest()
 
-        # Fallback: treat whole URL as key
-        return url
+
+# Shared: one backend (and, for R2, one boto3 client) per process.
+storage_service = StorageService()
@@ -5,6 +5,9 @@ import logging
 import os
 import tempfile
 
+from app.core.cpu_executor import CPUTaskTimeout, cpu_executor
+from app.services.pdf_extract import render_first_page_png
+
 logger = logging.getLogger(__name__)
 
 
@@ -12,7 +15,8 @@ async def render_tikz_to_png(tikz_code: str) -> bytes | None:
     """Render a TikZ snippet to PNG bytes.
 
     Uses asyncio.create_subprocess_exec (safe, no shell injection) to run
-    pdflatex, then PyMuPDF to convert the resulting PDF to a PNG at 150 DPI.
+    pdflatex, then PyMuPDF (in the CPU executor's process pool) to convert
+    the resulting PDF to a PNG at 150 DPI.
 
     Returns None on any failure (missing pdflatex, compilation error, etc.).
     """
@@ -55,20 +59,12 @@ async def render_tikz_to_png(tikz_code: str) -> bytes | None:
             logger.warning("pdflatex produced no PDF output")
             return None
 
-        # Convert PDF to PNG using PyMuPDF
-        import fitz  # PyMuPDF
-
-        doc = fitz.open(pdf_path)
-        page = doc[0]
-        # 150 DPI: default is 72, so zoom = 150/72
-        zoom = 150 / 72
-        mat = fitz.Matrix(zoom, zoom)
-        pix = page.get_pixmap(matrix=mat)
-        png_bytes = pix.tobytes("png")
-        doc.close()
-
-        return png_bytes
+        # Convert PDF to PNG (150 DPI) using PyMuPDF, in the CPU process pool
+        return await cpu_executor.run_pdf(render_first_page_png, pdf_path, dpi=150)
 
+    except CPUTaskTimeout as e:
+        logger.warning("TikZ rasterization: %s", e)
+        return None
     except asyncio.TimeoutError:
         logger.warning("pdflatex timed out after 30s")
         return None
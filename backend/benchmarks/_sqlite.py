@@ -0,0 +1,38 @@
+"""SQLite helpers shared by the benchmarks.
+
+Lets benchmarks exercise real ORM code paths without Postgres. BigInteger
+primary keys are rendered as INTEGER so SQLite autoincrements them, and
+JSONB columns as SQLite JSON.
+"""
+from __future__ import annotations
+
+from sqlalchemy import BigInteger
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+from sqlalchemy.ext.compiler import compiles
+
+from app.database import Base
+
+
+@compiles(BigInteger, "sqlite")
+def _bigint_as_integer(type_, compiler, **kw):
+    return "INTEGER"
+
+
+@compiles(JSONB, "sqlite")
+def _jsonb_as_json(type_, compiler, **kw):
+    return "JSON"
+
+
+async def create_tables(engine: AsyncEngine, *models) -> None:
+    async with engine.begin() as conn:
+        await conn.run_sync(
+            Base.metadata.create_all, tables=[m.__table__ for m in models]
+        )
+
+
+def session_factory(engine: AsyncEngine) -> async_sessionmaker:
+    """Same session options as ``app.database.AsyncSessionLocal``."""
+    return async_sessionmaker(
+        engine, class_=AsyncSession, expire_on_commit=False, autoflush=False,
+    )
@@ -0,0 +1,111 @@
+"""Per-request auth overhead: uncached vs cached Clerk verification.
+
+Runs ``get_current_user`` against an in-memory SQLite users table with a
+locally generated RSA key standing in for Clerk's JWKS, so no network or
+Postgres is needed::
+
+    cd backend && python -m benchmarks.bench_auth [--iterations 2000]
+
+"cold" clears the token and user caches before every call (the old
+behaviour: signature check + user SELECT each time); "warm" is the
+steady state for a returning client.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import statistics
+import time
+from unittest.mock import MagicMock
+
+import jwt
+from cryptography.hazmat.primitives.asymmetric import rsa
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.core import auth_cache, security
+from app.database import Base
+from app.models.subscription_tier import SubscriptionTier
+from app.models.user import User
+
+KID = "bench-key"
+
+
+def _make_keys() -> tuple[object, dict]:
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    jwk = jwt.algorithms.RSAAlgorithm.to_jwk(private_key.public_key(), as_dict=True)
+    jwk.update({"kid": KID, "alg": "RS256", "use": "sig"})
+    return private_key, {"keys": [jwk]}
+
+
+def _request(token: str):
+    request = MagicMock()
+    request.headers = {"Authorization": f"Bearer {token}"}
+    return request
+
+
+async def _time(fn, iterations: int) -> list[float]:
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        await fn()
+        samples.append((time.perf_counter() - start) * 1e6)
+    return samples
+
+
+def _report(label: str, samples: list[float]) -> None:
+    samples = sorted(samples)
+    p99 = samples[int(len(samples) * 0.99) - 1]
+    print(
+        f"{label:<6} mean {statistics.fmean(samples):8.1f}us  "
+        f"p50 {statistics.median(samples):8.1f}us  p99 {p99:8.1f}us"
+    )
+
+
+async def main(iterations: int) -> None:
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(
+            Base.metadata.create_all,
+            tables=[SubscriptionTier.__table__, User.__table__],
+        )
+    Session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with Session() as db:
+        # BigInteger PKs don't autoincrement on SQLite — set ids explicitly.
+        db.add(SubscriptionTier(id=1, name="free", display_name="Free", is_default=True))
+        db.add(User(id=1, clerk_id="user_bench", email="bench@example.com", tier_id=1))
+        await db.commit()
+
+    private_key, jwks = _make_keys()
+    jwks_cache = auth_cache.JWKSCache("http://unused")
+    jwks_cache.load(jwks)
+    security.jwks_cache = jwks_cache
+
+    token = jwt.encode(
+        {"sub": "user_bench", "iat": int(time.time()), "exp": int(time.time()) + 3600},
+        private_key,
+        algorithm="RS256",
+        headers={"kid": KID},
+    )
+    request = _request(token)
+
+    async def cold():
+        auth_cache.token_cache.clear()
+        auth_cache.user_cache.clear()
+        async with Session() as db:
+            await security.get_current_user(request, db)
+
+    async def warm():
+        async with Session() as db:
+            await security.get_current_user(request, db)
+
+    await cold()  # warm up SQLAlchemy compiled caches
+    _report("cold", await _time(cold, iterations))
+    await warm()
+    _report("warm", await _time(warm, iterations))
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=2000)
+    asyncio.run(main(parser.parse_args().iterations))
@@ -0,0 +1,103 @@
+"""Event-loop responsiveness during exam PDF uploads: inline vs CPU executor.
+
+Generates a multi-page exam PDF with PyMuPDF. It then runs several
+concurrent "uploads" of ``pdf_extract.extract_exam`` while the loop-lag
+monitor and a stream of tiny "student requests" (one every ~5 ms) measure
+how responsive the loop stays::
+
+    cd backend && python -m benchmarks.bench_cpu_offload [--pages 24] [--uploads 4]
+
+"inline" calls the extraction directly in the coroutine, which is what the
+upload handlers did before. "executor" routes it through
+``cpu_executor.run_pdf`` (the process pool).
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import fitz
+
+from app.core.cpu_executor import CPUExecutor
+from app.observability.loop_lag import LoopLagMonitor
+from app.services import pdf_extract
+
+_NUMBERS = ["ONE", "TWO", "THREE", "FOUR", "FIVE"]
+
+
+def _exam_pdf(pages: int) -> bytes:
+    doc = fitz.open()
+    for p in range(pages):
+        page = doc.new_page()
+        if p == 0:
+            page.insert_text((72, 60), "Numeracy 2024", fontsize=16)
+        if p % 5 == 0:
+            page.insert_text((72, 100), f"QUESTION {_NUMBERS[(p // 5) % 5]}: SECTION {p // 5 + 1}")
+        for i, letter in enumerate("abcd"):
+            y = 150 + i * 160
+            page.insert_text((72, y), f"({letter}) Sub-question {letter} on page {p + 1}.")
+            for line in range(6):
+                page.insert_text((90, y + 18 + line * 16), "Working space and a table of values " * 2, fontsize=9)
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+async def _student_requests(stop: asyncio.Event, served: list[int]) -> None:
+    # One tiny request every ~5 ms; a blocked loop serves none.
+    while not stop.is_set():
+        await asyncio.sleep(0.005)
+        served[0] += 1
+
+
+async def _scenario(label: str, upload, pdf: bytes, uploads: int) -> None:
+    monitor = LoopLagMonitor(interval=0.01, warn_seconds=1e9, window=100_000)
+    stop = asyncio.Event()
+    served = [0]
+    monitor.start()
+    students = asyncio.create_task(_student_requests(stop, served))
+    await asyncio.sleep(0.05)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(upload(pdf) for _ in range(uploads)))
+    wall = time.perf_counter() - start
+
+    stop.set()
+    await students
+    await monitor.stop()
+    lags = sorted(x * 1000 for x in monitor.samples)
+    print(
+        f"{label:<9} uploads {wall:6.2f}s  loop lag p50 {statistics.median(lags):6.1f} ms  "
+        f"p99 {lags[int(len(lags) * 0.99) - 1]:7.1f} ms  max {lags[-1]:7.1f} ms  "
+        f"student requests served {served[0]}"
+    )
+
+
+async def main(pages: int, uploads: int) -> None:
+    pdf = _exam_pdf(pages)
+    print(f"{pages}-page exam PDF ({len(pdf) / 1e3:.0f} KB), {uploads} concurrent uploads")
+
+    async def inline(data: bytes):
+        return pdf_extract.extract_exam(data)
+
+    executor = CPUExecutor()
+    await executor.run_pdf(pdf_extract.extract_text, pdf)  # start the worker processes
+
+    async def offloaded(data: bytes):
+        return await executor.run_pdf(pdf_extract.extract_exam, data)
+
+    try:
+        await _scenario("inline", inline, pdf, uploads)
+        await _scenario("executor", offloaded, pdf, uploads)
+    finally:
+        executor.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=24)
+    parser.add_argument("--uploads", type=int, default=4)
+    args = parser.parse_args()
+    asyncio.run(main(args.pages, args.uploads))
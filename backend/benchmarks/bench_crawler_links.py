@@ -0,0 +1,186 @@
+"""NZQA page link extraction: regex window scans vs the single-pass tokenizer.
+
+Times ``ExamCrawlerService`` link discovery + classification (without the
+fetch) against a reconstruction of the previous flow. That flow ran a
+DOTALL ``<a ...>.*?</a>`` regex over the whole page. For every link with
+generic text it sliced a 350-char window, stripped tags and whitespace
+with two more regexes, then ran each classification pattern separately::
+
+    cd backend && python -m benchmarks.bench_crawler_links [--rows 400] [--repeat 20] [--page saved.html ...]
+
+With no ``--page`` it generates an NZQA-style index page: navigation
+chrome, then one table row per paper (year, event/week, language and
+document type in the first cell, a "PDF (1.2 MB)" link in the last).
+Pass pages saved from the site (e.g. ``curl -o numeracy.html <url>``) to
+measure those instead. Both flows must classify every link the same way;
+any differences are printed.
+"""
+from __future__ import annotations
+
+import argparse
+import re
+import time
+from pathlib import Path
+from urllib.parse import urljoin
+
+from app.services import exam_crawler_service as crawler_module
+from app.services.exam_crawler_service import ExamCrawlerService, extract_pdf_links
+
+_BASE_URL = "https://www2.nzqa.govt.nz/ncea/subjects/numeracy/"
+_DOCS = [
+    ("Assessment paper", "exm"),
+    ("Marking schedule", "ass"),
+    ("Assessment report", "rpt"),
+    ("Exemplar", "exemplar"),
+]
+_LANGUAGES = ["English", "Te Reo Māori", "Niuean"]
+
+
+def _page(rows: int) -> str:
+    nav = "".join(
+        f'<li class="nav-item"><a href="/ncea/subjects/{i}/">Subject {i}</a>'
+        f'<ul><li><a href="/ncea/subjects/{i}/resources/">Resources</a></li></ul></li>'
+        for i in range(120)
+    )
+    body = []
+    for i in range(rows):
+        year = 2020 + i % 6
+        event = i // 6 % 3 + 1
+        label, slug = _DOCS[i % len(_DOCS)]
+        language = _LANGUAGES[i // 24 % len(_LANGUAGES)]
+        week = f" Week {i % 2 + 1}" if i % 5 == 0 else ""
+        body.append(
+            f'<tr class="resource-row"><td class="resource-title"><span>{year} Event {event}{week}</span> '
+            f'<strong>{label}</strong> <em>{language}</em></td>'
+            f'<td class="resource-meta">32406</td>'
+            f'<td class="resource-link"><a class="btn btn-download" href="/assets/32406-{slug}-{year}-{i}.pdf" '
+            f'data-track="download">PDF ({1 + i % 9}.{i % 7} MB)</a></td></tr>'
+        )
+        if i % 10 == 0:
+            # Older rows link with descriptive text instead
+            body.append(
+                f'<tr><td colspan="3"><a href="/assets/archive-{i}.pdf">'
+                f'Numeracy {label.lower()} {year} ({language})</a></td></tr>'
+            )
+    return (
+        "<!DOCTYPE html><html><head><title>Numeracy resources</title>"
+        "<script>window.dataLayer = [];</script></head><body>"
+        f"<nav><ul>{nav}</ul></nav><main><h1>Numeracy</h1>"
+        f"<table class=\"resources\">{''.join(body)}</table></main>"
+        "<footer><p>&copy; NZQA</p></footer></body></html>"
+    )
+
+
+# --- Previous flow --------------------------------------------------------------
+
+
+def _old_classify(url: str, link_text: str, context_text: str):
+    combined = f"{context_text or link_text} {url}"
+    year_match = crawler_module.YEAR_RE.search(combined)
+    year = int(year_match.group(1)) if year_match else 0
+    pdf_type = "exam"
+    for ptype, pattern in crawler_module.PDF_TYPE_PATTERNS.items():
+        if pattern.search(combined):
+            pdf_type = ptype
+            break
+    if re.search(r"\b(assessment paper|exam)\b", combined, re.IGNORECASE):
+        pdf_type = "exam"
+    language = "unknown"
+    for lang, pattern in crawler_module.LANGUAGE_PATTERNS.items():
+        if pattern.search(combined):
+            language = lang
+            break
+    if language == "unknown" and crawler_module.MAORI_URL_RE.search(url):
+        language = "te_reo_maori"
+    if language == "unknown" and pdf_type in ("exam", "schedule"):
+        language = "english"
+    event = ""
+    event_match = crawler_module.EVENT_RE.search(combined)
+    week_match = crawler_module.WEEK_RE.search(combined)
+    if event_match:
+        event = f"event-{event_match.group(1)}"
+    if week_match:
+        event = f"{event}-week-{week_match.group(1)}" if event else f"week-{week_match.group(1)}"
+    exam_code = ""
+    code_match = crawler_module.EXAM_CODE_RE.search(url.split("/")[-1])
+    if code_match and code_match.group(1) in crawler_module.EXAM_CODE_MAP:
+        exam_code = code_match.group(1)
+    elif code_match:
+        for code in crawler_module.EXAM_CODE_MAP:
+            if code in combined:
+                exam_code = code
+                break
+    title = link_text
+    if (link_text.startswith("PDF") or link_text.startswith("(")) and context_text and len(context_text) > len(link_text):
+        clean = re.sub(r"PDF\s*\([^)]*\)", "", context_text).strip()
+        clean = re.sub(r"\([^)]*KB\)|\([^)]*MB\)", "", clean).strip()
+        clean = re.sub(r"\s+", " ", clean).strip()
+        if clean:
+            title = clean[:100]
+    if title.startswith("(") or title.startswith("PDF"):
+        if exam_code and year:
+            title = f"{exam_code} Exam {year}"
+    return (url, title, year, language, pdf_type, event, exam_code)
+
+
+def _old_discover(html: str) -> list[tuple]:
+    link_re = re.compile(r'<a\s[^>]*href="([^"]*\.pdf)"[^>]*>(.*?)</a>', re.IGNORECASE | re.DOTALL)
+    pdfs = []
+    for match in link_re.finditer(html):
+        link_text = re.sub(r"<[^>]+>", "", match.group(2)).strip()
+        context_text = link_text
+        if link_text.startswith("PDF") or len(link_text) < 20:
+            start = max(0, match.start() - 300)
+            end = min(len(html), match.end() + 50)
+            surrounding = re.sub(r"<[^>]+>", " ", html[start:end]).strip()
+            context_text = re.sub(r"\s+", " ", surrounding)
+        pdfs.append(_old_classify(urljoin(_BASE_URL, match.group(1)), link_text, context_text))
+    return pdfs
+
+
+# --- Current flow ---------------------------------------------------------------
+
+
+def _new_discover(html: str) -> list[tuple]:
+    crawler = ExamCrawlerService(downloader=object())
+    pdfs = []
+    for link in extract_pdf_links(html):
+        p = crawler._classify_pdf(urljoin(_BASE_URL, link.href), link.text, link.context)
+        pdfs.append((p.url, p.title, p.year, p.language, p.pdf_type, p.event, p.exam_code))
+    return pdfs
+
+
+def _time(fn, html: str, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(html)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=400, help="rows in the generated page")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--page", action="append", type=Path, help="saved HTML page(s) to use instead")
+    args = parser.parse_args()
+
+    pages = [(p.name, p.read_text(encoding="utf-8", errors="replace")) for p in args.page or []]
+    if not pages:
+        pages = [(f"generated ({args.rows} rows)", _page(args.rows))]
+
+    print(f"{'page':<28} {'KB':>7} {'links':>6} {'regex ms':>9} {'tokenizer ms':>13} {'speedup':>8}  diffs")
+    for name, html in pages:
+        old, new = _old_discover(html), _new_discover(html)
+        diffs = [(a, b) for a, b in zip(old, new) if a != b] + [(None, None)] * abs(len(old) - len(new))
+        old_s = _time(_old_discover, html, args.repeat)
+        new_s = _time(_new_discover, html, args.repeat)
+        print(f"{name:<28} {len(html) / 1024:>7.0f} {len(new):>6} {old_s * 1000:>9.1f} "
+              f"{new_s * 1000:>13.1f} {old_s / new_s:>7.1f}x  {len(diffs)}")
+        for a, b in diffs[:5]:
+            print(f"    regex:     {a}\n    tokenizer: {b}")
+
+
+if __name__ == "__main__":
+    main()
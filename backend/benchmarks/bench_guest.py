@@ -0,0 +1,89 @@
+"""ASGI-level cost of resolving the guest identity.
+
+Serves a minimal route behind ``get_current_or_guest_user`` through
+httpx's ASGI transport with an in-memory SQLite users table::
+
+    cd backend && python -m benchmarks.bench_guest [--requests 2000]
+
+"query" resolves the guest with a SELECT per request (the behaviour before
+the startup snapshot); "snapshot" uses the guest loaded by
+``load_guest_user``.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+from fastapi import Depends, FastAPI
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.api import deps
+from app.database import Base
+from app.models.subscription_tier import SubscriptionTier
+from app.models.user import User
+
+
+async def _run(client: httpx.AsyncClient, n: int) -> list[float]:
+    samples = []
+    for _ in range(n):
+        start = time.perf_counter()
+        resp = await client.get("/whoami")
+        samples.append((time.perf_counter() - start) * 1e6)
+        resp.raise_for_status()
+    return samples
+
+
+def _report(label: str, samples: list[float]) -> None:
+    samples = sorted(samples)
+    p99 = samples[int(len(samples) * 0.99) - 1]
+    print(
+        f"{label:<9} mean {statistics.fmean(samples):8.1f}us  "
+        f"p50 {statistics.median(samples):8.1f}us  p99 {p99:8.1f}us"
+    )
+
+
+async def main(n: int) -> None:
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(
+            Base.metadata.create_all,
+            tables=[SubscriptionTier.__table__, User.__table__],
+        )
+    Session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with Session() as db:
+        # BigInteger PKs don't autoincrement on SQLite — seed the guest row.
+        db.add(User(id=1, email=deps.GUEST_EMAIL, nickname="Guest", is_active=True))
+        await db.commit()
+
+    async def get_db():
+        async with Session() as session:
+            yield session
+
+    app = FastAPI()
+    app.dependency_overrides[deps.get_db] = get_db
+
+    @app.get("/whoami")
+    async def whoami(user: User = Depends(deps.get_current_or_guest_user)):
+        return {"id": user.id}
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        deps.reset_guest_user()
+        await _run(client, 50)  # warm up
+        _report("query", await _run(client, n))
+
+        await deps.load_guest_user(Session)
+        await _run(client, 50)
+        _report("snapshot", await _run(client, n))
+
+    deps.reset_guest_user()
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    asyncio.run(main(parser.parse_args().requests))
@@ -0,0 +1,102 @@
+"""OCR payload size and latency with and without image normalization.
+
+Generates phone-photo-sized worksheet images (12 MP, noisy, EXIF-rotated),
+then compares what the OCR path sends before and after
+``image_preprocess.normalize_for_ocr``::
+
+    cd backend && python -m benchmarks.bench_ocr_preprocess [--images 5] [--live]
+
+"before" is the old ``fix_orientation`` re-encode. "after" is the
+normalization stage. Both report the base64 payload that goes into the
+Gemini request and the CPU time to produce it. ``--live`` also times real
+Gemini Vision calls for both payloads (requires ``GOOGLE_API_KEY``, and
+costs a few requests).
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import base64
+import io
+import random
+import statistics
+import time
+
+from PIL import Image, ImageDraw, ImageFilter
+
+from app.services.image_preprocess import normalize_for_ocr
+from app.services.ocr_service import GeminiVisionOCRProvider, fix_orientation
+
+
+def _photo(seed: int, size=(4032, 3024)) -> bytes:
+    """A worksheet-like 12 MP JPEG stored sideways with EXIF orientation 6."""
+    rng = random.Random(seed)
+    img = Image.new("RGB", size, (235, 228, 210))
+    draw = ImageDraw.Draw(img)
+    y = 150
+    while y < size[1] - 150:
+        x = 200
+        while x < size[0] - 400:
+            w = rng.randint(60, 260)
+            draw.rectangle([x, y, x + w, y + 48], fill=(30, 30, 50))
+            x += w + rng.randint(40, 90)
+        y += rng.randint(110, 160)
+    # Sensor noise + a lighting gradient, so the JPEG is as heavy as a real photo.
+    noise = Image.effect_noise(size, 40).convert("RGB")
+    img = Image.blend(img, noise, 0.18).filter(ImageFilter.GaussianBlur(0.6))
+    img = img.transpose(Image.Transpose.ROTATE_90)
+    exif = Image.Exif()
+    exif[0x0112] = 6
+    buf = io.BytesIO()
+    img.save(buf, format="JPEG", quality=92, exif=exif)
+    return buf.getvalue()
+
+
+def _time_cpu(fn, data: bytes, repeat: int) -> tuple[bytes, list[float]]:
+    samples, out = [], b""
+    for _ in range(repeat):
+        start = time.perf_counter()
+        out = fn(data)
+        samples.append((time.perf_counter() - start) * 1000)
+    return out, samples
+
+
+def _report(label: str, sizes: list[int], cpu_ms: list[float], ocr_ms: list[float]) -> None:
+    line = (
+        f"{label:<7} payload mean {statistics.fmean(sizes) / 1e6:6.2f} MB (base64)  "
+        f"cpu p50 {statistics.median(cpu_ms):7.1f} ms  max {max(cpu_ms):7.1f} ms"
+    )
+    if ocr_ms:
+        line += f"  ocr p50 {statistics.median(ocr_ms):7.0f} ms"
+    print(line)
+
+
+async def main(n_images: int, repeat: int, live: bool) -> None:
+    photos = [_photo(i) for i in range(n_images)]
+    print(f"{n_images} photos, mean {statistics.fmean(len(p) for p in photos) / 1e6:.2f} MB raw JPEG")
+
+    variants = {
+        "before": fix_orientation,
+        "after": lambda data: normalize_for_ocr(data).data,
+    }
+    provider = GeminiVisionOCRProvider() if live else None
+    for label, fn in variants.items():
+        sizes, cpu, ocr = [], [], []
+        for photo in photos:
+            payload, samples = _time_cpu(fn, photo, repeat)
+            sizes.append(len(base64.b64encode(payload)))
+            cpu.extend(samples)
+            if provider is not None:
+                start = time.perf_counter()
+                await provider.extract_text(payload)
+                ocr.append((time.perf_counter() - start) * 1000)
+        _report(label, sizes, cpu, ocr)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--images", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--live", action="store_true", help="also time real Gemini Vision calls")
+    args = parser.parse_args()
+    asyncio.run(main(args.images, args.repeat, args.live))
@@ -0,0 +1,104 @@
+"""Question-crop rendering: sequential vs process-pool fan-out, PNG vs WebP.
+
+Generates a reading-literacy-style paper (several full-page passages per
+question, then (a)-(d) subs) and renders its crops three ways:
+
+    cd backend && python -m benchmarks.bench_pdf_crops [--questions 4] [--passages 4] [--workers 4] [--pdf exam.pdf]
+
+- ``sequential png``: ``extract_question_images`` in this process (the old path)
+- ``pool png`` / ``pool webp``: ``pdf_raster.render_question_crops`` over
+  a ``--workers`` process pool
+
+The speed-up is bounded by the cores available (printed first). WebP's gain
+is mostly in bytes, which every question-image response and DB row carries.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import io
+import os
+import time
+from pathlib import Path
+
+import fitz
+from PIL import Image, ImageDraw
+
+from app.config import get_settings
+from app.core.cpu_executor import CPUExecutor
+from app.services import pdf_extract, pdf_raster
+
+_NUMBERS = ["ONE", "TWO", "THREE", "FOUR", "FIVE"]
+_PROSE = (
+    "The river had carved the valley over thousands of years, and the town grew along its "
+    "banks as traders arrived with wool, timber and news from the coast. "
+)
+
+
+def _figure(seed: int) -> bytes:
+    img = Image.new("RGB", (900, 600), "white")
+    draw = ImageDraw.Draw(img)
+    for i in range(0, 900, 9):
+        draw.line([(i, 600), (900 - i, 0)], fill=((i + seed * 40) % 255, 120, 200), width=2)
+    buf = io.BytesIO()
+    img.save(buf, "PNG")
+    return buf.getvalue()
+
+
+def _reading_paper(questions: int, passages: int) -> bytes:
+    doc = fitz.open()
+    for q in range(questions):
+        for p in range(passages):
+            page = doc.new_page()
+            if p == 0:
+                page.insert_text((72, 80), f"QUESTION {_NUMBERS[q % 5]}: TEXT {q + 1}", fontsize=13)
+            for line in range(44):
+                page.insert_text((60, 110 + line * 15), _PROSE[(line * 7) % 60:][:95], fontsize=9)
+            if p % 2 == 1:
+                page.insert_image(fitz.Rect(320, 420, 540, 580), stream=_figure(q * passages + p))
+        page = doc.new_page()
+        for i, letter in enumerate("abcd"):
+            y = 100 + i * 180
+            page.insert_text((72, y), f"({letter}) Explain how the writer uses detail {letter}.")
+            for line in range(8):
+                page.insert_text((90, y + 20 + line * 16), "_" * 70, fontsize=9)
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+async def main(questions: int, passages: int, workers: int, pdf_path: str | None) -> None:
+    data = Path(pdf_path).read_bytes() if pdf_path else _reading_paper(questions, passages)
+    extraction = pdf_extract.extract_exam(data, with_crops=False)
+    jobs = extraction.crop_jobs
+    print(f"{len(jobs)} crops, {len(data) / 1e6:.1f} MB PDF, {os.cpu_count()} CPUs, pool of {workers}")
+
+    start = time.perf_counter()
+    with fitz.open(stream=data, filetype="pdf") as doc:
+        sequential = pdf_extract.extract_question_images(doc)
+    print(f"  sequential png  {time.perf_counter() - start:6.2f}s  {sum(map(len, sequential.values())) / 1e6:6.2f} MB")
+
+    get_settings().cpu_process_workers = workers
+    executor = CPUExecutor()
+    pdf_raster.cpu_executor = executor
+    pdf_raster.settings.pdf_crop_batches = workers
+    try:
+        # Start every worker before timing.
+        await asyncio.gather(*(executor.run_pdf(pdf_extract.extract_text, data) for _ in range(workers)))
+        for fmt in ("png", "webp"):
+            start = time.perf_counter()
+            images = await pdf_raster.render_question_crops(data, jobs, image_format=fmt)
+            elapsed = time.perf_counter() - start
+            print(f"  pool {fmt:<10} {elapsed:6.2f}s  {sum(map(len, images.values())) / 1e6:6.2f} MB")
+    finally:
+        executor.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--questions", type=int, default=4)
+    parser.add_argument("--passages", type=int, default=4)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--pdf", default=None, help="a real exam PDF instead of the generated one")
+    args = parser.parse_args()
+    asyncio.run(main(args.questions, args.passages, args.workers, args.pdf))
@@ -0,0 +1,164 @@
+"""Exam PDF extraction: per-extractor page walks vs single-pass page analysis.
+
+Times ``pdf_extract.extract_exam`` and measures its peak memory, against a
+reconstruction of the previous flow. In that flow the title, full-text,
+image and question-crop extractors each walked the document, and
+``get_text("dict")`` was called (with image blocks) for every page::
+
+    cd backend && python -m benchmarks.bench_pdf_extract [--pages 24] [--repeat 5] [--pdf exam.pdf ...]
+
+With no ``--pdf`` it generates an NZQA-style numeracy paper: QUESTION
+headers, (a)-(d) subs, a logo image repeated on every page, a diagram
+every few pages and "DO NOT WRITE IN THIS AREA" margins. Pass real exam
+PDFs to measure those instead.
+
+"analysis" is everything except rendering the question crops: title,
+text, embedded images and markers. Crop rendering is the same in both
+variants. Each variant runs in a fresh forked process, so the peak RSS
+figures are independent. Python-heap peaks come from ``tracemalloc``.
+"""
+from __future__ import annotations
+
+import argparse
+import io
+import multiprocessing
+import resource
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import fitz
+from PIL import Image, ImageDraw
+
+from app.services import pdf_extract
+
+_NUMBERS = ["ONE", "TWO", "THREE", "FOUR", "FIVE"]
+
+
+def _png(size: tuple[int, int], seed: int) -> bytes:
+    img = Image.new("RGB", size, "white")
+    draw = ImageDraw.Draw(img)
+    for i in range(0, size[0], 12):
+        draw.line([(i, 0), (size[0] - i, size[1])], fill=((i * 7 + seed) % 255, 90, 160), width=2)
+    buf = io.BytesIO()
+    img.save(buf, "PNG")
+    return buf.getvalue()
+
+
+def _exam_pdf(pages: int) -> bytes:
+    doc = fitz.open()
+    logo = _png((240, 80), 0)
+    logo_xref = 0
+    for p in range(pages):
+        page = doc.new_page()
+        if p == 0:
+            page.insert_text((72, 60), "Numeracy 2024", fontsize=16)
+        rect = fitz.Rect(440, 20, 560, 60)
+        if logo_xref:
+            page.insert_image(rect, xref=logo_xref)
+        else:
+            logo_xref = page.insert_image(rect, stream=logo)
+        if p % 5 == 0:
+            page.insert_text((72, 100), f"QUESTION {_NUMBERS[(p // 5) % 5]}: SECTION {p // 5 + 1}")
+        if p % 3 == 1:
+            page.insert_image(fitz.Rect(300, 120, 540, 300), stream=_png((600, 450), p))
+        for i, letter in enumerate("abcd"):
+            y = 150 + i * 160
+            page.insert_text((72, y), f"({letter}) Sub-question {letter} on page {p + 1}.")
+            for line in range(6):
+                page.insert_text((90, y + 18 + line * 16), "Working space and a table of values " * 2, fontsize=9)
+        page.insert_text((20, 820), "DO NOT WRITE IN THIS AREA", fontsize=8)
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+def _multi_pass(file_bytes: bytes, crops: bool = True) -> None:
+    """The previous flow: every extractor opens its own walk over the pages."""
+    doc = fitz.open(stream=file_bytes, filetype="pdf")
+    try:
+        title = "Exam Paper"
+        for _ in range(2):  # title: primary match, then the large-font fallback
+            for block in doc[0].get_text("dict")["blocks"]:
+                if block.get("type") == 0:
+                    for line in block["lines"]:
+                        text = "".join(s["text"] for s in line["spans"]).strip()
+                        if "Numeracy" in text:
+                            title = text
+        text_pages = [page.get_text("text") for page in doc]
+        page_images: dict[int, list[bytes]] = {}
+        for page in doc:
+            for img in page.get_images(full=True):
+                pix = fitz.Pixmap(doc, img[0])
+                if pix.n > 4:
+                    pix = fitz.Pixmap(fitz.csRGB, pix)
+                page_images.setdefault(page.number, []).append(pix.tobytes("png"))
+        for page in doc:  # marker scan (dict with image blocks)
+            page.get_text("dict")
+        if crops:
+            pdf_extract.extract_question_images(doc)
+    finally:
+        doc.close()
+
+
+def _single_pass(file_bytes: bytes, crops: bool = True) -> None:
+    if crops:
+        pdf_extract.extract_exam(file_bytes)
+        return
+    doc = fitz.open(stream=file_bytes, filetype="pdf")
+    try:
+        pages = pdf_extract.analyze_pages(doc)
+        pdf_extract.extract_title(pages)
+        pdf_extract.extract_full_text(pages)
+        pdf_extract.extract_all_images(doc, pages)
+        pdf_extract.find_markers(pages)
+    finally:
+        doc.close()
+
+
+def _best(fn, file_bytes: bytes, repeat: int, **kwargs) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(file_bytes, **kwargs)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _measure(variant: str, file_bytes: bytes, repeat: int) -> tuple[float, float, float, float]:
+    """Runs in a fresh process: (analysis s, total s, Python-heap peak MB, RSS growth MB)."""
+    fn = _multi_pass if variant == "multi-pass" else _single_pass
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    tracemalloc.start()
+    fn(file_bytes)
+    heap_peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    rss_growth = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before
+    analysis = _best(fn, file_bytes, repeat, crops=False)
+    total = _best(fn, file_bytes, repeat)
+    return analysis, total, heap_peak / 1e6, rss_growth / 1e3
+
+
+def main(pages: int, repeat: int, pdfs: list[str]) -> None:
+    inputs = [(p, Path(p).read_bytes()) for p in pdfs] or [(f"synthetic {pages}-page exam", _exam_pdf(pages))]
+    ctx = multiprocessing.get_context("fork")
+    for name, data in inputs:
+        with fitz.open(stream=data, filetype="pdf") as doc:
+            print(f"{name}: {len(doc)} pages, {len(data) / 1e3:.0f} KB")
+        for variant in ("multi-pass", "single-pass"):
+            with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as pool:
+                analysis, total, heap_mb, rss_mb = pool.submit(_measure, variant, data, repeat).result()
+            print(
+                f"  {variant:<12} analysis {analysis * 1000:7.1f} ms  with crops {total * 1000:7.1f} ms  "
+                f"python heap peak {heap_mb:5.1f} MB  peak RSS growth {rss_mb:5.1f} MB"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=24)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--pdf", nargs="*", default=[], help="real exam PDFs to measure instead")
+    args = parser.parse_args()
+    main(args.pages, args.repeat, args.pdf)
@@ -0,0 +1,106 @@
+"""Question-list endpoint latency with images in-row vs in practice_question_images.
+
+Seeds a SQLite file DB with one exam of ``--questions`` questions, each with
+a ``--image-kb`` image, then times ``list_questions_student`` and
+``list_questions_admin`` (one 50-question page)::
+
+    cd backend && python -m benchmarks.bench_question_list [--questions 120] [--image-kb 150] [--runs 20]
+
+- ``in-row``: images still in practice_questions.image_data and every
+  ``select(PracticeQuestion)`` loading them (the old model)
+- ``side table``: after ``scripts/migrate_question_images``; listings read
+  metadata only
+
+SQLite is in-process, so this understates the gain against Postgres, where
+the blobs also cross the network (and TOAST decompression is not free).
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.orm import undefer
+
+from app.api.v1 import exams
+from app.models.exam_paper import ExamPaper, PracticeQuestion, PracticeQuestionImage
+from benchmarks._sqlite import create_tables, session_factory
+from scripts.migrate_question_images import migrate_batch
+
+
+def _select_with_image_data(*entities):
+    query = select(*entities)
+    if len(entities) == 1 and entities[0] is PracticeQuestion:
+        query = query.options(undefer(PracticeQuestion.image_data))
+    return query
+
+
+async def _seed(sessions, questions: int, image_kb: int) -> int:
+    async with sessions() as db:
+        paper = ExamPaper(title="Reading 2024", year=2024, subject="english", exam_code="32403", paper_type="exam")
+        db.add(paper)
+        await db.flush()
+        for i in range(questions):
+            db.add(PracticeQuestion(
+                exam_paper_id=paper.id, question_number=str(i // 4 + 1), sub_question="abcd"[i % 4],
+                question_text=f"Explain how the writer uses detail {i}.", has_image=True,
+                image_data=os.urandom(image_kb * 1024), order_index=i,
+            ))
+        await db.commit()
+        return paper.id
+
+
+async def _time(sessions, exam_id: int, runs: int) -> dict[str, float]:
+    results = {}
+    for name, endpoint in (("student", exams.list_questions_student), ("admin", exams.list_questions_admin)):
+        samples = []
+        for _ in range(runs):
+            async with sessions() as db:
+                start = time.perf_counter()
+                await endpoint(exam_id, None, None, 1, 50, db)
+                samples.append(time.perf_counter() - start)
+        results[name] = statistics.median(samples) * 1000
+    return results
+
+
+async def main(questions: int, image_kb: int, runs: int) -> None:
+    path = Path(tempfile.mkdtemp()) / "questions.db"
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    await create_tables(engine, ExamPaper, PracticeQuestion, PracticeQuestionImage)
+    sessions = session_factory(engine)
+    try:
+        exam_id = await _seed(sessions, questions, image_kb)
+        print(f"{questions} questions x {image_kb} KB images, page of 50, median of {runs}")
+
+        with patch.object(exams, "select", _select_with_image_data):
+            before = await _time(sessions, exam_id, runs)
+
+        start = time.perf_counter()
+        async with sessions() as db:
+            while await migrate_batch(db, 100):
+                pass
+        migrated = time.perf_counter() - start
+
+        after = await _time(sessions, exam_id, runs)
+        for name in before:
+            print(f"  {name:<8} in-row {before[name]:7.1f} ms   side table {after[name]:7.1f} ms")
+        print(f"  migration: {migrated:.2f}s")
+    finally:
+        await engine.dispose()
+        path.unlink(missing_ok=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--questions", type=int, default=120)
+    parser.add_argument("--image-kb", type=int, default=150)
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(main(args.questions, args.image_kb, args.runs))
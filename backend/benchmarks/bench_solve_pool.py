@@ -0,0 +1,147 @@
+"""Load test: concurrent solves against a deliberately small DB pool.
+
+Runs ``ScanService.scan_and_solve`` end to end (pre-check, graph, persist)
+with the LangGraph pipeline replaced by a stub that sleeps for
+``--llm-latency`` seconds, on a SQLite file DB whose pool holds only
+``--pool-size`` connections::
+
+    cd backend && python -m benchmarks.bench_solve_pool [--solves 30]
+
+"held" disables the DB phase boundaries, reproducing the old behaviour of
+keeping the connection checked out across the LLM await; throughput is
+then capped at roughly pool_size / llm_latency. "phased" is the current
+code path.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import tempfile
+import time
+from datetime import date
+from pathlib import Path
+from unittest.mock import patch
+
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from app.models.conversation_message import ConversationMessage
+from app.models.daily_usage import DailyUsage
+from app.models.scan_record import ScanRecord
+from app.models.solution import Solution
+from app.models.subscription_tier import SubscriptionTier
+from app.models.user import User
+from app.services import scan_service as scan_service_module
+from app.services.embedding_service import EmbeddingService
+from app.services.scan_service import ScanService
+from app.services.subscription_service import SubscriptionService
+from benchmarks._sqlite import create_tables, session_factory
+
+
+class StubGraph:
+    """Stands in for ``solve_graph``: fixed latency, canned result."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    async def ainvoke(self, state: dict) -> dict:
+        await asyncio.sleep(self.latency)
+        return {
+            "ocr_text": state.get("input_text") or "",
+            "detected_subject": "math",
+            "final_solution": {
+                "question_type": "linear equation",
+                "steps": [{"step": 1, "description": "Subtract 3", "formula": "2x = 4"}],
+                "final_answer": "x = 2",
+            },
+            "solution_raw": "x = 2",
+            "llm_provider": "stub",
+            "llm_model": "stub",
+            "verify_passed": True,
+            "verify_confidence": 0.9,
+            "cache_layer": 4,
+        }
+
+
+async def _increment_usage_sqlite(self, user_id: int) -> None:
+    # Production uses a Postgres ON CONFLICT ON CONSTRAINT upsert.
+    stmt = sqlite_insert(DailyUsage).values(
+        user_id=user_id, usage_date=date.today(), question_count=1,
+    ).on_conflict_do_update(
+        index_elements=["user_id", "usage_date"],
+        set_={"question_count": DailyUsage.question_count + 1},
+    )
+    await self.db.execute(stmt)
+    await self.db.commit()
+
+
+async def _noop(*args, **kwargs) -> None:
+    return None
+
+
+def _drop_background(coro):
+    coro.close()
+
+
+async def _run(mode: str, solves: int, pool_size: int, latency: float) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_async_engine(
+            f"sqlite+aiosqlite:///{Path(tmp) / 'bench.db'}",
+            poolclass=AsyncAdaptedQueuePool,
+            pool_size=pool_size,
+            max_overflow=0,
+            pool_timeout=120,
+            connect_args={"timeout": 30},
+        )
+        await create_tables(
+            engine, SubscriptionTier, User, DailyUsage, ScanRecord, Solution, ConversationMessage,
+        )
+        Session = session_factory(engine)
+        async with Session() as db:
+            db.add(SubscriptionTier(id=1, name="pro", display_name="Pro", daily_question_limit=10_000))
+            db.add(User(id=1, email="bench@example.com", tier_id=1, is_active=True))
+            await db.commit()
+
+        async def solve(i: int) -> None:
+            async with Session() as db:
+                service = ScanService(db)
+                service._graph = StubGraph(latency)
+                await service.scan_and_solve(user_id=1, text=f"2x + 3 = 7 ({i})")
+
+        patches = [
+            patch.object(SubscriptionService, "increment_usage", _increment_usage_sqlite),
+            patch.object(EmbeddingService, "embed_scan_record", _noop),
+            patch.object(scan_service_module, "spawn_in_current_context", _drop_background),
+        ]
+        if mode == "held":
+            patches.append(patch.object(ScanService, "_end_db_phase", _noop))
+        for p in patches:
+            p.start()
+        try:
+            start = time.perf_counter()
+            await asyncio.gather(*(solve(i) for i in range(solves)))
+            elapsed = time.perf_counter() - start
+        finally:
+            for p in patches:
+                p.stop()
+            await engine.dispose()
+
+    print(
+        f"{mode:<7} {solves} solves, pool={pool_size}, llm={latency:.2f}s: "
+        f"{elapsed:6.2f}s total, {solves / elapsed:6.1f} solves/s "
+        f"(pool-bound ceiling {pool_size / latency:.1f}/s)"
+    )
+
+
+async def main(args) -> None:
+    for mode in ("held", "phased"):
+        await _run(mode, args.solves, args.pool_size, args.llm_latency)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--solves", type=int, default=30)
+    parser.add_argument("--pool-size", type=int, default=3)
+    parser.add_argument("--llm-latency", type=float, default=0.5)
+    asyncio.run(main(parser.parse_args()))
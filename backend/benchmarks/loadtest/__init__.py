@@ -0,0 +1,6 @@
+"""Offline load-test harness for the solve and grading paths.
+
+Drives the real FastAPI app in-process (httpx ASGI transport) against the
+Postgres+pgvector / Redis fixture in ``docker-compose.yml``, with the fake
+LLM, embedding and OCR providers from ``app/llm/fake.py``. See ``run.py``.
+"""
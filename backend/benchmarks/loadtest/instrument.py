@@ -0,0 +1,107 @@
+"""Measurement hooks: per-node timings and DB / Redis round-trip counts."""
+from __future__ import annotations
+
+import contextvars
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Any, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.tracers.context import register_configure_hook
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+
+class NodeTimer(BaseCallbackHandler):
+    """Records wall time of every LangGraph node run (by node name)."""
+
+    run_inline = True  # don't bounce every event through the default executor
+
+    def __init__(self):
+        self.samples: dict[str, list[float]] = defaultdict(list)
+        self.errors: dict[str, int] = defaultdict(int)
+        self._starts: dict[UUID, tuple[str, float]] = {}
+
+    def on_chain_start(
+        self,
+        serialized: Optional[dict[str, Any]],
+        inputs: Any,
+        *,
+        run_id: UUID,
+        metadata: Optional[dict[str, Any]] = None,
+        name: Optional[str] = None,
+        **kwargs: Any,
+    ) -> None:
+        node = (metadata or {}).get("langgraph_node")
+        if node and name == node:
+            self._starts[run_id] = (node, time.perf_counter())
+
+    def on_chain_end(self, outputs: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        start = self._starts.pop(run_id, None)
+        if start is not None:
+            self.samples[start[0]].append(time.perf_counter() - start[1])
+
+    def on_chain_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        start = self._starts.pop(run_id, None)
+        if start is not None:
+            self.errors[start[0]] += 1
+
+    def reset(self) -> None:
+        self.samples.clear()
+        self.errors.clear()
+        self._starts.clear()
+
+
+_node_timer_var: contextvars.ContextVar[Optional[NodeTimer]] = contextvars.ContextVar(
+    "loadtest_node_timer", default=None
+)
+# Every LangChain run started while the var is set gets the handler attached.
+register_configure_hook(_node_timer_var, inheritable=True)
+
+
+def install_node_timer() -> NodeTimer:
+    timer = NodeTimer()
+    _node_timer_var.set(timer)
+    return timer
+
+
+class RoundTripCounter:
+    """Counts SQL statements sent on ``engine`` and Redis commands issued."""
+
+    def __init__(self):
+        self.db = 0
+        self.redis = 0
+
+    def reset(self) -> None:
+        self.db = 0
+        self.redis = 0
+
+    @contextmanager
+    def attached(self, engine: AsyncEngine):
+        from redis.asyncio.client import Pipeline, Redis
+
+        def on_execute(*args, **kwargs):
+            self.db += 1
+
+        orig_command = Redis.execute_command
+        orig_pipeline = Pipeline.execute
+
+        async def execute_command(redis_self, *args, **kwargs):
+            self.redis += 1
+            return await orig_command(redis_self, *args, **kwargs)
+
+        async def pipeline_execute(pipe_self, *args, **kwargs):
+            self.redis += 1  # one round trip for the whole pipeline
+            return await orig_pipeline(pipe_self, *args, **kwargs)
+
+        event.listen(engine.sync_engine, "before_cursor_execute", on_execute)
+        Redis.execute_command = execute_command
+        Pipeline.execute = pipeline_execute
+        try:
+            yield self
+        finally:
+            event.remove(engine.sync_engine, "before_cursor_execute", on_execute)
+            Redis.execute_command = orig_command
+            Pipeline.execute = orig_pipeline
@@ -0,0 +1,139 @@
+"""Scenario results, percentile tables and baseline regression checks."""
+from __future__ import annotations
+
+import json
+import math
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Optional
+
+BASELINE_PATH = Path(__file__).with_name("baseline.json")
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    """Nearest-rank percentile; 0.0 for no samples."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def _summary_ms(samples: list[float]) -> dict[str, float]:
+    return {
+        "p50_ms": round(percentile(samples, 50) * 1000, 1),
+        "p95_ms": round(percentile(samples, 95) * 1000, 1),
+        "p99_ms": round(percentile(samples, 99) * 1000, 1),
+    }
+
+
+@dataclass
+class ScenarioResult:
+    name: str
+    requests: int
+    errors: int
+    elapsed_s: float
+    rps: float
+    latency: dict[str, float]
+    nodes: dict[str, dict[str, float]] = field(default_factory=dict)
+    db_round_trips_per_req: float = 0.0
+    redis_round_trips_per_req: float = 0.0
+
+    @classmethod
+    def build(
+        cls,
+        name: str,
+        latencies: list[float],
+        errors: int,
+        elapsed_s: float,
+        node_samples: dict[str, list[float]],
+        db_round_trips: int,
+        redis_round_trips: int,
+    ) -> "ScenarioResult":
+        n = len(latencies) + errors
+        return cls(
+            name=name,
+            requests=n,
+            errors=errors,
+            elapsed_s=round(elapsed_s, 3),
+            rps=round(len(latencies) / elapsed_s, 2) if elapsed_s > 0 else 0.0,
+            latency=_summary_ms(latencies),
+            nodes={
+                node: {"count": len(s), **_summary_ms(s)}
+                for node, s in sorted(node_samples.items())
+            },
+            db_round_trips_per_req=round(db_round_trips / n, 2) if n else 0.0,
+            redis_round_trips_per_req=round(redis_round_trips / n, 2) if n else 0.0,
+        )
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+def format_table(results: list[ScenarioResult]) -> str:
+    lines = [
+        f"{'scenario':<18}{'req':>6}{'err':>5}{'req/s':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'db/req':>8}{'redis/req':>10}",
+    ]
+    for r in results:
+        lines.append(
+            f"{r.name:<18}{r.requests:>6}{r.errors:>5}{r.rps:>9.1f}"
+            f"{r.latency['p50_ms']:>9.0f}{r.latency['p95_ms']:>9.0f}{r.latency['p99_ms']:>9.0f}"
+            f"{r.db_round_trips_per_req:>8.1f}{r.redis_round_trips_per_req:>10.1f}"
+        )
+        for node, s in r.nodes.items():
+            lines.append(
+                f"  {node:<16}{s['count']:>6}{'':>14}"
+                f"{s['p50_ms']:>9.0f}{s['p95_ms']:>9.0f}{s['p99_ms']:>9.0f}"
+            )
+    return "\n".join(lines)
+
+
+def baseline_entry(result: ScenarioResult) -> dict:
+    return {
+        "rps": result.rps,
+        "p95_ms": result.latency["p95_ms"],
+        "db_round_trips_per_req": result.db_round_trips_per_req,
+        "redis_round_trips_per_req": result.redis_round_trips_per_req,
+    }
+
+
+def save_baseline(results: list[ScenarioResult], run_config: dict, path: Path = BASELINE_PATH) -> None:
+    data = {
+        "config": run_config,
+        "scenarios": {r.name: baseline_entry(r) for r in results},
+    }
+    path.write_text(json.dumps(data, indent=2, sort_keys=True) + "\n")
+
+
+def load_baseline(path: Path = BASELINE_PATH) -> Optional[dict]:
+    if not path.exists():
+        return None
+    return json.loads(path.read_text())
+
+
+def compare_to_baseline(
+    results: list[ScenarioResult],
+    baseline: dict,
+    tolerance: float = 0.15,
+    round_trip_slack: float = 0.5,
+) -> list[str]:
+    """Return human-readable regressions (empty list = pass).
+
+    Throughput and p95 get a relative ``tolerance``; round-trip counts are
+    near-deterministic, so they only get ``round_trip_slack`` per request.
+    """
+    regressions = []
+    scenarios = baseline.get("scenarios", {})
+    for r in results:
+        base = scenarios.get(r.name)
+        if base is None:
+            continue
+        if r.rps < base["rps"] * (1 - tolerance):
+            regressions.append(f"{r.name}: req/s {r.rps} < baseline {base['rps']}")
+        if r.latency["p95_ms"] > base["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{r.name}: p95 {r.latency['p95_ms']}ms > baseline {base['p95_ms']}ms")
+        for key in ("db_round_trips_per_req", "redis_round_trips_per_req"):
+            current = getattr(r, key)
+            if current > base[key] + round_trip_slack:
+                regressions.append(f"{r.name}: {key} {current} > baseline {base[key]}")
+    return regressions
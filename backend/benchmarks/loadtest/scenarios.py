@@ -0,0 +1,124 @@
+"""Scripted load-test scenarios.
+
+Each scenario issues one logical user action per call against the in-process
+app; ``setup`` runs once before timing starts (warm caches, seed rows).
+"""
+from __future__ import annotations
+
+import random
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Optional
+
+import httpx
+
+API = "/api/v1"
+
+# Vocabulary for generating problems that don't resemble each other, so the
+# fake embeddings keep them out of the semantic cache (Layer-4 traffic).
+_WORDS = (
+    "train leaves station speed hours distance apples oranges basket price total "
+    "rectangle perimeter width length area triangle angle degrees circle radius "
+    "ladder wall height ground ratio mixture litres tank fills pipe minutes "
+    "interest rate years principal profit loss percent sequence term common "
+    "difference probability dice coins cards marbles red blue chosen random "
+    "population grows doubles bacteria culture velocity acceleration force mass "
+    "energy current voltage resistance charge wavelength frequency mirror lens"
+).split()
+
+_HOT_PROBLEMS = [
+    "Solve for x: 2x + 5 = 15",
+    "Find the area of a circle with radius 7 cm.",
+    "A car travels 150 km in 2.5 hours. What is its average speed?",
+    "Factorise x^2 - 5x + 6.",
+    "What is 15% of 240?",
+]
+
+
+@dataclass
+class ScenarioContext:
+    rng: random.Random
+    exam_paper_id: Optional[int] = None
+    state: dict = field(default_factory=dict)
+
+
+@dataclass
+class Scenario:
+    name: str
+    description: str
+    request: Callable[[httpx.AsyncClient, int, ScenarioContext], Awaitable[None]]
+    setup: Optional[Callable[[httpx.AsyncClient, ScenarioContext], Awaitable[None]]] = None
+
+
+def unique_problem(rng: random.Random) -> str:
+    words = " ".join(rng.choice(_WORDS) for _ in range(14))
+    return f"{words} {rng.randint(2, 99)} {rng.randint(100, 999)}?"
+
+
+async def _solve(client: httpx.AsyncClient, text: str) -> None:
+    resp = await client.post(f"{API}/scan/solve-guest", data={"text": text})
+    resp.raise_for_status()
+
+
+# -- cache_hit_heavy: 90% repeats of a few hot problems (Layer-1 hits) ---------
+
+async def _warm_hot_problems(client: httpx.AsyncClient, ctx: ScenarioContext) -> None:
+    for text in _HOT_PROBLEMS:
+        await _solve(client, text)
+
+
+async def _cache_hit_heavy(client: httpx.AsyncClient, i: int, ctx: ScenarioContext) -> None:
+    if ctx.rng.random() < 0.9:
+        await _solve(client, ctx.rng.choice(_HOT_PROBLEMS))
+    else:
+        await _solve(client, unique_problem(ctx.rng))
+
+
+# -- layer4_heavy: every problem is new (full analyze/solve/verify path) ------
+
+async def _layer4_heavy(client: httpx.AsyncClient, i: int, ctx: ScenarioContext) -> None:
+    await _solve(client, unique_problem(ctx.rng))
+
+
+# -- streaming: SSE solve, consumed to the final event -------------------------
+
+async def _streaming(client: httpx.AsyncClient, i: int, ctx: ScenarioContext) -> None:
+    async with client.stream(
+        "POST", f"{API}/scan/solve-guest-stream", data={"text": unique_problem(ctx.rng)},
+    ) as resp:
+        resp.raise_for_status()
+        async for line in resp.aiter_lines():
+            if line.startswith("event: error"):
+                raise RuntimeError("stream reported an error event")
+            if line.startswith("event: complete"):
+                return
+    raise RuntimeError("stream ended without a complete event")
+
+
+# -- exam_grading: start, answer and submit an explanation-question paper ------
+
+async def _exam_grading(client: httpx.AsyncClient, i: int, ctx: ScenarioContext) -> None:
+    resp = await client.post(
+        f"{API}/sessions/start",
+        json={"exam_paper_id": ctx.exam_paper_id, "mode": "practice"},
+    )
+    resp.raise_for_status()
+    session_id = resp.json()["id"]
+    for qid in ctx.state["question_ids"]:
+        resp = await client.put(
+            f"{API}/sessions/{session_id}/answers/{qid}",
+            json={"student_answer": f"Because the forces balance ({i})."},
+        )
+        resp.raise_for_status()
+    resp = await client.post(f"{API}/sessions/{session_id}/submit")
+    resp.raise_for_status()
+
+
+SCENARIOS: dict[str, Scenario] = {
+    s.name: s
+    for s in (
+        Scenario("cache_hit_heavy", "90% repeated problems, served from cache", _cache_hit_heavy, _warm_hot_problems),
+        Scenario("layer4_heavy", "unique problems, full solve pipeline", _layer4_heavy),
+        Scenario("streaming", "SSE solve consumed to completion", _streaming),
+        Scenario("exam_grading", "exam session with AI-graded answers", _exam_grading),
+    )
+}
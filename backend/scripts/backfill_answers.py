@@ -11,6 +11,7 @@ Usage:
 import asyncio
 import json
 import logging
+import os
 import re
 import sys
 
@@ -20,6 +21,7 @@ sys.path.insert(0, ".")
 
 from sqlalchemy import func, select  # noqa: E402
 
+os.environ.setdefault("DB_PROCESS_ROLE", "script")  # small pool; see app/database.py
 from app.database import AsyncSessionLocal  # noqa: E402
 from app.models.exam_paper import ExamPaper, PracticeQuestion  # noqa: E402
 from app.services.exam_crawler_service import ExamCrawlerService  # noqa: E402
@@ -9,12 +9,14 @@ Usage:
 
 import asyncio
 import logging
+import os
 import sys
 
 sys.path.insert(0, ".")
 
 from sqlalchemy import func, select  # noqa: E402
 
+os.environ.setdefault("DB_PROCESS_ROLE", "script")  # small pool; see app/database.py
 from app.database import AsyncSessionLocal  # noqa: E402
 from app.models.exam_paper import ExamPaper, PracticeQuestion  # noqa: E402
 
@@ -12,14 +12,16 @@ Usage (from backend/ directory):
 import argparse
 import asyncio
 import logging
+import os
 
 from sqlalchemy import select, update
 
-from app.database import AsyncSessionLocal
-from app.llm.embeddings import embed_texts
-from app.models.formula import Formula
-from app.models.knowledge_base import KnowledgeBase
-from app.models.scan_record import ScanRecord
+os.environ.setdefault("DB_PROCESS_ROLE", "script")  # small pool; see app/database.py
+from app.database import AsyncSessionLocal  # noqa: E402
+from app.llm.embeddings import embed_texts  # noqa: E402
+from app.models.formula import Formula  # noqa: E402
+from app.models.knowledge_base import KnowledgeBase  # noqa: E402
+from app.models.scan_record import ScanRecord  # noqa: E402
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
 log = logging.getLogger(__name__)
@@ -10,6 +10,7 @@ Usage:
 import asyncio
 import json
 import logging
+import os
 import sys
 
 sys.path.insert(0, ".")
@@ -17,6 +18,7 @@ sys.path.insert(0, ".")
 from sqlalchemy import select  # noqa: E402
 from langchain_core.messages import HumanMessage, SystemMessage  # noqa: E402
 
+os.environ.setdefault("DB_PROCESS_ROLE", "script")  # small pool; see app/database.py
 from app.database import AsyncSessionLocal  # noqa: E402
 from app.llm.registry import get_llm  # noqa: E402
 from app.models.exam_paper import ExamPaper, PracticeQuestion  # noqa: E402
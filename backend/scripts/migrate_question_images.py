@@ -0,0 +1,95 @@
+"""
+Move question images from practice_questions.image_data into
+practice_question_images.
+
+Each batch copies the blobs and clears the legacy column in one
+transaction, so the script can be stopped at any point and re-run: it picks
+up from the rows that still have image_data. Rows that already have a
+side-table image (e.g. re-cropped by reprocess_exam_images) only get the
+legacy column cleared.
+
+Usage (from backend/ directory):
+    python -m scripts.migrate_question_images                  # migrate everything
+    python -m scripts.migrate_question_images --batch-size 50  # smaller transactions
+    python -m scripts.migrate_question_images --limit 500      # stop after 500 rows
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+from typing import Optional
+
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+os.environ.setdefault("DB_PROCESS_ROLE", "script")  # small pool; see app/database.py
+from app.database import AsyncSessionLocal  # noqa: E402
+from app.models.exam_paper import PracticeQuestion, PracticeQuestionImage  # noqa: E402
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+log = logging.getLogger(__name__)
+
+
+async def migrate_batch(db: AsyncSession, batch_size: int) -> int:
+    """Move up to ``batch_size`` images and commit. Returns rows handled."""
+    rows = (await db.execute(
+        select(PracticeQuestion.id, PracticeQuestion.image_data)
+        .where(PracticeQuestion.image_data.isnot(None))
+        .order_by(PracticeQuestion.id)
+        .limit(batch_size)
+    )).all()
+    if not rows:
+        return 0
+
+    ids = [row.id for row in rows]
+    done = set((await db.execute(
+        select(PracticeQuestionImage.question_id).where(PracticeQuestionImage.question_id.in_(ids))
+    )).scalars())
+    db.add_all(
+        PracticeQuestionImage.from_bytes(row.image_data, question_id=row.id)
+        for row in rows if row.id not in done
+    )
+    await db.flush()
+    await db.execute(
+        update(PracticeQuestion)
+        .where(PracticeQuestion.id.in_(ids))
+        .values(
+            image_data=None,
+            has_image=True,
+            image_sha256=select(PracticeQuestionImage.sha256)
+            .where(PracticeQuestionImage.question_id == PracticeQuestion.id)
+            .scalar_subquery(),
+        )
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    return len(rows)
+
+
+async def migrate(batch_size: int, limit: Optional[int] = None) -> int:
+    total = 0
+    async with AsyncSessionLocal() as db:
+        remaining = (await db.execute(
+            select(func.count(PracticeQuestion.id)).where(PracticeQuestion.image_data.isnot(None))
+        )).scalar() or 0
+        log.info("%d question images left in practice_questions", remaining)
+
+        while limit is None or total < limit:
+            size = batch_size if limit is None else min(batch_size, limit - total)
+            moved = await migrate_batch(db, size)
+            if not moved:
+                break
+            total += moved
+            log.info("  %d / %d moved", total, remaining)
+
+    log.info("Done — %d images moved.", total)
+    return total
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Move question images out of practice_questions")
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--limit", type=int, default=None)
+    args = parser.parse_args()
+    asyncio.run(migrate(args.batch_size, args.limit))
@@ -0,0 +1,177 @@
+"""Tests for the Clerk auth fast-path caches."""
+import time
+from unittest.mock import AsyncMock, MagicMock
+
+import jwt
+import pytest
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+from app.core import auth_cache
+from app.core.auth_cache import (
+    JWKSCache,
+    UserSnapshot,
+    UserSnapshotCache,
+    VerifiedTokenCache,
+    decode_clerk_token,
+)
+from app.models.subscription_tier import SubscriptionTier
+from app.models.user import User
+
+
+@pytest.fixture(scope="module")
+def rsa_key():
+    return rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+
+def _jwks(private_key, kid="k1"):
+    jwk = jwt.algorithms.RSAAlgorithm.to_jwk(private_key.public_key(), as_dict=True)
+    jwk.update({"kid": kid, "alg": "RS256", "use": "sig"})
+    return {"keys": [jwk]}
+
+
+def _token(private_key, kid="k1", exp_in=3600, **claims):
+    now = int(time.time())
+    payload = {"sub": "user_1", "iat": now, "exp": now + exp_in, **claims}
+    return jwt.encode(payload, private_key, algorithm="RS256", headers={"kid": kid})
+
+
+@pytest.fixture(autouse=True)
+def _clear_caches():
+    auth_cache.token_cache.clear()
+    auth_cache.user_cache.clear()
+    yield
+    auth_cache.token_cache.clear()
+    auth_cache.user_cache.clear()
+
+
+def test_token_cache_is_bounded_lru():
+    cache = VerifiedTokenCache(max_size=2)
+    exp = time.time() + 60
+    cache.put("a", {"exp": exp})
+    cache.put("b", {"exp": exp})
+    assert cache.get("a") is not None  # a is now most recent
+    cache.put("c", {"exp": exp})
+
+    assert len(cache) == 2
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+
+
+def test_token_cache_honours_exp_and_skips_tokens_without_it():
+    cache = VerifiedTokenCache()
+    cache.put("expired", {"exp": time.time() - 1})
+    cache.put("no-exp", {"sub": "x"})
+    assert cache.get("expired") is None
+    assert cache.get("no-exp") is None
+
+
+@pytest.mark.asyncio
+async def test_decode_caches_verified_claims(rsa_key, monkeypatch):
+    jwks = JWKSCache("http://unused")
+    jwks.load(_jwks(rsa_key))
+    decode = MagicMock(wraps=jwt.decode)
+    monkeypatch.setattr(auth_cache.jwt, "decode", decode)
+    token = _token(rsa_key)
+
+    first = await decode_clerk_token(token, jwks)
+    second = await decode_clerk_token(token, jwks)
+
+    assert first["sub"] == second["sub"] == "user_1"
+    assert decode.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_decode_rejects_bad_signature_and_does_not_cache(rsa_key):
+    other = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    jwks = JWKSCache("http://unused")
+    jwks.load(_jwks(rsa_key))
+    forged = _token(other)
+
+    with pytest.raises(jwt.InvalidSignatureError):
+        await decode_clerk_token(forged, jwks)
+    assert len(auth_cache.token_cache) == 0
+
+
+@pytest.mark.asyncio
+async def test_unknown_kid_triggers_refetch(rsa_key):
+    jwks = JWKSCache("http://unused")
+    jwks.refresh = AsyncMock(side_effect=lambda: jwks.load(_jwks(rsa_key, kid="k2")))
+
+    key = await jwks.get_signing_key("k2")
+
+    assert key.key_id == "k2"
+    jwks.refresh.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_unknown_kid_refetch_is_rate_limited(rsa_key):
+    jwks = JWKSCache("http://unused")
+    jwks.load(_jwks(rsa_key))
+    jwks.refresh = AsyncMock()
+
+    with pytest.raises(jwt.InvalidTokenError):
+        await jwks.get_signing_key("rotated")
+    jwks.refresh.assert_not_awaited()
+
+
+def _user(tier=None, **overrides):
+    user = User(
+        id=7, clerk_id="user_1", email="a@example.com", role="user",
+        tier_id=tier.id if tier else None, is_active=True, **overrides,
+    )
+    user.tier = tier
+    return user
+
+
+def test_user_cache_ttl_and_invalidate():
+    cache = UserSnapshotCache(ttl_seconds=60)
+    cache.put("user_1", _user())
+    assert cache.get("user_1") is not None
+
+    cache.invalidate("user_1")
+    assert cache.get("user_1") is None
+
+    expired = UserSnapshotCache(ttl_seconds=0.000001)
+    expired.put("user_1", _user())
+    time.sleep(0.001)
+    assert expired.get("user_1") is None
+
+
+def test_user_cache_skips_user_with_unloaded_tier():
+    cache = UserSnapshotCache(ttl_seconds=60)
+    user = User(id=7, clerk_id="user_1", email="a@example.com", tier_id=3, is_active=True)
+    cache.put("user_1", user)
+    assert cache.get("user_1") is None
+
+
+@pytest.mark.asyncio
+async def test_snapshot_attach_rebuilds_user_with_tier():
+    tier = SubscriptionTier(id=3, name="pro", display_name="Pro", daily_question_limit=100)
+    snapshot = UserSnapshot.from_user(_user(tier=tier))
+    db = MagicMock()
+    db.merge = AsyncMock(side_effect=lambda obj, load: obj)
+
+    user = await snapshot.attach(db)
+
+    db.merge.assert_awaited_once()
+    assert db.merge.await_args.kwargs == {"load": False}
+    assert user.id == 7
+    assert user.tier.daily_question_limit == 100
+
+
+@pytest.mark.asyncio
+async def test_webhook_invalidates_user_snapshot(monkeypatch):
+    from app.api.v1 import webhooks
+
+    auth_cache.user_cache.put("user_1", _user())
+    monkeypatch.setattr(
+        webhooks, "_verify_webhook",
+        AsyncMock(return_value={"type": "user.deleted", "data": {"id": "user_1"}}),
+    )
+    db = MagicMock()
+    db.scalar = AsyncMock(return_value=None)
+    db.commit = AsyncMock()
+
+    await webhooks.handle_clerk_webhook(MagicMock(), db)
+
+    assert auth_cache.user_cache.get("user_1") is None
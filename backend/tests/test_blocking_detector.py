@@ -0,0 +1,79 @@
+"""Tests for the blocking-call detector."""
+import asyncio
+import subprocess
+import time
+
+import pytest
+
+from app.observability.blocking_detector import OTHER_SITE, BlockingDetector, _Block
+
+
+def _blocking_helper(seconds):
+    time.sleep(seconds)
+
+
+def _library_blocking_call():
+    subprocess.run(["sleep", "0.2"], check=True)
+
+
+async def _detect(fn, *args, threshold=0.05):
+    detector = BlockingDetector(threshold=threshold, check_interval=0.01)
+    detector.start()
+    await asyncio.sleep(0.05)
+    fn(*args)
+    await asyncio.sleep(0.1)
+    await detector.stop()
+    return detector.sites()
+
+
+@pytest.mark.asyncio
+async def test_attributes_block_to_calling_function():
+    sites = await _detect(_blocking_helper, 0.25)
+    assert len(sites) == 1
+    site = sites[0]
+    assert site["site"].startswith("tests.test_blocking_detector:_blocking_helper:")
+    assert site["count"] == 1
+    assert 200 <= site["total_ms"] <= 400
+    assert any("_detect" in frame for frame in site["last_stack"])
+
+
+@pytest.mark.asyncio
+async def test_library_frames_are_skipped_for_the_site():
+    sites = await _detect(_library_blocking_call)
+    assert sites[0]["site"].startswith("tests.test_blocking_detector:_library_blocking_call:")
+    # The innermost frame is inside the stdlib (subprocess / selectors).
+    assert not sites[0]["blocked_in"].startswith("tests.")
+
+
+@pytest.mark.asyncio
+async def test_short_stalls_are_ignored():
+    assert await _detect(_blocking_helper, 0.01, threshold=0.2) == []
+
+
+def test_site_cardinality_is_bounded():
+    detector = BlockingDetector(max_sites=2)
+    for i in range(4):
+        detector._record(_Block(beat=0.0, site=f"mod:f{i}:1", blocked_in="x", stack=[]), 0.1)
+    sites = {s["site"]: s for s in detector.sites()}
+    assert set(sites) == {"mod:f0:1", "mod:f1:1", OTHER_SITE}
+    assert sites[OTHER_SITE]["count"] == 2
+    detector.reset()
+    assert detector.sites() == []
+
+
+@pytest.mark.asyncio
+async def test_admin_endpoint_reports_sites(monkeypatch):
+    from app.api.v1 import admin
+
+    detector = BlockingDetector(threshold=0.05)
+    detector._record(_Block(beat=0.0, site="app.services.storage_service:upload:40", blocked_in="ssl:read:1", stack=[]), 0.3)
+    monkeypatch.setattr(admin, "blocking_detector", detector)
+
+    body = await admin.get_blocking_diagnostics(limit=10)
+    assert body["detector_enabled"] is False
+    assert body["threshold_ms"] == 50.0
+    assert body["sites"][0]["site"] == "app.services.storage_service:upload:40"
+    assert body["sites"][0]["max_ms"] == 300.0
+
+    await admin.reset_blocking_diagnostics()
+    assert detector.sites() == []
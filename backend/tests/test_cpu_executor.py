@@ -0,0 +1,138 @@
+"""Tests for the CPU executor, PDF extraction in the process pool and the loop-lag monitor."""
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import fitz
+import pytest
+
+from app.core.cpu_executor import CPUExecutor, CPUPool, CPUTaskTimeout, CPU_TASK_ERRORS
+from app.observability.loop_lag import LoopLagMonitor
+from app.services import pdf_extract
+
+
+def _thread_pool(max_pending=4, timeout=5.0, workers=2):
+    return CPUPool(
+        "test", lambda: ThreadPoolExecutor(max_workers=workers), max_pending=max_pending, timeout=timeout,
+    )
+
+
+def _exam_pdf() -> bytes:
+    doc = fitz.open()
+    page = doc.new_page()
+    page.insert_text((72, 60), "Numeracy 2024", fontsize=16)
+    page.insert_text((72, 120), "QUESTION ONE: SHOPPING")
+    page.insert_text((72, 200), "(a) How much change from $20?")
+    page.insert_text((72, 400), "(b) Which option is cheapest?")
+    page = doc.new_page()
+    page.insert_text((72, 120), "QUESTION TWO: TRAVEL")
+    page.insert_text((72, 200), "(a) How long does the trip take?")
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+@pytest.mark.asyncio
+async def test_run_returns_result_and_propagates_errors():
+    pool = _thread_pool()
+    try:
+        assert await pool.run(sum, [1, 2, 3]) == 6
+
+        def boom():
+            raise ValueError("bad page")
+
+        before = CPU_TASK_ERRORS.samples().get(("test", "boom"), 0)
+        with pytest.raises(ValueError):
+            await pool.run(boom)
+        assert CPU_TASK_ERRORS.samples()[("test", "boom")] == before + 1
+        assert pool.inflight == 0
+    finally:
+        pool.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_backlog_is_bounded_and_waiters_time_out():
+    pool = _thread_pool(max_pending=1, timeout=5.0)
+    release = threading.Event()
+    try:
+        first = asyncio.create_task(pool.run(release.wait, 5))
+        await asyncio.sleep(0.05)
+        assert pool.inflight == 1
+        # Only one slot: the second caller waits, then gives up.
+        with pytest.raises(CPUTaskTimeout):
+            await pool.run(sum, [1], timeout=0.1)
+        release.set()
+        assert await first is True
+        assert await pool.run(sum, [2]) == 2
+    finally:
+        release.set()
+        pool.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_running_task_timeout_keeps_slot_until_finished():
+    pool = _thread_pool(max_pending=1)
+    try:
+        with pytest.raises(CPUTaskTimeout):
+            await pool.run(time.sleep, 0.3, timeout=0.05)
+        assert pool.inflight == 1  # still running in the worker
+        await asyncio.sleep(0.4)
+        assert pool.inflight == 0
+    finally:
+        pool.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_pdf_extraction_runs_in_process_pool():
+    executor = CPUExecutor()
+    try:
+        extraction = await executor.run_pdf(pdf_extract.extract_exam, _exam_pdf())
+        assert extraction.title == "Numeracy 2024"
+        assert "--- Page 2 ---" in extraction.raw_text
+        assert set(extraction.question_images) == {"Q1_a", "Q1_b", "Q2_a"}
+        assert all(png.startswith(b"\x89PNG") for png in extraction.question_images.values())
+        text = await executor.run_pdf(pdf_extract.extract_text, _exam_pdf())
+        assert "How long does the trip take?" in text
+    finally:
+        executor.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_parse_exam_pdf_attaches_crops_from_worker():
+    from app.services import pdf_parser_service
+
+    llm = MagicMock()
+    llm.ainvoke = AsyncMock(return_value=MagicMock(content=(
+        '[{"question_number": "1", "sub_question": "a", "question_text": "Change?", "question_type": "numeric"},'
+        ' {"question_number": "2", "sub_question": "a", "question_text": "Trip?", "question_type": "numeric"}]'
+    )))
+    executor = CPUExecutor()
+    try:
+        with patch.object(pdf_parser_service, "get_llm", return_value=llm), \
+                patch.object(pdf_parser_service, "cpu_executor", executor):
+            parsed = await pdf_parser_service.PDFParserService().parse_exam_pdf(_exam_pdf())
+    finally:
+        executor.shutdown()
+    assert parsed.title == "Numeracy 2024"
+    assert [q.has_image for q in parsed.questions] == [True, True]
+
+
+@pytest.mark.asyncio
+async def test_loop_lag_monitor_sees_blocking_but_not_offloaded_work():
+    monitor = LoopLagMonitor(interval=0.01, warn_seconds=10)
+    monitor.start()
+    await asyncio.sleep(0.05)
+    time.sleep(0.2)  # blocks the loop, like an inline PDF parse
+    await asyncio.sleep(0.05)
+    assert monitor.max_lag >= 0.15
+
+    monitor.samples.clear()
+    pool = _thread_pool()
+    try:
+        await pool.run(time.sleep, 0.2)  # same work, off the loop
+    finally:
+        pool.shutdown()
+    await monitor.stop()
+    assert monitor.max_lag < 0.1
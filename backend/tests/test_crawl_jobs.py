@@ -0,0 +1,202 @@
+"""Tests for background crawl jobs: SSE progress, concurrency, cancel + resume."""
+import asyncio
+import json
+from unittest.mock import AsyncMock, patch
+
+import httpx
+import pytest
+import pytest_asyncio
+from fastapi import FastAPI
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.api.v1 import exams
+from app.core.security import require_admin
+from app.models.exam_paper import ExamPaper, PracticeQuestion, PracticeQuestionImage
+from app.schemas.exam import CrawlRequest
+from app.services import crawl_job_service
+from app.services.crawl_job_service import CrawlJob, CrawlJobManager
+from app.services.exam_crawler_service import CrawledPDF, ExamCrawlerService, ExamSchedulePair
+from app.services.pdf_parser_service import ParsedExam, ParsedSubQuestion, PDFParserService, ScheduleAnswer
+from benchmarks._sqlite import create_tables, session_factory
+
+_NAMES = ["a", "b", "c", "d", "e"]
+
+
+def _parsed(name: str) -> ParsedExam:
+    return ParsedExam(title=f"Paper {name}", raw_text=name, questions=[
+        ParsedSubQuestion(question_number="1", sub_question=s, text=f"{name} {s}", order_index=i)
+        for i, s in enumerate("ab")
+    ])
+
+
+class _Parser:
+    """parse_exam_pdf stand-in: tracks concurrency; papers in ``hold`` never
+    finish, papers in ``broken`` raise."""
+
+    def __init__(self):
+        self.active = self.peak = 0
+        self.hold: set[str] = set()
+        self.broken: set[str] = set()
+
+    async def __call__(self, data: bytes) -> ParsedExam:
+        name = data.decode()
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            await asyncio.sleep(0.01)
+            if name in self.hold:
+                await asyncio.Event().wait()
+            if name in self.broken:
+                raise ValueError(f"cannot parse {name}")
+            return _parsed(name)
+        finally:
+            self.active -= 1
+
+
+@pytest_asyncio.fixture
+async def api(tmp_path, monkeypatch):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'crawl.db'}")
+    await create_tables(engine, ExamPaper, PracticeQuestion, PracticeQuestionImage)
+    manager = CrawlJobManager(session_factory(engine))
+    monkeypatch.setattr(exams, "crawl_jobs", manager)
+    monkeypatch.setattr(crawl_job_service.settings, "crawler_save_batch_size", 1)
+
+    pdfs = [CrawledPDF(url=f"https://nzqa/{n}.pdf", title=f"Paper {n}", year=2024, language="english",
+                       pdf_type="exam") for n in _NAMES]
+    parser = _Parser()
+    app = FastAPI()
+    app.include_router(exams.router, prefix="/api/v1/exams")
+    app.dependency_overrides[require_admin] = lambda: None
+    with patch.object(ExamCrawlerService, "discover_pdfs", AsyncMock(return_value=pdfs)), \
+            patch.object(ExamCrawlerService, "filter_exam_pdfs", lambda self, p, language: p), \
+            patch.object(ExamCrawlerService, "pair_exams_with_schedules",
+                         lambda self, p: [ExamSchedulePair(exam=x) for x in p]), \
+            patch.object(ExamCrawlerService, "download_pdf",
+                         AsyncMock(side_effect=lambda url: url.rsplit("/", 1)[1][:-4].encode())), \
+            patch.object(PDFParserService, "parse_exam_pdf", AsyncMock(side_effect=parser.__call__)):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            client.parser = parser
+            yield client
+    await manager.shutdown()
+    await engine.dispose()
+
+
+def _events(body: str) -> list[tuple[int, str, dict]]:
+    events = []
+    for block in body.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines() if not line.startswith(":"))
+        events.append((int(fields["id"]), fields["event"], json.loads(fields["data"])))
+    return events
+
+
+async def _start(api, **body) -> dict:
+    response = await api.post("/api/v1/exams/crawl/jobs", json={"url": "https://nzqa/page", **body})
+    assert response.status_code == 202
+    return response.json()
+
+
+@pytest.mark.asyncio
+async def test_job_streams_per_paper_progress(api):
+    job = await _start(api, concurrency=2)
+    assert job["status"] in ("pending", "running") and job["concurrency"] == 2
+
+    stream = await api.get(f"/api/v1/exams/crawl/jobs/{job['id']}/events")
+    assert stream.headers["content-type"].startswith("text/event-stream")
+    events = _events(stream.text)
+
+    assert [seq for seq, _, _ in events] == list(range(1, len(events) + 1))
+    assert events[0][1] == "started" and events[-1][1] == "completed"
+    assert events[-1][2]["total_papers_imported"] == 5
+    for name in _NAMES:
+        url = f"https://nzqa/{name}.pdf"
+        types = [t for _, t, data in events if data.get("url") == url]
+        assert types == ["discovered", "downloaded", "parsed", "saved"]
+    assert api.parser.peak == 2
+
+    status = (await api.get(f"/api/v1/exams/crawl/jobs/{job['id']}")).json()
+    assert status["status"] == "completed"
+    assert status["progress"] == {"discovered": 5, "skipped": 0, "downloaded": 5, "parsed": 5,
+                                  "saved": 5, "paper_failed": 0}
+    assert status["result"]["total_questions_parsed"] == 10
+
+    # Reconnecting with Last-Event-ID replays only what came after
+    tail = await api.get(f"/api/v1/exams/crawl/jobs/{job['id']}/events",
+                         headers={"Last-Event-ID": str(len(events) - 1)})
+    assert [t for _, t, _ in _events(tail.text)] == ["completed"]
+
+
+@pytest.mark.asyncio
+async def test_cancelled_crawl_resumes_without_redoing_saved_papers(api):
+    api.parser.hold = {"d", "e"}
+    job = await _start(api, concurrency=1)
+    job_id = job["id"]
+    for _ in range(200):
+        status = (await api.get(f"/api/v1/exams/crawl/jobs/{job_id}")).json()
+        if status["progress"]["saved"] == 3:
+            break
+        await asyncio.sleep(0.01)
+
+    cancelled = await api.delete(f"/api/v1/exams/crawl/jobs/{job_id}")
+    assert cancelled.status_code == 200
+    events = _events((await api.get(f"/api/v1/exams/crawl/jobs/{job_id}/events")).text)
+    assert events[-1][1] == "cancelled"
+    assert (await api.delete(f"/api/v1/exams/crawl/jobs/{job_id}")).status_code == 409
+
+    api.parser.hold = set()
+    resumed = await api.post(f"/api/v1/exams/crawl/jobs/{job_id}/resume")
+    assert resumed.status_code == 202 and resumed.json()["resumed_from"] == job_id
+    new_id = resumed.json()["id"]
+    events = _events((await api.get(f"/api/v1/exams/crawl/jobs/{new_id}/events")).text)
+
+    assert {data["url"] for _, t, data in events if t == "skipped"} == {f"https://nzqa/{n}.pdf" for n in "abc"}
+    assert {data["url"] for _, t, data in events if t == "saved"} == {"https://nzqa/d.pdf", "https://nzqa/e.pdf"}
+    assert events[-1][2]["total_skipped"] == 3
+
+    listed = (await api.get("/api/v1/exams/crawl/jobs")).json()
+    assert [j["id"] for j in listed] == [new_id, job_id]
+    assert [j["status"] for j in listed] == ["completed", "cancelled"]
+    assert (await api.get("/api/v1/exams/crawl/jobs/nope")).status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_paper_failures_are_not_job_failures(api):
+    api.parser.broken = {"b"}
+    job = await _start(api)
+    events = _events((await api.get(f"/api/v1/exams/crawl/jobs/{job['id']}/events")).text)
+
+    assert [data["url"] for _, t, data in events if t == "paper_failed"] == ["https://nzqa/b.pdf"]
+    assert events[-1][1] == "completed" and len(events[-1][2]["failed"]) == 1
+    status = (await api.get(f"/api/v1/exams/crawl/jobs/{job['id']}")).json()
+    assert (status["progress"]["saved"], status["progress"]["paper_failed"]) == (4, 1)
+
+    # The job's own failure is its final event and touches no counter
+    failing = CrawlJob(CrawlRequest(url="https://nzqa/page"), concurrency=1)
+    failing.emit("paper_failed", url="https://nzqa/a.pdf", error="bad pdf")
+    failing.error = "database down"
+    failing.finish("failed")
+    assert [(e.type, e.data.get("error")) for e in failing.events] == [
+        ("paper_failed", "bad pdf"), ("failed", "database down"),
+    ]
+    assert failing.progress.paper_failed == 1 and failing.status == "failed"
+
+
+@pytest.mark.asyncio
+async def test_shared_schedule_is_downloaded_and_parsed_once(api):
+    schedule = CrawledPDF(url="https://nzqa/schedule.pdf", title="Schedule", year=2024, language="english",
+                          pdf_type="schedule")
+
+    async def parse_schedule(data: bytes):
+        await asyncio.sleep(0.02)  # every pair asks while the parse is in flight
+        return [ScheduleAnswer(question_number="1", sub_question="a", correct_answer="42")]
+
+    with patch.object(ExamCrawlerService, "pair_exams_with_schedules",
+                      lambda self, p: [ExamSchedulePair(exam=x, schedule=schedule) for x in p]), \
+            patch.object(PDFParserService, "parse_schedule_pdf", AsyncMock(side_effect=parse_schedule)) as parse:
+        job = await _start(api, concurrency=5)
+        events = _events((await api.get(f"/api/v1/exams/crawl/jobs/{job['id']}/events")).text)
+
+    assert parse.await_count == 1
+    downloads = [c.args[0] for c in ExamCrawlerService.download_pdf.await_args_list]
+    assert downloads.count(schedule.url) == 1
+    assert [data["answers"] for _, t, data in events if t == "parsed"] == [1] * 5
+    assert events[-1][1] == "completed" and events[-1][2]["errors"] == []
@@ -0,0 +1,80 @@
+"""Tests for the instrumented DB pool, request route context and metrics registry."""
+import httpx
+import pytest
+from fastapi import FastAPI
+from sqlalchemy import text
+
+from app import database
+from app.observability.metrics import MetricsRegistry
+from app.observability.request_context import (
+    NO_ROUTE,
+    RequestContextMiddleware,
+    current_route,
+)
+
+
+def test_histogram_counts_and_snapshot():
+    registry = MetricsRegistry()
+    hist = registry.histogram("x_seconds", "doc", ["route"], buckets=(0.1, 1.0))
+    hist.observe(0.05, route="/a")
+    hist.observe(0.5, route="/a")
+    hist.observe(5.0, route="/a")
+
+    (sample,) = hist.samples().values()
+    assert sample["buckets"] == [1, 2, 3]
+    assert sample["count"] == 3
+    assert registry.snapshot()["x_seconds"][0]["labels"] == {"route": "/a"}
+
+
+def test_metric_label_mismatch_is_dropped():
+    registry = MetricsRegistry()
+    counter = registry.counter("c_total", "doc", ["route"])
+    counter.inc(wrong="x")  # must not raise
+    assert counter.samples() == {}
+
+
+def test_registering_same_name_returns_existing_metric():
+    registry = MetricsRegistry()
+    assert registry.counter("c_total", "doc") is registry.counter("c_total", "doc")
+    with pytest.raises(ValueError):
+        registry.gauge("c_total", "doc")
+
+
+def test_role_profile_and_overrides(monkeypatch, tmp_path):
+    url = f"sqlite+aiosqlite:///{tmp_path / 'pool.db'}"
+    engine = database.create_engine_for_role("script", url=url)
+    assert isinstance(engine.pool, database.InstrumentedAsyncPool)
+    assert engine.pool.size() == database.POOL_PROFILES["script"]["pool_size"]
+
+    monkeypatch.setattr(database.settings, "db_pool_size", 7)
+    assert database.create_engine_for_role("script", url=url).pool.size() == 7
+
+
+@pytest.mark.asyncio
+async def test_checkouts_are_tagged_with_route_template(tmp_path):
+    engine = database.create_engine_for_role("api", url=f"sqlite+aiosqlite:///{tmp_path / 'pool.db'}")
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    async def read_item(item_id: int):
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+        return {"route": current_route()}
+
+    app.add_middleware(RequestContextMiddleware)
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://t") as client:
+        resp = await client.get("/items/3")
+    await engine.dispose()
+
+    assert resp.json() == {"route": "/items/{item_id}"}
+    waits = database.DB_POOL_WAIT.samples()
+    holds = database.DB_POOL_HOLD.samples()
+    assert waits[("/items/{item_id}",)]["count"] >= 1
+    assert holds[("/items/{item_id}",)]["count"] >= 1
+    assert current_route() == NO_ROUTE
+
+
+def test_pool_status_shape():
+    status = database.pool_status()
+    assert {"role", "size", "checked_out", "overflow", "metrics"} <= status.keys()
+    assert "db_pool_checkout_wait_seconds" in status["metrics"]
@@ -0,0 +1,106 @@
+"""Tests for NZQA page link extraction and PDF classification."""
+from itertools import product
+from unittest.mock import AsyncMock
+
+import pytest
+
+from app.services.exam_crawler_service import CLASSIFY_RE, ExamCrawlerService, extract_pdf_links
+from benchmarks.bench_crawler_links import _old_classify
+
+_PAGE = """<!DOCTYPE html>
+<html><head><script>var tpl = '<a href="/fake.pdf">PDF (1 MB)</a>';</script></head><body>
+<nav><ul><li><a href="/ncea/">NCEA</a><ul><li><a href="/ncea/subjects/">Subjects</a></ul></li></ul></nav>
+<!-- <a href="/old.pdf">PDF (2 MB)</a> -->
+<table>
+  <tr><td>2024 Event 1 <strong>Assessment paper</strong> English</td>
+      <td><a class="btn" href="/assets/32406-exm-2024.pdf">PDF (1.2 MB)</a></td>
+  <tr><td>2024 Event 1 Marking schedule English</td>
+      <td><a href='/assets/32406-ass-2024.pdf'><span>PDF</span> (300 KB)</a></td></tr>
+  <tr><td>2023 Week 2 Te Reo M&#257;ori Whakamatautau</td>
+      <td><a href="/assets/32406-mex-2023.pdf?">PDF (1 MB)</a> <a href="/assets/32406-mex-2023.PDF">PDF (1 MB)</a></td></tr>
+</table>
+<ul>
+  <li><a href="/assets/numeracy-report-2022.pdf">Numeracy assessment report 2022</a>
+  <li>Specification 2025 <a href="docs/spec&amp;notes.pdf">(84KB)</a>
+</ul>
+<p><a href="/assets/unclosed.pdf">PDF (9 MB)
+</body></html>"""
+
+
+def _crawler(page: str = _PAGE) -> ExamCrawlerService:
+    downloader = AsyncMock()
+    downloader.get_text.return_value = page
+    return ExamCrawlerService(downloader=downloader)
+
+
+def test_links_get_text_and_row_context():
+    links = {link.href: link for link in extract_pdf_links(_PAGE)}
+
+    # Scripts, comments, non-PDF links, hrefs not ending in .pdf and unclosed <a> are ignored
+    assert list(links) == [
+        "/assets/32406-exm-2024.pdf",
+        "/assets/32406-ass-2024.pdf",
+        "/assets/32406-mex-2023.PDF",
+        "/assets/numeracy-report-2022.pdf",
+        "docs/spec&notes.pdf",
+    ]
+    # Context stops at the row boundaries (the next row is a marking schedule)
+    exam = links["/assets/32406-exm-2024.pdf"]
+    assert (exam.text, exam.context) == ("PDF (1.2 MB)", "2024 Event 1 Assessment paper English PDF (1.2 MB)")
+    assert links["/assets/32406-ass-2024.pdf"].context == "2024 Event 1 Marking schedule English PDF (300 KB)"
+    assert links["/assets/32406-mex-2023.PDF"].context.startswith("2023 Week 2 Te Reo Māori")
+    # Descriptive link text is its own context; unclosed <li> rows end at the next <li>
+    report = links["/assets/numeracy-report-2022.pdf"]
+    assert report.context == report.text == "Numeracy assessment report 2022"
+    assert links["docs/spec&notes.pdf"].context == "Specification 2025 (84KB)"
+
+
+@pytest.mark.asyncio
+async def test_discover_classifies_each_pdf():
+    pdfs = await _crawler().discover_pdfs("https://www2.nzqa.govt.nz/ncea/subjects/numeracy/")
+    got = [(p.title, p.year, p.language, p.pdf_type, p.event, p.exam_code) for p in pdfs]
+
+    assert got == [
+        ("2024 Event 1 Assessment paper English", 2024, "english", "exam", "event-1", "32406"),
+        ("2024 Event 1 Marking schedule English", 2024, "english", "schedule", "event-1", "32406"),
+        ("2023 Week 2 Te Reo Māori Whakamatautau", 2023, "te_reo_maori", "exam", "week-2", "32406"),
+        ("Numeracy assessment report 2022", 2022, "unknown", "report", "", ""),
+        ("Specification 2025", 2025, "unknown", "specification", "", ""),
+    ]
+    assert pdfs[-1].url == "https://www2.nzqa.govt.nz/ncea/subjects/numeracy/docs/spec&notes.pdf"
+
+
+@pytest.mark.parametrize("text, group", [
+    ("2021", "year"), ("Event-2", "event"), ("week 1", "week"), ("Assessment Paper", "exam"), ("EXAM", "exam"),
+    ("Marking", "type_schedule"), ("schedule", "type_schedule"), ("Report", "type_report"),
+    ("exemplars", "type_exemplar"), ("Specifications", "type_specification"), ("English", "lang_english"),
+    ("Māori", "lang_te_reo_maori"), ("Maori", "lang_te_reo_maori"), ("Te Reo", "lang_te_reo_maori"),
+    ("Whakamatautau", "lang_te_reo_maori"), ("Rauemi", "lang_te_reo_maori"), ("Pāngarau", "lang_te_reo_maori"),
+    ("Cook Islands", "lang_cook_islands_maori"), ("Niuean", "lang_niuean"), ("Tokelauan", "lang_tokelauan"),
+])
+def test_every_pattern_passes_the_first_letter_filter(text, group):
+    match = CLASSIFY_RE.search(f"x {text} x")
+    assert match and match.lastgroup == group
+
+
+_FRAGMENTS = [
+    "event-2023", "Event 1", "week-2024", "Week 2 2021", "Exam", "Assessment paper", "Marking schedule",
+    "report", "Exemplar", "Specification", "English", "Te Reo Māori", "Cook Islands Māori", "Niuean",
+    "2022", "PDF (1 MB)",
+]
+_URLS = [
+    "https://www2.nzqa.govt.nz/assets/32406-exm-2023.pdf",
+    "https://www2.nzqa.govt.nz/assets/week-2022-event2.pdf",
+    "https://www2.nzqa.govt.nz/assets/91262-mex-2024.pdf",
+]
+
+
+def test_merged_patterns_classify_like_the_separate_ones():
+    # Overlapping hits ("event-2023": the event's digit starts the year) must
+    # not hide one another.
+    crawler = ExamCrawlerService(downloader=object())
+    for first, second, url in product(_FRAGMENTS, _FRAGMENTS, _URLS):
+        context = f"{first} {second}"
+        new = crawler._classify_pdf(url, context, context)
+        assert (new.url, new.title, new.year, new.language, new.pdf_type, new.event, new.exam_code) == \
+            _old_classify(url, context, context), (context, url)
@@ -0,0 +1,108 @@
+"""Tests for bulk ingestion of parsed exam papers."""
+from unittest.mock import AsyncMock, patch
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import event, func, select
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.api.v1 import exams
+from app.models.exam_paper import ExamPaper, PracticeQuestion, PracticeQuestionImage
+from app.schemas.exam import CrawlRequest
+from app.services.crawl_job_service import crawl_jobs
+from app.services.exam_crawler_service import CrawledPDF, ExamCrawlerService, ExamSchedulePair
+from app.services.exam_ingest_service import ExamIngestService, PaperToIngest
+from app.services.pdf_parser_service import ParsedExam, ParsedSubQuestion, PDFParserService, ScheduleAnswer
+from benchmarks._sqlite import create_tables, session_factory
+
+
+@pytest_asyncio.fixture
+async def db(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'ingest.db'}")
+    await create_tables(engine, ExamPaper, PracticeQuestion, PracticeQuestionImage)
+    statements: list[str] = []
+    event.listen(engine.sync_engine, "before_cursor_execute",
+                 lambda conn, cursor, sql, *args: statements.append(sql))
+    sessions = session_factory(engine)
+    async with sessions() as session:
+        session.statements = statements
+        session.sessions = sessions
+        yield session
+    await engine.dispose()
+
+
+def _parsed(title: str, subs: int, image_every: int = 2) -> ParsedExam:
+    return ParsedExam(title=title, raw_text=f"{title} text", questions=[
+        ParsedSubQuestion(
+            question_number="1", sub_question=chr(97 + i), text=f"{title} part {i}",
+            has_image=i % image_every == 0,
+            image_bytes=f"{title}-{i}".encode() if i % image_every == 0 else None,
+            order_index=i,
+        )
+        for i in range(subs)
+    ])
+
+
+def _paper(title: str, subs: int, url: str) -> PaperToIngest:
+    return PaperToIngest(
+        parsed=_parsed(title, subs), title=title, source_url=url, year=2024,
+        subject="numeracy", level=1, exam_code="32406", language="english",
+        answers={"1_a": ScheduleAnswer(question_number="1", sub_question="a", correct_answer="42")},
+    )
+
+
+@pytest.mark.asyncio
+async def test_batch_inserts_without_refreshes(db):
+    db.statements.clear()
+    ingested = await ExamIngestService(db).ingest([_paper("P1", 3, "u1"), _paper("P2", 40, "u2")])
+
+    # No refreshes or per-row lookups. (SQLite can't order RETURNING rows, so
+    # SQLAlchemy sends those INSERTs row by row here; Postgres batches them.)
+    assert not [sql for sql in db.statements if sql.lstrip().upper().startswith("SELECT")]
+    assert sum(sql.startswith("INSERT INTO practice_question_images") for sql in db.statements) == 1
+    assert [i.paper.title for i in ingested] == ["P1", "P2"]
+    assert [len(i.questions) for i in ingested] == [3, 40]
+    q = ingested[1].questions[4]
+    assert (q.exam_paper_id, q.question_text, q.order_index) == (ingested[1].paper.id, "P2 part 4", 4)
+    assert ingested[0].questions[0].correct_answer == "42"
+    assert ingested[1].questions[1].image_sha256 is None
+
+    image = await db.get(PracticeQuestionImage, q.id)
+    assert image.data == b"P2-4" and image.sha256 == q.image_sha256
+    assert (await db.execute(select(func.count()).select_from(PracticeQuestionImage))).scalar() == 22
+
+
+@pytest.mark.asyncio
+async def test_existing_source_urls_is_one_query(db):
+    await ExamIngestService(db).ingest([_paper("P1", 1, "u1"), _paper("P2", 1, "u2")])
+    db.statements.clear()
+
+    assert await ExamIngestService(db).existing_source_urls(["u2", "u3", "u1", "u2"]) == {"u1", "u2"}
+    assert len(db.statements) == 1
+
+
+@pytest.mark.asyncio
+async def test_crawl_saves_in_one_batch_and_isolates_a_bad_paper(db, monkeypatch):
+    pdfs = [CrawledPDF(url=f"https://nzqa/{n}.pdf", title=t, year=2024, language="english", pdf_type="exam")
+            for n, t in [("a", "Paper A"), ("b", "Paper B"), ("c", "Paper C"), ("old", "Old")]]
+    await ExamIngestService(db).ingest([_paper("Old", 1, "https://nzqa/old.pdf")])
+    pdfs[1].title = None  # parsed title is None too → NOT NULL violation for this paper only
+    monkeypatch.setattr(crawl_jobs, "session_factory", db.sessions)
+
+    async def parse(data):
+        return ParsedExam(title=None, raw_text="", questions=_parsed("x", 2).questions) if data == b"b" \
+            else _parsed(data.decode(), 2)
+
+    with patch.object(ExamCrawlerService, "discover_pdfs", AsyncMock(return_value=pdfs)), \
+            patch.object(ExamCrawlerService, "filter_exam_pdfs", lambda self, p, language: p), \
+            patch.object(ExamCrawlerService, "pair_exams_with_schedules",
+                         lambda self, p: [ExamSchedulePair(exam=x) for x in p]), \
+            patch.object(ExamCrawlerService, "download_pdf",
+                         AsyncMock(side_effect=lambda url: url.rsplit("/", 1)[1][:-4].encode())), \
+            patch.object(PDFParserService, "parse_exam_pdf", AsyncMock(side_effect=parse)):
+        response = await exams.crawl_exam_page(CrawlRequest(url="https://nzqa/page"))
+
+    assert response.total_skipped == 1
+    assert sorted(p.title for p in response.papers) == ["Paper A", "Paper C"]
+    assert response.total_questions_parsed == 4
+    assert len(response.failed) == 1 and "nzqa/b.pdf" in response.failed[0]
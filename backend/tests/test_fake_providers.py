@@ -0,0 +1,120 @@
+"""Tests for the offline fake providers and load-test report helpers."""
+import json
+import math
+
+import pytest
+from langchain_core.messages import HumanMessage
+
+from app.llm import fake
+from app.llm.fake import FakeChatModel, FakeProviderError, fake_embedding, fake_response
+from app.llm.prompts.analysis import build_analysis_messages
+from app.llm.prompts.verify import build_verify_messages
+
+
+@pytest.fixture(autouse=True)
+def _no_latency(monkeypatch):
+    monkeypatch.setattr(fake.get_settings(), "fake_llm_latency_scale", 0.0)
+    monkeypatch.setattr(fake.get_settings(), "fake_llm_failure_rate", 0.0)
+
+
+def _render(messages):
+    return "\n".join(str(m.content) for m in messages)
+
+
+def test_analysis_prompt_gets_analysis_json():
+    text = _render(build_analysis_messages("Solve 2x + 5 = 15"))
+    data = json.loads(fake_response(text))
+    assert {"subject", "problem_type", "difficulty", "knowledge_points"} <= data.keys()
+
+
+def test_verify_prompt_gets_verification_json():
+    text = _render(build_verify_messages("Solve 2x + 5 = 15", "x = 5", "Subtract 5, divide by 2"))
+    data = json.loads(fake_response(text))
+    assert data["is_correct"] is True
+    assert "independent_answer" in data
+
+
+def test_responses_are_deterministic():
+    prompt = 'Return JSON with "final_answer" for: 3x = 9'
+    assert fake_response(prompt) == fake_response(prompt)
+
+
+def test_grading_response_scores_every_question():
+    prompt = (
+        'Return [{"question_id": ...}]\n'
+        "Question 1 (ID: 11) Max Score: 2\nQuestion 2 (ID: 12) Max Score: 3"
+    )
+    data = json.loads(fake_response(prompt))
+    assert [(d["question_id"], d["score"]) for d in data] == [(11, 2.0), (12, 3.0)]
+
+
+@pytest.mark.asyncio
+async def test_chat_model_reports_usage():
+    llm = FakeChatModel(model="fake-fast")
+    msg = await llm.ainvoke([HumanMessage(content="hello")])
+    assert isinstance(msg.content, str)
+    assert msg.usage_metadata["total_tokens"] > 0
+
+
+@pytest.mark.asyncio
+async def test_chat_model_injects_failures():
+    llm = FakeChatModel(model="fake-fast", failure_rate=1.0)
+    with pytest.raises(FakeProviderError):
+        await llm.ainvoke([HumanMessage(content="hello")])
+
+
+def test_sample_latency_scales(monkeypatch):
+    monkeypatch.setattr(fake.get_settings(), "fake_llm_latency_scale", 0.5)
+    assert fake.sample_latency(2.0, sigma=0) == 1.0
+
+
+def _cos(a, b):
+    return sum(x * y for x, y in zip(a, b))
+
+
+def test_fake_embedding_geometry():
+    a = fake_embedding("Solve for x: 2x + 5 = 15")
+    b = fake_embedding("Solve for x: 2x + 5 = 17")
+    c = fake_embedding("Describe photosynthesis in plant cells")
+    assert len(a) == fake.FAKE_EMBEDDING_DIM
+    assert math.isclose(sum(v * v for v in a), 1.0, rel_tol=1e-9)
+    assert a == fake_embedding("Solve for x: 2x + 5 = 15")
+    assert _cos(a, b) > 0.8
+    assert _cos(a, c) < 0.3
+
+
+def test_get_llm_honours_provider_override(monkeypatch):
+    from app.llm import registry
+
+    monkeypatch.setattr(registry.get_settings(), "llm_provider_override", "fake")
+    llm = registry.get_llm("strong", "claude")
+    assert isinstance(llm, FakeChatModel)
+    assert llm.model == "fake-strong"
+
+
+def test_fake_provider_not_in_paid_rotation(monkeypatch):
+    from app.llm import registry
+
+    picked = []
+    monkeypatch.setattr(registry, "get_llm", lambda tier, provider: picked.append(provider))
+    for attempt in range(len(registry.LLM_REGISTRY) * 2):
+        registry.select_llm(preferred="claude", subject="math", attempt=attempt)
+    assert "fake" not in picked
+
+
+def test_report_percentile_and_baseline_check():
+    from benchmarks.loadtest.report import (
+        ScenarioResult, baseline_entry, compare_to_baseline, percentile,
+    )
+
+    assert percentile([], 50) == 0.0
+    assert percentile([1, 2, 3, 4], 50) == 2
+    assert percentile([1, 2, 3, 4], 99) == 4
+
+    base = ScenarioResult.build("s", [0.1] * 10, 0, 1.0, {}, 20, 10)
+    baseline = {"scenarios": {"s": baseline_entry(base)}}
+    assert compare_to_baseline([base], baseline) == []
+
+    slow = ScenarioResult.build("s", [0.2] * 10, 0, 2.0, {}, 40, 10)
+    regressions = compare_to_baseline([slow], baseline)
+    assert len(regressions) == 3  # req/s, p95, db round trips
@@ -0,0 +1,144 @@
+"""Tests for per-node graph metrics and the Prometheus exposition."""
+from typing import TypedDict
+
+import pytest
+from langchain_core.messages import HumanMessage
+from langgraph.graph import END, START, StateGraph
+
+from app.llm import fake
+from app.llm.fake import FakeChatModel
+from app.observability import graph_metrics as gm
+from app.observability.metrics import MetricsRegistry
+
+
+class _State(TypedDict, total=False):
+    subject: str
+    user_tier: str
+    detected_subject: str
+    cache_layer: int
+    attempt_count: int
+    reply: str
+
+
+def _count(hist, **labels):
+    key = tuple(str(labels[n]) for n in hist.labelnames)
+    return hist.samples().get(key, {"count": 0})["count"]
+
+
+def _value(counter, **labels):
+    key = tuple(str(labels[n]) for n in counter.labelnames)
+    return counter.samples().get(key, 0.0)
+
+
+def _build(name):
+    async def analyze(state):
+        return {"detected_subject": "physics", "cache_layer": 4}
+
+    async def solve(state):
+        llm = FakeChatModel(model="fake-fast", latency=0.0)
+        msg = await llm.ainvoke([HumanMessage(content="hi")])
+        return {"reply": msg.content, "attempt_count": state.get("attempt_count", 0) + 1}
+
+    graph = StateGraph(_State)
+    graph.add_node("analyze", analyze)
+    graph.add_node("solve", solve)
+    graph.add_edge(START, "analyze")
+    graph.add_edge("analyze", "solve")
+    graph.add_conditional_edges(
+        "solve", lambda s: "solve" if s["attempt_count"] < 2 else END, {"solve": "solve", END: END},
+    )
+    return graph.compile(name=name)
+
+
+@pytest.fixture(autouse=True)
+def _no_latency(monkeypatch):
+    monkeypatch.setattr(fake.get_settings(), "fake_llm_latency_scale", 0.0)
+
+
+@pytest.mark.asyncio
+async def test_node_durations_use_detected_subject_and_tier():
+    before = _count(gm.GRAPH_NODE_DURATION, graph="solve_graph", node="solve", subject="physics", tier="free")
+    before_retries = _value(gm.GRAPH_NODE_RETRIES, graph="solve_graph", node="solve")
+    before_layer = _value(gm.GRAPH_CACHE_LAYER, graph="solve_graph", layer=4, subject="physics", tier="free")
+
+    await _build("solve_graph").ainvoke({"subject": None, "user_tier": "free"})
+
+    assert _count(gm.GRAPH_NODE_DURATION, graph="solve_graph", node="solve", subject="physics", tier="free") == before + 2
+    assert _value(gm.GRAPH_NODE_RETRIES, graph="solve_graph", node="solve") == before_retries + 1
+    assert _value(gm.GRAPH_CACHE_LAYER, graph="solve_graph", layer=4, subject="physics", tier="free") == before_layer + 1
+
+
+@pytest.mark.asyncio
+async def test_llm_calls_record_provider_model_and_tokens():
+    labels = {"provider": "fake", "model": "fake-fast", "node": "solve"}
+    before = _count(gm.LLM_CALL_DURATION, **labels)
+    before_tokens = _value(gm.LLM_TOKENS, kind="completion", **labels)
+
+    await _build("solve_graph").ainvoke({"user_tier": "paid"})
+
+    assert _count(gm.LLM_CALL_DURATION, **labels) == before + 2
+    assert _value(gm.LLM_TOKENS, kind="completion", **labels) > before_tokens
+
+
+@pytest.mark.asyncio
+async def test_uninstrumented_graphs_are_ignored():
+    before = {k: v["count"] for k, v in gm.GRAPH_NODE_DURATION.samples().items()}
+    await _build("some_other_graph").ainvoke({"user_tier": "paid"})
+    after = {k: v["count"] for k, v in gm.GRAPH_NODE_DURATION.samples().items()}
+    assert before == after
+
+
+@pytest.mark.asyncio
+async def test_disabled_via_context_var():
+    token = gm.graph_metrics_var.set(None)
+    try:
+        before = _count(gm.GRAPH_NODE_DURATION, graph="solve_graph", node="analyze", subject="physics", tier="paid")
+        await _build("solve_graph").ainvoke({"user_tier": "paid"})
+        assert _count(gm.GRAPH_NODE_DURATION, graph="solve_graph", node="analyze", subject="physics", tier="paid") == before
+    finally:
+        gm.graph_metrics_var.reset(token)
+
+
+def test_label_clamping():
+    assert gm._subject_label("Physics") == "physics"
+    assert gm._subject_label("astrology") == "other"
+    assert gm._subject_label(None) == "unknown"
+    assert gm._tier_label("paid") == "paid"
+    assert gm._tier_label("enterprise") == "other"
+
+
+def test_prometheus_rendering():
+    registry = MetricsRegistry()
+    registry.counter("jobs_total", "Jobs", ["kind"]).inc(kind='a"b')
+    registry.histogram("latency_seconds", "Latency", ["node"], buckets=(0.1, 1.0)).observe(0.5, node="solve")
+    registry.gauge("in_use", "In use").set(3)
+
+    text = registry.render()
+
+    assert "# TYPE jobs_total counter" in text
+    assert 'jobs_total{kind="a\\"b"} 1' in text
+    assert 'latency_seconds_bucket{node="solve",le="0.1"} 0' in text
+    assert 'latency_seconds_bucket{node="solve",le="1"} 1' in text
+    assert 'latency_seconds_bucket{node="solve",le="+Inf"} 1' in text
+    assert 'latency_seconds_count{node="solve"} 1' in text
+    assert "in_use 3" in text
+    assert text.endswith("\n")
+
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint(monkeypatch):
+    import httpx
+
+    from app import main
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        resp = await client.get("/metrics")
+        assert resp.status_code == 200
+        assert resp.headers["content-type"].startswith("text/plain")
+        assert "# TYPE graph_node_duration_seconds histogram" in resp.text
+
+        monkeypatch.setattr(main.settings, "metrics_token", "s3cret")
+        assert (await client.get("/metrics")).status_code == 401
+        ok = await client.get("/metrics", headers={"Authorization": "Bearer s3cret"})
+        assert ok.status_code == 200
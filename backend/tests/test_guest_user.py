@@ -0,0 +1,108 @@
+"""Tests for the startup-resolved guest identity."""
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.api import deps
+from app.database import Base
+from app.models.subscription_tier import SubscriptionTier
+from app.models.user import User
+
+
+def _session_factory(db):
+    class _Ctx:
+        async def __aenter__(self):
+            return db
+
+        async def __aexit__(self, exc_type, exc, tb):
+            return False
+
+    return MagicMock(side_effect=lambda: _Ctx())
+
+
+@pytest.fixture(autouse=True)
+def _reset_guest():
+    deps.reset_guest_user()
+    yield
+    deps.reset_guest_user()
+
+
+def _merging_db():
+    db = MagicMock()
+    db.merge = AsyncMock(side_effect=lambda obj, load: obj)
+    db.execute = AsyncMock()
+    return db
+
+
+@pytest.mark.asyncio
+async def test_guest_resolved_without_db_after_startup_load():
+    guest = User(id=42, email=deps.GUEST_EMAIL, nickname="Guest", role="user", is_active=True)
+    loader_db = MagicMock()
+    result = MagicMock()
+    result.scalar_one_or_none = MagicMock(return_value=guest)
+    loader_db.execute = AsyncMock(return_value=result)
+    await deps.load_guest_user(_session_factory(loader_db))
+
+    db = _merging_db()
+    user = await deps.get_or_create_guest_user(db)
+
+    assert user.id == 42
+    assert user.email == deps.GUEST_EMAIL
+    assert user.tier is None
+    db.execute.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_guest_falls_back_to_query_before_load():
+    guest = User(id=42, email=deps.GUEST_EMAIL)
+    db = MagicMock()
+    result = MagicMock()
+    result.scalar_one_or_none = MagicMock(return_value=guest)
+    db.execute = AsyncMock(return_value=result)
+
+    assert await deps.get_or_create_guest_user(db) is guest
+    db.execute.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_unauthenticated_request_uses_cached_guest():
+    loader_db = MagicMock()
+    result = MagicMock()
+    result.scalar_one_or_none = MagicMock(
+        return_value=User(id=42, email=deps.GUEST_EMAIL, role="user", is_active=True)
+    )
+    loader_db.execute = AsyncMock(return_value=result)
+    await deps.load_guest_user(_session_factory(loader_db))
+
+    request = MagicMock()
+    request.headers = {}
+    db = _merging_db()
+    user = await deps.get_current_or_guest_user(request, db)
+
+    assert user.id == 42
+    db.execute.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_startup_snapshot_includes_the_guest_tier():
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(
+            Base.metadata.create_all,
+            tables=[SubscriptionTier.__table__, User.__table__],
+        )
+    Session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with Session() as db:
+        # BigInteger PKs don't autoincrement on SQLite — seed explicit ids.
+        db.add(SubscriptionTier(id=1, name="guest", display_name="Guest", daily_question_limit=3))
+        db.add(User(id=1, email=deps.GUEST_EMAIL, nickname="Guest", is_active=True, tier_id=1))
+        await db.commit()
+
+    await deps.load_guest_user(Session)
+    async with Session() as db:
+        user = await deps.get_or_create_guest_user(db)
+    await engine.dispose()
+
+    assert deps._guest_snapshot.tier is not None
+    assert user.tier.daily_question_limit == 3
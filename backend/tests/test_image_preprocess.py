@@ -0,0 +1,86 @@
+"""Tests for OCR image normalization."""
+import io
+from unittest.mock import AsyncMock
+
+import pytest
+from PIL import Image, ImageDraw
+
+from app.services.image_preprocess import normalize_for_ocr, sniff_mime_type
+
+
+def _jpeg(size=(2400, 1800), exif_orientation=None, quality=95):
+    img = Image.effect_noise(size, 60).convert("RGB")
+    ImageDraw.Draw(img).rectangle([0, 0, size[0] // 4, size[1] // 4], fill=(10, 10, 10))
+    buf = io.BytesIO()
+    kwargs = {"quality": quality}
+    if exif_orientation is not None:
+        exif = Image.Exif()
+        exif[0x0112] = exif_orientation
+        kwargs["exif"] = exif
+    img.save(buf, format="JPEG", **kwargs)
+    return buf.getvalue()
+
+
+def _open(data):
+    return Image.open(io.BytesIO(data))
+
+
+def test_downscales_to_max_side_and_grayscale():
+    out = normalize_for_ocr(_jpeg(), max_side=1200, max_bytes=10_000_000, grayscale=True)
+    img = _open(out.data)
+    assert max(img.size) == 1200
+    assert img.mode == "L"
+    assert out.mime_type == "image/jpeg"
+    assert (out.width, out.height) == img.size == (1200, 900)
+
+
+def test_fits_byte_budget_by_lowering_quality_then_size():
+    original = _jpeg()
+    out = normalize_for_ocr(original, max_side=2000, max_bytes=100_000)
+    assert len(out.data) <= 100_000
+    assert out.original_bytes == len(original)
+
+
+def test_applies_exif_orientation():
+    out = normalize_for_ocr(_jpeg(size=(3000, 2000), exif_orientation=6), max_side=900)
+    img = _open(out.data)
+    assert img.size == (600, 900)
+    assert img.getexif().get(0x0112, 1) == 1
+
+
+def test_webp_output():
+    out = normalize_for_ocr(_jpeg(), max_side=800, output_format="webp")
+    assert out.mime_type == "image/webp"
+    assert sniff_mime_type(out.data) == "image/webp"
+    assert _open(out.data).format == "WEBP"
+
+
+def test_small_image_is_passed_through():
+    buf = io.BytesIO()
+    Image.new("RGB", (300, 200), "white").save(buf, format="PNG")
+    png = buf.getvalue()
+    out = normalize_for_ocr(png, max_side=1600, max_bytes=400_000, grayscale=False)
+    assert out.data == png
+    assert out.mime_type == "image/png"
+
+
+def test_undecodable_bytes_are_passed_through():
+    out = normalize_for_ocr(b"not an image")
+    assert out.data == b"not an image"
+    assert out.mime_type == "image/jpeg"
+
+
+@pytest.mark.asyncio
+async def test_ocr_service_sends_normalized_image(monkeypatch):
+    from app.services import ocr_service
+
+    monkeypatch.setattr(ocr_service.settings, "ocr_cache_enabled", False)
+    monkeypatch.setattr(ocr_service.settings, "ocr_image_max_side", 1000)
+    service = ocr_service.OCRService(provider="mock")
+    service.provider.extract_text = AsyncMock(return_value="text")
+    original = _jpeg()
+
+    assert await service.extract_text(original) == "text"
+    sent = service.provider.extract_text.await_args.args[0]
+    assert len(sent) < len(original)
+    assert max(_open(sent).size) == 1000
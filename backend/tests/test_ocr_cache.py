@@ -0,0 +1,196 @@
+"""Tests for the perceptual-hash OCR cache."""
+import io
+import random
+from unittest.mock import AsyncMock
+
+import pytest
+from PIL import Image, ImageDraw
+
+from app.services import ocr_cache as oc
+from app.services.ocr_cache import BKTree, OCRFingerprintCache, fingerprint, hamming
+
+
+def _worksheet(lines, size=(1200, 1600), seed=0):
+    img = Image.new("RGB", size, "white")
+    draw = ImageDraw.Draw(img)
+    rng = random.Random(seed)
+    y = 80
+    for line in lines:
+        # Thick "text" bars so the layout survives downscaling.
+        x = 80
+        for word in line.split():
+            w = 30 * len(word)
+            draw.rectangle([x, y, x + w, y + 36], fill=(20, 20, 20))
+            x += w + 40 + rng.randint(0, 4)
+        y += 120
+    return img
+
+
+def _jpeg(img, quality=90, exif_orientation=None):
+    buf = io.BytesIO()
+    kwargs = {"quality": quality}
+    if exif_orientation is not None:
+        exif = Image.Exif()
+        exif[0x0112] = exif_orientation
+        kwargs["exif"] = exif
+    img.save(buf, format="JPEG", **kwargs)
+    return buf.getvalue()
+
+
+SHEET_A = ["Solve for x", "2x plus 5 equals 15", "Show all working", "Then check your answer"]
+SHEET_B = ["Find the area", "of a circle radius 3", "Give two decimal places", "Explain method", "Bonus"]
+
+
+class _FakeRedis:
+    """Just enough of redis.asyncio for the cache (hash + sorted set)."""
+
+    def __init__(self):
+        self.hashes, self.zsets = {}, {}
+
+    def pipeline(self, transaction=False):
+        return _Pipeline(self)
+
+    async def hset(self, key, field, value):
+        self.hashes.setdefault(key, {})[field] = value
+
+    async def hmget(self, key, fields):
+        h = self.hashes.get(key, {})
+        return [h.get(f) for f in fields]
+
+    async def hdel(self, key, *fields):
+        for f in fields:
+            self.hashes.get(key, {}).pop(f, None)
+
+    async def zadd(self, key, mapping):
+        self.zsets.setdefault(key, {}).update(mapping)
+
+    async def zcard(self, key):
+        return len(self.zsets.get(key, {}))
+
+    async def zrange(self, key, start, stop):
+        ordered = sorted(self.zsets.get(key, {}).items(), key=lambda kv: kv[1])
+        return [k for k, _ in ordered[start:stop + 1]]
+
+    async def zrem(self, key, *members):
+        for m in members:
+            self.zsets.get(key, {}).pop(m, None)
+
+    async def zrangebyscore(self, key, low, high, withscores=False):
+        exclusive = low.startswith("(")
+        low = float(low.lstrip("("))
+        items = sorted(self.zsets.get(key, {}).items(), key=lambda kv: kv[1])
+        return [(k, s) for k, s in items if (s > low if exclusive else s >= low)]
+
+
+class _Pipeline:
+    def __init__(self, redis):
+        self._redis, self._calls = redis, []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self._calls.append((name, args, kwargs))
+
+    async def execute(self):
+        return [await getattr(self._redis, n)(*a, **k) for n, a, k in self._calls]
+
+
+def test_bktree_matches_brute_force():
+    rng = random.Random(42)
+    keys = [rng.getrandbits(64) for _ in range(500)]
+    tree = BKTree()
+    for i, key in enumerate(keys):
+        tree.add(key, i)
+    assert len(tree) == len(set(keys))
+
+    for _ in range(20):
+        probe = keys[rng.randrange(len(keys))] ^ (1 << rng.randrange(64))
+        expected = sorted(hamming(probe, k) for k in set(keys) if hamming(probe, k) <= 20)
+        assert [d for d, _, _ in tree.search(probe, 20)] == expected
+
+
+def test_reencoded_photo_is_near_and_other_sheet_is_far():
+    a = _worksheet(SHEET_A)
+    fp_a = fingerprint(_jpeg(a, quality=95))
+    fp_a2 = fingerprint(_jpeg(a.resize((900, 1200)), quality=60))
+    fp_b = fingerprint(_jpeg(_worksheet(SHEET_B)))
+
+    assert fp_a.bits == 256
+    max_distance = oc._settings.ocr_cache_max_distance
+    assert hamming(fp_a.hash, fp_a2.hash) <= max_distance
+    assert hamming(fp_a.hash, fp_b.hash) > max_distance
+
+
+def test_exif_orientation_is_applied_before_hashing():
+    a = _worksheet(SHEET_A)
+    upright = fingerprint(_jpeg(a))
+    # Pixels stored rotated, with EXIF saying "rotate 90 CW to display".
+    stored_rotated = fingerprint(_jpeg(a.transpose(Image.Transpose.ROTATE_90), exif_orientation=6))
+    assert hamming(upright.hash, stored_rotated.hash) <= 12
+    assert stored_rotated.aspect == pytest.approx(upright.aspect, rel=0.01)
+
+
+@pytest.mark.asyncio
+async def test_lookup_store_and_sync_between_workers():
+    redis = _FakeRedis()
+    worker_1 = OCRFingerprintCache(redis=redis)
+    worker_2 = OCRFingerprintCache(redis=redis)
+
+    fp = fingerprint(_jpeg(_worksheet(SHEET_A)))
+    assert await worker_1.lookup(fp) is None
+    await worker_1.store(fp, "Solve for x: 2x + 5 = 15")
+
+    near = fingerprint(_jpeg(_worksheet(SHEET_A).resize((1000, 1333)), quality=70))
+    assert await worker_1.lookup(near) == "Solve for x: 2x + 5 = 15"
+    # Second worker has never seen it locally — pulls it from Redis.
+    assert await worker_2.lookup(near) == "Solve for x: 2x + 5 = 15"
+    assert await worker_2.lookup(fingerprint(_jpeg(_worksheet(SHEET_B)))) is None
+
+
+@pytest.mark.asyncio
+async def test_aspect_ratio_must_match():
+    cache = OCRFingerprintCache(redis=_FakeRedis())
+    fp = fingerprint(_jpeg(_worksheet(SHEET_A)))
+    await cache.store(fp, "text")
+    stretched = oc.ImageFingerprint(hash=fp.hash, bits=fp.bits, aspect=fp.aspect * 1.3)
+    assert cache.match(stretched) is None
+
+
+@pytest.mark.asyncio
+async def test_redis_failures_fail_open():
+    redis = _FakeRedis()
+    redis.zrangebyscore = AsyncMock(side_effect=ConnectionError("down"))
+    redis.zcard = AsyncMock(side_effect=ConnectionError("down"))
+    cache = OCRFingerprintCache(redis=redis)
+    fp = fingerprint(_jpeg(_worksheet(SHEET_A)))
+    assert await cache.lookup(fp) is None
+    await cache.store(fp, "text")  # must not raise
+    assert await cache.lookup(fp) == "text"  # still served from memory
+
+
+@pytest.mark.asyncio
+async def test_ocr_service_skips_provider_on_near_duplicate(monkeypatch):
+    from app.services import ocr_service
+
+    monkeypatch.setattr(ocr_service, "ocr_cache", OCRFingerprintCache(redis=_FakeRedis()))
+    service = ocr_service.OCRService(provider="mock")
+    service.provider.extract_text = AsyncMock(return_value="Solve for x: 2x + 5 = 15")
+
+    first = await service.extract_text(_jpeg(_worksheet(SHEET_A), quality=92))
+    second = await service.extract_text(_jpeg(_worksheet(SHEET_A), quality=75))
+
+    assert first == second == "Solve for x: 2x + 5 = 15"
+    service.provider.extract_text.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_ocr_service_handles_non_image_bytes(monkeypatch):
+    from app.services import ocr_service
+
+    monkeypatch.setattr(ocr_service, "ocr_cache", OCRFingerprintCache(redis=_FakeRedis()))
+    service = ocr_service.OCRService(provider="mock")
+    assert "2x + 5" in await service.extract_text(b"not an image")
@@ -0,0 +1,148 @@
+"""Tests for the content-addressed PDF parse cache."""
+import fnmatch
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from app.services import parse_cache as pc
+from app.services import pdf_parser_service as pps
+from app.services.pdf_extract import ExamExtraction
+from app.services.pdf_parser_service import ParsedSubQuestion, PDFParserService, ScheduleAnswer
+
+
+class _FakeRedis:
+    """Just enough of a binary redis.asyncio client (strings + hashes)."""
+
+    def __init__(self):
+        self.data = {}
+
+    async def get(self, key):
+        value = self.data.get(key)
+        return value.encode() if isinstance(value, str) else value
+
+    async def set(self, key, value, ex=None):
+        self.data[key] = value
+
+    async def hgetall(self, key):
+        return {k.encode(): v for k, v in self.data.get(key, {}).items()}
+
+    async def delete(self, *keys):
+        return sum(self.data.pop(k, None) is not None for k in keys)
+
+    async def scan_iter(self, match, count=None):
+        for key in [k for k in self.data if fnmatch.fnmatch(k, match)]:
+            yield key
+
+    def pipeline(self, transaction=True):
+        return _Pipeline(self)
+
+
+class _Pipeline:
+    def __init__(self, redis):
+        self.redis, self.ops = redis, []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def delete(self, key):
+        self.ops.append(lambda: self.redis.data.pop(key, None))
+
+    def hset(self, key, mapping):
+        self.ops.append(lambda: self.redis.data.setdefault(key, {}).update(mapping))
+
+    def expire(self, key, ttl):
+        pass
+
+    async def execute(self):
+        for op in self.ops:
+            op()
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = pc.PDFParseCache(redis=_FakeRedis())
+    monkeypatch.setattr(pps, "parse_cache", cache)
+    monkeypatch.setattr(pc._settings, "pdf_parse_cache_enabled", True)
+    return cache
+
+
+def _extraction() -> ExamExtraction:
+    return ExamExtraction(title="Numeracy 2024", raw_text="QUESTION ONE\n(a) Add.\n(b) Subtract.")
+
+
+async def _parse(file_bytes, crops):
+    run_pdf = AsyncMock(return_value=_extraction())
+    render = AsyncMock(return_value=crops)
+    llm_items = [
+        ParsedSubQuestion(question_number="1", sub_question="a", text="Add.", order_index=0),
+        ParsedSubQuestion(question_number="1", sub_question="b", text="Subtract.", order_index=1),
+    ]
+    ai = AsyncMock(return_value=llm_items)
+    with patch.object(pps.cpu_executor, "run_pdf", run_pdf), \
+            patch.object(pps.pdf_raster, "render_question_crops", render), \
+            patch.object(PDFParserService, "_ai_parse_questions", ai):
+        parsed = await PDFParserService().parse_exam_pdf(file_bytes)
+    return parsed, run_pdf.await_count + render.await_count + ai.await_count
+
+
+@pytest.mark.asyncio
+async def test_unchanged_exam_pdf_skips_pymupdf_and_llm(cache):
+    crops = {"Q1_passage_0": b"png-p", "Q1_a": b"png-a", "Q1_b": b"png-b"}
+
+    first, work = await _parse(b"%PDF exam", crops)
+    assert work == 3
+    second, work = await _parse(b"%PDF exam", crops)
+
+    assert work == 0
+    assert second == first
+    assert [q.image_bytes for q in second.questions] == [b"png-p", b"png-a", b"png-b"]
+    assert [q.image_key for q in second.questions] == ["Q1_passage_0", "Q1_a", "Q1_b"]
+
+    _, work = await _parse(b"%PDF other exam", crops)
+    assert work == 3
+
+
+def test_cached_exam_keeps_images_whose_bytes_were_copied():
+    # The crop is found by its recorded key, not by object identity.
+    question = ParsedSubQuestion(question_number="1", sub_question="a", text="Add.", has_image=True,
+                                 image_bytes=bytes(bytearray(b"png-a")), image_key="Q1_a")
+    cached = pps._exam_to_cache(pps.ParsedExam(title="t", raw_text="r", questions=[question]))
+
+    restored = pps._exam_from_cache(cached, {"Q1_a": b"png-a"})
+    assert restored.questions == [question]
+
+
+@pytest.mark.asyncio
+async def test_schedule_cached_until_prompt_changes(cache, monkeypatch):
+    answers = [ScheduleAnswer(question_number="1", sub_question="a", correct_answer="42")]
+    run_pdf = AsyncMock(return_value="schedule text")
+    ai = AsyncMock(return_value=answers)
+
+    with patch.object(pps.cpu_executor, "run_pdf", run_pdf), \
+            patch.object(PDFParserService, "_ai_parse_schedule", ai):
+        assert await PDFParserService().parse_schedule_pdf(b"%PDF sched") == answers
+        assert await PDFParserService().parse_schedule_pdf(b"%PDF sched") == answers
+        assert ai.await_count == 1
+
+        monkeypatch.setattr(pps, "SCHEDULE_PARSE_SYSTEM", pps.SCHEDULE_PARSE_SYSTEM + " Be brief.")
+        await PDFParserService().parse_schedule_pdf(b"%PDF sched")
+        assert ai.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_crop_settings_and_invalidate(cache, monkeypatch):
+    sha = pc.content_hash(b"%PDF exam")
+    await cache.put_crops(sha, {})
+    assert await cache.get_crops(sha) == {}  # an image-less PDF still hits
+
+    monkeypatch.setattr(pc._settings, "pdf_crop_format", "webp")
+    assert await cache.get_crops(sha) is None
+    await cache.put_crops(sha, {"Q1_a": b"webp"})
+    await cache.put_json("schedule", "p1", pc.content_hash(b"%PDF other"), [])
+
+    assert await cache.invalidate(sha) == 2
+    assert await cache.get_crops(sha) is None
+    assert await cache.invalidate() == 1
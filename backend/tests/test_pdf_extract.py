@@ -0,0 +1,85 @@
+"""Tests for single-pass exam PDF analysis."""
+import io
+from unittest.mock import patch
+
+import fitz
+from PIL import Image
+
+from app.services import pdf_extract
+
+
+def _png() -> bytes:
+    buf = io.BytesIO()
+    Image.new("RGB", (60, 40), (200, 30, 30)).save(buf, "PNG")
+    return buf.getvalue()
+
+
+def _exam_doc() -> fitz.Document:
+    doc = fitz.open()
+    logo_xref = 0
+    for p in range(3):
+        page = doc.new_page()
+        rect = fitz.Rect(440, 20, 500, 60)
+        if logo_xref:
+            page.insert_image(rect, xref=logo_xref)
+        else:
+            logo_xref = page.insert_image(rect, stream=_png())
+        if p == 0:
+            page.insert_text((72, 60), "Numeracy 2024", fontsize=16)
+            page.insert_text((72, 120), "QUESTION ONE: SHOPPING")
+        if p == 2:
+            page.insert_text((72, 120), "QUESTION TWO: TRAVEL")
+        page.insert_text((72, 200), f"(a) Part a on page {p + 1}")
+        page.insert_text((72, 400), f"(b) Part b on page {p + 1}")
+        page.insert_text((20, 820), "DO NOT WRITE IN THIS AREA", fontsize=8)
+    return fitz.open(stream=doc.tobytes(), filetype="pdf")
+
+
+def test_each_page_is_read_once():
+    doc = _exam_doc()
+    calls = []
+    original = fitz.Page.get_text
+
+    def counting(page, option="text", **kwargs):
+        calls.append((page.number, option, kwargs.get("textpage") is not None))
+        return original(page, option, **kwargs)
+
+    with patch.object(fitz.Page, "get_text", counting):
+        pages = pdf_extract.analyze_pages(doc)
+        pdf_extract.extract_title(pages)
+        pdf_extract.extract_full_text(pages)
+        pdf_extract.find_markers(pages)
+
+    assert sorted(calls) == sorted(
+        [(p, "dict", True) for p in range(3)] + [(p, "text", True) for p in range(3)]
+    )
+
+
+def test_extractors_work_from_page_info():
+    doc = _exam_doc()
+    pages = pdf_extract.analyze_pages(doc)
+
+    assert pdf_extract.extract_title(pages) == "Numeracy 2024"
+    text = pdf_extract.extract_full_text(pages)
+    assert text.startswith("--- Page 1 ---\n") and "--- Page 3 ---" in text
+    assert "DO NOT WRITE" not in text
+
+    markers = pdf_extract.find_markers(pages)
+    assert [(m["page"], m["type"], m["question"], m["label"]) for m in markers] == [
+        (0, "question", "1", "1"), (0, "sub", "1", "a"), (0, "sub", "1", "b"),
+        (1, "sub", "1", "a"), (1, "sub", "1", "b"),
+        (2, "question", "2", "2"), (2, "sub", "2", "a"), (2, "sub", "2", "b"),
+    ]
+    assert set(pdf_extract.extract_question_images(doc, pages)) == {"Q1_a", "Q1_b", "Q2_a", "Q2_b"}
+
+
+def test_shared_image_is_decoded_once():
+    doc = _exam_doc()
+    pages = pdf_extract.analyze_pages(doc)
+
+    with patch.object(pdf_extract, "_image_png", wraps=pdf_extract._image_png) as decode:
+        images = pdf_extract.extract_all_images(doc, pages)
+
+    assert decode.call_count == 1
+    assert sorted(images) == [0, 1, 2]
+    assert images[0][0] is images[2][0]
@@ -0,0 +1,95 @@
+"""Tests for chunked, concurrent LLM parsing of exam papers and schedules."""
+import asyncio
+import json
+import re
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+from app.services import pdf_parser_service as pps
+from app.services.pdf_parser_service import PDFParserService, TextChunk
+
+_PAPER = """--- Page 1 ---
+Numeracy 2024
+Check that this booklet has pages 2-12.
+
+--- Page 2 ---
+QUESTION ONE: SHOPPING
+(a) How much change from $20?
+(b) Which option is cheapest?
+
+--- Page 3 ---
+QUESTION ONE (continued)
+(c) Explain your choice.
+QUESTION TWO: TRAVEL
+(a) How long is the trip?
+
+--- Page 4 ---
+QUESTION THREE: SPORT
+(a) Who won?
+"""
+
+
+def test_split_at_question_headings():
+    chunks = pps.split_question_chunks(_PAPER)
+
+    assert [c.question_number for c in chunks] == ["1", "2", "3"]
+    assert chunks[0].text.startswith("--- Page 1 ---")  # preamble stays with QUESTION ONE
+    assert "(c) Explain your choice." in chunks[0].text  # "continued" heading doesn't split
+    assert chunks[1].text.startswith("QUESTION TWO") and "QUESTION THREE" not in chunks[1].text
+    assert pps.split_question_chunks("no headings here") == [TextChunk("", "no headings here")]
+
+
+def test_merge_orders_by_question_and_drops_duplicates():
+    chunks = [TextChunk("1", ""), TextChunk("2", ""), TextChunk("3", "")]
+    results = [
+        [{"question_number": "1", "sub_question": "a"}, {"question_number": "1", "sub_question": "b"}],
+        [{"sub_question": "a"}, {"question_number": "1", "sub_question": "B"}],
+        [{"question_number": "3", "sub_question": "a"}],
+    ]
+
+    merged = pps.merge_chunk_items(chunks, results)
+
+    assert [(m["question_number"], m["sub_question"]) for m in merged] == [
+        ("1", "a"), ("1", "b"), ("2", "a"), ("3", "a"),
+    ]
+
+
+class _ChunkLLM:
+    """Answers each chunk after a delay that makes later chunks finish first."""
+
+    def __init__(self):
+        self.active = 0
+        self.peak = 0
+        self.calls = 0
+
+    async def ainvoke(self, messages):
+        self.calls += 1
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        text = messages[-1].content
+        number = re.search(r"QUESTION (\d) only", text).group(1)
+        await asyncio.sleep(0.05 * (4 - int(number)))
+        self.active -= 1
+        subs = re.findall(r"^\(([a-f])\)", text, re.MULTILINE)
+        items = [
+            {"question_number": number, "sub_question": s, "question_text": f"Q{number}{s}"} for s in subs
+        ]
+        return SimpleNamespace(content=json.dumps(items))
+
+
+@pytest.mark.asyncio
+async def test_chunks_parse_concurrently_and_merge_deterministically(monkeypatch):
+    llm = _ChunkLLM()
+    monkeypatch.setattr(pps.settings, "pdf_parse_concurrency", 2)
+
+    with patch.object(pps, "get_llm", return_value=llm):
+        questions = await PDFParserService()._ai_parse_questions(_PAPER, {})
+
+    assert llm.calls == 3
+    assert llm.peak == 2
+    assert [(q.question_number, q.sub_question) for q in questions] == [
+        ("1", "a"), ("1", "b"), ("1", "c"), ("2", "a"), ("3", "a"),
+    ]
+    assert [q.order_index for q in questions] == [0, 1, 2, 3, 4]
@@ -0,0 +1,76 @@
+"""Tests for parallel question-crop rasterization."""
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+import fitz
+import pytest
+
+from app.core.cpu_executor import CPUExecutor, CPUPool
+from app.services import pdf_extract, pdf_raster
+from app.services.pdf_extract import CropJob
+
+
+def _reading_exam() -> bytes:
+    doc = fitz.open()
+    page = doc.new_page()
+    page.insert_text((72, 100), "QUESTION ONE: READING")
+    page.insert_text((72, 200), "A long passage students need for every part.")
+    for p in range(4):
+        page = doc.new_page()
+        if p == 2:
+            page.insert_text((72, 100), "QUESTION TWO: GRAPHS")
+        page.insert_text((72, 200), f"(a) Part a on page {p + 2}")
+        page.insert_text((72, 450), f"(b) Part b on page {p + 2}")
+    return doc.tobytes()
+
+
+def _jobs(pdf: bytes) -> list[CropJob]:
+    return pdf_extract.extract_exam(pdf, with_crops=False).crop_jobs
+
+
+def test_batches_keep_pages_together():
+    jobs = [CropJob(key=f"k{i}", page=page, clip=(0, 0, 1, 1)) for i, page in enumerate([3, 0, 0, 1, 1, 1, 2, 3])]
+    batches = pdf_raster.batch_jobs(jobs, 3)
+
+    assert sorted(job.key for batch in batches for job in batch) == sorted(job.key for job in jobs)
+    pages = [{job.page for job in batch} for batch in batches]
+    assert all(not (a & b) for i, a in enumerate(pages) for b in pages[i + 1:])
+    assert len(batches) <= 3
+    assert pdf_raster.batch_jobs([], 4) == []
+
+
+@pytest.mark.asyncio
+async def test_parallel_crops_match_sequential_rendering(monkeypatch, tmp_path):
+    pdf = _reading_exam()
+    executor = CPUExecutor()
+    monkeypatch.setattr(pdf_raster, "cpu_executor", executor)
+    monkeypatch.setattr(pdf_raster.settings, "pdf_crop_batches", 3)
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+    try:
+        images = await pdf_raster.render_question_crops(pdf, _jobs(pdf), image_format="png")
+    finally:
+        executor.shutdown()
+
+    doc = fitz.open(stream=pdf, filetype="pdf")
+    expected = pdf_extract.extract_question_images(doc)
+    assert list(images) == list(expected)  # passages first, plan order
+    assert images == expected
+    assert "Q1_passage_0" in images
+    assert not list(tmp_path.glob("*.pdf"))  # temp PDF removed
+
+
+@pytest.mark.asyncio
+async def test_webp_crops_stream_back(monkeypatch):
+    pdf = _reading_exam()
+    executor = CPUExecutor()
+    executor.pdf = CPUPool("pdf", lambda: ThreadPoolExecutor(max_workers=2), max_pending=4, timeout=30)
+    monkeypatch.setattr(pdf_raster, "cpu_executor", executor)
+    monkeypatch.setattr(pdf_raster.settings, "pdf_crop_batches", 2)
+    jobs = _jobs(pdf)
+    try:
+        seen = [(job, data) async for job, data in pdf_raster.iter_question_crops(pdf, jobs, image_format="webp")]
+    finally:
+        executor.shutdown()
+
+    assert sorted(job.key for job, _ in seen) == sorted(job.key for job in jobs)
+    assert all(data[:4] == b"RIFF" and data[8:12] == b"WEBP" for _, data in seen)
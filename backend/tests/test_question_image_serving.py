@@ -0,0 +1,125 @@
+"""Tests for cacheable question image serving (ETag, immutable ?v=, ranges, ?w=)."""
+import io
+
+import httpx
+import pytest
+import pytest_asyncio
+from fastapi import FastAPI
+from PIL import Image
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.api.v1 import exams
+from app.database import get_db
+from app.models.exam_paper import ExamPaper, PracticeQuestion, PracticeQuestionImage
+from app.services import question_images
+from benchmarks._sqlite import create_tables, session_factory
+
+
+def _png(width=800, height=400) -> bytes:
+    buf = io.BytesIO()
+    Image.new("RGB", (width, height), (200, 30, 30)).save(buf, "PNG")
+    return buf.getvalue()
+
+
+class _FakeRedis:
+    def __init__(self):
+        self.data = {}
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def set(self, key, value, ex=None):
+        self.data[key] = value
+
+
+@pytest_asyncio.fixture
+async def api(tmp_path, monkeypatch):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'serve.db'}")
+    await create_tables(engine, ExamPaper, PracticeQuestion, PracticeQuestionImage)
+    statements: list[str] = []
+    event.listen(engine.sync_engine, "before_cursor_execute",
+                 lambda conn, cursor, sql, *args: statements.append(sql))
+    sessions = session_factory(engine)
+
+    async with sessions() as db:
+        paper = ExamPaper(title="Numeracy 2024", year=2024, subject="numeracy", exam_code="32406", paper_type="exam")
+        db.add(paper)
+        await db.flush()
+        db.add(PracticeQuestion(
+            exam_paper_id=paper.id, question_number="1", sub_question="a", question_text="Read the graph.",
+            has_image=True, image=PracticeQuestionImage.from_bytes(_png()),
+        ))
+        await db.commit()
+
+    async def override_get_db():
+        async with sessions() as db:
+            yield db
+
+    app = FastAPI()
+    app.include_router(exams.router, prefix="/api/v1/exams")
+    app.dependency_overrides[get_db] = override_get_db
+    monkeypatch.setattr(question_images, "variant_cache", question_images.VariantCache(redis=_FakeRedis()))
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        client.statements = statements
+        client.exam_id = paper.id
+        yield client
+    await engine.dispose()
+
+
+async def _image_url(api) -> str:
+    page = (await api.get(f"/api/v1/exams/{api.exam_id}/questions")).json()
+    return page["items"][0]["image_url"]
+
+
+@pytest.mark.asyncio
+async def test_versioned_url_is_immutable_and_revalidates_without_blob(api):
+    url = await _image_url(api)
+    assert "?v=" in url
+
+    first = await api.get(url)
+    assert first.status_code == 200
+    assert first.headers["cache-control"] == question_images.IMMUTABLE
+    assert first.content == _png()
+
+    api.statements.clear()
+    again = await api.get(url, headers={"If-None-Match": first.headers["etag"]})
+    assert again.status_code == 304 and again.content == b""
+    assert not any("practice_question_images.data" in sql for sql in api.statements)
+
+    stale = await api.get(url.split("?")[0] + "?v=0000")
+    assert stale.headers["cache-control"] == question_images.REVALIDATE
+
+
+@pytest.mark.asyncio
+async def test_byte_ranges(api):
+    url = await _image_url(api)
+    size = len(_png())
+
+    part = await api.get(url, headers={"Range": "bytes=0-7"})
+    assert part.status_code == 206
+    assert part.content == b"\x89PNG\r\n\x1a\n"
+    assert part.headers["content-range"] == f"bytes 0-7/{size}"
+    assert (await api.get(url, headers={"Range": "bytes=-4"})).content == _png()[-4:]
+
+    bad = await api.get(url, headers={"Range": f"bytes={size}-"})
+    assert bad.status_code == 416
+    assert bad.headers["content-range"] == f"bytes */{size}"
+
+
+@pytest.mark.asyncio
+async def test_resized_variant_is_rendered_once(api):
+    url = await _image_url(api)
+
+    small = await api.get(url + "&w=160")
+    assert small.status_code == 200
+    assert small.headers["content-type"] == "image/webp"
+    assert Image.open(io.BytesIO(small.content)).size == (160, 80)
+    assert small.headers["etag"] != (await api.get(url)).headers["etag"]
+
+    api.statements.clear()
+    cached = await api.get(url + "&w=160")
+    assert cached.content == small.content
+    assert not any("practice_question_images.data" in sql for sql in api.statements)
+
+    assert (await api.get(url + "&w=123")).status_code == 422
@@ -0,0 +1,96 @@
+"""Tests for out-of-row question images (practice_question_images)."""
+import hashlib
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import event, select, update
+from sqlalchemy.exc import InvalidRequestError
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.api.v1 import exams
+from app.models.exam_paper import ExamPaper, PracticeQuestion, PracticeQuestionImage
+from benchmarks._sqlite import create_tables, session_factory
+from scripts.migrate_question_images import migrate_batch
+
+_PNG = b"\x89PNG\r\n\x1a\n" + b"\x00" * 64
+
+
+@pytest_asyncio.fixture
+async def db(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'images.db'}")
+    await create_tables(engine, ExamPaper, PracticeQuestion, PracticeQuestionImage)
+    statements: list[str] = []
+    event.listen(engine.sync_engine, "before_cursor_execute",
+                 lambda conn, cursor, sql, *args: statements.append(sql))
+    async with session_factory(engine)() as session:
+        session.statements = statements
+        yield session
+    await engine.dispose()
+
+
+async def _exam(db, images: list) -> ExamPaper:
+    paper = ExamPaper(title="Numeracy 2024", year=2024, subject="numeracy", exam_code="32406", paper_type="exam")
+    db.add(paper)
+    await db.flush()
+    for i, data in enumerate(images):
+        db.add(PracticeQuestion(
+            exam_paper_id=paper.id, question_number="1", sub_question=chr(97 + i), question_text=f"Q{i}",
+            has_image=data is not None, order_index=i,
+            image=PracticeQuestionImage.from_bytes(data) if data else None,
+        ))
+    await db.commit()
+    return paper
+
+
+@pytest.mark.asyncio
+async def test_listing_loads_no_image_bytes(db):
+    paper = await _exam(db, [_PNG, None, _PNG + b"2"])
+    db.statements.clear()
+
+    page = await exams.list_questions_student(paper.id, None, None, 1, 50, db)
+
+    assert [q.image_url is not None for q in page.items] == [True, False, True]
+    sql = " ".join(db.statements)
+    assert "image_data" not in sql and "practice_question_images" not in sql
+    question = (await db.execute(select(PracticeQuestion).limit(1))).scalar_one()
+    with pytest.raises(InvalidRequestError):
+        question.image_data  # deferred with raiseload
+
+
+@pytest.mark.asyncio
+async def test_image_endpoint_reads_side_table_then_legacy_column(db):
+    paper = await _exam(db, [_PNG, None])
+    first, second = (await db.execute(
+        select(PracticeQuestion.id).where(PracticeQuestion.exam_paper_id == paper.id).order_by(PracticeQuestion.id)
+    )).scalars().all()
+    await db.execute(update(PracticeQuestion).where(PracticeQuestion.id == second).values(image_data=b"legacy"))
+    await db.commit()
+
+    assert (await exams.get_question_image(first, None, None, None, None, db)).body == _PNG
+    assert (await exams.get_question_image(second, None, None, None, None, db)).body == b"legacy"
+
+
+@pytest.mark.asyncio
+async def test_migration_moves_blobs_in_resumable_batches(db):
+    await _exam(db, [None] * 5)
+    ids = (await db.execute(select(PracticeQuestion.id).order_by(PracticeQuestion.id))).scalars().all()
+    for qid in ids:
+        await db.execute(update(PracticeQuestion).where(PracticeQuestion.id == qid).values(image_data=b"img%d" % qid))
+    # Already re-cropped into the side table: the legacy copy is just cleared
+    db.add(PracticeQuestionImage.from_bytes(b"new", question_id=ids[0]))
+    await db.commit()
+
+    assert await migrate_batch(db, 2) == 2  # "interrupted" after one batch
+    assert await migrate_batch(db, 2) == 2
+    assert await migrate_batch(db, 2) == 1
+    assert await migrate_batch(db, 2) == 0
+
+    left = (await db.execute(select(PracticeQuestion.id).where(PracticeQuestion.image_data.isnot(None)))).all()
+    assert left == []
+    moved = {i.question_id: i for i in (await db.execute(select(PracticeQuestionImage))).scalars()}
+    assert moved[ids[0]].data == b"new"
+    assert moved[ids[3]].data == b"img%d" % ids[3]
+    assert moved[ids[3]].sha256 == hashlib.sha256(moved[ids[3]].data).hexdigest()
+    assert len(moved) == 5
+    versions = dict((await db.execute(select(PracticeQuestion.id, PracticeQuestion.image_sha256))).all())
+    assert versions == {qid: image.sha256 for qid, image in moved.items()}
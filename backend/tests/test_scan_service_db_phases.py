@@ -0,0 +1,113 @@
+"""The solve path must not hold a DB connection across graph (LLM) awaits."""
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+
+def _service(mod, graph_result, events):
+    svc = mod.ScanService.__new__(mod.ScanService)
+    svc.db = MagicMock()
+    svc.db.commit = AsyncMock(side_effect=lambda: events.append("commit"))
+    svc.db.flush = AsyncMock()
+    svc.db.add = MagicMock()
+    svc.db.execute = AsyncMock()
+
+    async def ainvoke(state):
+        events.append("graph")
+        return graph_result
+
+    svc._graph = MagicMock()
+    svc._graph.ainvoke = ainvoke
+    svc._followup_graph = MagicMock()
+    svc._followup_graph.ainvoke = ainvoke
+    svc._conversation_service = MagicMock()
+    svc._conversation_service.add_message = AsyncMock()
+    svc._conversation_service.get_history = AsyncMock(return_value=[])
+    svc._embedding_service = MagicMock()
+    svc._embedding_service.embed_scan_record = AsyncMock()
+    return svc
+
+
+@pytest.mark.asyncio
+async def test_precheck_is_committed_before_graph_runs(monkeypatch):
+    from app.services import scan_service as mod
+
+    events = []
+    svc = _service(mod, {
+        "ocr_text": "", "final_solution": {"steps": [], "final_answer": ""},
+        "attempt_count": 1, "cache_layer": 1,
+    }, events)
+
+    sub = MagicMock()
+    sub.get_user_tier = AsyncMock(side_effect=lambda uid: events.append("precheck") or "free")
+    sub.check_usage_limit = AsyncMock(return_value=(True, 3))
+    sub.increment_usage = AsyncMock()
+    monkeypatch.setattr(mod, "SubscriptionService", lambda db: sub)
+    monkeypatch.setattr(mod, "spawn_in_current_context", lambda coro: coro.close())
+
+    await svc.scan_and_solve(user_id=1, text="2+2=?")
+
+    assert events[:3] == ["precheck", "commit", "graph"]
+    assert events.count("commit") >= 2  # pre-check phase + persist phase
+
+
+@pytest.mark.asyncio
+async def test_followup_commits_before_graph_runs():
+    from app.services import scan_service as mod
+
+    events = []
+    svc = _service(mod, {"reply": "ok", "tokens_used": 1}, events)
+    result = MagicMock()
+    result.scalars.return_value.first.return_value = None
+    svc.db.execute = AsyncMock(return_value=result)
+
+    await svc.followup(scan_id=1, user_id=1, message="why?")
+
+    assert events.index("commit") < events.index("graph")
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("stream", [False, True])
+async def test_failed_solve_refunds_the_committed_quota_charge(tmp_path, monkeypatch, stream):
+    from types import SimpleNamespace
+
+    from sqlalchemy import select
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    from app.models.daily_usage import DailyUsage
+    from app.services import scan_service as mod
+    from app.services.quota_service import check_and_increment_quota
+    from benchmarks._sqlite import create_tables, session_factory
+
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'quota.db'}")
+    await create_tables(engine, DailyUsage)
+    sessions = session_factory(engine)
+    user = SimpleNamespace(id=1, tier=SimpleNamespace(daily_question_limit=5))
+
+    sub = MagicMock()
+    sub.get_user_tier = AsyncMock(return_value="pro")
+    monkeypatch.setattr(mod, "SubscriptionService", lambda db: sub)
+
+    async def ainvoke(state):
+        raise RuntimeError("LLM down")
+
+    async def astream(state, stream_mode):
+        raise RuntimeError("LLM down")
+        yield  # pragma: no cover
+
+    async with sessions() as db:
+        await check_and_increment_quota(user, None, db)
+        await db.commit()  # an earlier, successful question
+        quota = await check_and_increment_quota(user, None, db)
+        svc = mod.ScanService(db)
+        svc._graph = MagicMock(ainvoke=ainvoke, astream=astream)
+        if stream:
+            events = [e async for e in svc.scan_and_solve_stream(user_id=1, text="2+2=?", quota=quota)]
+            assert events[-1]["event"] == "error"
+        else:
+            with pytest.raises(RuntimeError):
+                await svc.scan_and_solve(user_id=1, text="2+2=?", quota=quota)
+
+    async with sessions() as db:
+        assert await db.scalar(select(DailyUsage.question_count)) == 1
+    await engine.dispose()
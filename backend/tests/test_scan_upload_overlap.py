@@ -0,0 +1,144 @@
+"""Scan image upload runs concurrently with the graph; its URL joins at persist."""
+import asyncio
+import io
+import time
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from fastapi import UploadFile
+
+from app.services.storage_service import StorageBackend, StorageService
+
+_DELAY = 0.3
+
+
+class _SlowBackend(StorageBackend):
+    def __init__(self, fail: bool = False):
+        self.fail = fail
+        self.stored: dict[str, bytes] = {}
+        self.deleted: list[str] = []
+
+    async def put(self, key, body, size, content_type):
+        await asyncio.sleep(_DELAY)
+        if self.fail:
+            raise ConnectionError("bucket unreachable")
+        self.stored[key] = body.read()
+        return self.url_for(key)
+
+    async def exists(self, key):
+        return key in self.stored
+
+    async def delete(self, url):
+        self.deleted.append(url)
+        return True
+
+    def url_for(self, key):
+        return f"mem://{key}"
+
+    def key_from_url(self, url):
+        return url.removeprefix("mem://")
+
+
+def _spawn(coro):
+    # Let storage work run for real; drop the fire-and-forget DB side tasks.
+    if coro.__name__ in ("put_upload", "delete_image"):
+        return asyncio.ensure_future(coro)
+    coro.close()
+
+
+def _service(mod, monkeypatch, backend, ainvoke):
+    svc = mod.ScanService.__new__(mod.ScanService)
+    svc.db = MagicMock()
+    svc.db.commit = AsyncMock()
+    svc.db.flush = AsyncMock()
+    svc.db.execute = AsyncMock()
+    svc.db.add = MagicMock()
+    svc._graph = MagicMock()
+    svc._graph.ainvoke = ainvoke
+    svc._conversation_service = MagicMock()
+    svc._conversation_service.add_message = AsyncMock()
+    svc._embedding_service = MagicMock()
+    svc._embedding_service.embed_scan_record = AsyncMock()
+
+    sub = MagicMock()
+    sub.get_user_tier = AsyncMock(return_value="free")
+    sub.check_usage_limit = AsyncMock(return_value=(True, 3))
+    sub.increment_usage = AsyncMock()
+    monkeypatch.setattr(mod, "SubscriptionService", lambda db: sub)
+    monkeypatch.setattr(mod, "spawn_in_current_context", _spawn)
+    storage = StorageService(backend=backend)
+    monkeypatch.setattr(storage, "reference_count", AsyncMock(return_value=0))
+    monkeypatch.setattr(mod, "storage_service", storage)
+    return svc
+
+
+def _upload() -> UploadFile:
+    return UploadFile(file=io.BytesIO(b"\xff\xd8scan-bytes"), filename="page.jpg")
+
+
+def _saved_image_url(svc):
+    from app.models.scan_record import ScanRecord
+
+    records = [c.args[0] for c in svc.db.add.call_args_list if isinstance(c.args[0], ScanRecord)]
+    return records[0].image_url
+
+
+_RESULT = {
+    "ocr_text": "2+2", "final_solution": {"steps": [], "final_answer": "4"},
+    "attempt_count": 1, "cache_layer": 1,
+}
+
+
+@pytest.mark.asyncio
+async def test_upload_overlaps_graph_and_url_is_saved(monkeypatch):
+    from app.services import scan_service as mod
+
+    seen = {}
+
+    async def ainvoke(state):
+        seen.update(state)
+        await asyncio.sleep(_DELAY)
+        return _RESULT
+
+    backend = _SlowBackend()
+    svc = _service(mod, monkeypatch, backend, ainvoke)
+
+    start = time.perf_counter()
+    await svc.scan_and_solve(user_id=1, image=_upload())
+    elapsed = time.perf_counter() - start
+
+    assert seen["image_bytes"] == b"\xff\xd8scan-bytes"  # graph had the bytes before the upload finished
+    assert elapsed < _DELAY * 1.8  # max(upload, graph), not the sum
+    key = next(iter(backend.stored))
+    assert _saved_image_url(svc) == f"mem://{key}"
+
+
+@pytest.mark.asyncio
+async def test_upload_failure_saves_scan_without_url(monkeypatch):
+    from app.services import scan_service as mod
+
+    async def ainvoke(state):
+        return _RESULT
+
+    svc = _service(mod, monkeypatch, _SlowBackend(fail=True), ainvoke)
+    response = await svc.scan_and_solve(user_id=1, image=_upload())
+
+    assert response is not None
+    assert _saved_image_url(svc) is None
+
+
+@pytest.mark.asyncio
+async def test_graph_failure_deletes_uploaded_object(monkeypatch):
+    from app.services import scan_service as mod
+
+    async def ainvoke(state):
+        raise RuntimeError("all providers down")
+
+    backend = _SlowBackend()
+    svc = _service(mod, monkeypatch, backend, ainvoke)
+    with pytest.raises(RuntimeError):
+        await svc.scan_and_solve(user_id=1, image=_upload())
+
+    await asyncio.sleep(_DELAY + 0.1)  # the upload finishes, then cleanup runs
+    key = next(iter(backend.stored))
+    assert backend.deleted == [f"mem://{key}"]
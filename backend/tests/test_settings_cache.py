@@ -0,0 +1,198 @@
+"""Tests for the in-process system settings cache."""
+import asyncio
+from types import MappingProxyType
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from app.services.settings_cache import SETTINGS_CHANNEL, SettingsCache, SettingsSnapshot
+
+
+def _session_factory(rows):
+    """Build an ``AsyncSessionLocal`` stand-in whose execute returns ``rows``."""
+    result = MagicMock()
+    result.all = MagicMock(return_value=rows)
+    db = MagicMock()
+    db.execute = AsyncMock(return_value=result)
+
+    class _Ctx:
+        async def __aenter__(self):
+            return db
+
+        async def __aexit__(self, exc_type, exc, tb):
+            return False
+
+    factory = MagicMock(side_effect=lambda: _Ctx())
+    factory.db = db
+    return factory
+
+
+def _row(key, value):
+    row = MagicMock()
+    row.key = key
+    row.value = value
+    return row
+
+
+def test_snapshot_typed_accessors():
+    snap = SettingsSnapshot(values=MappingProxyType({
+        "guest_daily_limit": 3,
+        "limit_str": "7",
+        "maintenance_mode": False,
+        "signup_enabled": "true",
+        "default_ai_model": "claude",
+        "ratio": "0.5",
+    }))
+
+    assert snap.get_int("guest_daily_limit", 50) == 3
+    assert snap.get_int("limit_str", 50) == 7
+    assert snap.get_int("missing", 50) == 50
+    assert snap.get_int("default_ai_model", 50) == 50
+    assert snap.get_bool("maintenance_mode", True) is False
+    assert snap.get_bool("signup_enabled") is True
+    assert snap.get_str("default_ai_model") == "claude"
+    assert snap.get_float("ratio") == 0.5
+    assert snap.get("missing", "fallback") == "fallback"
+
+
+def test_snapshot_is_immutable():
+    snap = SettingsSnapshot(values=MappingProxyType({"a": 1}))
+    with pytest.raises(TypeError):
+        snap.values["a"] = 2
+    with pytest.raises(AttributeError):
+        snap.loaded_at = 5.0
+
+
+@pytest.mark.asyncio
+async def test_load_swaps_in_new_snapshot():
+    factory = _session_factory([_row("guest_daily_limit", 3)])
+    cache = SettingsCache(session_factory=factory)
+    assert cache.snapshot is None
+
+    first = await cache.load()
+    assert cache.snapshot is first
+    assert first.get_int("guest_daily_limit") == 3
+
+    factory.db.execute.return_value.all.return_value = [_row("guest_daily_limit", 10)]
+    second = await cache.load()
+    assert cache.snapshot is second
+    assert first.get_int("guest_daily_limit") == 3  # old snapshot untouched
+    assert second.get_int("guest_daily_limit") == 10
+
+
+@pytest.mark.asyncio
+async def test_reload_and_publish_notifies_other_workers():
+    cache = SettingsCache(session_factory=_session_factory([_row("k", 1)]))
+    redis = MagicMock()
+    redis.publish = AsyncMock()
+    cache._redis = redis
+
+    await cache.reload_and_publish(["k"])
+
+    assert cache.snapshot.get("k") == 1
+    redis.publish.assert_awaited_once_with(SETTINGS_CHANNEL, '["k"]')
+
+
+@pytest.mark.asyncio
+async def test_reload_and_publish_fails_open_on_redis_error():
+    cache = SettingsCache(session_factory=_session_factory([_row("k", 1)]))
+    redis = MagicMock()
+    redis.publish = AsyncMock(side_effect=ConnectionError("redis down"))
+    cache._redis = redis
+
+    await cache.reload_and_publish(["k"])  # must not raise
+    assert cache.snapshot.get("k") == 1
+
+
+@pytest.mark.asyncio
+async def test_listener_reloads_on_change_message(monkeypatch):
+    factory = _session_factory([_row("guest_daily_limit", 3)])
+    cache = SettingsCache(session_factory=factory)
+
+    delivered = asyncio.Event()
+
+    async def get_message(ignore_subscribe_messages, timeout):
+        if not delivered.is_set():
+            delivered.set()
+            return {"type": "message", "data": '["guest_daily_limit"]'}
+        await asyncio.sleep(3600)
+
+    pubsub = MagicMock()
+    pubsub.subscribe = AsyncMock()
+    pubsub.get_message = get_message
+    pubsub.aclose = AsyncMock()
+    redis = MagicMock()
+    redis.pubsub = MagicMock(return_value=pubsub)
+    redis.aclose = AsyncMock()
+
+    cache.start_listener(redis)
+    await asyncio.wait_for(delivered.wait(), timeout=1)
+    for _ in range(10):
+        if cache.snapshot is not None:
+            break
+        await asyncio.sleep(0)
+    await cache.stop_listener()
+
+    pubsub.subscribe.assert_awaited_once_with(SETTINGS_CHANNEL)
+    assert cache.snapshot.get_int("guest_daily_limit") == 3
+
+
+@pytest.mark.asyncio
+async def test_listener_closes_pubsub_before_resubscribing(monkeypatch):
+    from app.config import get_settings
+
+    monkeypatch.setattr(get_settings(), "settings_cache_refresh_seconds", 0.01)
+    cache = SettingsCache(session_factory=_session_factory([]))
+    resubscribed = asyncio.Event()
+
+    async def idle(ignore_subscribe_messages, timeout):
+        await asyncio.sleep(3600)
+
+    def make_pubsub():
+        pubsub = MagicMock()
+        pubsub.subscribe = AsyncMock()
+        pubsub.aclose = AsyncMock()
+        if redis.pubsub.call_count == 1:
+            pubsub.get_message = AsyncMock(side_effect=ConnectionError("connection reset"))
+        else:
+            resubscribed.set()
+            pubsub.get_message = idle
+        pubsubs.append(pubsub)
+        return pubsub
+
+    pubsubs = []
+    redis = MagicMock()
+    redis.pubsub = MagicMock(side_effect=make_pubsub)
+    redis.aclose = AsyncMock()
+
+    cache.start_listener(redis)
+    await asyncio.wait_for(resubscribed.wait(), timeout=1)
+    await cache.stop_listener()
+
+    pubsubs[0].aclose.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_get_setting_value_prefers_snapshot(monkeypatch):
+    from app.services import quota_service
+
+    cache = SettingsCache(session_factory=_session_factory([_row("guest_daily_limit", 3)]))
+    await cache.load()
+    monkeypatch.setattr(quota_service, "settings_cache", cache)
+
+    db = MagicMock()
+    db.scalar = AsyncMock()
+    assert await quota_service.get_setting_value("guest_daily_limit", db, default=50) == 3
+    assert await quota_service.get_setting_value("missing", db, default=50) == 50
+    db.scalar.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_get_setting_value_falls_back_to_db_before_first_load(monkeypatch):
+    from app.services import quota_service
+
+    monkeypatch.setattr(quota_service, "settings_cache", SettingsCache())
+    db = MagicMock()
+    db.scalar = AsyncMock(return_value=7)
+    assert await quota_service.get_setting_value("guest_daily_limit", db, default=50) == 7
+    db.scalar.assert_awaited_once()
@@ -0,0 +1,164 @@
+"""Tests for the streaming storage service (local backend and S3 transfer config)."""
+import hashlib
+import io
+from unittest.mock import AsyncMock, MagicMock
+
+import boto3
+import pytest
+from botocore.exceptions import ClientError
+from botocore.stub import Stubber
+from fastapi import HTTPException, UploadFile
+from starlette.datastructures import Headers
+
+from app.services import storage_service as ss
+from app.services.storage_service import LocalBackend, R2Backend, StorageService
+
+
+class _CountingIO(io.BytesIO):
+    bytes_read = 0
+
+    def read(self, size=-1):
+        data = super().read(size)
+        self.bytes_read += len(data)
+        return data
+
+
+def _upload(data: bytes, filename="photo.JPG", content_type="image/jpeg"):
+    return UploadFile(
+        file=_CountingIO(data), filename=filename, headers=Headers({"content-type": content_type}),
+    )
+
+
+@pytest.mark.asyncio
+async def test_store_upload_reads_once_and_tees_bytes(tmp_path):
+    data = b"\xff\xd8" + bytes(range(256)) * 9000  # ~2.3 MB, several read chunks
+    upload = _upload(data)
+    service = StorageService(backend=LocalBackend(str(tmp_path)))
+
+    stored, body = await service.store_upload(upload)
+
+    assert body == data
+    assert upload.file.bytes_read == len(data)  # storage and OCR share one read
+    assert stored.sha256 == hashlib.sha256(data).hexdigest()
+    assert stored.size == len(data)
+    assert stored.key.startswith("scans/") and stored.key.endswith(".jpg")
+    assert (tmp_path / stored.key).read_bytes() == data
+    assert not list(tmp_path.rglob("*.part"))
+
+
+@pytest.mark.asyncio
+async def test_local_delete(tmp_path, monkeypatch):
+    service = StorageService(backend=LocalBackend(str(tmp_path)))
+    monkeypatch.setattr(service, "reference_count", AsyncMock(return_value=0))
+    url = await service.upload_image(_upload(b"img"))
+    assert await service.delete_image(url) is True
+    assert await service.delete_image(url) is False
+
+
+@pytest.mark.asyncio
+async def test_duplicate_content_is_stored_once(tmp_path, monkeypatch):
+    data = b"\x89PNG\r\n\x1a\n" + b"same homework photo"
+    backend = LocalBackend(str(tmp_path))
+    monkeypatch.setattr(backend, "put", AsyncMock(wraps=backend.put))
+    service = StorageService(backend=backend)
+
+    first, _ = await service.store_upload(_upload(data, filename="a.jpeg", content_type="image/jpeg"))
+    second, _ = await service.store_upload(_upload(data, filename="b.PNG"))
+
+    assert first.key == second.key == f"scans/{hashlib.sha256(data).hexdigest()}.png"
+    assert first.url == second.url
+    assert first.content_type == "image/png"  # sniffed, not the client's header
+    assert backend.put.await_count == 1
+
+    # Another worker finds the object with the same existence check.
+    other = StorageService(backend=backend)
+    third, _ = await other.store_upload(_upload(data))
+    assert third.url == first.url
+    assert backend.put.await_count == 1
+
+
+@pytest.mark.asyncio
+async def test_delete_keeps_objects_still_referenced(tmp_path, monkeypatch):
+    backend = LocalBackend(str(tmp_path))
+    service = StorageService(backend=backend)
+    refs = AsyncMock(return_value=1)
+    monkeypatch.setattr(service, "reference_count", refs)
+    stored, _ = await service.store_upload(_upload(b"shared"))
+
+    assert await service.delete_image(stored.url) is False
+    assert (tmp_path / stored.key).exists()
+
+    refs.return_value = 0
+    assert await service.delete_image(stored.url) is True
+    assert not (tmp_path / stored.key).exists()
+
+    # Re-uploading after the delete stores the object again.
+    again, _ = await service.store_upload(_upload(b"shared"))
+    assert (tmp_path / again.key).read_bytes() == b"shared"
+
+
+@pytest.mark.asyncio
+async def test_upload_after_another_worker_deleted_the_object_stores_it_again(tmp_path, monkeypatch):
+    backend = LocalBackend(str(tmp_path))
+    worker_a, worker_b = StorageService(backend=backend), StorageService(backend=backend)
+    monkeypatch.setattr(worker_b, "reference_count", AsyncMock(return_value=0))
+
+    stored, _ = await worker_a.store_upload(_upload(b"homework"))
+    assert await worker_b.delete_image(stored.url) is True
+
+    # Worker A saw the object moments ago; it must not trust that.
+    again, _ = await worker_a.store_upload(_upload(b"homework"))
+    assert again.url == stored.url
+    assert (tmp_path / again.key).read_bytes() == b"homework"
+
+
+@pytest.mark.asyncio
+async def test_oversized_upload_is_rejected(tmp_path, monkeypatch):
+    monkeypatch.setattr(ss.settings, "storage_max_upload_mb", 1)
+    service = StorageService(backend=LocalBackend(str(tmp_path)))
+    with pytest.raises(HTTPException) as exc:
+        await service.store_upload(_upload(b"x" * (ss._MB + 1)))
+    assert exc.value.status_code == 413
+    assert not list(tmp_path.rglob("*.jpg"))
+
+
+@pytest.mark.asyncio
+async def test_r2_backend_urls_and_delete(monkeypatch):
+    monkeypatch.setattr(ss.settings, "r2_endpoint_url", "http://localhost:9000")
+    monkeypatch.setattr(ss.settings, "r2_public_url", "")
+    client = MagicMock()
+    backend = R2Backend(client=client)
+
+    url = await backend.put("scans/a.jpg", io.BytesIO(b"img"), 3, "image/jpeg")
+    assert url == "http://localhost:9000/eduscan/scans/a.jpg"
+    kwargs = client.upload_fileobj.call_args.kwargs
+    assert kwargs["ExtraArgs"] == {"ContentType": "image/jpeg"}
+    assert kwargs["Config"].multipart_threshold == ss.settings.storage_multipart_threshold_mb * ss._MB
+
+    assert backend.key_from_url(url) == "scans/a.jpg"
+    assert await backend.exists("scans/a.jpg") is True
+    client.head_object.side_effect = ClientError({"Error": {"Code": "404"}}, "HeadObject")
+    assert await backend.exists("scans/b.jpg") is False
+    await backend.delete(url)
+    client.delete_object.assert_called_once_with(Bucket="eduscan", Key="scans/a.jpg")
+
+
+@pytest.mark.asyncio
+async def test_large_objects_use_multipart(monkeypatch):
+    monkeypatch.setattr(ss.settings, "storage_multipart_threshold_mb", 5)
+    monkeypatch.setattr(ss.settings, "storage_multipart_chunk_mb", 5)
+    monkeypatch.setattr(ss.settings, "storage_max_concurrency", 1)  # deterministic part order
+    client = boto3.client(
+        "s3", endpoint_url="http://localhost:9000", region_name="auto",
+        aws_access_key_id="test", aws_secret_access_key="test",
+    )
+    stubber = Stubber(client)
+    stubber.add_response("create_multipart_upload", {"UploadId": "u1"})
+    for _ in range(3):
+        stubber.add_response("upload_part", {"ETag": '"etag"'})
+    stubber.add_response("complete_multipart_upload", {})
+
+    with stubber:
+        backend = R2Backend(client=client)
+        await backend.put("scans/big.png", io.BytesIO(b"x" * (12 * ss._MB)), 12 * ss._MB, "image/png")
+    stubber.assert_no_pending_responses()
@@ -0,0 +1,169 @@
+"""Tests for the usage ledger (per-call cost accounting)."""
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from langchain_core.messages import HumanMessage
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.llm import fake
+from app.observability import usage_ledger as ul
+from app.observability.pricing import estimate_cost
+
+
+@pytest.fixture
+def ledger(monkeypatch):
+    """Fresh ledger whose session factory is a mock."""
+    db = MagicMock()
+    db.execute = AsyncMock()
+    db.commit = AsyncMock()
+
+    class _Ctx:
+        async def __aenter__(self):
+            return db
+
+        async def __aexit__(self, *exc):
+            return False
+
+    factory = MagicMock(side_effect=lambda: _Ctx())
+    instance = ul.UsageLedger(session_factory=factory)
+    instance.db = db
+    monkeypatch.setattr(ul, "usage_ledger", instance)
+    monkeypatch.setattr(fake.get_settings(), "fake_llm_latency_scale", 0.0)
+    return instance
+
+
+async def _request(app_body):
+    """Run ``app_body`` inside UsageScopeMiddleware like an HTTP request."""
+    async def app(scope, receive, send):
+        await app_body()
+
+    await ul.UsageScopeMiddleware(app)({"type": "http", "path": "/api/v1/scan/solve"}, None, None)
+
+
+def test_estimate_cost_prefers_longest_model_match():
+    assert estimate_cost("gpt-4o", 1_000_000, 0) == pytest.approx(2.50)
+    assert estimate_cost("gpt-4o-mini-2024-07-18", 1_000_000, 0) == pytest.approx(0.15)
+    assert estimate_cost("claude-sonnet-4-20250514", 1000, 1000) == pytest.approx(0.018)
+    assert estimate_cost("fake-strong", 1000, 1000) == 0.0
+
+
+@pytest.mark.asyncio
+async def test_calls_aggregate_per_request_with_annotations(ledger, monkeypatch):
+    from app.llm import registry
+
+    monkeypatch.setattr(registry.get_settings(), "llm_provider_override", "fake")
+
+    async def body():
+        ul.annotate(user_id=7, tier="free")
+        llm = registry.get_llm("fast")
+        await llm.ainvoke([HumanMessage(content="Solve for x: 2x + 5 = 15")])
+        await llm.ainvoke([HumanMessage(content="Solve for x: 3x - 1 = 8")])
+        ul.record("embedding", "openai", "text-embedding-3-small", prompt_tokens=1000, operation="embedding")
+        ul.annotate(subject="math", cache_layer=4)
+
+    await _request(body)
+
+    rows = {(r["kind"], r["model"]): r for r in ledger._buffer}
+    assert len(rows) == 2
+    llm_row = rows[("llm", "fake-fast")]
+    assert llm_row["calls"] == 2
+    assert llm_row["prompt_tokens"] > 0
+    assert llm_row["provider"] == "fake"
+    assert (llm_row["user_id"], llm_row["tier"], llm_row["subject"], llm_row["cache_layer"]) == (7, "free", "math", 4)
+    assert llm_row["route"] == "/api/v1/scan/solve"
+    emb = rows[("embedding", "text-embedding-3-small")]
+    assert float(emb["cost_usd"]) == pytest.approx(0.00002)
+    assert llm_row["request_id"] == emb["request_id"]
+
+
+@pytest.mark.asyncio
+async def test_operation_label_from_context(ledger):
+    async def body():
+        with ul.usage_operation("deep_evaluate"):
+            ul.record("llm", "google_genai", "gemini-2.5-flash", 10, 10)
+
+    await _request(body)
+    assert ledger._buffer[0]["operation"] == "deep_evaluate"
+
+
+@pytest.mark.asyncio
+async def test_calls_after_request_end_get_their_own_row(ledger):
+    captured = {}
+
+    async def body():
+        ul.annotate(user_id=3, cache_layer=4)
+        ul.record("llm", "anthropic", "claude-sonnet-4-20250514", 10, 10)
+        captured["scope"] = ul.current_scope()
+
+    await _request(body)
+    assert len(ledger._buffer) == 1
+
+    # A spawned background task still sees the (now closed) scope.
+    token = ul._current_scope.set(captured["scope"])
+    try:
+        ul.record("llm", "google_genai", "gemini-2.5-flash", 5, 5, operation="deep_evaluate")
+    finally:
+        ul._current_scope.reset(token)
+
+    assert len(ledger._buffer) == 2
+    late = ledger._buffer[1]
+    assert late["request_id"] == ledger._buffer[0]["request_id"]
+    assert (late["user_id"], late["cache_layer"], late["operation"]) == (3, 4, "deep_evaluate")
+
+
+@pytest.mark.asyncio
+async def test_record_outside_request_writes_immediately(ledger):
+    ul.record("llm", "openai", "gpt-4o", 100, 10, operation="script")
+    assert len(ledger._buffer) == 1
+    assert ledger._buffer[0]["user_id"] is None
+
+
+@pytest.mark.asyncio
+async def test_flush_inserts_batch_and_clears_buffer(ledger):
+    ledger.push([{"request_id": "r"}] * 3)
+    assert await ledger.flush() == 3
+    assert ledger.pending == 0
+    ledger.db.execute.assert_awaited_once()
+    ledger.db.commit.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_flush_failure_drops_batch_without_raising(ledger):
+    ledger.db.execute.side_effect = ConnectionError("db down")
+    ledger.push([{"request_id": "r"}])
+    assert await ledger.flush() == 0
+    assert ledger.pending == 0
+
+
+def test_buffer_is_bounded(ledger):
+    ledger._max_buffer = 5
+    ledger.push([{"n": i} for i in range(8)])
+    assert [r["n"] for r in ledger._buffer] == [3, 4, 5, 6, 7]
+
+
+@pytest.mark.asyncio
+async def test_admin_cost_grouping(tmp_path):
+    from benchmarks._sqlite import create_tables, session_factory
+    from app.api.v1.admin import get_usage_cost
+    from app.models.usage_ledger import UsageLedgerEntry
+
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'ledger.db'}")
+    await create_tables(engine, UsageLedgerEntry)
+    factory = session_factory(engine)
+    writer = ul.UsageLedger(session_factory=factory)
+
+    for request_id, layer, cost_tokens in [("a", 4, 1000), ("b", 4, 3000), ("c", 1, 0)]:
+        scope = ul.UsageScope(route="/api/v1/scan/solve")
+        scope.request_id, scope.cache_layer = request_id, layer
+        scope.add(("llm", "solve", "anthropic", "claude-sonnet-4-20250514"), cost_tokens, 0, 100, cost_tokens * 3e-6)
+        writer.push(scope.rows())
+    assert await writer.flush() == 3
+
+    async with factory() as db:
+        result = await get_usage_cost(group_by="cache_layer", days=1, user_id=None, limit=10, db=db)
+    await engine.dispose()
+
+    by_layer = {row["key"]: row for row in result["rows"]}
+    assert by_layer[4]["requests"] == 2
+    assert by_layer[4]["cost_per_request"] == pytest.approx(0.006)
+    assert by_layer[1]["cost_usd"] == 0.0